@@ -0,0 +1,206 @@
+"""响应压缩基准测试
+
+通过七牛云替身加载音乐库，连续翻页调用 get_music_list，将每页结果按 MCP 的
+JSON-RPC 响应格式封装为 SSE 事件，测量每种编码（以及不压缩）的：
+- 压缩率：压缩后字节数 / 原始字节数
+- 每页编码耗时
+- 按给定带宽估算的每页传输耗时（编码耗时 + 传输耗时）
+
+流式编码器在一个 SSE 连接内复用压缩上下文，每个事件后同步刷新，与服务端中间件的行为一致。
+
+用法:
+    python -m benchmarks.compression --output compression.json
+    python -m benchmarks.compression --page-sizes 20,100,500 --bandwidth 2000
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, List
+
+import click
+
+from .fake_qiniu import FakeQiniuBackend, FakeQiniuServer
+from .stats import compare, metric, summarize, write_results
+
+OBJECTS_PER_BUCKET = 500
+REGION_NAME = "bench-region"
+NEXT_CURSOR_PREFIX = "next_cursor: "
+
+
+def _parse_ints(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def sse_event(request_id: int, texts: List[str]) -> bytes:
+    """按 MCP SSE 传输的格式封装一次工具调用的响应"""
+    message = {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "result": {
+            "content": [{"type": "text", "text": text} for text in texts],
+            "isError": False,
+        },
+    }
+    return f"event: message\r\ndata: {json.dumps(message)}\r\n\r\n".encode()
+
+
+async def collect_pages(
+    endpoint_url: str, backend: FakeQiniuBackend, tracks: int, page_size: int
+) -> List[bytes]:
+    """创建会话并从头到尾翻页，返回每页对应的 SSE 事件"""
+    from mcp_server import core
+    from mcp_server.session import session_manager
+    from mcp_server.tools import tools
+
+    core.load()
+    buckets = []
+    for index in range(0, tracks, OBJECTS_PER_BUCKET):
+        name = f"compress-{page_size}-{index // OBJECTS_PER_BUCKET}"
+        backend.add_bucket(
+            name, min(OBJECTS_PER_BUCKET, tracks - index), seed=index + 1
+        )
+        buckets.append(name)
+    session_id = await session_manager.create_session(
+        access_key=f"compress-ak-{page_size}",
+        secret_key="compress-sk",
+        endpoint_url=endpoint_url,
+        region_name=REGION_NAME,
+        buckets=buckets,
+    )
+
+    events = []
+    arguments: Dict[str, Any] = {"session_id": session_id, "max_keys": page_size}
+    while True:
+        result = await tools.call_tool("get_music_list", dict(arguments))
+        texts = [content.text for content in result]
+        events.append(sse_event(len(events) + 1, texts))
+        if not texts[-1].startswith(NEXT_CURSOR_PREFIX):
+            return events
+        arguments["cursor"] = texts[-1].removeprefix(NEXT_CURSOR_PREFIX)
+
+
+def measure_encoding(
+    name: str, events: List[bytes], bandwidth_kbps: float
+) -> Dict[str, Any]:
+    """在一个流中依次编码全部事件"""
+    from mcp_server.transport.compression import available_encoders
+
+    encoder = available_encoders()[name]() if name != "identity" else None
+    raw = compressed = 0
+    encode_times, page_times = [], []
+    for event in events:
+        start = time.perf_counter()
+        data = event if encoder is None else encoder.compress(event) + encoder.flush()
+        elapsed = time.perf_counter() - start
+        raw += len(event)
+        compressed += len(data)
+        encode_times.append(elapsed)
+        page_times.append(elapsed + len(data) * 8 / (bandwidth_kbps * 1000))
+    return {
+        "raw_bytes": raw,
+        "compressed_bytes": compressed,
+        "ratio": compressed / raw,
+        "encode": summarize(encode_times),
+        "page": summarize(page_times),
+    }
+
+
+def run(params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    from mcp_server.core.storage.storage import UC_HOST_ENV
+    from mcp_server.transport.compression import available_encoders
+
+    encodings = ["identity", *available_encoders()]
+    results = []
+    backend = FakeQiniuBackend(seed=params["seed"])
+    with FakeQiniuServer(backend) as server:
+        os.environ[UC_HOST_ENV] = server.url
+        for page_size in params["page_sizes"]:
+            events = asyncio.run(
+                collect_pages(server.url, backend, params["tracks"], page_size)
+            )
+            for encoding in encodings:
+                stats = measure_encoding(encoding, events, params["bandwidth"])
+                prefix = f"compression/{encoding}/page={page_size}"
+                results.append(
+                    metric(
+                        f"{prefix}/ratio",
+                        stats["ratio"],
+                        "ratio",
+                        pages=len(events),
+                        raw_bytes=stats["raw_bytes"],
+                        compressed_bytes=stats["compressed_bytes"],
+                    )
+                )
+                results.append(
+                    metric(
+                        f"{prefix}/encode_p50",
+                        stats["encode"]["p50"],
+                        "s",
+                        timings=stats["encode"],
+                    )
+                )
+                results.append(
+                    metric(
+                        f"{prefix}/page_p50",
+                        stats["page"]["p50"],
+                        "s",
+                        bandwidth_kbps=params["bandwidth"],
+                        timings=stats["page"],
+                    )
+                )
+    return results
+
+
+@click.command()
+@click.option("--tracks", default=2000, help="Tracks in the benchmark catalog")
+@click.option(
+    "--page-sizes",
+    default="20,100,500",
+    callback=lambda ctx, param, value: _parse_ints(value),
+    help="Comma separated get_music_list page sizes",
+)
+@click.option(
+    "--bandwidth",
+    default=5000.0,
+    type=click.FloatRange(min=1),
+    help="Simulated client bandwidth in kbit/s for transfer time",
+)
+@click.option("--seed", default=0, help="Random seed for generated objects")
+@click.option("--output", default="-", help='Result file, "-" for stdout')
+@click.option(
+    "--compare",
+    "baseline",
+    default=None,
+    help="Baseline result file to compare against",
+)
+@click.option(
+    "--tolerance", default=0.2, type=float, help="Allowed relative regression"
+)
+def main(
+    tracks: int,
+    page_sizes: List[int],
+    bandwidth: float,
+    seed: int,
+    output: str,
+    baseline: str,
+    tolerance: float,
+) -> None:
+    params = {
+        "tracks": tracks,
+        "page_sizes": page_sizes,
+        "bandwidth": bandwidth,
+        "seed": seed,
+    }
+    document = write_results("compression", params, run(params), output)
+    if baseline:
+        failures = compare(document, baseline, tolerance)
+        for line in failures:
+            click.echo(f"REGRESSION {line}", err=True)
+        if failures:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,512 @@
+"""七牛云 S3/UC 本地替身
+
+在本进程的后台线程中启动一个 HTTP 服务，模拟服务端用到的接口：
+- S3（path-style）：ListBuckets、ListObjectsV2、GetObject、PutObject
+- UC：/v3/domains、/v2/bucketInfo、/v4/query
+- 上传：表单上传（七牛 SDK 的 put_data/put_file）
+- 抓取：/fetch（七牛 SDK 的 BucketManager.fetch），不访问源地址，按地址生成对象
+- 文件信息：/stat（七牛 SDK 的 BucketManager.stat）
+- 事件通知：FakeEventNotifier 模拟转发服务，以七牛云事件通知的格式向服务端的 Webhook 推送对象事件
+
+对象按种子确定性生成，每个请求可附加固定延迟，用于离线基准测试与压测。
+"""
+
+import asyncio
+import base64
+import bisect
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+from xml.sax.saxutils import escape
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+MUSIC_EXTENSIONS = (".mp3", ".flac", ".m4a", ".ogg", ".wav")
+LAST_MODIFIED = "2024-01-01T00:00:00.000Z"
+S3_NAMESPACE = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+# GetObject 返回的内容上限，避免生成与对象大小相同的数据
+MAX_BODY_BYTES = 64 * 1024
+
+
+@dataclass
+class FakeObject:
+    key: str
+    size: int
+    etag: str
+    body: Optional[bytes] = None
+
+
+@dataclass
+class FakeBucket:
+    name: str
+    private: bool = False
+    objects: Dict[str, FakeObject] = field(default_factory=dict)
+    # UC 返回的下载域名，为空时返回一个 CDN 域名
+    domains: List[Dict[str, Any]] = field(default_factory=list)
+    _keys: List[str] = field(default_factory=list)
+
+    def put(self, obj: FakeObject) -> None:
+        if obj.key not in self.objects:
+            bisect.insort(self._keys, obj.key)
+        self.objects[obj.key] = obj
+
+    def delete(self, key: str) -> bool:
+        if self.objects.pop(key, None) is None:
+            return False
+        self._keys.pop(bisect.bisect_left(self._keys, key))
+        return True
+
+    def list(self, prefix: str, start_after: str, max_keys: int) -> List[FakeObject]:
+        index = bisect.bisect_right(self._keys, start_after) if start_after else 0
+        if prefix:
+            index = max(index, bisect.bisect_left(self._keys, prefix))
+        result = []
+        while index < len(self._keys) and len(result) < max_keys:
+            key = self._keys[index]
+            if not key.startswith(prefix):
+                break
+            result.append(self.objects[key])
+            index += 1
+        return result
+
+    @property
+    def domain(self) -> str:
+        return f"{self.name}.cdn.example.test"
+
+
+def generate_objects(
+    count: int, seed: int = 0, non_music_ratio: float = 0.05
+) -> List[FakeObject]:
+    """确定性生成音乐库对象
+
+    Args:
+        count: 对象数量
+        seed: 随机种子，相同种子生成相同的对象
+        non_music_ratio: 非音乐文件（封面图片）的比例
+    """
+    rng = random.Random(seed)
+    objects = []
+    for i in range(count):
+        folder = f"artist-{i % 97:03d}/album-{(i // 7) % 13:02d}"
+        if rng.random() < non_music_ratio:
+            key = f"{folder}/cover-{i:06d}.jpg"
+        else:
+            key = f"{folder}/track-{i:06d}{rng.choice(MUSIC_EXTENSIONS)}"
+        etag = hashlib.md5(f"{seed}:{key}".encode()).hexdigest()
+        objects.append(FakeObject(key, rng.randint(1 << 20, 12 << 20), etag))
+    return objects
+
+
+def _urlsafe_b64decode(value: str) -> str:
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)).decode("utf-8")
+
+
+class FakeQiniuBackend:
+    """模拟七牛云 S3 与 UC 接口的 Starlette 应用"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: int = 0):
+        """初始化替身后端
+
+        Args:
+            latency: 每个请求附加的延迟（秒）
+            jitter: 延迟的随机抖动上限（秒）
+            seed: 生成对象与抖动使用的随机种子
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.seed = seed
+        self.buckets: Dict[str, FakeBucket] = {}
+        self.requests: Counter = Counter()
+        # 源地址 -> 抓取时需要先返回 599 的次数，用于模拟临时故障
+        self.fetch_failures: Counter = Counter()
+        # 源地址 -> 抓取完成后仍返回 599 的次数，用于模拟文件已写入但响应丢失
+        self.fetch_lost_responses: Counter = Counter()
+        self._rng = random.Random(seed)
+        self.app = Starlette(
+            routes=[
+                Route("/v3/domains", self._domains, methods=["POST", "GET"]),
+                Route("/v2/bucketInfo", self._bucket_info, methods=["POST", "GET"]),
+                Route("/v4/query", self._query_regions, methods=["GET"]),
+                Route("/fetch/{resource}/to/{entry}", self._fetch, methods=["POST"]),
+                Route("/stat/{entry}", self._stat, methods=["POST", "GET"]),
+                Route("/", self._list_buckets, methods=["GET"]),
+                Route("/", self._form_upload, methods=["POST"]),
+                Route("/{bucket}", self._list_objects, methods=["GET"]),
+                Route("/{bucket}/{key:path}", self._object, methods=["GET", "PUT"]),
+            ]
+        )
+
+    def add_bucket(
+        self,
+        name: str,
+        count: int = 0,
+        private: bool = False,
+        seed: Optional[int] = None,
+    ) -> FakeBucket:
+        """添加存储桶并生成 count 个对象"""
+        bucket = FakeBucket(name, private=private)
+        for obj in generate_objects(count, seed=self.seed if seed is None else seed):
+            bucket.put(obj)
+        self.buckets[name] = bucket
+        return bucket
+
+    async def _delay(self, operation: str) -> None:
+        self.requests[operation] += 1
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _error(self, code: str, status: int) -> Response:
+        body = (
+            f'<?xml version="1.0" encoding="UTF-8"?><Error><Code>{code}</Code></Error>'
+        )
+        return Response(body, status_code=status, media_type="application/xml")
+
+    async def _list_buckets(self, request: Request) -> Response:
+        await self._delay("ListBuckets")
+        buckets = "".join(
+            f"<Bucket><Name>{escape(name)}</Name><CreationDate>{LAST_MODIFIED}</CreationDate></Bucket>"
+            for name in sorted(self.buckets)
+        )
+        body = (
+            f'<?xml version="1.0" encoding="UTF-8"?>'
+            f'<ListAllMyBucketsResult xmlns="{S3_NAMESPACE}">'
+            f"<Owner><ID>fake</ID><DisplayName>fake</DisplayName></Owner>"
+            f"<Buckets>{buckets}</Buckets></ListAllMyBucketsResult>"
+        )
+        return Response(body, media_type="application/xml")
+
+    async def _list_objects(self, request: Request) -> Response:
+        await self._delay("ListObjectsV2")
+        bucket = self.buckets.get(request.path_params["bucket"])
+        if bucket is None:
+            return self._error("NoSuchBucket", 404)
+
+        params = request.query_params
+        prefix = params.get("prefix", "")
+        start_after = params.get("continuation-token") or params.get("start-after", "")
+        max_keys = int(params.get("max-keys", 1000))
+        objects = bucket.list(prefix, start_after, max_keys + 1)
+        truncated = len(objects) > max_keys
+        objects = objects[:max_keys]
+
+        contents = "".join(
+            f"<Contents><Key>{escape(obj.key)}</Key><LastModified>{LAST_MODIFIED}</LastModified>"
+            f'<ETag>"{obj.etag}"</ETag><Size>{obj.size}</Size>'
+            f"<StorageClass>STANDARD</StorageClass></Contents>"
+            for obj in objects
+        )
+        next_token = (
+            f"<NextContinuationToken>{escape(objects[-1].key)}</NextContinuationToken>"
+            if truncated
+            else ""
+        )
+        body = (
+            f'<?xml version="1.0" encoding="UTF-8"?>'
+            f'<ListBucketResult xmlns="{S3_NAMESPACE}">'
+            f"<Name>{escape(bucket.name)}</Name><Prefix>{escape(prefix)}</Prefix>"
+            f"<KeyCount>{len(objects)}</KeyCount><MaxKeys>{max_keys}</MaxKeys>"
+            f"<IsTruncated>{'true' if truncated else 'false'}</IsTruncated>"
+            f"{contents}{next_token}</ListBucketResult>"
+        )
+        return Response(body, media_type="application/xml")
+
+    async def _object(self, request: Request) -> Response:
+        bucket = self.buckets.get(request.path_params["bucket"])
+        key = request.path_params["key"]
+        if request.method == "PUT":
+            await self._delay("PutObject")
+            if bucket is None:
+                return self._error("NoSuchBucket", 404)
+            body = await request.body()
+            etag = hashlib.md5(body).hexdigest()
+            bucket.put(FakeObject(key, len(body), etag, body))
+            return Response(status_code=200, headers={"ETag": f'"{etag}"'})
+
+        await self._delay("GetObject")
+        obj = bucket.objects.get(key) if bucket is not None else None
+        if obj is None:
+            return self._error("NoSuchKey", 404)
+        body = (
+            obj.body if obj.body is not None else b"\0" * min(obj.size, MAX_BODY_BYTES)
+        )
+        return Response(
+            body,
+            media_type="application/octet-stream",
+            headers={
+                "ETag": f'"{obj.etag}"',
+                "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT",
+            },
+        )
+
+    def _qiniu_json(self, content, status_code: int = 200) -> Response:
+        # 七牛 SDK 通过 X-Reqid 判断响应是否来自七牛服务
+        return JSONResponse(
+            content, status_code=status_code, headers={"X-Reqid": uuid.uuid4().hex}
+        )
+
+    async def _domains(self, request: Request) -> Response:
+        await self._delay("UcDomains")
+        bucket = self.buckets.get(request.query_params.get("tbl", ""))
+        if bucket is None:
+            return self._qiniu_json({"error": "no such bucket"}, status_code=612)
+        return self._qiniu_json(
+            bucket.domains or [{"domain": bucket.domain, "domaintype": 0}]
+        )
+
+    async def _bucket_info(self, request: Request) -> Response:
+        await self._delay("UcBucketInfo")
+        bucket = self.buckets.get(request.query_params.get("bucket", ""))
+        if bucket is None:
+            return self._qiniu_json({"error": "no such bucket"}, status_code=612)
+        return self._qiniu_json({"private": 1 if bucket.private else 0})
+
+    async def _query_regions(self, request: Request) -> Response:
+        # 所有服务（包括上传）都指向替身自身
+        await self._delay("UcQuery")
+        hosts = {"domains": [request.url.netloc]}
+        region = {"region": "fake", "ttl": 86400}
+        region.update({service: hosts for service in ("up", "io", "rs", "rsf", "api")})
+        return self._qiniu_json({"hosts": [region]})
+
+    async def _fetch(self, request: Request) -> Response:
+        await self._delay("Fetch")
+        url = _urlsafe_b64decode(request.path_params["resource"])
+        bucket_name, _, key = _urlsafe_b64decode(
+            request.path_params["entry"]
+        ).partition(":")
+        bucket = self.buckets.get(bucket_name)
+        if bucket is None:
+            return self._qiniu_json({"error": "no such bucket"}, status_code=631)
+        if self.fetch_failures[url] > 0:
+            self.fetch_failures[url] -= 1
+            return self._qiniu_json({"error": "temporary failure"}, status_code=599)
+        # 地址包含 missing 时模拟源站返回 404
+        if "missing" in url:
+            return self._qiniu_json({"error": "source not found"}, status_code=404)
+
+        digest = hashlib.md5(url.encode("utf-8")).hexdigest()
+        obj = FakeObject(key, (1 << 20) + int(digest[:5], 16), digest)
+        bucket.put(obj)
+        if self.fetch_lost_responses[url] > 0:
+            self.fetch_lost_responses[url] -= 1
+            return self._qiniu_json({"error": "gateway timeout"}, status_code=599)
+        return self._qiniu_json(
+            {"fsize": obj.size, "hash": obj.etag, "key": key, "mimeType": "audio/mpeg"}
+        )
+
+    async def _stat(self, request: Request) -> Response:
+        await self._delay("Stat")
+        bucket_name, _, key = _urlsafe_b64decode(
+            request.path_params["entry"]
+        ).partition(":")
+        bucket = self.buckets.get(bucket_name)
+        if bucket is None:
+            return self._qiniu_json({"error": "no such bucket"}, status_code=631)
+        obj = bucket.objects.get(key)
+        if obj is None:
+            return self._qiniu_json(
+                {"error": "no such file or directory"}, status_code=612
+            )
+        return self._qiniu_json(
+            {"fsize": obj.size, "hash": obj.etag, "mimeType": "audio/mpeg"}
+        )
+
+    async def _form_upload(self, request: Request) -> Response:
+        await self._delay("FormUpload")
+        form = await request.form()
+        # 上传凭证格式为 ak:sign:base64(policy)，这里只取出 scope 中的 bucket
+        policy = json.loads(base64.urlsafe_b64decode(form["token"].split(":")[2]))
+        bucket = self.buckets.get(policy["scope"].split(":", 1)[0])
+        if bucket is None:
+            return self._qiniu_json({"error": "no such bucket"}, status_code=631)
+        key = form["key"]
+        body = await form["file"].read()
+        if policy.get("insertOnly") and key in bucket.objects:
+            return self._qiniu_json({"error": "file exists"}, status_code=614)
+        etag = hashlib.md5(body).hexdigest()
+        bucket.put(FakeObject(key, len(body), etag, body))
+        return self._qiniu_json({"hash": etag, "key": key})
+
+
+# 七牛云的自定义状态码，uvicorn 默认只能发送 100-599 的状态码
+QINIU_STATUS_CODES = (612, 614, 631)
+
+
+class FakeQiniuServer:
+    """在后台线程中运行替身后端的 HTTP 服务"""
+
+    def __init__(
+        self, backend: FakeQiniuBackend, host: str = "127.0.0.1", port: int = 0
+    ):
+        self.backend = backend
+        self.host = host
+        self.port = port
+        self._server: Optional[uvicorn.Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """S3 endpoint_url 与 UC 服务地址"""
+        return f"http://{self.host}:{self.port}"
+
+    def start(self, timeout: float = 10.0) -> "FakeQiniuServer":
+        from uvicorn.protocols.http import h11_impl
+
+        for status_code in QINIU_STATUS_CODES:
+            h11_impl.STATUS_PHRASES.setdefault(status_code, b"")
+        config = uvicorn.Config(
+            self.backend.app,
+            host=self.host,
+            port=self.port,
+            log_level="warning",
+            lifespan="off",
+            http="h11",
+        )
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(
+            target=self._server.run, name="fake-qiniu", daemon=True
+        )
+        self._thread.start()
+
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("Fake Qiniu server failed to start")
+            time.sleep(0.01)
+        self.port = self._server.servers[0].sockets[0].getsockname()[1]
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def __enter__(self) -> "FakeQiniuServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+class FakeEventNotifier:
+    """以七牛云事件通知的格式向 Webhook 推送对象事件，
+    请求使用租户的 AK/SK 连同时间戳与随机数签名"""
+
+    def __init__(
+        self,
+        url: str,
+        access_key: str,
+        secret_key: str,
+        client: Optional[Any] = None,
+    ):
+        """
+        Args:
+            url: Webhook 地址
+            access_key: 签名使用的 AK
+            secret_key: 签名使用的 SK
+            client: 提供 post(url, content=..., headers=...) 的 HTTP 客户端，
+                默认为 httpx.Client，测试中可以传入 starlette 的 TestClient
+        """
+        self.url = url
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.client = client or httpx.Client()
+
+    def put_event(self, bucket: str, obj: FakeObject) -> Dict[str, Any]:
+        return {
+            "eventName": "put",
+            "time": int(time.time()),
+            "bucket": bucket,
+            "key": obj.key,
+            "fsize": obj.size,
+            "hash": obj.etag,
+            "mimeType": "audio/mpeg",
+            "putTime": int(time.time() * 10_000_000),
+        }
+
+    def delete_event(self, bucket: str, key: str) -> Dict[str, Any]:
+        return {
+            "eventName": "delete",
+            "time": int(time.time()),
+            "bucket": bucket,
+            "key": key,
+        }
+
+    def signed_headers(
+        self,
+        body: bytes,
+        secret_key: Optional[str] = None,
+        timestamp: Optional[int] = None,
+    ) -> Dict[str, str]:
+        """生成请求的签名请求头，每次使用新的随机数
+
+        Args:
+            body: 请求体
+            secret_key: 覆盖签名使用的 SK，用于模拟伪造的请求
+            timestamp: 覆盖签名时间戳，用于模拟过期的请求
+        """
+        parsed = urlparse(self.url)
+        path = f"{parsed.path}?{parsed.query}" if parsed.query else parsed.path
+        timestamp = str(int(time.time()) if timestamp is None else timestamp)
+        nonce = uuid.uuid4().hex
+        digest = hmac.new(
+            (secret_key or self.secret_key).encode("utf-8"),
+            f"{path}\n{timestamp}\n{nonce}\n".encode("utf-8") + body,
+            hashlib.sha1,
+        ).digest()
+        signature = base64.urlsafe_b64encode(digest).decode("ascii")
+        return {
+            "Authorization": f"QBox {self.access_key}:{signature}",
+            "X-Event-Timestamp": timestamp,
+            "X-Event-Nonce": nonce,
+        }
+
+    def post(self, body: bytes, headers: Dict[str, str]):
+        """以给定的请求头推送请求体，返回 HTTP 响应"""
+        return self.client.post(
+            self.url,
+            content=body,
+            headers={**headers, "Content-Type": "application/json"},
+        )
+
+    def send(
+        self,
+        events: List[Dict[str, Any]],
+        secret_key: Optional[str] = None,
+        timestamp: Optional[int] = None,
+    ):
+        """签名并推送事件，返回 HTTP 响应
+
+        Args:
+            events: 事件列表
+            secret_key: 覆盖签名使用的 SK，用于模拟伪造的请求
+            timestamp: 覆盖签名时间戳，用于模拟过期的请求
+        """
+        body = json.dumps(events).encode("utf-8")
+        return self.post(body, self.signed_headers(body, secret_key, timestamp))
+
+    def notify_put(self, backend: FakeQiniuBackend, bucket: str, obj: FakeObject):
+        """把对象写入替身后端并推送 put 事件"""
+        backend.buckets[bucket].put(obj)
+        return self.send([self.put_event(bucket, obj)])
+
+    def notify_delete(self, backend: FakeQiniuBackend, bucket: str, key: str):
+        """从替身后端删除对象并推送 delete 事件"""
+        backend.buckets[bucket].delete(key)
+        return self.send([self.delete_event(bucket, key)])
@@ -0,0 +1,490 @@
+"""多会话并发压测
+
+启动七牛云 S3/UC 替身，并在子进程中启动 SSE 服务（或连接已有服务），
+同时建立 N 个使用不同租户凭证的 MCP SSE 会话，按比例混合执行浏览、前缀搜索与取链调用，
+报告各操作的 p50/p95/p99 延迟、服务端事件循环延迟以及常驻内存随时间的变化。
+
+用法:
+    python -m benchmarks.load_test --sessions 50 --calls 40 --output load.json
+    python -m benchmarks.load_test --server-url http://127.0.0.1:8000 --sessions 10
+"""
+
+import asyncio
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import click
+import httpx
+
+from .fake_qiniu import FakeQiniuBackend, FakeQiniuServer
+from .stats import compare, metric, summarize, write_results
+
+logger = logging.getLogger("music-mcp-load")
+
+REGION_NAME = "load-region"
+OBJECTS_PER_BUCKET = 500
+NEXT_CURSOR_PREFIX = "next_cursor: "
+
+# 操作名 -> 默认权重
+DEFAULT_MIX = "list=5,search=3,url=2"
+
+
+@dataclass
+class Tenant:
+    access_key: str
+    buckets: List[str]
+    keys: List[str]
+    prefixes: List[str]
+
+    def headers(self, endpoint_url: str) -> Dict[str, str]:
+        return {
+            "X-AK": self.access_key,
+            "X-SK": f"{self.access_key}-secret",
+            "X-REGION-NAME": REGION_NAME,
+            "X-ENDPOINT-URL": endpoint_url,
+            "X-BUCKETS": ",".join(self.buckets),
+        }
+
+
+@dataclass
+class SessionResult:
+    connect_seconds: Optional[float] = None
+    calls: List[Tuple[str, float, bool]] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+def _parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ("list", "search", "url"):
+            raise click.BadParameter(f"unknown operation {name!r}", param_hint="--mix")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def create_tenants(
+    backend: FakeQiniuBackend, count: int, objects: int, seed: int
+) -> List[Tenant]:
+    """为每个租户生成独立的存储桶与对象"""
+    tenants = []
+    for index in range(count):
+        buckets = []
+        for part in range(max(1, -(-objects // OBJECTS_PER_BUCKET))):
+            name = f"load-{index}-{part}"
+            size = min(OBJECTS_PER_BUCKET, objects - part * OBJECTS_PER_BUCKET)
+            backend.add_bucket(name, size, seed=seed * 100000 + index * 100 + part)
+            buckets.append(name)
+        keys = [
+            key
+            for name in buckets
+            for key in backend.buckets[name].objects
+            if not key.endswith(".jpg")
+        ]
+        prefixes = sorted({key.split("/", 1)[0] + "/" for key in keys})
+        tenants.append(Tenant(f"load-ak-{index}", buckets, keys, prefixes))
+    return tenants
+
+
+class LocalServer:
+    """在子进程中运行 SSE 服务"""
+
+    def __init__(self, uc_host: str, extra_args: List[str]):
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._log = tempfile.NamedTemporaryFile(
+            prefix="music-mcp-load-", suffix=".log", delete=False
+        )
+        # 替身同时提供 UC 与 S3 接口，需要允许客户端通过 X-ENDPOINT-URL 指定
+        env = dict(
+            os.environ, QINIU_UC_HOST=uc_host, MUSIC_MCP_ALLOWED_ENDPOINTS=uc_host
+        )
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                "-c",
+                "from mcp_server import main; main()",
+                "--transport",
+                "sse",
+                "--port",
+                str(self.port),
+                *extra_args,
+            ],
+            env=env,
+            stdout=self._log,
+            stderr=subprocess.STDOUT,
+        )
+
+    async def wait_ready(self, timeout: float = 30.0) -> None:
+        deadline = time.monotonic() + timeout
+        async with httpx.AsyncClient() as client:
+            while time.monotonic() < deadline:
+                if self.process.poll() is not None:
+                    break
+                try:
+                    if (await client.get(f"{self.url}/metrics")).status_code == 200:
+                        return
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.1)
+        raise RuntimeError(f"Server did not start, see {self._log.name}")
+
+    def stop(self) -> None:
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self._log.close()
+
+
+def parse_metrics(text: str) -> Dict[str, float]:
+    """解析 Prometheus 文本格式，返回 {带标签的样本名: 数值}"""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        name, _, value = line.rpartition(" ")
+        try:
+            samples[name] = float(value)
+        except ValueError:
+            continue
+    return samples
+
+
+def histogram_quantile(samples: Dict[str, float], name: str, q: float) -> float:
+    """根据无标签直方图的累积分桶估算分位数（取所在分桶的上界）"""
+    buckets = []
+    for sample, value in samples.items():
+        if sample.startswith(f'{name}_bucket{{le="'):
+            bound = sample[len(name) + 12 : -2]
+            buckets.append((float("inf") if bound == "+Inf" else float(bound), value))
+    buckets.sort()
+    if not buckets or not buckets[-1][1]:
+        return 0.0
+    target = q / 100 * buckets[-1][1]
+    for bound, count in buckets:
+        if count >= target:
+            return bound
+    return buckets[-1][0]
+
+
+class LoadGenerator:
+    def __init__(
+        self,
+        server_url: str,
+        endpoint_url: str,
+        mix: Dict[str, float],
+        calls: int,
+        think_time: float,
+        seed: int,
+    ):
+        self.server_url = server_url.rstrip("/")
+        self.endpoint_url = endpoint_url
+        self.operations = list(mix)
+        self.weights = [mix[op] for op in self.operations]
+        self.calls = calls
+        self.think_time = think_time
+        self.seed = seed
+        self.completed_calls = 0
+
+    async def _call(self, session, op: str, tenant: Tenant, state: Dict[str, Any], rng):
+        if op == "url":
+            arguments = {"key": rng.choice(tenant.keys)}
+            name = "get_music_url"
+        elif op == "search":
+            arguments = {"prefix": rng.choice(tenant.prefixes), "max_keys": 20}
+            name = "get_music_list"
+        else:
+            arguments = {"max_keys": 50}
+            if state.get("cursor"):
+                arguments["cursor"] = state["cursor"]
+            name = "get_music_list"
+
+        result = await session.call_tool(name, arguments)
+        texts = [item.text for item in result.content if hasattr(item, "text")]
+        if op == "list":
+            state["cursor"] = next(
+                (
+                    text[len(NEXT_CURSOR_PREFIX) :]
+                    for text in texts
+                    if text.startswith(NEXT_CURSOR_PREFIX)
+                ),
+                None,
+            )
+        return not result.isError and not any("失败" in text for text in texts)
+
+    async def run_session(
+        self, index: int, tenant: Tenant, delay: float
+    ) -> SessionResult:
+        from mcp import ClientSession
+        from mcp.client.sse import sse_client
+
+        await asyncio.sleep(delay)
+        rng = random.Random(self.seed * 7919 + index)
+        result = SessionResult()
+        start = time.perf_counter()
+        try:
+            async with sse_client(
+                f"{self.server_url}/sse",
+                headers=tenant.headers(self.endpoint_url),
+                timeout=120,
+            ) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    result.connect_seconds = time.perf_counter() - start
+
+                    state: Dict[str, Any] = {}
+                    for _ in range(self.calls):
+                        op = rng.choices(self.operations, self.weights)[0]
+                        call_start = time.perf_counter()
+                        try:
+                            ok = await self._call(session, op, tenant, state, rng)
+                        except Exception as e:
+                            logger.debug(f"session {index} {op} failed: {e}")
+                            ok = False
+                        result.calls.append((op, time.perf_counter() - call_start, ok))
+                        self.completed_calls += 1
+                        if self.think_time:
+                            await asyncio.sleep(rng.uniform(0, 2 * self.think_time))
+        except BaseException as e:
+            if isinstance(e, (KeyboardInterrupt, SystemExit)):
+                raise
+            result.error = f"{type(e).__name__}: {e}"
+        return result
+
+    async def sample(self, interval: float, timeline: List[Dict[str, Any]]) -> None:
+        start = time.perf_counter()
+        async with httpx.AsyncClient() as client:
+            while True:
+                try:
+                    text = (await client.get(f"{self.server_url}/metrics")).text
+                    samples = parse_metrics(text)
+                    timeline.append(
+                        {
+                            "t": round(time.perf_counter() - start, 3),
+                            "rss_bytes": samples.get("process_resident_memory_bytes"),
+                            "loop_lag_max_seconds": samples.get(
+                                "music_mcp_event_loop_lag_max_seconds"
+                            ),
+                            "active_sessions": samples.get("music_mcp_active_sessions"),
+                            "completed_calls": self.completed_calls,
+                        }
+                    )
+                except httpx.HTTPError as e:
+                    logger.debug(f"metrics scrape failed: {e}")
+                await asyncio.sleep(interval)
+
+    async def final_metrics(self) -> Dict[str, float]:
+        async with httpx.AsyncClient() as client:
+            return parse_metrics((await client.get(f"{self.server_url}/metrics")).text)
+
+
+def build_results(
+    sessions: List[SessionResult],
+    timeline: List[Dict[str, Any]],
+    server_metrics: Dict[str, float],
+    wall: float,
+) -> List[Dict[str, Any]]:
+    connected = [
+        s for s in sessions if s.connect_seconds is not None and s.error is None
+    ]
+    calls = [call for s in sessions for call in s.calls]
+    results = [
+        metric(
+            "sessions/survived",
+            len(connected),
+            "sessions",
+            lower_is_better=False,
+            requested=len(sessions),
+            errors=sorted({s.error for s in sessions if s.error})[:10],
+        ),
+        metric(
+            "sessions/connect/p95",
+            summarize([s.connect_seconds for s in connected])["p95"]
+            if connected
+            else 0.0,
+            "s",
+            latency=summarize([s.connect_seconds for s in connected]),
+        ),
+        metric(
+            "calls/throughput",
+            len(calls) / wall if wall else 0.0,
+            "ops/s",
+            lower_is_better=False,
+            total=len(calls),
+            failed=sum(1 for _, _, ok in calls if not ok),
+        ),
+    ]
+
+    for op in sorted({op for op, _, _ in calls}):
+        latencies = [elapsed for name, elapsed, ok in calls if name == op and ok]
+        stats = summarize(latencies)
+        for q in ("p50", "p95", "p99"):
+            results.append(
+                metric(f"calls/{op}/{q}", stats.get(q, 0.0), "s", latency=stats)
+            )
+
+    lag_name = "music_mcp_event_loop_lag_seconds"
+    for q in (50, 95, 99):
+        results.append(
+            metric(
+                f"server/event_loop_lag/p{q}",
+                histogram_quantile(server_metrics, lag_name, q),
+                "s",
+                note="upper bound of the histogram bucket",
+            )
+        )
+    rss = [point["rss_bytes"] for point in timeline if point.get("rss_bytes")]
+    results.append(
+        metric(
+            "server/rss/peak",
+            max(rss, default=0.0),
+            "B",
+            per_session=max(rss, default=0.0) / max(len(connected), 1),
+        )
+    )
+    return results
+
+
+async def run_load(
+    params: Dict[str, Any],
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    backend = FakeQiniuBackend(
+        latency=params["latency"], jitter=params["jitter"], seed=params["seed"]
+    )
+    tenants = create_tenants(
+        backend, params["sessions"], params["objects"], params["seed"]
+    )
+    with FakeQiniuServer(backend) as fake:
+        local: Optional[LocalServer] = None
+        server_url = params["server_url"]
+        if not server_url:
+            local = LocalServer(fake.url, params["server_args"])
+            server_url = local.url
+        try:
+            if local is not None:
+                await local.wait_ready()
+
+            generator = LoadGenerator(
+                server_url,
+                fake.url,
+                params["mix"],
+                params["calls"],
+                params["think_time"],
+                params["seed"],
+            )
+            timeline: List[Dict[str, Any]] = []
+            sampler = asyncio.create_task(
+                generator.sample(params["sample_interval"], timeline)
+            )
+
+            ramp = params["ramp_up"] / max(len(tenants), 1)
+            start = time.perf_counter()
+            sessions = await asyncio.gather(
+                *[
+                    generator.run_session(index, tenant, index * ramp)
+                    for index, tenant in enumerate(tenants)
+                ]
+            )
+            wall = time.perf_counter() - start
+            sampler.cancel()
+            server_metrics = await generator.final_metrics()
+        finally:
+            if local is not None:
+                local.stop()
+
+    return build_results(sessions, timeline, server_metrics, wall), timeline
+
+
+@click.command()
+@click.option(
+    "--server-url",
+    default=None,
+    help="Existing SSE server, spawns a local one by default",
+)
+@click.option(
+    "--sessions",
+    default=20,
+    type=click.IntRange(min=1),
+    help="Concurrent MCP SSE sessions",
+)
+@click.option(
+    "--calls", default=30, type=click.IntRange(min=1), help="Tool calls per session"
+)
+@click.option(
+    "--mix", default=DEFAULT_MIX, help="Operation weights, e.g. list=5,search=3,url=2"
+)
+@click.option(
+    "--objects", default=1000, type=click.IntRange(min=1), help="Objects per tenant"
+)
+@click.option(
+    "--think-time", default=0.05, type=float, help="Mean pause between calls in seconds"
+)
+@click.option(
+    "--ramp-up", default=2.0, type=float, help="Seconds over which sessions are opened"
+)
+@click.option(
+    "--latency",
+    default=0.005,
+    type=float,
+    help="Backend latency per request in seconds",
+)
+@click.option(
+    "--jitter", default=0.0, type=float, help="Random extra backend latency in seconds"
+)
+@click.option(
+    "--sample-interval", default=0.5, type=float, help="Seconds between metrics scrapes"
+)
+@click.option("--seed", default=0, type=int)
+@click.option(
+    "--server-arg",
+    "server_args",
+    multiple=True,
+    help="Extra argument for the spawned server",
+)
+@click.option("--output", default="-", help='Result file, "-" for stdout')
+@click.option(
+    "--compare",
+    "baseline",
+    default=None,
+    help="Baseline result file to compare against",
+)
+@click.option(
+    "--tolerance", default=0.2, type=float, help="Allowed relative regression"
+)
+def main(
+    baseline: Optional[str], tolerance: float, output: str, **options: Any
+) -> None:
+    logging.basicConfig(level=logging.WARNING)
+    params = dict(options)
+    params["mix"] = _parse_mix(options["mix"])
+    params["server_args"] = list(options["server_args"])
+
+    results, timeline = asyncio.run(run_load(params))
+    document = write_results("load", params, results, output, timeline=timeline)
+
+    if baseline:
+        regressions = compare(document, baseline, tolerance)
+        for line in regressions:
+            click.echo(f"REGRESSION {line}", err=True)
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""离线基准测试
+
+在进程内启动七牛云 S3/UC 替身，不需要真实凭证与网络，测量：
+- 预加载耗时与目录规模的关系
+- 每首曲目的内存占用
+- get_music_list / get_music_url 的延迟分布
+- 并发会话下的预加载与取链吞吐
+
+用法:
+    python -m benchmarks.run_benchmarks --output results.json
+    python -m benchmarks.run_benchmarks --compare baseline.json --tolerance 0.2
+"""
+
+import asyncio
+import copy
+import logging
+import math
+import os
+import random
+import time
+import tracemalloc
+from typing import Any, Dict, List, Tuple
+
+import click
+
+from .fake_qiniu import FakeQiniuBackend, FakeQiniuServer
+from .stats import compare, metric, summarize, write_results
+
+# ListObjects 单次最多返回 500 个对象，按此规模拆分 bucket
+OBJECTS_PER_BUCKET = 500
+REGION_NAME = "bench-region"
+
+
+def _parse_ints(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+class BenchmarkSuite:
+    def __init__(self, backend: FakeQiniuBackend, endpoint_url: str, seed: int):
+        from mcp_server import core
+        from mcp_server.session import session_manager
+        from mcp_server.tools import tools
+
+        # 工具在首次使用时才注册，基准测试直接调用工具前需要先加载
+        core.load()
+
+        self.backend = backend
+        self.endpoint_url = endpoint_url
+        self.session_manager = session_manager
+        self.tools = tools
+        self.rng = random.Random(seed)
+        self.results: List[Dict[str, Any]] = []
+        self._tenant_counter = 0
+
+    def _create_buckets(self, tracks: int) -> List[str]:
+        self._tenant_counter += 1
+        names = []
+        for index in range(math.ceil(tracks / OBJECTS_PER_BUCKET)):
+            name = f"bench-{self._tenant_counter}-{index}"
+            count = min(OBJECTS_PER_BUCKET, tracks - index * OBJECTS_PER_BUCKET)
+            self.backend.add_bucket(
+                name, count, seed=self._tenant_counter * 1000 + index
+            )
+            names.append(name)
+        return names
+
+    async def create_session(self, tracks: int) -> Tuple[str, float]:
+        """创建一个拥有 tracks 个对象的租户会话，返回会话ID与预加载耗时"""
+        buckets = self._create_buckets(tracks)
+        start = time.perf_counter()
+        session_id = await self.session_manager.create_session(
+            access_key=f"bench-ak-{self._tenant_counter}",
+            secret_key="bench-sk",
+            endpoint_url=self.endpoint_url,
+            region_name=REGION_NAME,
+            buckets=buckets,
+        )
+        return session_id, time.perf_counter() - start
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> float:
+        start = time.perf_counter()
+        result = await self.tools.call_tool(name, dict(arguments))
+        elapsed = time.perf_counter() - start
+        if "失败" in result[0].text or "未找到" in result[0].text:
+            raise RuntimeError(f"{name} failed: {result[0].text[:200]}")
+        return elapsed
+
+    async def bench_preload(self, sizes: List[int], repeat: int) -> str:
+        largest = ""
+        for tracks in sizes:
+            timings = []
+            for _ in range(repeat):
+                session_id, elapsed = await self.create_session(tracks)
+                timings.append(elapsed)
+                largest = session_id
+            loaded = self.session_manager.get_music_cache().get_total_count(largest)
+            stats = summarize(timings)
+            self.results.append(
+                metric(
+                    f"preload/objects={tracks}",
+                    stats["p50"],
+                    "s",
+                    loaded_tracks=loaded,
+                    timings=stats,
+                    ms_per_1k_tracks=stats["p50"] * 1000 / max(loaded, 1) * 1000,
+                )
+            )
+        return largest
+
+    def bench_memory(self, session_id: str) -> None:
+        from mcp_server.core.storage.catalog import MusicCatalog
+
+        catalog = self.session_manager.get_music_cache().get_catalog(session_id)
+        entries = catalog.entries
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        rebuilt = MusicCatalog(copy.deepcopy(entries))
+        measured = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+
+        self.results.append(
+            metric(
+                "memory/bytes_per_track",
+                measured / max(len(rebuilt), 1),
+                "B",
+                tracks=len(rebuilt),
+                estimated_bytes_per_track=catalog.estimated_bytes
+                / max(len(catalog), 1),
+            )
+        )
+
+    async def bench_list(self, session_id: str, iterations: int) -> None:
+        prefixes = [""] + [f"artist-{i:03d}/" for i in range(97)]
+
+        # 冷请求：每次使用不同的参数，绕过分页缓存
+        cold = []
+        for i in range(iterations):
+            args = {
+                "session_id": session_id,
+                "prefix": prefixes[i % len(prefixes)],
+                "max_keys": 20 + i // len(prefixes),
+            }
+            cold.append(await self.call_tool("get_music_list", args))
+
+        # 热请求：重复同一页
+        warm_args = {"session_id": session_id, "max_keys": 50}
+        warm = [
+            await self.call_tool("get_music_list", warm_args) for _ in range(iterations)
+        ]
+
+        for name, samples in (("cold", cold), ("warm", warm)):
+            stats = summarize(samples)
+            self.results.append(
+                metric(f"get_music_list/{name}/p95", stats["p95"], "s", latency=stats)
+            )
+
+    def _sample_keys(self, session_id: str, count: int) -> List[str]:
+        catalog = self.session_manager.get_music_cache().get_catalog(session_id)
+        keys = [entry["Key"] for entry in catalog.entries]
+        return [self.rng.choice(keys) for _ in range(count)]
+
+    async def bench_url(self, session_id: str, iterations: int) -> None:
+        samples = [
+            await self.call_tool(
+                "get_music_url", {"session_id": session_id, "key": key}
+            )
+            for key in self._sample_keys(session_id, iterations)
+        ]
+        stats = summarize(samples)
+        self.results.append(
+            metric("get_music_url/p95", stats["p95"], "s", latency=stats)
+        )
+
+    async def bench_concurrency(
+        self, levels: List[int], tracks: int, iterations: int
+    ) -> None:
+        for level in levels:
+            # 并发创建会话并预加载
+            start = time.perf_counter()
+            created = await asyncio.gather(
+                *[self.create_session(tracks) for _ in range(level)]
+            )
+            wall = time.perf_counter() - start
+            self.results.append(
+                metric(
+                    f"concurrency/preload/sessions={level}",
+                    level / wall,
+                    "sessions/s",
+                    lower_is_better=False,
+                    wall_seconds=wall,
+                    preload=summarize([elapsed for _, elapsed in created]),
+                )
+            )
+
+            # 每个会话并发取链
+            per_session = max(1, iterations // level)
+
+            async def worker(session_id: str) -> List[float]:
+                return [
+                    await self.call_tool(
+                        "get_music_url", {"session_id": session_id, "key": key}
+                    )
+                    for key in self._sample_keys(session_id, per_session)
+                ]
+
+            start = time.perf_counter()
+            samples = await asyncio.gather(*[worker(sid) for sid, _ in created])
+            wall = time.perf_counter() - start
+            latencies = [s for worker_samples in samples for s in worker_samples]
+            self.results.append(
+                metric(
+                    f"concurrency/get_music_url/sessions={level}",
+                    len(latencies) / wall,
+                    "ops/s",
+                    lower_is_better=False,
+                    latency=summarize(latencies),
+                )
+            )
+
+            for session_id, _ in created:
+                await self.session_manager.remove_session(session_id)
+
+
+async def run_suite(params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    backend = FakeQiniuBackend(
+        latency=params["latency"], jitter=params["jitter"], seed=params["seed"]
+    )
+    with FakeQiniuServer(backend) as server:
+        from mcp_server.core.storage.rate_limit import DEFAULT_RATES, rate_limiter
+        from mcp_server.core.storage.storage import UC_HOST_ENV
+
+        os.environ[UC_HOST_ENV] = server.url
+        if not params["rate_limits"]:
+            # 默认测量代码路径本身的延迟，不让单租户的限流速率主导结果
+            rate_limiter.configure(rates={name: 1e9 for name in DEFAULT_RATES})
+        suite = BenchmarkSuite(backend, server.url, params["seed"])
+
+        largest = await suite.bench_preload(params["sizes"], params["repeat"])
+        suite.bench_memory(largest)
+        await suite.bench_list(largest, params["iterations"])
+        await suite.bench_url(largest, params["iterations"])
+        await suite.bench_concurrency(
+            params["concurrency"], params["concurrency_objects"], params["iterations"]
+        )
+        suite.results.append(
+            metric(
+                "backend/requests",
+                sum(backend.requests.values()),
+                "requests",
+                by_operation=dict(backend.requests),
+            )
+        )
+        return suite.results
+
+
+@click.command()
+@click.option("--sizes", default="500,2000,8000", help="Comma separated catalog sizes")
+@click.option(
+    "--repeat", default=3, type=click.IntRange(min=1), help="Preloads per size"
+)
+@click.option(
+    "--iterations",
+    default=200,
+    type=click.IntRange(min=1),
+    help="Tool calls per latency run",
+)
+@click.option("--concurrency", default="1,4,16", help="Comma separated session counts")
+@click.option(
+    "--concurrency-objects",
+    default=1000,
+    type=click.IntRange(min=1),
+    help="Objects per concurrent session",
+)
+@click.option(
+    "--latency",
+    default=0.005,
+    type=float,
+    help="Backend latency per request in seconds",
+)
+@click.option(
+    "--jitter", default=0.0, type=float, help="Random extra backend latency in seconds"
+)
+@click.option(
+    "--seed", default=0, type=int, help="Seed for generated objects and sampling"
+)
+@click.option(
+    "--rate-limits/--no-rate-limits",
+    default=False,
+    help="Apply the default per-tenant storage rate limits",
+)
+@click.option("--output", default="-", help='Result file, "-" for stdout')
+@click.option(
+    "--compare",
+    "baseline",
+    default=None,
+    help="Baseline result file to compare against",
+)
+@click.option(
+    "--tolerance", default=0.2, type=float, help="Allowed relative regression"
+)
+def main(
+    sizes: str,
+    repeat: int,
+    iterations: int,
+    concurrency: str,
+    concurrency_objects: int,
+    latency: float,
+    jitter: float,
+    seed: int,
+    rate_limits: bool,
+    output: str,
+    baseline: str,
+    tolerance: float,
+) -> None:
+    from mcp_server.consts import consts
+
+    logging.getLogger(consts.LOGGER_NAME).setLevel(logging.ERROR)
+    params = {
+        "sizes": _parse_ints(sizes),
+        "repeat": repeat,
+        "iterations": iterations,
+        "concurrency": _parse_ints(concurrency),
+        "concurrency_objects": concurrency_objects,
+        "latency": latency,
+        "jitter": jitter,
+        "seed": seed,
+        "rate_limits": rate_limits,
+    }
+    results = asyncio.run(run_suite(params))
+    document = write_results("offline", params, results, output)
+
+    if baseline:
+        regressions = compare(document, baseline, tolerance)
+        for line in regressions:
+            click.echo(f"REGRESSION {line}", err=True)
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
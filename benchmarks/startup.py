@@ -0,0 +1,167 @@
+"""冷启动基准测试
+
+在全新的子进程中测量各启动场景的耗时与导入的重量级模块：
+- import: 导入 mcp_server 包
+- help: 命令行 --help
+- application: 导入 MCP 服务（stdio 与 HTTP 传输在处理 initialize 前的准备）
+- tools: 注册全部业务工具（首次列出或调用工具）
+
+用法:
+    python -m benchmarks.startup --output startup.json
+    python -m benchmarks.startup --budget help=0.8 --budget application=1.5
+"""
+
+import json
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+import click
+
+from .stats import compare, metric, summarize, write_results
+
+# 导入较慢、只应在真正访问存储时加载的模块
+HEAVY_MODULES = ("aioboto3", "aiobotocore", "botocore", "qiniu", "openai")
+
+# 各场景执行的代码，最后一行输出已加载的重量级模块
+SCENARIOS: Dict[str, str] = {
+    "import": "import mcp_server",
+    "help": (
+        "import sys\n"
+        "sys.argv = ['music-mcp-server', '--help']\n"
+        "from mcp_server import main\n"
+        "try:\n"
+        "    main()\n"
+        "except SystemExit:\n"
+        "    pass"
+    ),
+    "application": (
+        "from mcp_server import application\n"
+        "application.server.create_initialization_options()"
+    ),
+    "tools": (
+        "from mcp_server import application\n"
+        "from mcp_server.tools import tools\n"
+        "application.load_core()\n"
+        "assert tools.all_tools()"
+    ),
+}
+
+# 测试中强制执行的耗时预算（秒），按较慢的 CI 机器留有余量
+DEFAULT_BUDGETS: Dict[str, float] = {"import": 1.0, "help": 1.5, "application": 3.0}
+
+_REPORT = (
+    "\nimport json, sys\n"
+    "print(json.dumps(sorted({{m.split('.')[0] for m in sys.modules}} & set({heavy!r}))))"
+)
+
+
+def run_scenario(name: str) -> Tuple[float, List[str]]:
+    """在新进程中执行场景，返回耗时与已加载的重量级模块"""
+    code = SCENARIOS[name] + _REPORT.format(heavy=HEAVY_MODULES)
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"Scenario {name} failed: {completed.stderr[-2000:]}")
+    return elapsed, json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def measure(names: List[str], repeat: int) -> List[Dict[str, Any]]:
+    results = []
+    for name in names:
+        timings = []
+        modules: List[str] = []
+        for _ in range(repeat):
+            elapsed, modules = run_scenario(name)
+            timings.append(elapsed)
+        stats = summarize(timings)
+        results.append(
+            metric(
+                f"startup/{name}",
+                stats["p50"],
+                "s",
+                timings=stats,
+                heavy_modules=modules,
+            )
+        )
+    return results
+
+
+def _parse_budgets(ctx, param, values) -> Dict[str, float]:
+    budgets = {}
+    for value in values:
+        name, _, seconds = value.partition("=")
+        if name not in SCENARIOS:
+            raise click.BadParameter(f"unknown scenario {name!r}")
+        budgets[name] = float(seconds)
+    return budgets
+
+
+@click.command()
+@click.option(
+    "--scenarios",
+    default=",".join(SCENARIOS),
+    help="Comma separated scenarios to measure",
+)
+@click.option(
+    "--repeat", default=5, type=click.IntRange(min=1), help="Runs per scenario"
+)
+@click.option(
+    "--budget",
+    "budgets",
+    multiple=True,
+    callback=_parse_budgets,
+    help="Fail when the median of a scenario exceeds SCENARIO=SECONDS",
+)
+@click.option("--output", default="-", help='Result file, "-" for stdout')
+@click.option(
+    "--compare",
+    "baseline",
+    default=None,
+    help="Baseline result file to compare against",
+)
+@click.option(
+    "--tolerance", default=0.2, type=float, help="Allowed relative regression"
+)
+def main(
+    scenarios: str,
+    repeat: int,
+    budgets: Dict[str, float],
+    output: str,
+    baseline: str,
+    tolerance: float,
+) -> None:
+    names = [name for name in scenarios.split(",") if name]
+    for name in names:
+        if name not in SCENARIOS:
+            raise click.BadParameter(
+                f"unknown scenario {name!r}", param_hint="--scenarios"
+            )
+
+    params = {"scenarios": names, "repeat": repeat, "budgets": budgets}
+    document = write_results("startup", params, measure(names, repeat), output)
+
+    failures = []
+    for result in document["results"]:
+        name = result["name"].split("/", 1)[1]
+        if name in budgets and result["value"] > budgets[name]:
+            failures.append(
+                f"{result['name']}: {result['value']:.3f}s exceeds budget {budgets[name]:.3f}s"
+            )
+    if baseline:
+        failures.extend(compare(document, baseline, tolerance))
+    for line in failures:
+        click.echo(f"REGRESSION {line}", err=True)
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""基准测试统计与结果比较工具"""
+
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+# 结果文件格式版本
+RESULT_SCHEMA_VERSION = 1
+
+
+def percentile(samples: Sequence[float], q: float) -> float:
+    """最近秩法计算分位数，q 取值 0-100"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples: Sequence[float]) -> Dict[str, float]:
+    """计算耗时样本的常用统计量（秒）"""
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "mean": sum(samples) / len(samples),
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+        "max": max(samples),
+    }
+
+
+def max_rss_bytes() -> int:
+    """当前进程的峰值常驻内存，无法读取时返回0"""
+    try:
+        # resource 只在 Unix 上可用
+        import resource
+    except ImportError:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位，Linux 以 KiB 为单位
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def current_rss_bytes() -> int:
+    """当前进程的常驻内存，无法读取 /proc 时退化为峰值"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return max_rss_bytes()
+
+
+def environment() -> Dict[str, Any]:
+    """记录运行环境，便于比较不同机器上的结果"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=False,
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit or None,
+    }
+
+
+def metric(
+    name: str, value: float, unit: str, lower_is_better: bool = True, **extra: Any
+) -> Dict[str, Any]:
+    """构建一条可比较的结果记录"""
+    return {
+        "name": name,
+        "value": value,
+        "unit": unit,
+        "lower_is_better": lower_is_better,
+        **({"extra": extra} if extra else {}),
+    }
+
+
+def write_results(
+    suite: str,
+    params: Dict[str, Any],
+    results: List[Dict[str, Any]],
+    path: Optional[str],
+    **sections: Any,
+) -> Dict[str, Any]:
+    """输出 JSON 结果，path 为空或 "-" 时写到标准输出
+
+    Args:
+        suite: 测试套件名称
+        params: 运行参数
+        results: metric() 构建的结果记录
+        path: 输出文件路径
+        **sections: 附加输出的其他数据，如时间线
+    """
+    document = {
+        "schema": RESULT_SCHEMA_VERSION,
+        "suite": suite,
+        "environment": environment(),
+        "params": params,
+        "results": results,
+        **sections,
+    }
+    text = json.dumps(document, indent=2, ensure_ascii=False)
+    if not path or path == "-":
+        print(text)
+    else:
+        with open(path, "w") as f:
+            f.write(text + "\n")
+    return document
+
+
+def compare(current: Dict[str, Any], baseline_path: str, tolerance: float) -> List[str]:
+    """与基线结果比较，返回超出容差的退化项描述"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {r["name"]: r for r in baseline.get("results", [])}
+
+    regressions = []
+    for result in current["results"]:
+        old = previous.get(result["name"])
+        if old is None or not old["value"]:
+            continue
+        ratio = result["value"] / old["value"]
+        worse = (
+            ratio > 1 + tolerance
+            if result["lower_is_better"]
+            else ratio < 1 - tolerance
+        )
+        if worse:
+            regressions.append(
+                f"{result['name']}: {old['value']:.6g} -> {result['value']:.6g} {result['unit']} "
+                f"({(ratio - 1) * 100:+.1f}%)"
+            )
+    return regressions
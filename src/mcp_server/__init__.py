@@ -1,11 +1,17 @@
 import logging
 
 from .consts import consts
-from .server import main
 
-# Configure logging
-logging.basicConfig(level=logging.ERROR)
+# 日志由 server 模块在启动时配置
 logger = logging.getLogger(consts.LOGGER_NAME)
 logger.info("Initializing MCP server package")
 
+
+def main():
+    """命令行入口，延迟导入服务端模块，使导入包本身保持轻量"""
+    from .server import main as server_main
+
+    return server_main()
+
+
 __all__ = ["main"]
@@ -1,5 +1,5 @@
 import logging
-from contextlib import aclosing
+from typing import Optional, Union, get_args
 
 import mcp.types as types
 from mcp.types import EmptyResult
@@ -8,44 +8,99 @@ from mcp import LoggingLevel
 from mcp.server.lowlevel import Server
 from mcp.types import Tool, AnyUrl
 
-from . import core
 from .consts import consts
 from .resource import resource
 from .tools import tools
 from .context import current_session_id
+from .session import session_manager
 
 
 logger = logging.getLogger(consts.LOGGER_NAME)
 
-core.load()
 server = Server("music-mcp-server")
 
 
+def load_core() -> None:
+    """注册业务工具与资源，首次列出或调用工具、访问资源时执行，重复调用无开销"""
+    from . import core
+
+    core.load()
+
+
 @server.set_logging_level()
 async def set_logging_level(level: LoggingLevel) -> EmptyResult:
     logger.setLevel(level.upper())
-    await server.request_context.session.send_log_message(
+    try:
+        request_context = server.request_context
+    except LookupError:
+        # streamable HTTP 请求没有可以推送日志通知的长连接
+        return EmptyResult()
+    await request_context.session.send_log_message(
         level="warning", data=f"Log level set to {level}", logger=consts.LOGGER_NAME
     )
     return EmptyResult()
 
 
-@server.list_resources()
-async def list_resources(**kwargs) -> list[types.Resource]:
-    resource_list = []
-    async with aclosing(resource.list_resources(**kwargs)) as results:
-        async for result in results:
-            resource_list.append(result)
-    return resource_list
+class ListResourcesRequestParams(types.RequestParams):
+    cursor: Optional[types.Cursor] = None
+
+
+class ListResourcesRequest(types.ListResourcesRequest):
+    """携带游标的 resources/list 请求
+
+    mcp 的 ListResourcesRequest 参数类型不包含 cursor，解析时会丢弃 params.cursor，
+    导致客户端翻页时始终拿到第一页
+    """
+
+    params: Optional[ListResourcesRequestParams] = None
+
+
+def _parse_list_resources_cursor() -> None:
+    """让 ClientRequest 将 resources/list 解析为 ListResourcesRequest
+
+    SSE 会话与 streamable HTTP 都通过 types.ClientRequest 解析请求，
+    替换联合类型中的成员后两条路径都能拿到 params.cursor
+    """
+    root = types.ClientRequest.model_fields["root"]
+    members = get_args(root.annotation)
+    if ListResourcesRequest in members:
+        return
+    root.annotation = Union[
+        tuple(
+            ListResourcesRequest if member is types.ListResourcesRequest else member
+            for member in members
+        )
+    ]
+    types.ClientRequest.model_rebuild(force=True)
+
+
+async def list_resources(req: types.ListResourcesRequest) -> types.ServerResult:
+    load_core()
+    session_manager.touch(current_session_id.get())
+    # 游标可能位于请求顶层或 params 中，取决于客户端实现
+    cursor = req.cursor or getattr(req.params, "cursor", None)
+    resources, next_cursor = await resource.list_resources_page(cursor=cursor)
+    return types.ServerResult(
+        types.ListResourcesResult(resources=resources, nextCursor=next_cursor)
+    )
+
+
+# server.list_resources() 装饰器不会传递游标，这里直接注册 resources/list 处理器
+_parse_list_resources_cursor()
+server.request_handlers[ListResourcesRequest] = list_resources
+server.request_handlers[types.ListResourcesRequest] = list_resources
 
 
 @server.read_resource()
 async def read_resource(uri: AnyUrl) -> str:
+    load_core()
+    session_manager.touch(current_session_id.get())
     return await resource.read_resource(uri)
 
 
 @server.list_tools()
 async def handle_list_tools() -> list[Tool]:
+    load_core()
     return tools.all_tools()
 
 
@@ -59,8 +114,10 @@ async def call_tool(name: str, arguments: dict):
         if session_id:
             # 无条件注入，schema中已包含可选的 session_id 字段
             arguments["session_id"] = session_id
+            session_manager.touch(session_id)
             logger.debug(f"Injected session_id {session_id} into tool {name} arguments")
     except Exception as e:
         logger.warning(f"Could not get session_id for tool {name}: {e}")
 
+    load_core()
     return await tools.call_tool(name, arguments)
@@ -1,4 +1,5 @@
 import logging
+import os
 from typing import List, Optional
 from attr import dataclass
 
@@ -9,6 +10,13 @@ _HEADER_ACCESS_KEY = "X-AK"
 _HEADER_SECRET_KEY = "X-SK"
 _HEADER_REGION_NAME = "X-REGION-NAME"
 _HEADER_BUCKETS = "X-BUCKETS"
+# 可选，覆盖根据区域生成的 S3 endpoint，用于私有云或本地替身
+_HEADER_ENDPOINT_URL = "X-ENDPOINT-URL"
+
+# 允许客户端通过 X-ENDPOINT-URL 指定的 endpoint，逗号分隔，"*" 表示任意地址。
+# 服务端会用租户的密钥向该地址发送签名请求，未配置时忽略该头部，防止 SSRF 与 access key 泄露
+ALLOWED_ENDPOINTS_ENV = "MUSIC_MCP_ALLOWED_ENDPOINTS"
+ANY_ENDPOINT = "*"
 
 logger = logging.getLogger(consts.LOGGER_NAME)
 
@@ -22,6 +30,36 @@ class Config:
     buckets: List[str]
 
 
+def allowed_endpoints() -> List[str]:
+    """服务端允许客户端指定的 endpoint 列表"""
+    return [
+        endpoint.strip().rstrip("/")
+        for endpoint in os.environ.get(ALLOWED_ENDPOINTS_ENV, "").split(",")
+        if endpoint.strip()
+    ]
+
+
+def _endpoint_override(
+    endpoint_url: Optional[str],
+) -> tuple[Optional[str], Optional[str]]:
+    """校验客户端指定的 endpoint
+
+    Returns:
+        (允许使用的 endpoint, 错误信息)，未指定或服务端未开启时 endpoint 为 None
+    """
+    if not endpoint_url:
+        return None, None
+    allowed = allowed_endpoints()
+    if not allowed:
+        logger.warning(
+            f"Ignoring {_HEADER_ENDPOINT_URL} header, set {ALLOWED_ENDPOINTS_ENV} to allow it"
+        )
+        return None, None
+    if ANY_ENDPOINT in allowed or endpoint_url.rstrip("/") in allowed:
+        return endpoint_url, None
+    return None, f"{_HEADER_ENDPOINT_URL} {endpoint_url} is not allowed"
+
+
 def load_config_from_headers(headers: dict) -> tuple[Optional[Config], Optional[str]]:
     """从HTTP headers加载配置（大小写不敏感）"""
     # 归一化为小写键
@@ -35,8 +73,6 @@ def load_config_from_headers(headers: dict) -> tuple[Optional[Config], Optional[
     access_key = _h(_HEADER_ACCESS_KEY)
     secret_key = _h(_HEADER_SECRET_KEY)
     region_name = _h(_HEADER_REGION_NAME)
-    # 通过region_name动态生成endpoint_url
-    endpoint_url = f"https://s3.{region_name}.qiniucs.com"
     buckets_str = _h(_HEADER_BUCKETS)
 
     if not access_key or not secret_key:
@@ -54,6 +90,13 @@ def load_config_from_headers(headers: dict) -> tuple[Optional[Config], Optional[
         logger.warning(error_msg)
         return None, error_msg
 
+    # 未指定或不允许指定endpoint_url时通过region_name动态生成
+    endpoint_url, error_msg = _endpoint_override(_h(_HEADER_ENDPOINT_URL))
+    if error_msg:
+        logger.warning(error_msg)
+        return None, error_msg
+    endpoint_url = endpoint_url or f"https://s3.{region_name}.qiniucs.com"
+
     # 解析buckets配置
     buckets = [b.strip() for b in buckets_str.split(",") if b.strip()]
     if not buckets:
@@ -1,9 +1,27 @@
-from .storage import load as load_storage
-from .version import load as load_version
+import threading
+
+_loaded = False
+_load_lock = threading.Lock()
 
 
 def load():
-    # 版本
-    load_version()
-    # 存储业务 - 注册会话感知的工具
-    load_storage()
+    """注册业务工具与资源，只在首次调用时加载
+
+    业务包依赖的存储 SDK 导入较慢，启动时不导入，由首次列出或调用工具、访问资源时触发。
+    """
+    global _loaded
+    with _load_lock:
+        if _loaded:
+            return
+
+        from ..tools.batch import register_tools as load_batch
+        from .storage import load as load_storage
+        from .version import load as load_version
+
+        # 版本
+        load_version()
+        # 存储业务 - 注册会话感知的工具
+        load_storage()
+        # 批量调用
+        load_batch()
+        _loaded = True
@@ -0,0 +1,140 @@
+"""bucket 元数据缓存模块
+
+按凭证缓存 ListBuckets 的结果，bucket 集合很少变化，预加载时不必每次都请求：
+- 缓存在 TTL 内有效，过期后下一次调用重新请求
+- 成功列举过对象的 bucket 记为已验证，会话配置的 bucket 全部已验证时
+  直接返回这些 bucket，不再调用 ListBuckets
+- 列举对象发现 bucket 不存在或无权访问时取消验证并丢弃缓存
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, Iterable, List, Optional
+
+from ...metrics import metrics
+
+# 缓存与验证结果的默认有效期（秒）
+DEFAULT_BUCKET_CACHE_TTL = 300.0
+
+# 缓存的凭证数量上限，超出时清理过期条目
+MAX_CREDENTIALS = 10000
+
+
+@dataclass
+class _CredentialEntry:
+    # bucket 名称 -> ListBuckets 返回的 bucket 信息，None 表示尚未请求或已过期
+    buckets: Optional[Dict[str, dict]] = None
+    listed_at: float = 0.0
+    # 已验证的 bucket 名称 -> 验证时间
+    verified: Dict[str, float] = field(default_factory=dict)
+
+
+class BucketCache:
+    """按凭证缓存 bucket 元数据"""
+
+    def __init__(self, ttl: float = DEFAULT_BUCKET_CACHE_TTL):
+        """初始化缓存
+
+        Args:
+            ttl: 缓存与验证结果的有效期（秒），为 0 时禁用缓存
+        """
+        self.ttl = ttl
+        self._entries: Dict[Hashable, _CredentialEntry] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, credential: Hashable) -> _CredentialEntry:
+        entry = self._entries.get(credential)
+        if entry is None:
+            if len(self._entries) >= MAX_CREDENTIALS:
+                self._purge(time.monotonic())
+            entry = self._entries.setdefault(credential, _CredentialEntry())
+        return entry
+
+    def _purge(self, now: float) -> None:
+        for credential in [
+            c
+            for c, e in self._entries.items()
+            if now - e.listed_at > self.ttl
+            and all(now - t > self.ttl for t in e.verified.values())
+        ]:
+            del self._entries[credential]
+
+    def lookup(
+        self, credential: Hashable, configured: Iterable[str]
+    ) -> Optional[List[dict]]:
+        """查找会话配置的 bucket
+
+        Args:
+            credential: 凭证键
+            configured: 会话配置的 bucket 名称
+
+        Returns:
+            按 ListBuckets 顺序排列的已配置 bucket；缓存未命中时返回 None
+        """
+        if self.ttl <= 0:
+            return None
+
+        configured = set(configured)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(credential)
+            if entry is None:
+                metrics.BUCKET_CACHE_LOOKUPS.inc(result="miss")
+                return None
+
+            if entry.buckets is not None and now - entry.listed_at <= self.ttl:
+                metrics.BUCKET_CACHE_LOOKUPS.inc(result="hit")
+                return [
+                    bucket
+                    for name, bucket in entry.buckets.items()
+                    if name in configured
+                ]
+
+            if configured and all(
+                now - entry.verified.get(name, float("-inf")) <= self.ttl
+                for name in configured
+            ):
+                metrics.BUCKET_CACHE_LOOKUPS.inc(result="verified")
+                return [{"Name": name} for name in sorted(configured)]
+
+        metrics.BUCKET_CACHE_LOOKUPS.inc(result="miss")
+        return None
+
+    def put(self, credential: Hashable, buckets: List[dict]) -> None:
+        """保存 ListBuckets 的结果，列出的 bucket 同时记为已验证"""
+        if self.ttl <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entry(credential)
+            entry.buckets = {bucket["Name"]: bucket for bucket in buckets}
+            entry.listed_at = now
+            entry.verified = {name: now for name in entry.buckets}
+
+    def verify(self, credential: Hashable, bucket: str) -> None:
+        """记录凭证可以访问 bucket"""
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entry(credential).verified[bucket] = time.monotonic()
+
+    def invalidate(self, credential: Hashable, bucket: Optional[str] = None) -> None:
+        """bucket 不存在或无权访问时丢弃缓存，未指定 bucket 时丢弃凭证的全部缓存"""
+        with self._lock:
+            entry = self._entries.get(credential)
+            if entry is None:
+                return
+            if bucket is None:
+                del self._entries[credential]
+                return
+            entry.verified.pop(bucket, None)
+            entry.buckets = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# 全局 bucket 元数据缓存实例
+bucket_cache = BucketCache()
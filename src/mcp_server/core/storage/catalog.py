@@ -0,0 +1,307 @@
+"""音乐目录快照模块
+
+提供单个会话的音乐目录快照，包括：
+- 按 (Key, Bucket) 排序的全局索引与按 bucket 划分的索引
+- 基于二分查找的前缀定位与分页
+- 编码目录版本、bucket 与位置的不透明分页游标
+- 随目录加载与变更增量维护的分面统计、目录树与重复文件索引
+"""
+
+import base64
+import bisect
+import itertools
+import json
+import secrets
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .directory import DirectoryTrie
+from .duplicates import DuplicateIndex
+from .facets import MusicFacets
+
+# 目录版本号全局递增，保证不同会话、不同次加载的版本互不相同；
+# 起始值随机，避免多个进程共享目录存储时版本号冲突
+_version_counter = itertools.count((secrets.randbits(20) << 32) + 1)
+
+# 前缀区间上界使用的哨兵字符
+_MAX_CHAR = "\U0010ffff"
+
+# 估算内存占用时每个文件的固定开销（对象字典、排序索引、目录树与统计引用）
+ENTRY_OVERHEAD_BYTES = 1024
+
+
+def estimate_entry_bytes(obj: Dict[str, Any]) -> int:
+    """估算单个音乐文件在目录快照中占用的内存"""
+    return ENTRY_OVERHEAD_BYTES + 2 * len(obj["Key"])
+
+
+def next_catalog_version() -> int:
+    """分配一个新的目录版本号"""
+    return next(_version_counter)
+
+
+@dataclass(frozen=True)
+class CatalogCursor:
+    """分页游标，记录上一页最后一个文件的位置"""
+
+    version: int
+    bucket: str
+    key: str
+    position: int
+
+
+def encode_cursor(cursor: CatalogCursor) -> str:
+    """将游标编码为不透明字符串
+
+    Args:
+        cursor: 分页游标
+
+    Returns:
+        URL安全的base64字符串
+    """
+    payload = {
+        "v": cursor.version,
+        "b": cursor.bucket,
+        "k": cursor.key,
+        "p": cursor.position,
+    }
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> CatalogCursor:
+    """解析不透明游标字符串
+
+    Args:
+        token: encode_cursor 生成的字符串
+
+    Returns:
+        分页游标
+
+    Raises:
+        ValueError: 游标格式无效
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return CatalogCursor(
+            version=int(payload["v"]),
+            bucket=str(payload["b"]),
+            key=str(payload["k"]),
+            position=int(payload["p"]),
+        )
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {token}") from e
+
+
+class MusicCatalog:
+    """单个会话的音乐目录快照
+
+    目录中的文件按 (Key, Bucket) 排序，同时为每个 bucket 维护一份按 Key 排序的索引，
+    分页与前缀定位均通过二分查找完成，续页复杂度为 O(log n)。
+    """
+
+    def __init__(
+        self, music_files: List[Dict[str, Any]], version: Optional[int] = None
+    ):
+        """初始化音乐目录快照
+
+        Args:
+            music_files: 带有 Bucket 字段的音乐文件列表
+            version: 目录版本号，默认自动分配
+        """
+        self.version = version if version is not None else next_catalog_version()
+        # 目录被修改、版本更新时以旧版本号调用，用于使旧版本的派生缓存失效
+        self.on_version_change: Optional[Callable[[int], None]] = None
+        self._entries: List[Dict[str, Any]] = sorted(
+            music_files, key=lambda obj: (obj["Key"], obj["Bucket"])
+        )
+        self._sort_keys: List[Tuple[str, str]] = [
+            (obj["Key"], obj["Bucket"]) for obj in self._entries
+        ]
+        self._bucket_entries: Dict[str, List[Dict[str, Any]]] = {}
+        for obj in self._entries:
+            self._bucket_entries.setdefault(obj["Bucket"], []).append(obj)
+        self._bucket_sort_keys: Dict[str, List[Tuple[str, str]]] = {
+            bucket: [(obj["Key"], bucket) for obj in entries]
+            for bucket, entries in self._bucket_entries.items()
+        }
+        self.facets = MusicFacets()
+        self.directories = DirectoryTrie()
+        self.duplicates = DuplicateIndex()
+        self.estimated_bytes = 0
+        for obj in self._entries:
+            self.facets.add(obj)
+            self.directories.add(obj)
+            self.duplicates.add(obj)
+            self.estimated_bytes += estimate_entry_bytes(obj)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def entries(self) -> List[Dict[str, Any]]:
+        """按 (Key, Bucket) 排序的全部音乐文件"""
+        return self._entries
+
+    def _scope(
+        self, bucket: Optional[str]
+    ) -> Tuple[List[Dict[str, Any]], List[Tuple[str, str]]]:
+        if not bucket:
+            return self._entries, self._sort_keys
+        return self._bucket_entries.get(bucket, []), self._bucket_sort_keys.get(
+            bucket, []
+        )
+
+    def _resume_index(
+        self,
+        entries: List[Dict[str, Any]],
+        sort_keys: List[Tuple[str, str]],
+        cursor: CatalogCursor,
+    ) -> int:
+        """根据游标计算续页起始下标
+
+        游标版本与当前目录一致且位置未失效时直接使用记录的位置，
+        否则（目录已刷新）按 (Key, Bucket) 二分定位，保证续页不重复不遗漏。
+        """
+        position = cursor.position
+        if (
+            cursor.version == self.version
+            and 0 <= position < len(entries)
+            and sort_keys[position] == (cursor.key, cursor.bucket)
+        ):
+            return position + 1
+        return bisect.bisect_right(sort_keys, (cursor.key, cursor.bucket))
+
+    def insert(self, obj: Dict[str, Any]) -> None:
+        """插入或替换一个音乐文件，目录版本随之更新
+
+        Args:
+            obj: 带有 Bucket 字段的音乐文件对象
+        """
+        self.remove(obj["Bucket"], obj["Key"])
+
+        sort_key = (obj["Key"], obj["Bucket"])
+        index = bisect.bisect_left(self._sort_keys, sort_key)
+        self._entries.insert(index, obj)
+        self._sort_keys.insert(index, sort_key)
+
+        bucket_entries = self._bucket_entries.setdefault(obj["Bucket"], [])
+        bucket_sort_keys = self._bucket_sort_keys.setdefault(obj["Bucket"], [])
+        index = bisect.bisect_left(bucket_sort_keys, sort_key)
+        bucket_entries.insert(index, obj)
+        bucket_sort_keys.insert(index, sort_key)
+
+        self.facets.add(obj)
+        self.directories.add(obj)
+        self.duplicates.add(obj)
+        self.estimated_bytes += estimate_entry_bytes(obj)
+        self._bump_version()
+
+    def remove(self, bucket: str, key: str) -> Optional[Dict[str, Any]]:
+        """移除一个音乐文件，目录版本随之更新
+
+        Args:
+            bucket: 文件所在bucket
+            key: 文件键名
+
+        Returns:
+            被移除的音乐文件对象，文件不存在时返回None
+        """
+        sort_key = (key, bucket)
+        index = bisect.bisect_left(self._sort_keys, sort_key)
+        if index >= len(self._sort_keys) or self._sort_keys[index] != sort_key:
+            return None
+
+        obj = self._entries.pop(index)
+        del self._sort_keys[index]
+
+        bucket_sort_keys = self._bucket_sort_keys[bucket]
+        index = bisect.bisect_left(bucket_sort_keys, sort_key)
+        del self._bucket_entries[bucket][index]
+        del bucket_sort_keys[index]
+
+        self.facets.remove(obj)
+        self.directories.remove(obj)
+        self.duplicates.remove(obj)
+        self.estimated_bytes -= estimate_entry_bytes(obj)
+        self._bump_version()
+        return obj
+
+    def _bump_version(self) -> None:
+        previous = self.version
+        self.version = next_catalog_version()
+        if self.on_version_change is not None:
+            self.on_version_change(previous)
+
+    def find_by_key(self, key: str) -> List[Dict[str, Any]]:
+        """查找所有 bucket 中与 key 完全匹配的文件
+
+        Args:
+            key: 文件键名
+
+        Returns:
+            匹配的音乐文件列表
+        """
+        entries = self._entries
+        start = bisect.bisect_left(self._sort_keys, (key, ""))
+        end = start
+        while end < len(entries) and entries[end]["Key"] == key:
+            end += 1
+        return entries[start:end]
+
+    def page(
+        self,
+        limit: int,
+        bucket: Optional[str] = None,
+        prefix: str = "",
+        start_after: str = "",
+        cursor: Optional[str] = None,
+        offset: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """获取一页音乐文件
+
+        Args:
+            limit: 本页最大文件数量
+            bucket: 只返回指定 bucket 中的文件
+            prefix: 只返回 Key 以此前缀开头的文件
+            start_after: 只返回 Key 大于此值的文件
+            cursor: 上一页返回的游标，优先于 start_after
+            offset: 在过滤后的结果中跳过的文件数量
+
+        Returns:
+            (本页文件列表, 下一页游标)，没有更多数据时游标为 None
+
+        Raises:
+            ValueError: 游标格式无效
+        """
+        entries, sort_keys = self._scope(bucket)
+
+        start = bisect.bisect_left(sort_keys, (prefix, ""))
+        if cursor:
+            start = max(
+                start, self._resume_index(entries, sort_keys, decode_cursor(cursor))
+            )
+        elif start_after:
+            start = max(start, bisect.bisect_right(sort_keys, (start_after, _MAX_CHAR)))
+
+        end = len(entries)
+        if prefix:
+            end = bisect.bisect_left(sort_keys, (prefix + _MAX_CHAR, ""), lo=start)
+        start = min(start + max(offset, 0), end)
+
+        stop = min(start + max(limit, 0), end)
+        page = entries[start:stop]
+
+        next_cursor = None
+        if page and stop < end:
+            last = page[-1]
+            next_cursor = encode_cursor(
+                CatalogCursor(
+                    version=self.version,
+                    bucket=last["Bucket"],
+                    key=last["Key"],
+                    position=stop - 1,
+                )
+            )
+        return page, next_cursor
@@ -0,0 +1,168 @@
+"""音乐目录树模块
+
+按 Key 的路径段构建前缀树，每个节点记录子树中的文件数量与总字节数，
+列出某个路径下的子目录与文件只需访问该节点的直接子项。
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+PATH_SEPARATOR = "/"
+
+
+class DirectoryNode:
+    """目录树节点"""
+
+    __slots__ = ("children", "files", "count", "size")
+
+    def __init__(self) -> None:
+        # 子目录名 -> 子节点
+        self.children: Dict[str, "DirectoryNode"] = {}
+        # 文件名 -> 该路径在各个bucket中的文件对象
+        self.files: Dict[str, List[Dict[str, Any]]] = {}
+        self.count = 0
+        self.size = 0
+
+
+def _split_key(key: str) -> Tuple[List[str], str]:
+    *folders, filename = key.split(PATH_SEPARATOR)
+    return folders, filename
+
+
+def _split_path(path: str) -> List[str]:
+    path = path.strip(PATH_SEPARATOR)
+    return path.split(PATH_SEPARATOR) if path else []
+
+
+class DirectoryTrie:
+    """基于路径段的目录前缀树"""
+
+    def __init__(self) -> None:
+        self.root = DirectoryNode()
+
+    def add(self, obj: Dict[str, Any]) -> None:
+        """将文件加入目录树
+
+        Args:
+            obj: 带有 Bucket 字段的音乐文件对象
+        """
+        folders, filename = _split_key(obj["Key"])
+        size = obj.get("Size", 0)
+
+        node = self.root
+        node.count += 1
+        node.size += size
+        for folder in folders:
+            node = node.children.setdefault(folder, DirectoryNode())
+            node.count += 1
+            node.size += size
+        node.files.setdefault(filename, []).append(obj)
+
+    def remove(self, obj: Dict[str, Any]) -> bool:
+        """将文件从目录树中移除，并清理空目录
+
+        Args:
+            obj: 带有 Bucket 字段的音乐文件对象
+
+        Returns:
+            文件是否存在于目录树中
+        """
+        folders, filename = _split_key(obj["Key"])
+
+        path = [self.root]
+        for folder in folders:
+            child = path[-1].children.get(folder)
+            if child is None:
+                return False
+            path.append(child)
+
+        copies = path[-1].files.get(filename, [])
+        for index, candidate in enumerate(copies):
+            if candidate["Bucket"] == obj["Bucket"]:
+                break
+        else:
+            return False
+
+        removed = copies.pop(index)
+        if not copies:
+            del path[-1].files[filename]
+
+        size = removed.get("Size", 0)
+        for node in path:
+            node.count -= 1
+            node.size -= size
+
+        # 自底向上清理空目录
+        for depth in range(len(folders), 0, -1):
+            if path[depth].count > 0:
+                break
+            del path[depth - 1].children[folders[depth - 1]]
+        return True
+
+    def find(self, path: str) -> Optional[DirectoryNode]:
+        """查找路径对应的目录节点
+
+        Args:
+            path: 目录路径，空字符串或"/"表示根目录
+
+        Returns:
+            目录节点，不存在时返回None
+        """
+        node = self.root
+        for folder in _split_path(path):
+            node = node.children.get(folder)
+            if node is None:
+                return None
+        return node
+
+    def list_directory(
+        self, path: str = "", max_files: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """列出目录下的子目录与文件
+
+        Args:
+            path: 目录路径，空字符串或"/"表示根目录
+            max_files: 最多返回的文件数量，默认全部返回
+
+        Returns:
+            目录信息字典，目录不存在时返回None
+        """
+        node = self.find(path)
+        if node is None:
+            return None
+
+        folders = _split_path(path)
+        base = PATH_SEPARATOR.join(folders) + PATH_SEPARATOR if folders else ""
+
+        directories = [
+            {
+                "name": name,
+                "path": base + name + PATH_SEPARATOR,
+                "count": child.count,
+                "bytes": child.size,
+            }
+            for name, child in sorted(node.children.items())
+        ]
+
+        files = []
+        for name in sorted(node.files):
+            for obj in node.files[name]:
+                files.append(
+                    {
+                        "key": obj["Key"],
+                        "bucket": obj["Bucket"],
+                        "size": obj.get("Size", 0),
+                    }
+                )
+
+        truncated = max_files is not None and len(files) > max_files
+        if truncated:
+            files = files[:max_files]
+
+        return {
+            "path": base,
+            "count": node.count,
+            "bytes": node.size,
+            "directories": directories,
+            "files": files,
+            "truncated": truncated,
+        }
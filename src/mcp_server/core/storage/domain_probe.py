@@ -0,0 +1,207 @@
+"""下载域名探测模块
+
+bucket 通常同时绑定 CDN 域名与源站域名，UC 返回的顺序与实际访问速度无关。
+后台任务定期向生成过URL的每个域名发送 HEAD 请求，记录延迟与可用性：
+- 延迟按指数加权平均，生成URL时按测得的延迟从快到慢排序，未测量的域名 CDN 优先
+- 连续探测失败（连接错误、超时或 5xx）达到阈值的域名视为不可用，排在最后，
+  恢复后自动回到原来的位置
+- 排序只读取内存中的统计，不增加生成URL的耗时
+- 不再探测的域名同时删除其延迟指标，带有延迟指标的域名数量有上限
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from ...consts import consts
+from ...metrics import metrics
+
+logger = logging.getLogger(consts.LOGGER_NAME)
+
+DEFAULT_PROBE_INTERVAL = 30.0
+PROBE_TIMEOUT = 3.0
+# 连续失败次数达到该值的域名视为不可用
+FAILURE_THRESHOLD = 2
+# 新延迟在加权平均中的权重
+LATENCY_SMOOTHING = 0.3
+# 超过该时间（秒）没有生成过URL的域名不再探测
+DOMAIN_TTL = 3600.0
+MAX_CONCURRENT_PROBES = 8
+# 探测任务检查到期域名的间隔，新出现的域名在该时间内完成首次探测
+PROBE_TICK = 1.0
+
+
+@dataclass
+class _DomainStats:
+    last_used: float
+    latency: Optional[float] = None
+    failures: int = 0
+    last_probe: Optional[float] = None
+
+
+class DomainProber:
+    """记录各下载域名的延迟与可用性，并据此排序"""
+
+    def __init__(
+        self,
+        interval: float = DEFAULT_PROBE_INTERVAL,
+        timeout: float = PROBE_TIMEOUT,
+    ):
+        """初始化域名探测
+
+        Args:
+            interval: 每个域名的探测间隔（秒），为 0 时不探测
+            timeout: 单次探测的超时时间（秒）
+        """
+        self.interval = interval
+        self.timeout = timeout
+        # "scheme://domain" -> 统计，生成URL的线程与探测任务都会访问
+        self._stats: Dict[str, _DomainStats] = {}
+        self._lock = threading.Lock()
+
+    def _sort_key(self, origin: str, domain_type: str) -> Tuple[bool, float, int]:
+        stats = self._stats.get(origin)
+        degraded = stats is not None and stats.failures >= FAILURE_THRESHOLD
+        latency = math.inf
+        if stats is not None and stats.latency is not None:
+            latency = stats.latency
+        return degraded, latency, 0 if domain_type == "cdn" else 1
+
+    def rank(
+        self, scheme: str, domains: List[Tuple[str, str]]
+    ) -> List[Tuple[str, str]]:
+        """按测得的性能排序域名，并登记需要探测的域名
+
+        Args:
+            scheme: http 或 https
+            domains: UC 顺序的 (域名, 域名类型) 列表
+
+        Returns:
+            从快到慢排列的 (域名, 域名类型)
+        """
+        now = time.monotonic()
+        with self._lock:
+            for domain, _ in domains:
+                origin = f"{scheme}://{domain}"
+                stats = self._stats.get(origin)
+                if stats is None:
+                    self._stats[origin] = _DomainStats(last_used=now)
+                else:
+                    stats.last_used = now
+            return sorted(
+                domains,
+                key=lambda item: self._sort_key(f"{scheme}://{item[0]}", item[1]),
+            )
+
+    def order_urls(self, url_infos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """按当前统计重新排序已生成的URL，用于缓存的URL在域名不可用时切换"""
+
+        def sort_key(url_info: Dict[str, Any]) -> Tuple[bool, float, int]:
+            parsed = urlparse(url_info["object_url"])
+            return self._sort_key(
+                f"{parsed.scheme}://{parsed.netloc}", url_info.get("domain_type", "")
+            )
+
+        with self._lock:
+            return sorted(url_infos, key=sort_key)
+
+    def is_degraded(self, origin: str) -> bool:
+        stats = self._stats.get(origin)
+        return stats is not None and stats.failures >= FAILURE_THRESHOLD
+
+    def record(self, origin: str, latency: Optional[float]) -> None:
+        """记录一次探测结果
+
+        Args:
+            origin: "scheme://domain"
+            latency: 响应耗时（秒），探测失败时为 None
+        """
+        with self._lock:
+            stats = self._stats.get(origin)
+            if stats is None:
+                stats = self._stats[origin] = _DomainStats(last_used=time.monotonic())
+            stats.last_probe = time.monotonic()
+            if latency is None:
+                stats.failures += 1
+            else:
+                stats.failures = 0
+                stats.latency = (
+                    latency
+                    if stats.latency is None
+                    else LATENCY_SMOOTHING * latency
+                    + (1 - LATENCY_SMOOTHING) * stats.latency
+                )
+                label = metrics.domain_label(origin)
+                if label is not None:
+                    metrics.DOMAIN_LATENCY.set(stats.latency, domain=label)
+        metrics.DOMAIN_PROBES.inc(result="failure" if latency is None else "success")
+
+    async def _probe(self, client: Any, origin: str) -> Optional[float]:
+        start = time.perf_counter()
+        try:
+            response = await client.head(f"{origin}/", timeout=self.timeout)
+        except Exception as e:
+            logger.debug(f"Probe of {origin} failed: {e}")
+            return None
+        if response.status_code >= 500:
+            return None
+        # 私有 bucket 的根路径返回 401/403/404 也说明域名可用
+        return time.perf_counter() - start
+
+    def _due(self, now: float) -> List[str]:
+        """丢弃长期未使用的域名，返回需要探测的域名"""
+        with self._lock:
+            for origin, stats in list(self._stats.items()):
+                if now - stats.last_used > DOMAIN_TTL:
+                    del self._stats[origin]
+                    metrics.release_domain_label(origin)
+            return [
+                origin
+                for origin, stats in self._stats.items()
+                if stats.last_probe is None or now - stats.last_probe >= self.interval
+            ]
+
+    async def probe_due(self, now: Optional[float] = None) -> int:
+        """探测首次出现或距上次探测超过探测间隔的域名
+
+        Returns:
+            探测的域名数量
+        """
+        origins = self._due(time.monotonic() if now is None else now)
+        if not origins:
+            return 0
+
+        import httpx
+
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_PROBES)
+
+        async def probe(origin: str) -> None:
+            async with semaphore:
+                latency = await self._probe(client, origin)
+            if latency is None and not self.is_degraded(origin):
+                logger.info(f"Probe of download domain {origin} failed")
+            self.record(origin, latency)
+
+        async with httpx.AsyncClient(follow_redirects=False) as client:
+            await asyncio.gather(*(probe(origin) for origin in origins))
+        return len(origins)
+
+    async def run_prober(self) -> None:
+        """定期探测下载域名"""
+        if self.interval <= 0:
+            return
+        while True:
+            await asyncio.sleep(PROBE_TICK)
+            try:
+                await self.probe_due()
+            except Exception as e:
+                logger.error(f"Failed to probe download domains: {e}")
+
+
+# 全局域名探测实例
+domain_prober = DomainProber()
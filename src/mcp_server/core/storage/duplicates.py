@@ -0,0 +1,113 @@
+"""重复文件索引模块
+
+按 (ETag, Size) 对音乐文件分组，随目录加载与变更增量维护：
+- 七牛云的 ETag 由文件内容计算，内容相同的文件 ETag 相同，不需要下载文件即可判断重复
+- 同时维护存在多份副本的分组与可回收的总字节数，查询只遍历重复的分组
+- 没有 ETag 或大小为 0 的文件不参与比较
+"""
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+ContentId = Tuple[str, int]
+ObjectId = Tuple[str, str]
+
+
+def content_id(obj: Dict[str, Any]) -> Optional[ContentId]:
+    """文件内容的标识 (ETag, Size)，无法判断时返回 None"""
+    etag = str(obj.get("ETag") or "").strip('"')
+    size = obj.get("Size", 0)
+    if not etag or size <= 0:
+        return None
+    return etag, size
+
+
+class DuplicateIndex:
+    """按文件内容分组的重复文件索引"""
+
+    def __init__(self) -> None:
+        # (ETag, Size) -> (Bucket, Key) -> 文件对象
+        self._groups: Dict[ContentId, Dict[ObjectId, Dict[str, Any]]] = {}
+        # 存在多份副本的分组
+        self._duplicated: Set[ContentId] = set()
+        # 每组只保留一份时可以删除的文件数量与字节数
+        self.redundant_count = 0
+        self.reclaimable_bytes = 0
+
+    def add(self, obj: Dict[str, Any]) -> None:
+        """将文件加入索引"""
+        cid = content_id(obj)
+        if cid is None:
+            return
+        members = self._groups.setdefault(cid, {})
+        members[(obj["Bucket"], obj["Key"])] = obj
+        if len(members) > 1:
+            self._duplicated.add(cid)
+            self.redundant_count += 1
+            self.reclaimable_bytes += cid[1]
+
+    def remove(self, obj: Dict[str, Any]) -> None:
+        """将文件从索引中移除"""
+        cid = content_id(obj)
+        members = self._groups.get(cid) if cid is not None else None
+        if members is None or members.pop((obj["Bucket"], obj["Key"]), None) is None:
+            return
+        if members:
+            self.redundant_count -= 1
+            self.reclaimable_bytes -= cid[1]
+            if len(members) == 1:
+                self._duplicated.discard(cid)
+        else:
+            del self._groups[cid]
+
+    @property
+    def group_count(self) -> int:
+        """存在多份副本的分组数量"""
+        return len(self._duplicated)
+
+    def groups(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """获取重复分组，按可回收字节数降序排列
+
+        Args:
+            limit: 最多返回的分组数量
+
+        Returns:
+            分组列表，每项包含 etag、size、copies、reclaimable_bytes 与按 (bucket, key) 排序的 files
+        """
+        ordered = sorted(
+            self._duplicated,
+            key=lambda cid: (-cid[1] * (len(self._groups[cid]) - 1), cid),
+        )
+        if limit is not None:
+            ordered = ordered[:limit]
+        result = []
+        for etag, size in ordered:
+            members = self._groups[(etag, size)]
+            result.append(
+                {
+                    "etag": etag,
+                    "size": size,
+                    "copies": len(members),
+                    "reclaimable_bytes": size * (len(members) - 1),
+                    "files": [
+                        {"bucket": bucket, "key": key}
+                        for bucket, key in sorted(members)
+                    ],
+                }
+            )
+        return result
+
+    def summary(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        """获取重复文件汇总
+
+        Args:
+            limit: 最多返回的分组数量
+
+        Returns:
+            包含分组数、多余副本数、可回收字节数以及分组明细的字典
+        """
+        return {
+            "duplicate_groups": self.group_count,
+            "redundant_files": self.redundant_count,
+            "reclaimable_bytes": self.reclaimable_bytes,
+            "groups": self.groups(limit=limit),
+        }
@@ -0,0 +1,146 @@
+"""音乐目录分面统计模块
+
+按 bucket、扩展名、顶层目录、顶层目录与扩展名的组合以及文件大小区间增量维护文件数量与总字节数，
+目录加载或变更时同步更新，查询时无需遍历整个目录。
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+# 支持的分面名称
+FACET_BUCKET = "bucket"
+FACET_EXTENSION = "extension"
+FACET_FOLDER = "folder"
+FACET_SIZE_BAND = "size_band"
+# 顶层目录与扩展名的组合，值为 "目录|扩展名"
+FACET_FOLDER_EXTENSION = "folder_extension"
+FACETS: Tuple[str, ...] = (
+    FACET_BUCKET,
+    FACET_EXTENSION,
+    FACET_FOLDER,
+    FACET_FOLDER_EXTENSION,
+    FACET_SIZE_BAND,
+)
+
+# 根目录下的文件归入的顶层目录名
+ROOT_FOLDER = "/"
+
+_MB = 1024 * 1024
+
+# 文件大小区间（上界不含），按顺序匹配
+SIZE_BANDS: Tuple[Tuple[str, float], ...] = (
+    ("<1MB", 1 * _MB),
+    ("1-10MB", 10 * _MB),
+    ("10-50MB", 50 * _MB),
+    ("50-100MB", 100 * _MB),
+    (">=100MB", float("inf")),
+)
+
+
+def size_band(size: int) -> str:
+    """根据文件大小获取所在的大小区间"""
+    for name, upper in SIZE_BANDS:
+        if size < upper:
+            return name
+    return SIZE_BANDS[-1][0]
+
+
+def _extension(key: str) -> str:
+    filename = key.rsplit("/", 1)[-1]
+    if "." not in filename:
+        return ""
+    return filename.rsplit(".", 1)[-1].lower()
+
+
+def _top_level_folder(key: str) -> str:
+    if "/" not in key:
+        return ROOT_FOLDER
+    return key.split("/", 1)[0]
+
+
+class MusicFacets:
+    """音乐目录分面计数器"""
+
+    def __init__(self) -> None:
+        # 分面名称 -> 分面值 -> [文件数量, 总字节数]
+        self._counters: Dict[str, Dict[str, List[int]]] = {
+            facet: {} for facet in FACETS
+        }
+        self.total_count = 0
+        self.total_bytes = 0
+
+    def _facet_values(self, obj: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+        key = obj["Key"]
+        extension = _extension(key)
+        folder = _top_level_folder(key)
+        return (
+            (FACET_BUCKET, obj["Bucket"]),
+            (FACET_EXTENSION, extension),
+            (FACET_FOLDER, folder),
+            (FACET_FOLDER_EXTENSION, f"{folder}|{extension}"),
+            (FACET_SIZE_BAND, size_band(obj.get("Size", 0))),
+        )
+
+    def _apply(self, obj: Dict[str, Any], sign: int) -> None:
+        size = obj.get("Size", 0)
+        self.total_count += sign
+        self.total_bytes += sign * size
+        for facet, value in self._facet_values(obj):
+            counter = self._counters[facet].setdefault(value, [0, 0])
+            counter[0] += sign
+            counter[1] += sign * size
+            if counter[0] <= 0:
+                del self._counters[facet][value]
+
+    def add(self, obj: Dict[str, Any]) -> None:
+        """将文件计入统计"""
+        self._apply(obj, 1)
+
+    def remove(self, obj: Dict[str, Any]) -> None:
+        """将文件从统计中移除"""
+        self._apply(obj, -1)
+
+    def facet(self, facet: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """获取单个分面的统计结果，按文件数量降序排列
+
+        Args:
+            facet: 分面名称
+            limit: 最多返回的分面值数量
+
+        Returns:
+            分面统计列表，每项包含 value、count 和 bytes
+
+        Raises:
+            ValueError: 分面名称无效
+        """
+        if facet not in self._counters:
+            raise ValueError(f"Unknown facet: {facet}")
+
+        items = sorted(
+            self._counters[facet].items(), key=lambda item: (-item[1][0], item[0])
+        )
+        if limit is not None:
+            items = items[:limit]
+        return [
+            {"value": value, "count": count, "bytes": total_bytes}
+            for value, (count, total_bytes) in items
+        ]
+
+    def summary(
+        self, facets: Optional[List[str]] = None, limit: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """获取统计汇总
+
+        Args:
+            facets: 需要返回的分面名称，默认全部
+            limit: 每个分面最多返回的分面值数量
+
+        Returns:
+            包含总数、总字节数以及各分面统计的字典
+        """
+        return {
+            "total_count": self.total_count,
+            "total_bytes": self.total_bytes,
+            "facets": {
+                facet: self.facet(facet, limit=limit) for facet in (facets or FACETS)
+            },
+        }
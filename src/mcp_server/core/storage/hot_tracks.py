@@ -0,0 +1,316 @@
+"""热门曲目模块
+
+播放请求高度集中在少数曲目上，按租户统计曲目热度并提前生成这些曲目的播放URL：
+- 热度为按半衰期指数衰减的播放次数（decayed LFU），很久没有播放的曲目热度逐渐归零
+- 生成过的播放URL按 (凭证, bucket, key) 缓存，剩余有效期不足时不再使用
+- 后台任务定期为每个租户热度最高的曲目重新签名即将过期的URL，
+  热门曲目的取链请求总是命中缓存
+- 每个租户最近播放的曲目保存在内存中
+- 租户在本进程中的最后一个会话离开后丢弃其统计与缓存的URL，不再持有其密钥
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Hashable, List, Optional, Set, Tuple
+
+from .storage import StorageService
+from ...consts import consts
+from ...metrics import metrics
+from ...session import session_manager
+from ...tools.scheduler import scheduler
+
+logger = logging.getLogger(consts.LOGGER_NAME)
+
+# 热度半衰期（秒）
+DEFAULT_HALF_LIFE = 600.0
+# 每个租户预签名的热门曲目数量，为 0 时不预签名
+DEFAULT_HOT_SET_SIZE = 200
+# 热度低于该值的曲目不预签名
+MIN_HOT_SCORE = 2.0
+# 每个租户统计的曲目数量上限，超出时丢弃热度最低的曲目
+MAX_TRACKED_TRACKS = 5000
+# 每个租户保存的最近播放记录数
+RECENT_PLAYS = 50
+# 租户超过该时间（秒）没有播放时丢弃其统计
+IDLE_TENANT_TTL = 3600.0
+
+# 缓存URL的有效期与最少剩余有效期（秒）
+DEFAULT_URL_EXPIRES = 3600
+URL_MIN_VALIDITY = 900.0
+# 所有租户缓存的URL数量上限
+MAX_CACHED_URLS = 20000
+DEFAULT_PREFETCH_INTERVAL = 60.0
+
+TrackId = Tuple[str, str]
+# (URL信息列表, 过期时间戳)
+UrlEntry = Tuple[List[Dict[str, Any]], float]
+
+
+@dataclass
+class _TrackStats:
+    score: float
+    updated: float
+
+
+@dataclass
+class _TenantState:
+    storage: StorageService
+    last_seen: float
+    tracks: Dict[TrackId, _TrackStats] = field(default_factory=dict)
+    recent: Deque[Tuple[str, str, float]] = field(
+        default_factory=lambda: deque(maxlen=RECENT_PLAYS)
+    )
+    # 播放过曲目且仍在本进程中的会话
+    sessions: Set[str] = field(default_factory=set)
+
+
+class HotTracks:
+    """按租户统计曲目热度并缓存、预签名播放URL"""
+
+    def __init__(
+        self,
+        half_life: float = DEFAULT_HALF_LIFE,
+        hot_set_size: int = DEFAULT_HOT_SET_SIZE,
+        url_expires: int = DEFAULT_URL_EXPIRES,
+    ):
+        """初始化热门曲目统计
+
+        Args:
+            half_life: 热度半衰期（秒）
+            hot_set_size: 每个租户预签名的热门曲目数量，为 0 时不预签名
+            url_expires: 预签名URL的有效期（秒）
+        """
+        self.half_life = half_life
+        self.hot_set_size = hot_set_size
+        self.url_expires = url_expires
+        # 凭证键 -> 租户统计
+        self._tenants: Dict[Hashable, _TenantState] = {}
+        # 会话ID -> 凭证键
+        self._session_tenants: Dict[str, Hashable] = {}
+        # (凭证键, bucket, key) -> 缓存的URL，按最近使用排序
+        self._urls: "OrderedDict[Tuple[Hashable, str, str], UrlEntry]" = OrderedDict()
+
+    def configure(
+        self, hot_set_size: Optional[int] = None, half_life: Optional[float] = None
+    ) -> None:
+        """修改热门曲目数量与热度半衰期，为 None 的参数保持不变"""
+        if hot_set_size is not None:
+            self.hot_set_size = hot_set_size
+        if half_life is not None:
+            self.half_life = half_life
+
+    def _score(self, stats: _TrackStats, now: float) -> float:
+        return stats.score * 0.5 ** ((now - stats.updated) / self.half_life)
+
+    def record_play(
+        self,
+        storage: StorageService,
+        bucket: str,
+        key: str,
+        now: Optional[float] = None,
+        session_id: Optional[str] = None,
+    ) -> None:
+        """记录一次播放
+
+        Args:
+            storage: 发起播放的会话的存储服务，用于之后预签名
+            bucket: 曲目所在bucket
+            key: 曲目key
+            now: 当前时间，默认为 time.time()
+            session_id: 发起播放的会话ID，租户的会话全部离开后丢弃其统计
+        """
+        now = time.time() if now is None else now
+        credential = storage.credential_key
+        tenant = self._tenants.get(credential)
+        if tenant is None:
+            tenant = self._tenants[credential] = _TenantState(storage, now)
+        tenant.storage = storage
+        tenant.last_seen = now
+        if session_id is not None:
+            tenant.sessions.add(session_id)
+            self._session_tenants[session_id] = credential
+        tenant.recent.appendleft((bucket, key, now))
+
+        stats = tenant.tracks.get((bucket, key))
+        if stats is None:
+            if len(tenant.tracks) >= MAX_TRACKED_TRACKS:
+                self._prune(tenant, now)
+            stats = tenant.tracks[(bucket, key)] = _TrackStats(0.0, now)
+        stats.score = self._score(stats, now) + 1
+        stats.updated = now
+
+    def _prune(self, tenant: _TenantState, now: float) -> None:
+        """丢弃热度最低的四分之一曲目"""
+        keep = heapq.nlargest(
+            MAX_TRACKED_TRACKS * 3 // 4,
+            tenant.tracks.items(),
+            key=lambda item: self._score(item[1], now),
+        )
+        tenant.tracks = dict(keep)
+
+    def hot_set(
+        self, credential: Hashable, now: Optional[float] = None
+    ) -> List[Tuple[str, str, float]]:
+        """租户当前的热门曲目
+
+        Returns:
+            按热度降序排列的 (bucket, key, 热度)
+        """
+        now = time.time() if now is None else now
+        tenant = self._tenants.get(credential)
+        if tenant is None or self.hot_set_size <= 0:
+            return []
+        scored = (
+            (bucket, key, self._score(stats, now))
+            for (bucket, key), stats in tenant.tracks.items()
+        )
+        return heapq.nlargest(
+            self.hot_set_size,
+            (item for item in scored if item[2] >= MIN_HOT_SCORE),
+            key=lambda item: item[2],
+        )
+
+    def recently_played(
+        self, credential: Hashable, limit: int = RECENT_PLAYS
+    ) -> List[Tuple[str, str, float]]:
+        """租户最近播放的曲目，最新的在前
+
+        Returns:
+            (bucket, key, 播放时间戳) 列表
+        """
+        tenant = self._tenants.get(credential)
+        if tenant is None:
+            return []
+        return list(tenant.recent)[:limit]
+
+    def get_urls(
+        self,
+        credential: Hashable,
+        bucket: str,
+        key: str,
+        now: Optional[float] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """获取缓存的播放URL，剩余有效期不足 URL_MIN_VALIDITY 时返回 None"""
+        now = time.time() if now is None else now
+        cache_key = (credential, bucket, key)
+        entry = self._urls.get(cache_key)
+        if entry is None or entry[1] - now < URL_MIN_VALIDITY:
+            metrics.URL_CACHE_LOOKUPS.inc(result="miss")
+            return None
+        self._urls.move_to_end(cache_key)
+        metrics.URL_CACHE_LOOKUPS.inc(result="hit")
+        return entry[0]
+
+    def put_urls(
+        self,
+        credential: Hashable,
+        bucket: str,
+        key: str,
+        urls: List[Dict[str, Any]],
+        expires_at: float,
+    ) -> None:
+        """缓存播放URL
+
+        Args:
+            credential: 凭证键
+            bucket: 曲目所在bucket
+            key: 曲目key
+            urls: get_object_url 返回的URL信息
+            expires_at: URL的过期时间戳，应不晚于签名时间加有效期
+        """
+        self._urls[(credential, bucket, key)] = (urls, expires_at)
+        self._urls.move_to_end((credential, bucket, key))
+        while len(self._urls) > MAX_CACHED_URLS:
+            self._urls.popitem(last=False)
+
+    def forget(self, credential: Hashable, bucket: str, key: str) -> None:
+        """丢弃已删除曲目的热度与缓存的URL"""
+        self._urls.pop((credential, bucket, key), None)
+        tenant = self._tenants.get(credential)
+        if tenant is not None:
+            tenant.tracks.pop((bucket, key), None)
+
+    def release_session(self, session_id: str) -> None:
+        """会话离开本进程，租户没有其他会话时丢弃其统计与缓存的URL"""
+        credential = self._session_tenants.pop(session_id, None)
+        tenant = self._tenants.get(credential) if credential is not None else None
+        if tenant is None:
+            return
+        tenant.sessions.discard(session_id)
+        if not tenant.sessions:
+            self._drop_tenant(credential)
+
+    def _drop_tenant(self, credential: Hashable) -> None:
+        tenant = self._tenants.pop(credential, None)
+        if tenant is not None:
+            for session_id in tenant.sessions:
+                self._session_tenants.pop(session_id, None)
+        for cache_key in [k for k in self._urls if k[0] == credential]:
+            del self._urls[cache_key]
+
+    async def prefetch(
+        self, now: Optional[float] = None, interval: float = DEFAULT_PREFETCH_INTERVAL
+    ) -> int:
+        """为各租户的热门曲目重新签名在下次预签名之前就会失效的URL
+
+        同一 bucket 的曲目批量签名，下载域名与 bucket 信息只查询一次。
+
+        Returns:
+            重新签名的URL数量
+        """
+        now = time.time() if now is None else now
+        refreshed = 0
+        for credential, tenant in list(self._tenants.items()):
+            if now - tenant.last_seen > IDLE_TENANT_TTL:
+                self._drop_tenant(credential)
+                continue
+
+            due: Dict[str, List[str]] = {}
+            for bucket, key, _ in self.hot_set(credential, now):
+                entry = self._urls.get((credential, bucket, key))
+                if entry is None or entry[1] - now < URL_MIN_VALIDITY + interval:
+                    due.setdefault(bucket, []).append(key)
+
+            for bucket, keys in due.items():
+                signed_at = time.time()
+                try:
+                    urls = await scheduler.run_sync(
+                        tenant.storage.get_object_urls,
+                        bucket=bucket,
+                        keys=keys,
+                        expires=self.url_expires,
+                    )
+                except Exception as e:
+                    logger.warning(f"预签名 bucket {bucket} 的热门曲目失败: {e}")
+                    continue
+                for key, url_infos in urls.items():
+                    self.put_urls(
+                        credential,
+                        bucket,
+                        key,
+                        url_infos,
+                        signed_at + self.url_expires,
+                    )
+                refreshed += len(urls)
+                metrics.URL_PREFETCHES.inc(len(urls), tenant=tenant.storage.tenant)
+        return refreshed
+
+    async def run_prefetcher(self, interval: float = DEFAULT_PREFETCH_INTERVAL) -> None:
+        """定期预签名热门曲目的URL"""
+        while True:
+            await asyncio.sleep(interval)
+            if self.hot_set_size <= 0:
+                continue
+            try:
+                await self.prefetch(interval=interval)
+            except Exception as e:
+                logger.error(f"Failed to prefetch hot track URLs: {e}")
+
+
+# 全局热门曲目实例
+hot_tracks = HotTracks()
+session_manager.register_release_callback(hot_tracks.release_session)
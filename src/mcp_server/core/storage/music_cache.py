@@ -3,17 +3,25 @@
 提供音乐文件的缓存管理功能，包括：
 - 预加载音乐文件到内存缓存
 - 支持会话级别的文件隔离
-- 提供音乐文件查询和分页功能
+- 提供音乐文件查询和基于游标的分页功能
+- 随目录一起加载会话的播放列表
 """
 
 import asyncio
 import logging
-from typing import Any, Dict, List, Set
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
 from mcp import types
 
+from .catalog import MusicCatalog
+from .page_cache import PageCache
+from .playlist import PlaylistStore
 from .storage import StorageService
 from ...consts import consts
+from ...metrics import metrics
 from ...session import SessionConfig
+from ...tracing import tracing
+from ...store.store import CATALOG_COMPACT_CHANGES, SessionStore
 
 logger = logging.getLogger(consts.LOGGER_NAME)
 
@@ -21,6 +29,8 @@ logger = logging.getLogger(consts.LOGGER_NAME)
 MAX_OBJ_PER_BUCKET = 3000
 MAX_CONCURRENT_BUCKETS = 3
 DEFAULT_PAGE_SIZE = 300
+# 所有会话目录快照的默认内存预算（字节）
+DEFAULT_CATALOG_MEMORY_BUDGET = 512 * 1024 * 1024
 
 # 支持的音乐文件扩展名
 MUSIC_EXTENSIONS: Set[str] = {
@@ -58,10 +68,32 @@ MIME_TYPE_MAP: Dict[str, str] = {
 class MusicCache:
     """音乐文件缓存管理器"""
 
-    def __init__(self) -> None:
-        """初始化音乐缓存管理器"""
-        # 每个session_id对应一个音乐文件列表
-        self._session_music_cache: Dict[str, List[Dict[str, Any]]] = {}
+    def __init__(
+        self,
+        store: Optional[SessionStore] = None,
+        max_catalog_bytes: int = DEFAULT_CATALOG_MEMORY_BUDGET,
+    ) -> None:
+        """初始化音乐缓存管理器
+
+        Args:
+            store: 会话与目录存储后端，共享存储时目录快照会同步写入以供其他进程加载
+            max_catalog_bytes: 所有会话目录快照的内存预算，超出时按LRU淘汰
+        """
+        self.store = store
+        self.max_catalog_bytes = max_catalog_bytes
+        # 每个session_id对应一个音乐目录快照，按最近访问顺序排列
+        self._session_music_cache: "OrderedDict[str, MusicCatalog]" = OrderedDict()
+        # 因内存预算被淘汰、下次访问时需要重新加载的会话
+        self._evicted_sessions: Set[str] = set()
+        self.evictions = 0
+        # 每个session_id对应 (目录版本, (Key, Bucket) -> Resource) 的懒构建缓存
+        self._resource_memo: Dict[
+            str, Tuple[int, Dict[Tuple[str, str], types.Resource]]
+        ] = {}
+        # 按目录版本缓存编码后的分页响应，目录刷新后自动失效
+        self.page_cache = PageCache()
+        # 每个session_id的播放列表
+        self.playlists = PlaylistStore()
         self._cache_lock = asyncio.Lock()
 
     def _is_valid_music_object(self, obj: Dict[str, Any]) -> bool:
@@ -149,54 +181,275 @@ class MusicCache:
         Raises:
             Exception: 预加载失败时抛出异常
         """
-        async with self._cache_lock:
-            logger.info(f"开始为会话 {session_id} 预加载音乐文件")
+        tenant = metrics.tenant_label(session_config.access_key)
+        metrics.PRELOADS_IN_FLIGHT.inc()
+        try:
+            async with self._cache_lock:
+                with (
+                    metrics.PRELOAD_DURATION.time(tenant=tenant),
+                    tracing.span("catalog.preload", session_id=session_id),
+                ):
+                    return await self._preload_locked(session_id, session_config)
+        finally:
+            metrics.PRELOADS_IN_FLIGHT.dec()
+
+    async def _preload_locked(
+        self, session_id: str, session_config: SessionConfig
+    ) -> int:
+        """在持有预加载锁的情况下加载会话的音乐文件"""
+        logger.info(f"开始为会话 {session_id} 预加载音乐文件")
+
+        try:
+            storage = StorageService.from_session_config(session_config)
+
+            # 获取所有bucket
+            buckets = await storage.list_buckets()
+            logger.debug(f"找到 {len(buckets)} 个音乐目录")
+
+            if not buckets:
+                logger.warning(f"会话 {session_id} 没有找到任何音乐目录")
+                self._set_catalog(session_id, MusicCatalog([]))
+                return 0
+
+            # 限制并发处理bucket的数量
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_BUCKETS)
+
+            # 并发处理所有bucket，同时加载播放列表
+            bucket_names = [bucket["Name"] for bucket in buckets]
+            playlists_loaded, *bucket_results = await asyncio.gather(
+                self.playlists.load(session_id, storage, bucket_names),
+                *[
+                    self._process_bucket(storage, bucket, semaphore)
+                    for bucket in buckets
+                ],
+                return_exceptions=True,
+            )
+            if isinstance(playlists_loaded, Exception):
+                logger.error(f"加载播放列表时发生异常: {playlists_loaded}")
+
+            # 合并所有bucket的音乐文件
+            music_files = []
+            for result in bucket_results:
+                if isinstance(result, list):
+                    music_files.extend(result)
+                elif isinstance(result, Exception):
+                    logger.error(f"处理bucket时发生异常: {result}")
+
+            # 缓存音乐目录快照，每次加载都会生成新的目录版本
+            catalog = MusicCatalog(music_files)
+            self._set_catalog(session_id, catalog)
+            await self._persist_catalog(session_id, catalog)
+            logger.info(
+                f"为会话 {session_id} 预加载了 {len(music_files)} 个音乐文件 (目录版本 {catalog.version})"
+            )
 
-            try:
-                storage = StorageService.from_session_config(session_config)
-
-                # 获取所有bucket
-                buckets = await storage.list_buckets()
-                logger.debug(f"找到 {len(buckets)} 个音乐目录")
-
-                if not buckets:
-                    logger.warning(f"会话 {session_id} 没有找到任何音乐目录")
-                    self._session_music_cache[session_id] = []
-                    return 0
-
-                # 限制并发处理bucket的数量
-                semaphore = asyncio.Semaphore(MAX_CONCURRENT_BUCKETS)
-
-                # 并发处理所有bucket
-                bucket_results = await asyncio.gather(
-                    *[
-                        self._process_bucket(storage, bucket, semaphore)
-                        for bucket in buckets
-                    ],
-                    return_exceptions=True,
-                )
+            return len(music_files)
+
+        except Exception as e:
+            logger.error(f"预加载音乐文件失败: {str(e)}")
+            # 确保即使失败也有一个空的缓存
+            self._set_catalog(session_id, MusicCatalog([]))
+            raise
+
+    def _set_catalog(self, session_id: str, catalog: MusicCatalog) -> None:
+        """替换会话的目录快照，并使旧版本的分页缓存失效"""
+        previous = self._session_music_cache.get(session_id)
+        if previous is not None:
+            self.page_cache.invalidate(previous.version)
+            previous.on_version_change = None
+        # 目录的任何修改都会使旧版本的分页缓存失效
+        catalog.on_version_change = self.page_cache.invalidate
+        self._session_music_cache[session_id] = catalog
+        self._session_music_cache.move_to_end(session_id)
+        self._evicted_sessions.discard(session_id)
+        self._enforce_memory_budget(keep=session_id)
+
+    @property
+    def catalog_bytes(self) -> int:
+        """所有会话目录快照的估算内存占用"""
+        return sum(c.estimated_bytes for c in self._session_music_cache.values())
+
+    def _enforce_memory_budget(self, keep: str) -> None:
+        """超出内存预算时按LRU淘汰其他会话的目录快照"""
+        total = self.catalog_bytes
+        while total > self.max_catalog_bytes:
+            victim = next(
+                (sid for sid in self._session_music_cache if sid != keep), None
+            )
+            if victim is None:
+                break
+
+            catalog = self._session_music_cache.pop(victim)
+            self._resource_memo.pop(victim, None)
+            self.page_cache.invalidate(catalog.version)
+            self._evicted_sessions.add(victim)
+            self.evictions += 1
+            total -= catalog.estimated_bytes
+            logger.warning(
+                f"目录内存超出预算 ({total + catalog.estimated_bytes}/{self.max_catalog_bytes} 字节)，"
+                f"淘汰会话 {victim} 的 {len(catalog)} 个音乐文件"
+            )
 
-                # 合并所有bucket的音乐文件
-                music_files = []
-                for result in bucket_results:
-                    if isinstance(result, list):
-                        music_files.extend(result)
-                    elif isinstance(result, Exception):
-                        logger.error(f"处理bucket时发生异常: {result}")
+    def get_memory_stats(self) -> Dict[str, Any]:
+        """获取目录缓存的内存占用统计
 
-                # 缓存音乐文件列表
-                self._session_music_cache[session_id] = music_files
-                logger.info(
-                    f"为会话 {session_id} 预加载了 {len(music_files)} 个音乐文件"
-                )
+        Returns:
+            包含会话数、文件数、估算字节数、预算、淘汰次数与分页缓存统计的字典
+        """
+        page_lookups = self.page_cache.hits + self.page_cache.misses
+        return {
+            "cached_sessions": len(self._session_music_cache),
+            "catalog_entries": sum(len(c) for c in self._session_music_cache.values()),
+            "evicted_sessions": len(self._evicted_sessions),
+            "catalog_bytes": self.catalog_bytes,
+            "max_catalog_bytes": self.max_catalog_bytes,
+            "evictions": self.evictions,
+            "page_cache_bytes": self.page_cache.current_bytes,
+            "page_cache_hits": self.page_cache.hits,
+            "page_cache_misses": self.page_cache.misses,
+            "page_cache_hit_ratio": self.page_cache.hits / page_lookups
+            if page_lookups
+            else 0.0,
+        }
+
+    async def _persist_catalog(self, session_id: str, catalog: MusicCatalog) -> None:
+        """将目录快照写入共享存储"""
+        if self.store is None or not self.store.shared:
+            return
+        # 目录可能在写入期间被增量修改，写入副本
+        await asyncio.to_thread(
+            self.store.put_catalog, session_id, catalog.version, list(catalog.entries)
+        )
 
-                return len(music_files)
+    async def _persist_changes(
+        self,
+        session_id: str,
+        catalog: MusicCatalog,
+        upserts: List[Dict[str, Any]],
+        removals: List[Tuple[str, str]],
+    ) -> None:
+        """将目录的增量修改写入共享存储，写入量只与修改数量有关
+
+        累积的修改超过 CATALOG_COMPACT_CHANGES 或存储中没有快照时改为写入完整快照，
+        完整快照的开销分摊到多次修改上。
+        """
+        if self.store is None or not self.store.shared:
+            return
+        pending = await asyncio.to_thread(
+            self.store.put_catalog_changes,
+            session_id,
+            catalog.version,
+            upserts,
+            removals,
+        )
+        if pending is None or pending > CATALOG_COMPACT_CHANGES:
+            await self._persist_catalog(session_id, catalog)
 
-            except Exception as e:
-                logger.error(f"预加载音乐文件失败: {str(e)}")
-                # 确保即使失败也有一个空的缓存
-                self._session_music_cache[session_id] = []
-                raise
+    async def add_music_files(
+        self, session_id: str, music_files: List[Dict[str, Any]]
+    ) -> int:
+        """把新写入 bucket 的音乐文件加入会话目录，不重新列举 bucket
+
+        已存在的同名文件会被替换，旧目录版本的分页缓存与资源缓存随之失效，
+        修改以增量形式写入共享存储。
+
+        Args:
+            session_id: 会话ID
+            music_files: 带有 Bucket 字段的对象信息，非音乐文件会被忽略
+
+        Returns:
+            加入目录的音乐文件数量，会话目录未加载时返回0
+        """
+        added, _ = await self.apply_changes(session_id, music_files, [])
+        return added
+
+    async def apply_changes(
+        self,
+        session_id: str,
+        upserts: List[Dict[str, Any]],
+        removals: List[Tuple[str, str]],
+    ) -> Tuple[int, int]:
+        """增量修改会话目录，耗时与写入共享存储的数据量只与修改的文件数量有关
+
+        Args:
+            session_id: 会话ID
+            upserts: 新增或替换的对象信息，带有 Bucket 字段，非音乐文件会被忽略
+            removals: 需要移除的 (bucket, key)
+
+        Returns:
+            (加入的音乐文件数量, 移除的音乐文件数量)，会话目录未加载时均为0
+        """
+        catalog = self.get_catalog(session_id)
+        if catalog is None:
+            return 0, 0
+
+        inserted = [obj for obj in upserts if self._is_valid_music_object(obj)]
+        for obj in inserted:
+            catalog.insert(obj)
+        removed_keys = [
+            (bucket, key)
+            for bucket, key in removals
+            if catalog.remove(bucket, key) is not None
+        ]
+        added, removed = len(inserted), len(removed_keys)
+        if not added and not removed:
+            return 0, 0
+
+        # 旧版本的分页缓存已在目录修改时失效
+        self._resource_memo.pop(session_id, None)
+        self._enforce_memory_budget(keep=session_id)
+        await self._persist_changes(session_id, catalog, inserted, removed_keys)
+        logger.info(
+            f"会话 {session_id} 的目录增量加入 {added} 个、移除 {removed} 个音乐文件 "
+            f"(目录版本 {catalog.version})"
+        )
+        return added, removed
+
+    async def ensure_catalog(self, session_id: str) -> Optional[MusicCatalog]:
+        """获取会话的目录快照，本进程缺失或落后于共享存储时从存储中加载
+
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            音乐目录快照，会话不存在时返回None
+        """
+        catalog = self.get_catalog(session_id)
+        if self.store is not None and self.store.shared:
+            catalog = await self._load_shared_catalog(session_id, catalog)
+
+        if catalog is None and session_id in self._evicted_sessions:
+            # 因内存预算被淘汰的目录，按会话配置重新加载
+            from ...session import session_manager
+
+            session_config = await session_manager.get_session(session_id)
+            if session_config is None:
+                self._evicted_sessions.discard(session_id)
+                return None
+            logger.info(f"重新加载被淘汰的会话 {session_id} 的音乐目录")
+            await self.preload_music_files(session_id, session_config)
+            catalog = self.get_catalog(session_id)
+        return catalog
+
+    async def _load_shared_catalog(
+        self, session_id: str, catalog: Optional[MusicCatalog]
+    ) -> Optional[MusicCatalog]:
+        """本进程的目录快照缺失或版本落后时从共享存储中加载"""
+        version = await asyncio.to_thread(self.store.get_catalog_version, session_id)
+        if version is None or (catalog is not None and catalog.version == version):
+            return catalog
+
+        stored = await asyncio.to_thread(self.store.get_catalog, session_id)
+        if stored is None:
+            return catalog
+
+        version, music_files = stored
+        catalog = MusicCatalog(music_files, version=version)
+        self._set_catalog(session_id, catalog)
+        logger.info(
+            f"从共享存储加载会话 {session_id} 的 {len(catalog)} 个音乐文件 (目录版本 {version})"
+        )
+        return catalog
 
     def _is_music_file(self, filename: str) -> bool:
         """判断文件是否为音乐文件
@@ -227,45 +480,129 @@ class MusicCache:
         ext = filename.lower().split(".")[-1]
         return MIME_TYPE_MAP.get(ext, "audio/mpeg")
 
+    def _to_resource(self, obj: Dict[str, Any]) -> types.Resource:
+        """将音乐文件对象转换为Resource格式"""
+        object_key = obj["Key"]
+        bucket_name = obj["Bucket"]
+        return types.Resource(
+            uri=f"s3://{bucket_name}/{object_key}",
+            name=object_key,
+            mimeType=self._get_music_mime_type(object_key),
+            description=f"音乐文件: {object_key} (大小: {obj.get('Size', 0)} 字节)",
+        )
+
+    def get_catalog(self, session_id: str) -> Optional[MusicCatalog]:
+        """获取指定会话的音乐目录快照
+
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            音乐目录快照，会话未缓存时返回None
+        """
+        catalog = self._session_music_cache.get(session_id)
+        if catalog is not None:
+            self._session_music_cache.move_to_end(session_id)
+        return catalog
+
+    def _get_resources(
+        self, session_id: str, catalog: MusicCatalog, music_files: List[Dict[str, Any]]
+    ) -> List[types.Resource]:
+        """将音乐文件转换为Resource，按目录版本懒构建并复用"""
+        memo_version, memo = self._resource_memo.get(session_id, (None, None))
+        if memo is None or memo_version != catalog.version:
+            memo = {}
+            self._resource_memo[session_id] = (catalog.version, memo)
+
+        resources = []
+        for obj in music_files:
+            memo_key = (obj["Key"], obj["Bucket"])
+            resource = memo.get(memo_key)
+            if resource is None:
+                resource = memo[memo_key] = self._to_resource(obj)
+            resources.append(resource)
+        return resources
+
     def get_music_files(
-        self, session_id: str, offset: int = 0, limit: int = DEFAULT_PAGE_SIZE
+        self,
+        session_id: str,
+        offset: int = 0,
+        limit: int = DEFAULT_PAGE_SIZE,
+        prefix: str = "",
     ) -> List[types.Resource]:
-        """获取指定会话的音乐文件列表，支持分页
+        """获取指定会话的音乐文件列表，支持前缀过滤与分页
+
+        前缀过滤通过排序索引完成，先过滤再分页，保证每页数量稳定。
 
         Args:
             session_id: 会话ID
-            offset: 偏移量，从0开始
+            offset: 过滤后结果的偏移量，从0开始
             limit: 返回的最大文件数量，默认为DEFAULT_PAGE_SIZE
+            prefix: 只返回Key以此前缀开头的文件
 
         Returns:
             音乐文件资源列表
         """
-        music_files = self._session_music_cache.get(session_id, [])
+        catalog = self.get_catalog(session_id)
+        if catalog is None:
+            return []
 
-        # 分页处理
-        start_idx = offset
-        end_idx = min(offset + limit, len(music_files))
-        paginated_files = music_files[start_idx:end_idx]
-
-        # 转换为Resource格式
-        resources = []
-        for obj in paginated_files:
-            object_key = obj["Key"]
-            bucket_name = obj["Bucket"]
-            mime_type = self._get_music_mime_type(object_key)
-            resource = types.Resource(
-                uri=f"s3://{bucket_name}/{object_key}",
-                name=object_key,
-                mimeType=mime_type,
-                description=f"音乐文件: {object_key} (大小: {obj.get('Size', 0)} 字节)",
-            )
-            resources.append(resource)
+        page, _ = catalog.page(limit, prefix=prefix, offset=offset)
+        resources = self._get_resources(session_id, catalog, page)
 
         logger.debug(
-            f"返回会话 {session_id} 的音乐文件: {len(resources)} 个 (总共 {len(music_files)} 个)"
+            f"返回会话 {session_id} 的音乐文件: {len(resources)} 个 (总共 {len(catalog)} 个)"
         )
         return resources
 
+    def get_music_files_page(
+        self,
+        session_id: str,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        prefix: str = "",
+    ) -> Tuple[List[types.Resource], Optional[str]]:
+        """基于游标获取指定会话的一页音乐文件
+
+        Args:
+            session_id: 会话ID
+            cursor: 上一页返回的游标，为空时从头开始
+            limit: 返回的最大文件数量，默认为DEFAULT_PAGE_SIZE
+            prefix: 只返回Key以此前缀开头的文件
+
+        Returns:
+            (音乐文件资源列表, 下一页游标)
+
+        Raises:
+            ValueError: 游标格式无效
+        """
+        catalog = self.get_catalog(session_id)
+        if catalog is None:
+            return [], None
+
+        # 相同目录版本下的相同请求直接复用已构建的分页
+        cache_params = ("list_resources", cursor, limit, prefix)
+        cached = self.page_cache.get(catalog.version, cache_params)
+        if cached is not None:
+            return cached
+
+        page, next_cursor = catalog.page(limit, prefix=prefix, cursor=cursor)
+        resources = self._get_resources(session_id, catalog, page)
+
+        # 按分页编码为响应后的 UTF-8 字节数计入缓存预算
+        size = sum(
+            len(r.model_dump_json(by_alias=True, exclude_none=True).encode())
+            for r in resources
+        )
+        self.page_cache.put(
+            catalog.version, cache_params, (resources, next_cursor), size
+        )
+
+        logger.debug(
+            f"返回会话 {session_id} 的音乐文件: {len(resources)} 个 (总共 {len(catalog)} 个)"
+        )
+        return resources, next_cursor
+
     def find_music_by_key(self, session_id: str, key: str) -> List[Dict[str, Any]]:
         """根据文件key查找音乐文件，可能在多个bucket中存在
 
@@ -276,12 +613,8 @@ class MusicCache:
         Returns:
             匹配的音乐文件信息列表
         """
-        music_files = self._session_music_cache.get(session_id, [])
-        matches = []
-
-        for obj in music_files:
-            if obj["Key"] == key:
-                matches.append(obj)
+        catalog = self.get_catalog(session_id)
+        matches = catalog.find_by_key(key) if catalog is not None else []
 
         logger.debug(
             f"在会话 {session_id} 中找到 {len(matches)} 个匹配的音乐文件: {key}"
@@ -297,7 +630,8 @@ class MusicCache:
         Returns:
             音乐文件总数
         """
-        return len(self._session_music_cache.get(session_id, []))
+        catalog = self.get_catalog(session_id)
+        return len(catalog) if catalog is not None else 0
 
     def clear_session_cache(self, session_id: str) -> bool:
         """清除指定会话的缓存
@@ -308,8 +642,12 @@ class MusicCache:
         Returns:
             是否成功清除缓存
         """
+        self._resource_memo.pop(session_id, None)
+        self._evicted_sessions.discard(session_id)
+        self.playlists.clear(session_id)
         if session_id in self._session_music_cache:
-            del self._session_music_cache[session_id]
+            catalog = self._session_music_cache.pop(session_id)
+            self.page_cache.invalidate(catalog.version)
             logger.info(f"清除会话 {session_id} 的音乐文件缓存")
             return True
         return False
@@ -0,0 +1,309 @@
+"""对象事件模块
+
+推送的对象事件告知 bucket 中对象的新增与删除，
+收到事件后直接修改受影响会话的目录，不需要定期重新列举 bucket：
+- 事件请求使用租户的 AK/SK 签名，只修改使用该凭证的会话的目录
+- 签名包含时间戳与一次性随机数，过期或重复的请求被拒绝，截获的请求无法重放；
+  使用共享存储时随机数记录在存储中，重放到其他 worker 同样被拒绝
+- 同一请求中同一对象的多个事件只有最后一个生效，修改的耗时只与事件数量有关
+- 删除的对象同时丢弃其热度统计与缓存的播放URL
+
+支持的请求体：
+- 七牛云事件通知格式：{"eventName": "put", "bucket": ..., "key": ..., "fsize": ..., "hash": ...}，
+  或由这样的事件组成的数组
+- 通用格式：{"events": [{"event": "put" | "delete", "bucket": ..., "key": ...,
+  "size": ..., "etag": ..., "last_modified": ...}]}
+
+请求需携带 TIMESTAMP_HEADER（Unix 时间戳，秒）、NONCE_HEADER（一次性随机数）与
+Authorization 头：QBox <AK>:<urlsafe_base64(hmac_sha1(SK, 路径 + "\\n" + 时间戳 + "\\n" + 随机数 + "\\n" + 请求体))>。
+
+七牛云事件通知自带的回调签名只覆盖路径（JSON 请求体不参与签名），也不包含时间戳，
+无法防止篡改与重放，因此七牛云不能直接推送到该端点，
+需要由接收通知的转发服务按上述方式重新签名后推送。
+"""
+
+import base64
+import hashlib
+import hmac
+import logging
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from .hot_tracks import hot_tracks
+from .storage import StorageService
+from ...consts import consts
+from ...metrics import metrics
+from ...session import SessionConfig, SessionManager
+
+logger = logging.getLogger(consts.LOGGER_NAME)
+
+# 单次请求的事件数量上限
+MAX_EVENTS = 1000
+
+# 参与签名的时间戳与一次性随机数请求头
+TIMESTAMP_HEADER = "X-Event-Timestamp"
+NONCE_HEADER = "X-Event-Nonce"
+# 签名时间与服务端时间允许的最大偏差（秒），超出的请求被拒绝
+MAX_CLOCK_SKEW = 300
+MAX_NONCE_LENGTH = 64
+# 记住的随机数数量上限，超出时丢弃最早的随机数
+MAX_NONCES = 100_000
+
+# 七牛云事件名称中表示对象被写入与被删除的事件
+PUT_EVENTS = frozenset({"put", "mkfile", "copy", "append", "fetch"})
+DELETE_EVENTS = frozenset({"delete"})
+
+
+@dataclass(frozen=True)
+class ObjectEvent:
+    """bucket 中一个对象的新增或删除"""
+
+    kind: str  # "put" 或 "delete"
+    bucket: str
+    key: str
+    size: int = 0
+    etag: str = ""
+    last_modified: Optional[datetime] = None
+
+    def to_catalog_object(self) -> Dict[str, Any]:
+        """转换为与 ListObjectsV2 结果一致的目录对象"""
+        return {
+            "Key": self.key,
+            "Size": self.size,
+            "ETag": f'"{self.etag}"',
+            "LastModified": self.last_modified or datetime.now(timezone.utc),
+            "Bucket": self.bucket,
+        }
+
+
+def sign_request(
+    secret_key: str, path: str, timestamp: str, nonce: str, body: bytes
+) -> str:
+    """计算事件请求的签名"""
+    data = f"{path}\n{timestamp}\n{nonce}\n".encode("utf-8") + body
+    digest = hmac.new(secret_key.encode("utf-8"), data, hashlib.sha1).digest()
+    return base64.urlsafe_b64encode(digest).decode("ascii")
+
+
+def signed_headers(
+    access_key: str,
+    secret_key: str,
+    path: str,
+    body: bytes,
+    now: Optional[float] = None,
+) -> Dict[str, str]:
+    """生成事件请求的签名请求头，每次调用使用新的随机数"""
+    timestamp = str(int(time.time() if now is None else now))
+    nonce = secrets.token_urlsafe(16)
+    signature = sign_request(secret_key, path, timestamp, nonce, body)
+    return {
+        "Authorization": f"QBox {access_key}:{signature}",
+        TIMESTAMP_HEADER: timestamp,
+        NONCE_HEADER: nonce,
+    }
+
+
+def parse_authorization(header: Optional[str]) -> Optional[Tuple[str, str]]:
+    """解析 Authorization 头
+
+    Returns:
+        (access_key, 签名)，格式不正确时返回 None
+    """
+    scheme, _, credentials = (header or "").partition(" ")
+    access_key, _, signature = credentials.strip().partition(":")
+    if scheme != "QBox" or not access_key or not signature:
+        return None
+    return access_key, signature
+
+
+def is_fresh(timestamp: Optional[str], now: Optional[float] = None) -> bool:
+    """签名时间戳是否在允许的时间偏差之内"""
+    if not timestamp or not timestamp.isdigit():
+        return False
+    now = time.time() if now is None else now
+    return abs(now - int(timestamp)) <= MAX_CLOCK_SKEW
+
+
+class NonceCache:
+    """记住时间窗口内见过的随机数，拒绝重复的请求
+
+    随机数在本进程中记住，过期的随机数由时间戳校验拒绝，不再需要保留。
+    多个 worker 进程之间需要另外通过共享存储的 add_nonce 记住随机数。
+    """
+
+    def __init__(self, ttl: float = 2 * MAX_CLOCK_SKEW, max_size: int = MAX_NONCES):
+        self.ttl = ttl
+        self.max_size = max_size
+        # (access key, 随机数) -> 过期时间，按加入顺序排列
+        self._nonces: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._nonces)
+
+    def add(self, access_key: str, nonce: str, now: Optional[float] = None) -> bool:
+        """记住随机数
+
+        Returns:
+            随机数在有效期内没有出现过时返回 True，重复时返回 False
+        """
+        now = time.monotonic() if now is None else now
+        while self._nonces:
+            oldest, expires = next(iter(self._nonces.items()))
+            if expires > now and len(self._nonces) < self.max_size:
+                break
+            del self._nonces[oldest]
+        if (access_key, nonce) in self._nonces:
+            return False
+        self._nonces[(access_key, nonce)] = now + self.ttl
+        return True
+
+
+def _timestamp(value: Any) -> Optional[datetime]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value, timezone.utc)
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return None
+
+
+def _parse_event(item: Dict[str, Any]) -> Optional[ObjectEvent]:
+    """解析单个事件，不关心的事件类型返回 None
+
+    Raises:
+        ValueError: 事件缺少 bucket 或 key
+    """
+    name = item.get("eventName", item.get("event"))
+    if name in PUT_EVENTS:
+        kind = "put"
+    elif name in DELETE_EVENTS:
+        kind = "delete"
+    else:
+        return None
+
+    bucket, key = item.get("bucket"), item.get("key")
+    if not isinstance(bucket, str) or not isinstance(key, str) or not key:
+        raise ValueError(f"事件缺少 bucket 或 key: {item!r}")
+
+    if "putTime" in item:
+        # 七牛云的 putTime 以 100 纳秒为单位
+        last_modified = _timestamp(item["putTime"] / 10_000_000)
+    else:
+        last_modified = _timestamp(item.get("last_modified"))
+    return ObjectEvent(
+        kind=kind,
+        bucket=bucket,
+        key=key,
+        size=int(item.get("fsize", item.get("size", 0))),
+        etag=str(item.get("hash", item.get("etag", ""))).strip('"'),
+        last_modified=last_modified,
+    )
+
+
+def parse_events(document: Any) -> Tuple[List[ObjectEvent], int]:
+    """解析事件请求体
+
+    Returns:
+        (需要处理的事件, 忽略的事件数量)
+
+    Raises:
+        ValueError: 请求体格式不正确或事件过多
+    """
+    if isinstance(document, dict):
+        items = document["events"] if "events" in document else [document]
+    else:
+        items = document
+    if not isinstance(items, list) or not all(isinstance(i, dict) for i in items):
+        raise ValueError("事件必须是对象或对象数组")
+    if len(items) > MAX_EVENTS:
+        raise ValueError(f"单次最多推送{MAX_EVENTS}个事件")
+
+    events = []
+    for item in items:
+        event = _parse_event(item)
+        if event is not None:
+            events.append(event)
+    return events, len(items) - len(events)
+
+
+async def authenticated_sessions(
+    session_manager: SessionManager,
+    access_key: str,
+    signature: str,
+    path: str,
+    timestamp: str,
+    nonce: str,
+    body: bytes,
+) -> List[Tuple[str, SessionConfig]]:
+    """签名可以由会话的凭证验证通过的全部会话，只查找使用该 access key 的会话"""
+    expected: Dict[str, str] = {}
+    sessions = []
+    for session_id, session_config in await session_manager.find_sessions(access_key):
+        secret_key = session_config.secret_key
+        if secret_key not in expected:
+            expected[secret_key] = sign_request(
+                secret_key, path, timestamp, nonce, body
+            )
+        if hmac.compare_digest(expected[secret_key], signature):
+            sessions.append((session_id, session_config))
+    return sessions
+
+
+async def apply_events(
+    session_manager: SessionManager,
+    sessions: List[Tuple[str, SessionConfig]],
+    events: List[ObjectEvent],
+) -> Dict[str, int]:
+    """把事件应用到会话目录
+
+    Args:
+        session_manager: 会话管理器
+        sessions: 受影响的 (会话ID, 会话配置)
+        events: 按发生顺序排列的事件
+
+    Returns:
+        修改的会话数、加入与移除的音乐文件数
+    """
+    # 同一对象只保留最后一个事件
+    latest: Dict[Tuple[str, str], ObjectEvent] = {}
+    for event in events:
+        latest.pop((event.bucket, event.key), None)
+        latest[(event.bucket, event.key)] = event
+        metrics.OBJECT_EVENTS.inc(event=event.kind)
+
+    by_bucket: Dict[str, List[ObjectEvent]] = {}
+    for event in latest.values():
+        by_bucket.setdefault(event.bucket, []).append(event)
+
+    music_cache = session_manager.get_music_cache()
+    summary = {"sessions": 0, "added": 0, "removed": 0}
+    credentials = set()
+    for session_id, session_config in sessions:
+        buckets = session_config.buckets or list(by_bucket)
+        relevant = [e for bucket in buckets for e in by_bucket.get(bucket, [])]
+        if not relevant:
+            continue
+        credentials.add(
+            StorageService.from_session_config(session_config).credential_key
+        )
+        if await music_cache.ensure_catalog(session_id) is None:
+            continue
+
+        added, removed = await music_cache.apply_changes(
+            session_id,
+            [e.to_catalog_object() for e in relevant if e.kind == "put"],
+            [(e.bucket, e.key) for e in relevant if e.kind == "delete"],
+        )
+        if added or removed:
+            summary["sessions"] += 1
+            summary["added"] += added
+            summary["removed"] += removed
+
+    for credential in credentials:
+        for event in latest.values():
+            if event.kind == "delete":
+                hot_tracks.forget(credential, event.bucket, event.key)
+    return summary
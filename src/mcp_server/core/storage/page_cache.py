@@ -0,0 +1,121 @@
+"""分页响应缓存模块
+
+按目录版本缓存已经构建好的分页结果（如 Resource 列表与下一页游标），
+命中时不必重新分页与构建资源对象。使用LRU淘汰，总大小按调用方给出的
+分页编码后的字节数限制，不是缓存对象实际占用的内存。
+缓存键包含目录版本，目录刷新后旧版本的条目整体失效。
+"""
+
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+from ...consts import consts
+
+logger = logging.getLogger(consts.LOGGER_NAME)
+
+# 默认缓存容量上限（字节）
+DEFAULT_PAGE_CACHE_BYTES = 32 * 1024 * 1024
+
+# 缓存键: (目录版本, 请求类型与参数)
+PageKey = Tuple[int, Hashable]
+
+
+class PageCache:
+    """按目录版本划分、带内存上限的LRU分页缓存"""
+
+    def __init__(self, max_bytes: int = DEFAULT_PAGE_CACHE_BYTES) -> None:
+        """初始化分页缓存
+
+        Args:
+            max_bytes: 缓存内容的总字节数上限
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[PageKey, Tuple[Any, int]]" = OrderedDict()
+        self._version_keys: Dict[int, Set[PageKey]] = {}
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, version: int, params: Hashable) -> Optional[Any]:
+        """获取缓存的分页结果
+
+        Args:
+            version: 目录版本
+            params: 请求类型与参数
+
+        Returns:
+            缓存的分页结果，未命中时返回None
+        """
+        key = (version, params)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, version: int, params: Hashable, value: Any, size: int) -> None:
+        """写入分页结果
+
+        Args:
+            version: 目录版本
+            params: 请求类型与参数
+            value: 分页结果
+            size: 分页编码为响应后的字节数
+        """
+        if size > self.max_bytes:
+            return
+
+        key = (version, params)
+        self._discard(key)
+        self._entries[key] = (value, size)
+        self._version_keys.setdefault(version, set()).add(key)
+        self.current_bytes += size
+
+        while self.current_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self.evictions += 1
+
+    def _discard(self, key: PageKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        self.current_bytes -= entry[1]
+        version_keys = self._version_keys.get(key[0])
+        if version_keys is not None:
+            version_keys.discard(key)
+            if not version_keys:
+                del self._version_keys[key[0]]
+
+    def invalidate(self, version: int) -> int:
+        """移除指定目录版本的全部缓存
+
+        Args:
+            version: 目录版本
+
+        Returns:
+            被移除的条目数量
+        """
+        keys = self._version_keys.pop(version, set())
+        for key in keys:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.current_bytes -= entry[1]
+        if keys:
+            logger.debug(f"移除目录版本 {version} 的 {len(keys)} 个分页缓存")
+        return len(keys)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._entries.clear()
+        self._version_keys.clear()
+        self.current_bytes = 0
@@ -0,0 +1,331 @@
+"""播放列表模块
+
+播放列表以 JSON 对象保存在租户自己的 bucket 中（PLAYLIST_PREFIX 目录下），
+随目录一起加载到内存：
+- 获取播放列表优先访问内存，内存中没有时从 bucket 读取，
+  其他会话或其他进程创建的播放列表同样可见；列出播放列表时重新列举 bucket，
+  只读取内存中没有的播放列表
+- 修改时先从 bucket 重新读取最新内容，在此基础上修改后整体写回，
+  同一会话的修改按顺序执行。七牛云不支持条件写入，不同进程在读取与写回之间
+  同时修改同一播放列表时，后写回的修改生效
+- 播放列表对象在内存中不会被原地修改，修改总是生成新的对象
+"""
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, List, Optional
+
+from .storage import StorageService, client_error_code
+from ...consts import consts
+from ...tools.scheduler import scheduler
+
+logger = logging.getLogger(consts.LOGGER_NAME)
+
+# 播放列表对象的 key 为 PLAYLIST_PREFIX + 名称 + PLAYLIST_SUFFIX
+PLAYLIST_PREFIX = ".playlists/"
+PLAYLIST_SUFFIX = ".json"
+
+MAX_PLAYLIST_NAME_LENGTH = 100
+MAX_PLAYLIST_TRACKS = 1000
+# 每个 bucket 加载的播放列表数量上限
+MAX_PLAYLISTS_PER_BUCKET = 500
+# 加载播放列表时同时读取的对象数量
+MAX_CONCURRENT_LOADS = 8
+
+
+def playlist_key(name: str) -> str:
+    """播放列表在 bucket 中的对象 key"""
+    return f"{PLAYLIST_PREFIX}{name}{PLAYLIST_SUFFIX}"
+
+
+def playlist_name(key: str) -> Optional[str]:
+    """由对象 key 得到播放列表名称，不是播放列表对象时返回 None"""
+    if not key.startswith(PLAYLIST_PREFIX) or not key.endswith(PLAYLIST_SUFFIX):
+        return None
+    return key[len(PLAYLIST_PREFIX) : -len(PLAYLIST_SUFFIX)] or None
+
+
+def validate_playlist_name(name: str) -> None:
+    """校验播放列表名称
+
+    Raises:
+        ValueError: 名称为空、过长或包含路径分隔符与控制字符
+    """
+    if not name or len(name) > MAX_PLAYLIST_NAME_LENGTH:
+        raise ValueError(f"播放列表名称长度需在1到{MAX_PLAYLIST_NAME_LENGTH}个字符之间")
+    if "/" in name or "\\" in name or any(ord(c) < 0x20 for c in name):
+        raise ValueError(f"播放列表名称不能包含路径分隔符或控制字符: {name!r}")
+
+
+@dataclass(frozen=True)
+class Playlist:
+    """播放列表，曲目为 {"bucket": ..., "key": ...} 列表"""
+
+    name: str
+    bucket: str
+    tracks: List[Dict[str, str]] = field(default_factory=list)
+    updated_at: float = 0.0
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {"name": self.name, "tracks": self.tracks, "updated_at": self.updated_at},
+            ensure_ascii=False,
+        )
+
+    @classmethod
+    def from_json(cls, bucket: str, data: bytes) -> "Playlist":
+        document = json.loads(data)
+        return cls(
+            name=document["name"],
+            bucket=bucket,
+            tracks=[
+                {"bucket": track["bucket"], "key": track["key"]}
+                for track in document.get("tracks", [])
+            ],
+            updated_at=document.get("updated_at", 0.0),
+        )
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "name": self.name,
+            "bucket": self.bucket,
+            "track_count": len(self.tracks),
+            "updated_at": self.updated_at,
+        }
+
+
+class PlaylistStore:
+    """按会话在内存中保存播放列表"""
+
+    def __init__(self) -> None:
+        # session_id -> 播放列表名称 -> 播放列表
+        self._playlists: Dict[str, Dict[str, Playlist]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _lock(self, session_id: str) -> asyncio.Lock:
+        return self._locks.setdefault(session_id, asyncio.Lock())
+
+    async def load(
+        self, session_id: str, storage: StorageService, buckets: List[str]
+    ) -> int:
+        """从 bucket 中加载会话的全部播放列表，替换内存中的播放列表
+
+        Args:
+            session_id: 会话ID
+            storage: 存储服务实例
+            buckets: 需要加载的 bucket 名称
+
+        Returns:
+            加载的播放列表数量
+        """
+        playlists = await self._load_new(storage, buckets, {})
+        self._playlists[session_id] = playlists
+        if playlists:
+            logger.info(f"为会话 {session_id} 加载了 {len(playlists)} 个播放列表")
+        return len(playlists)
+
+    async def _load_new(
+        self, storage: StorageService, buckets: List[str], known: Dict[str, Playlist]
+    ) -> Dict[str, Playlist]:
+        """列举 bucket 中的播放列表，只读取 known 中没有的播放列表
+
+        Returns:
+            bucket 中现有的全部播放列表，不同 bucket 中的同名播放列表以先配置的 bucket 为准；
+            列举失败的 bucket 保留 known 中属于它的播放列表
+        """
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_LOADS)
+
+        async def load_object(bucket: str, key: str) -> Optional[Playlist]:
+            async with semaphore:
+                try:
+                    return await self._fetch(storage, bucket, key)
+                except Exception as e:
+                    logger.warning(f"加载播放列表 {bucket}/{key} 失败: {e}")
+                    return None
+
+        async def load_bucket(bucket: str) -> List[Optional[Playlist]]:
+            objects = await storage.list_objects(
+                bucket, prefix=PLAYLIST_PREFIX, max_keys=MAX_PLAYLISTS_PER_BUCKET
+            )
+            kept, loads = [], []
+            for obj in objects:
+                name = playlist_name(obj["Key"])
+                if name is None:
+                    continue
+                playlist = known.get(name)
+                if playlist is not None and playlist.bucket == bucket:
+                    kept.append(playlist)
+                else:
+                    loads.append(load_object(bucket, obj["Key"]))
+            return kept + list(await asyncio.gather(*loads))
+
+        playlists: Dict[str, Playlist] = {}
+        results = await asyncio.gather(
+            *(load_bucket(bucket) for bucket in buckets), return_exceptions=True
+        )
+        for bucket, result in zip(buckets, results):
+            if isinstance(result, Exception):
+                logger.warning(f"加载 bucket {bucket} 的播放列表失败: {result}")
+                result = [p for p in known.values() if p.bucket == bucket]
+            for playlist in result:
+                # 不同 bucket 中的同名播放列表以先配置的 bucket 为准
+                if playlist is not None and playlist.name not in playlists:
+                    playlists[playlist.name] = playlist
+        return playlists
+
+    async def _ensure_loaded(
+        self, session_id: str, storage: StorageService
+    ) -> Dict[str, Playlist]:
+        playlists = self._playlists.get(session_id)
+        if playlists is None:
+            # 目录从共享存储加载的进程没有加载过播放列表
+            await self.load(session_id, storage, list(storage.config.buckets))
+            playlists = self._playlists[session_id]
+        return playlists
+
+    async def _fetch(
+        self, storage: StorageService, bucket: str, key: str
+    ) -> Optional[Playlist]:
+        """读取 bucket 中的播放列表对象，不存在时返回 None"""
+        try:
+            response = await storage.get_object(bucket, key)
+        except Exception as e:
+            if client_error_code(e) in ("NoSuchKey", "404"):
+                return None
+            raise
+        if not response:
+            return None
+        return Playlist.from_json(bucket, response["Body"])
+
+    async def _lookup(
+        self, playlists: Dict[str, Playlist], storage: StorageService, name: str
+    ) -> Optional[Playlist]:
+        """查找播放列表，内存中没有时按配置顺序从各 bucket 读取"""
+        playlist = playlists.get(name)
+        if playlist is not None:
+            return playlist
+        for bucket in storage.config.buckets:
+            playlist = await self._fetch(storage, bucket, playlist_key(name))
+            if playlist is not None:
+                playlists[name] = playlist
+                return playlist
+        return None
+
+    async def list_playlists(
+        self, session_id: str, storage: StorageService
+    ) -> List[Playlist]:
+        """获取会话的全部播放列表，按名称排序
+
+        重新列举 bucket，其他会话或进程创建与删除的播放列表随之更新，
+        内存中已有的播放列表不重新读取。
+        """
+        async with self._lock(session_id):
+            playlists = self._playlists.get(session_id)
+            if playlists is None:
+                playlists = await self._ensure_loaded(session_id, storage)
+            else:
+                playlists = await self._load_new(
+                    storage, list(storage.config.buckets), playlists
+                )
+                self._playlists[session_id] = playlists
+        return [playlists[name] for name in sorted(playlists)]
+
+    async def get(
+        self, session_id: str, storage: StorageService, name: str
+    ) -> Optional[Playlist]:
+        """获取播放列表，不存在时返回 None"""
+        async with self._lock(session_id):
+            playlists = await self._ensure_loaded(session_id, storage)
+            return await self._lookup(playlists, storage, name)
+
+    async def create(
+        self,
+        session_id: str,
+        storage: StorageService,
+        name: str,
+        bucket: str,
+        tracks: List[Dict[str, str]],
+    ) -> Playlist:
+        """创建播放列表
+
+        Raises:
+            ValueError: 名称无效、曲目过多或同名播放列表已存在
+        """
+        validate_playlist_name(name)
+        _check_track_count(len(tracks))
+        async with self._lock(session_id):
+            playlists = await self._ensure_loaded(session_id, storage)
+            if await self._lookup(playlists, storage, name) is not None:
+                raise ValueError(f"播放列表已存在: {name}")
+
+            playlist = Playlist(name, bucket, list(tracks), time.time())
+            # 不覆盖写入，其他进程同时创建同名播放列表时只有一个成功
+            await scheduler.run_sync(
+                storage.put_text_object,
+                bucket,
+                playlist_key(name),
+                playlist.to_json(),
+                overwrite=False,
+            )
+            playlists[name] = playlist
+            return playlist
+
+    async def update(
+        self,
+        session_id: str,
+        storage: StorageService,
+        name: str,
+        change: Callable[[List[Dict[str, str]]], List[Dict[str, str]]],
+    ) -> Playlist:
+        """修改播放列表的曲目并写回 bucket
+
+        修改基于 bucket 中的最新内容，但写回不是原子的：
+        其他进程在读取与写回之间的修改会被覆盖。
+
+        Args:
+            session_id: 会话ID
+            storage: 存储服务实例
+            name: 播放列表名称
+            change: 接收当前曲目列表并返回新曲目列表的函数
+
+        Raises:
+            ValueError: 播放列表不存在、修改后曲目过多或 change 校验失败
+        """
+        async with self._lock(session_id):
+            playlists = await self._ensure_loaded(session_id, storage)
+            playlist = await self._lookup(playlists, storage, name)
+            if playlist is None:
+                raise ValueError(f"未找到播放列表: {name}")
+
+            # 在 bucket 中的最新内容上修改，缩小覆盖其他进程修改的窗口；
+            # 读取与写回之间的并发修改仍会被覆盖
+            latest = await self._fetch(storage, playlist.bucket, playlist_key(name))
+            if latest is None:
+                playlists.pop(name, None)
+                raise ValueError(f"未找到播放列表: {name}")
+
+            tracks = change(list(latest.tracks))
+            _check_track_count(len(tracks))
+            playlist = replace(latest, tracks=tracks, updated_at=time.time())
+            await scheduler.run_sync(
+                storage.put_text_object,
+                playlist.bucket,
+                playlist_key(name),
+                playlist.to_json(),
+                overwrite=True,
+            )
+            playlists[name] = playlist
+            return playlist
+
+    def clear(self, session_id: str) -> None:
+        """清除会话的播放列表"""
+        self._playlists.pop(session_id, None)
+        self._locks.pop(session_id, None)
+
+
+def _check_track_count(count: int) -> None:
+    if count > MAX_PLAYLIST_TRACKS:
+        raise ValueError(f"播放列表最多包含{MAX_PLAYLIST_TRACKS}首曲目")
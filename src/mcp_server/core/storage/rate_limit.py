@@ -0,0 +1,255 @@
+"""存储后端限流模块
+
+按租户与操作类别维护令牌桶，在调用七牛云之前排队等待令牌：
+- 令牌不足时等待而不是立即报错，只有预计等待超过上限时才拒绝
+- 后端返回 429/503/573 等限流响应时按比例降低该租户该类操作的速率，
+  之后每次成功调用逐步恢复（AIMD）
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from ...consts import consts
+from ...metrics import metrics
+
+logger = logging.getLogger(consts.LOGGER_NAME)
+
+# 存储操作到限流类别的映射，同一类别共享令牌桶
+OPERATION_CLASSES: Dict[str, str] = {
+    "list_buckets": "list",
+    "list_objects": "list",
+    "get_object": "read",
+    "bucket_domains": "read",
+    "bucket_info": "read",
+    "upload_text_data": "write",
+    "put_text_object": "write",
+    "upload_local_file": "write",
+    "fetch_object": "write",
+    "stat_object": "read",
+}
+DEFAULT_OPERATION_CLASS = "read"
+
+# 每个租户每类操作的默认速率（次/秒），桶容量为速率的 BURST_FACTOR 倍
+DEFAULT_RATES: Dict[str, float] = {"list": 20.0, "read": 50.0, "write": 10.0}
+BURST_FACTOR = 2.0
+
+# 预计等待超过该时间（秒）时拒绝请求
+DEFAULT_MAX_WAIT = 30.0
+
+# 被限流后速率乘以 THROTTLE_DECREASE，每次成功调用恢复基准速率的 RECOVERY_STEP，
+# 速率不低于基准速率的 MIN_RATE_FACTOR
+THROTTLE_DECREASE = 0.5
+RECOVERY_STEP = 0.05
+MIN_RATE_FACTOR = 0.05
+
+# 七牛云 573 表示单用户请求频率超限
+THROTTLE_STATUS_CODES = frozenset({429, 503, 573})
+THROTTLE_ERROR_CODES = frozenset(
+    {"SlowDown", "Throttling", "ThrottlingException", "TooManyRequests"}
+)
+
+# 令牌桶数量超过该值时清理已经回满的空闲桶
+MAX_IDLE_BUCKETS = 10000
+
+
+class RateLimitExceeded(Exception):
+    """预计等待时间超过上限，请求被拒绝"""
+
+
+class StorageResponseError(Exception):
+    """存储后端返回了错误响应，status_code 为 -1 表示网络错误"""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class StorageThrottledError(StorageResponseError):
+    """存储后端返回了限流响应"""
+
+
+def response_error(message: str, info) -> StorageResponseError:
+    """根据七牛 SDK 的 ResponseInfo 构建异常，限流响应使用 StorageThrottledError"""
+    status_code = getattr(info, "status_code", -1)
+    if status_code in THROTTLE_STATUS_CODES:
+        return StorageThrottledError(f"{message}: {info}", status_code)
+    return StorageResponseError(f"{message}: {info}", status_code)
+
+
+def is_throttled(error: BaseException) -> bool:
+    """判断异常是否由后端限流引起"""
+    if isinstance(error, StorageThrottledError):
+        return True
+    # 按属性识别 botocore 的 ClientError，避免导入 botocore
+    response = getattr(error, "response", None)
+    if isinstance(response, dict):
+        status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        code = response.get("Error", {}).get("Code")
+        return status in THROTTLE_STATUS_CODES or code in THROTTLE_ERROR_CODES
+    return False
+
+
+class TokenBucket:
+    """可预约的令牌桶，令牌可以透支，透支部分即为调用方需要等待的时间"""
+
+    def __init__(self, rate: float, burst: float):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, max_wait: float, now: Optional[float] = None) -> Optional[float]:
+        """预约一个令牌
+
+        Returns:
+            需要等待的秒数；预计等待超过 max_wait 时不预约并返回 None
+        """
+        with self._lock:
+            now = time.monotonic() if now is None else now
+            self._refill(now)
+            wait = max(0.0, (1 - self.tokens) / self.rate)
+            if wait > max_wait:
+                return None
+            self.tokens -= 1
+            return wait
+
+    def throttled(self) -> None:
+        """后端限流，降低速率并清空剩余令牌"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(
+                self.base_rate * MIN_RATE_FACTOR, self.rate * THROTTLE_DECREASE
+            )
+            self.tokens = min(self.tokens, 0.0)
+
+    def succeeded(self) -> None:
+        """调用成功，逐步恢复速率"""
+        if self.rate < self.base_rate:
+            with self._lock:
+                self.rate = min(
+                    self.base_rate, self.rate + self.base_rate * RECOVERY_STEP
+                )
+
+    def idle(self, now: float) -> bool:
+        """令牌已经回满且速率已恢复"""
+        with self._lock:
+            self._refill(now)
+            return self.tokens >= self.burst and self.rate >= self.base_rate
+
+
+class StorageRateLimiter:
+    """按 (租户, 操作类别) 管理令牌桶"""
+
+    def __init__(
+        self,
+        rates: Optional[Dict[str, float]] = None,
+        max_wait: float = DEFAULT_MAX_WAIT,
+    ):
+        """初始化限流器
+
+        Args:
+            rates: 操作类别到速率（次/秒）的映射，未指定的类别使用默认速率
+            max_wait: 单次调用最多等待的秒数，超过时拒绝
+        """
+        self.rates = dict(DEFAULT_RATES)
+        self.rates.update(rates or {})
+        self.max_wait = max_wait
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def configure(
+        self,
+        rates: Optional[Dict[str, float]] = None,
+        max_wait: Optional[float] = None,
+    ) -> None:
+        """调整速率与最长等待时间，已创建的令牌桶会被重建"""
+        if rates:
+            self.rates.update(rates)
+        if max_wait is not None:
+            self.max_wait = max_wait
+        with self._lock:
+            self._buckets.clear()
+
+    def _bucket(self, access_key: str, operation_class: str) -> TokenBucket:
+        key = (access_key, operation_class)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            with self._lock:
+                if len(self._buckets) >= MAX_IDLE_BUCKETS:
+                    now = time.monotonic()
+                    for idle_key in [
+                        k for k, b in self._buckets.items() if b.idle(now)
+                    ]:
+                        del self._buckets[idle_key]
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    rate = self.rates.get(
+                        operation_class, DEFAULT_RATES[DEFAULT_OPERATION_CLASS]
+                    )
+                    bucket = TokenBucket(rate, rate * BURST_FACTOR)
+                    self._buckets[key] = bucket
+        return bucket
+
+    def _reserve(self, access_key: str, operation: str) -> float:
+        operation_class = OPERATION_CLASSES.get(operation, DEFAULT_OPERATION_CLASS)
+        tenant = metrics.tenant_label(access_key)
+        wait = self._bucket(access_key, operation_class).reserve(self.max_wait)
+        if wait is None:
+            metrics.STORAGE_RATE_LIMIT_REJECTIONS.inc(
+                operation_class=operation_class, tenant=tenant
+            )
+            raise RateLimitExceeded(
+                f"Storage rate limit exceeded for {operation_class} operations, "
+                f"retry later"
+            )
+        if wait > 0:
+            metrics.STORAGE_RATE_LIMIT_WAIT.observe(
+                wait, operation_class=operation_class, tenant=tenant
+            )
+        return wait
+
+    def acquire(self, access_key: str, operation: str) -> None:
+        """同步等待令牌，只能在工作线程中调用"""
+        wait = self._reserve(access_key, operation)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, access_key: str, operation: str) -> None:
+        """异步等待令牌"""
+        wait = self._reserve(access_key, operation)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def record(self, access_key: str, operation: str, error: Optional[BaseException]):
+        """根据调用结果调整速率"""
+        operation_class = OPERATION_CLASSES.get(operation, DEFAULT_OPERATION_CLASS)
+        bucket = self._bucket(access_key, operation_class)
+        if error is not None and is_throttled(error):
+            bucket.throttled()
+            metrics.STORAGE_THROTTLED.inc(
+                operation_class=operation_class,
+                tenant=metrics.tenant_label(access_key),
+            )
+            logger.warning(
+                f"Storage backend throttled {operation_class} operations, "
+                f"slowing down to {bucket.rate:.2f}/s"
+            )
+        elif error is None:
+            bucket.succeeded()
+
+    def current_rate(self, access_key: str, operation_class: str) -> float:
+        """租户某类操作当前的速率"""
+        return self._bucket(access_key, operation_class).rate
+
+
+# 全局存储限流器实例
+rate_limiter = StorageRateLimiter()
@@ -0,0 +1,185 @@
+"""远程抓取导入模块
+
+通过七牛云服务端抓取（BucketManager.fetch）把其他来源的音乐文件批量导入 bucket：
+- 抓取在专用的有界线程池中执行，不占用同步工具的线程池；
+  单次导入与所有会话同时进行的抓取数都有上限
+- 不覆盖已有文件时，抓取前先查询目标文件是否已存在
+- 网络错误、限流与服务端错误按指数退避重试，源站不存在等错误不重试
+- 每完成一项回调一次进度
+- 成功导入的文件直接加入会话目录，不需要重新列举 bucket
+"""
+
+import asyncio
+import contextvars
+import logging
+import posixpath
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import unquote, urlparse
+
+from .rate_limit import RateLimitExceeded, StorageResponseError, is_throttled
+from .storage import StorageService
+from ...consts import consts
+
+logger = logging.getLogger(consts.LOGGER_NAME)
+
+# 单次导入的文件数量上限
+MAX_FETCH_ITEMS = 200
+# 单次导入同时进行的抓取数，每个抓取占用一个抓取线程直到七牛云下载完成
+DEFAULT_FETCH_CONCURRENCY = 4
+MAX_FETCH_CONCURRENCY = 8
+# 抓取专用线程池大小，即所有会话同时进行的抓取总数
+FETCH_WORKERS = 16
+DEFAULT_FETCH_RETRIES = 2
+MAX_FETCH_RETRIES = 5
+# 第 n 次重试前等待 RETRY_BASE_DELAY * 2^(n-1) 秒，另加随机抖动
+RETRY_BASE_DELAY = 0.5
+
+FILE_EXISTS_ERROR = "文件已存在"
+
+# 七牛云抓取源站失败（478）通常是源站临时不可用
+RETRYABLE_STATUS_CODES = frozenset({-1, 478})
+
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _fetch_executor() -> ThreadPoolExecutor:
+    """抓取专用线程池，首次使用时创建"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=FETCH_WORKERS, thread_name_prefix="music-mcp-fetch"
+        )
+    return _executor
+
+
+async def _run_in_fetch_pool(func: Callable[..., Any], *args: Any) -> Any:
+    """在抓取专用线程池中执行同步函数，并在线程中延续当前上下文"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _fetch_executor(), lambda: context.run(func, *args)
+    )
+
+
+def shutdown() -> None:
+    """关闭抓取专用线程池"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def key_from_url(url: str, prefix: str = "") -> str:
+    """根据源地址的文件名生成对象 key
+
+    Raises:
+        ValueError: 地址中没有文件名
+    """
+    name = posixpath.basename(unquote(urlparse(url).path))
+    if not name:
+        raise ValueError(f"无法从地址中获取文件名: {url}")
+    return f"{prefix}{name}"
+
+
+def is_retryable(error: BaseException) -> bool:
+    """判断抓取失败是否值得重试"""
+    if isinstance(error, RateLimitExceeded):
+        return False
+    if is_throttled(error):
+        return True
+    if isinstance(error, StorageResponseError):
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    return False
+
+
+def to_catalog_object(bucket: str, ret: Dict[str, Any]) -> Dict[str, Any]:
+    """把抓取结果转换为与 ListObjectsV2 结果一致的目录对象"""
+    return {
+        "Key": ret["key"],
+        "Size": ret.get("fsize", 0),
+        "ETag": f'"{ret.get("hash", "")}"',
+        "LastModified": datetime.now(timezone.utc),
+        "Bucket": bucket,
+    }
+
+
+async def fetch_all(
+    storage: StorageService,
+    bucket: str,
+    items: List[Dict[str, str]],
+    concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+    retries: int = DEFAULT_FETCH_RETRIES,
+    overwrite: bool = False,
+    on_progress: Optional[ProgressCallback] = None,
+) -> List[Dict[str, Any]]:
+    """并发抓取多个远程文件到 bucket
+
+    Args:
+        storage: 存储服务实例
+        bucket: 目标 bucket
+        items: 包含 url 与 key 的抓取项，key 不能重复
+        concurrency: 同时进行的抓取数，不超过 FETCH_WORKERS
+        retries: 每项失败后的最大重试次数
+        overwrite: 是否覆盖已存在的文件，为 False 时抓取前先查询文件是否存在，
+            重试时文件已存在说明上次抓取已经写入，视为成功
+        on_progress: 每完成一项后以 (已完成数量, 总数量) 调用
+
+    Returns:
+        按输入顺序排列的结果，成功时包含 object（抓取到的文件信息），失败时包含 error
+    """
+    semaphore = asyncio.Semaphore(min(concurrency, FETCH_WORKERS))
+    completed = 0
+
+    async def fetch_one(index: int, item: Dict[str, str]) -> Dict[str, Any]:
+        nonlocal completed
+        result: Dict[str, Any] = {
+            "index": index,
+            "url": item["url"],
+            "key": item["key"],
+        }
+        async with semaphore:
+            for attempt in range(retries + 1):
+                try:
+                    # 七牛云抓取总是覆盖同名文件，目录可能落后于 bucket，需要再确认一次
+                    existing = (
+                        await _run_in_fetch_pool(
+                            storage.stat_object, bucket, item["key"]
+                        )
+                        if not overwrite
+                        else None
+                    )
+                    if existing and attempt == 0:
+                        result["error"] = FILE_EXISTS_ERROR
+                        break
+                    if existing:
+                        # 抓取前文件不存在，上次失败的抓取已在服务端完成，只是响应丢失
+                        result["object"] = {**existing, "key": item["key"]}
+                        result.pop("error", None)
+                        break
+                    result["object"] = await _run_in_fetch_pool(
+                        storage.fetch_object, bucket, item["key"], item["url"]
+                    )
+                    result.pop("error", None)
+                    break
+                except Exception as e:
+                    result["error"] = str(e)
+                    if attempt == retries or not is_retryable(e):
+                        logger.warning(f"抓取 {item['url']} 失败: {e}")
+                        break
+                    delay = RETRY_BASE_DELAY * 2**attempt
+                    await asyncio.sleep(delay + random.uniform(0, delay / 2))
+            result["attempts"] = attempt + 1
+
+        completed += 1
+        if on_progress is not None:
+            await on_progress(completed, len(items))
+        return result
+
+    return await asyncio.gather(
+        *(fetch_one(index, item) for index, item in enumerate(items))
+    )
@@ -1,5 +1,6 @@
 import logging
 import base64
+from typing import Optional
 
 from mcp import types
 from urllib.parse import unquote
@@ -9,7 +10,7 @@ from mcp.server.lowlevel.helper_types import ReadResourceContents
 from .storage import StorageService
 from ...consts import consts
 from ...resource import resource
-from ...resource.resource import ResourceContents
+from ...resource.resource import ResourceContents, ResourcePage
 from ...session import get_session_context
 from ...context import current_session_id
 
@@ -45,17 +46,12 @@ class _SessionAwareResourceProvider(resource.ResourceProvider):
             # 获取分页参数
             offset = kwargs.get("offset", 0)
 
-            # 从缓存中获取音乐文件列表
-            music_resources = music_cache.get_music_files(
-                session_id, offset=offset, limit=max_keys
-            )
-
-            for music_resource in music_resources:
-                # 应用前缀过滤
-                if prefix and not music_resource.name.startswith(prefix):
-                    continue
+            await music_cache.ensure_catalog(session_id)
 
-                resources.append(music_resource)
+            # 前缀过滤在排序索引上完成，之后再分页
+            resources = music_cache.get_music_files(
+                session_id, offset=offset, limit=max_keys, prefix=prefix
+            )
 
             logger.debug(f"Listed {len(resources)} music resources from cache")
 
@@ -65,6 +61,36 @@ class _SessionAwareResourceProvider(resource.ResourceProvider):
         logger.info(f"Returning {len(resources)} music resources")
         return resources
 
+    async def list_resources_page(
+        self,
+        cursor: Optional[str] = None,
+        prefix: str = "",
+        max_keys: int = 300,
+        **kwargs,
+    ) -> ResourcePage:
+        """
+        List cached music files as resources with an opaque cursor
+        Args:
+            cursor: Cursor returned by the previous page, None for the first page
+            prefix: Prefix filter for resource names
+            max_keys: Returns the maximum number of keys (default 300)
+        """
+        from ...session import session_manager
+
+        session_id = current_session_id.get()
+        if not session_id:
+            logger.warning("No session_id found in context")
+            return [], None
+
+        music_cache = session_manager.get_music_cache()
+        await music_cache.ensure_catalog(session_id)
+        resources, next_cursor = music_cache.get_music_files_page(
+            session_id, cursor=cursor, limit=max_keys, prefix=prefix
+        )
+
+        logger.info(f"Returning {len(resources)} music resources")
+        return resources, next_cursor
+
     async def read_resource(self, uri: types.AnyUrl, **kwargs) -> ResourceContents:
         """
         Read content from an S3 resource and return structured response
@@ -0,0 +1,109 @@
+"""存储请求合并模块
+
+同一租户同时发起的相同后端请求只执行一次，结果分发给所有等待者：
+- 异步请求在独立任务中执行，单个等待者被取消不会影响其他等待者，
+  只有所有等待者都取消后才取消后端请求
+- 同步请求（七牛 SDK 的 UC 调用）在发起请求的线程中执行，其他线程等待结果
+
+合并的结果对象由所有等待者共享，调用方不能修改。
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+from ...metrics import metrics
+
+T = TypeVar("T")
+
+
+class _AsyncCall:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """按键合并进行中的相同请求"""
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, _AsyncCall] = {}
+        self._sync_calls: Dict[Hashable, Future] = {}
+        self._sync_lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        """正在执行的合并请求数"""
+        return len(self._calls) + len(self._sync_calls)
+
+    async def do(
+        self,
+        key: Hashable,
+        function: Callable[[], Awaitable[T]],
+        operation: str,
+        tenant: str,
+    ) -> T:
+        """执行异步请求，相同键的请求正在进行时等待其结果
+
+        Args:
+            key: 请求键，需包含租户与全部请求参数
+            function: 发起请求的协程函数
+            operation: 操作名称，用于指标
+            tenant: 租户标签，用于指标
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _AsyncCall(asyncio.ensure_future(function()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            metrics.STORAGE_COALESCED.inc(operation=operation, tenant=tenant)
+
+        call.waiters += 1
+        try:
+            # shield 使等待者的取消不会传递到共享的请求任务
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # 所有等待者都已离开，新的请求需要重新发起
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: Hashable, call: _AsyncCall) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def do_sync(
+        self, key: Hashable, function: Callable[[], T], operation: str, tenant: str
+    ) -> T:
+        """执行同步请求，相同键的请求正在其他线程中进行时等待其结果"""
+        with self._sync_lock:
+            future = self._sync_calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._sync_calls[key] = future
+
+        if not leader:
+            metrics.STORAGE_COALESCED.inc(operation=operation, tenant=tenant)
+            return future.result()
+
+        try:
+            result: Any = function()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._sync_lock:
+                del self._sync_calls[key]
+
+
+# 全局请求合并实例
+single_flight = SingleFlight()
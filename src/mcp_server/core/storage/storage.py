@@ -1,21 +1,115 @@
-import aioboto3
+import functools
+import hashlib
+import inspect
 import logging
-import qiniu
+import os
 
 from typing import List, Dict, Any, Optional
-from botocore.config import Config as S3Config
 
 from ...config import config
 from ...consts import consts
+from ...metrics import metrics
 from ...session import SessionConfig
+from ...tracing import tracing
+from .bucket_cache import bucket_cache
+from .domain_probe import domain_prober
+from .rate_limit import rate_limiter, response_error
+from .single_flight import single_flight
 
 logger = logging.getLogger(consts.LOGGER_NAME)
 
+# 表示 bucket 不存在或当前凭证无权访问的错误码
+BUCKET_UNAVAILABLE_CODES = frozenset({"NoSuchBucket", "AccessDenied", "403", "404"})
+
+# 私有云或本地替身环境可通过环境变量指定 UC 服务地址，如 http://127.0.0.1:9000
+UC_HOST_ENV = "QINIU_UC_HOST"
+
+
+def _instrumented(operation: str):
+    """按租户限流，并记录存储后端调用的次数、状态与耗时，作为子 span 追踪
+
+    限流等待不计入存储调用耗时，单独记录为 storage.rate_limit span。
+    """
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(self, *args, **kwargs):
+                access_key = self.config.access_key
+                with tracing.span("storage.rate_limit", operation=operation):
+                    await rate_limiter.acquire_async(access_key, operation)
+                with (
+                    metrics.track_call(
+                        metrics.STORAGE_REQUESTS,
+                        metrics.STORAGE_DURATION,
+                        operation=operation,
+                        tenant=self.tenant,
+                    ),
+                    tracing.span(f"storage.{operation}", operation=operation),
+                ):
+                    try:
+                        result = await func(self, *args, **kwargs)
+                    except Exception as e:
+                        rate_limiter.record(access_key, operation, e)
+                        raise
+                    rate_limiter.record(access_key, operation, None)
+                    return result
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def sync_wrapper(self, *args, **kwargs):
+            access_key = self.config.access_key
+            with tracing.span("storage.rate_limit", operation=operation):
+                rate_limiter.acquire(access_key, operation)
+            with (
+                metrics.track_call(
+                    metrics.STORAGE_REQUESTS,
+                    metrics.STORAGE_DURATION,
+                    operation=operation,
+                    tenant=self.tenant,
+                ),
+                tracing.span(f"storage.{operation}", operation=operation),
+            ):
+                try:
+                    result = func(self, *args, **kwargs)
+                except Exception as e:
+                    rate_limiter.record(access_key, operation, e)
+                    raise
+                rate_limiter.record(access_key, operation, None)
+                return result
+
+        return sync_wrapper
+
+    return decorator
+
+
+def client_error_code(error: BaseException) -> Optional[str]:
+    """botocore ClientError 的错误码，其他异常返回 None"""
+    response = getattr(error, "response", None)
+    if not isinstance(response, dict):
+        return None
+    return response.get("Error", {}).get("Code")
+
 
 class StorageService:
+    """七牛云存储访问服务
+
+    aioboto3、botocore 与七牛 SDK 导入较慢，只在首次用到 S3 或 UC 接口时导入，
+    只读取目录缓存的调用不需要加载它们。
+    """
+
     def __init__(self, cfg: config.Config = None):
+        self.config = cfg
+        self.tenant = metrics.tenant_label(cfg.access_key)
+
+    @functools.cached_property
+    def s3_config(self):
+        from botocore.config import Config as S3Config
+
         # Configure boto3 with retries and timeouts
-        self.s3_config = S3Config(
+        return S3Config(
             retries=dict(max_attempts=2, mode="adaptive"),
             connect_timeout=30,
             read_timeout=60,
@@ -24,10 +118,39 @@ class StorageService:
                 "addressing_style": "path"
             },  # Force path-style addressing for S3 compatibility
         )
-        self.config = cfg
-        self.s3_session = aioboto3.Session()
-        self.auth = qiniu.Auth(cfg.access_key, cfg.secret_key)
-        self.bucket_manager = qiniu.BucketManager(self.auth, preferred_scheme="https")
+
+    @functools.cached_property
+    def s3_session(self):
+        import aioboto3
+
+        return aioboto3.Session()
+
+    @functools.cached_property
+    def auth(self):
+        import qiniu
+
+        return qiniu.Auth(self.config.access_key, self.config.secret_key)
+
+    @functools.cached_property
+    def bucket_manager(self):
+        import qiniu
+
+        return qiniu.BucketManager(
+            self.auth, preferred_scheme=self._configure_uc_host()
+        )
+
+    @staticmethod
+    def _configure_uc_host() -> str:
+        """应用 UC_HOST_ENV 指定的 UC 服务地址，返回访问 UC 使用的协议"""
+        uc_host = os.environ.get(UC_HOST_ENV)
+        if not uc_host:
+            return "https"
+
+        import qiniu
+
+        if qiniu.config.get_default("default_uc_host") != uc_host:
+            qiniu.config.set_default(default_uc_host=uc_host)
+        return uc_host.split("://", 1)[0] if "://" in uc_host else "https"
 
     @classmethod
     def from_session_config(cls, session_config: SessionConfig) -> "StorageService":
@@ -48,11 +171,26 @@ class StorageService:
         )
         return cls(cfg)
 
-    # todo: ssl验证
-    def get_object_url(
-        self, bucket: str, key: str, disable_ssl: bool = True, expires: int = 3600
-    ) -> list[dict[str:Any]]:
-        # 获取下载域名
+    @functools.cached_property
+    def credential_key(self) -> tuple:
+        """凭证与后端地址组成的键，secret key 只保留哈希
+
+        包含 secret key 的哈希，使用错误 secret key 的请求不会共享正确凭证的缓存与结果。
+        """
+        secret_digest = hashlib.sha256(self.config.secret_key.encode("utf-8"))
+        return (
+            self.config.access_key,
+            secret_digest.hexdigest()[:16],
+            self.config.endpoint_url,
+            self.config.region_name,
+        )
+
+    def _request_key(self, operation: str, *args) -> tuple:
+        """合并请求使用的键，包含租户凭证与后端地址"""
+        return (*self.credential_key, operation, *args)
+
+    @_instrumented("bucket_domains")
+    def _bucket_domains(self, bucket: str) -> list[dict[str, Any]]:
         domains_getter = getattr(
             self.bucket_manager, "_BucketManager__uc_do_with_retrier"
         )
@@ -60,17 +198,58 @@ class StorageService:
             "/v3/domains?tbl={0}".format(bucket)
         )
         if domain_response.status_code != 200:
-            raise Exception(
-                f"get bucket domain error：{domain_response.exception} reqId:{domain_response.req_id}"
-            )
+            raise response_error("get bucket domain error", domain_response)
 
         if not domains_list or len(domains_list) == 0:
             raise Exception(
                 f"get bucket domain error：domains_list is empty reqId:{domain_response.req_id}"
             )
+        return domains_list
+
+    @_instrumented("bucket_info")
+    def _bucket_info(self, bucket: str) -> dict[str, Any]:
+        bucket_info, bucket_info_response = self.bucket_manager.bucket_info(bucket)
+        if bucket_info_response.status_code != 200:
+            raise response_error("get bucket info error", bucket_info_response)
+        return bucket_info
+
+    # todo: ssl验证
+    def get_object_url(
+        self, bucket: str, key: str, disable_ssl: bool = True, expires: int = 3600
+    ) -> list[dict[str:Any]]:
+        return self.get_object_urls(bucket, [key], disable_ssl, expires)[key]
+
+    def get_object_urls(
+        self,
+        bucket: str,
+        keys: List[str],
+        disable_ssl: bool = True,
+        expires: int = 3600,
+    ) -> Dict[str, list[dict[str:Any]]]:
+        """批量生成同一 bucket 中多个文件的访问URL
+
+        下载域名与 bucket 信息只查询一次，私有 bucket 的签名在本地完成，
+        生成大量URL时不会随文件数量增加后端请求。
+
+        Args:
+            bucket: bucket名称
+            keys: 文件key列表
+            disable_ssl: 是否使用http
+            expires: 私有 bucket 签名URL的有效期（秒）
+
+        Returns:
+            文件key到URL信息列表的映射
+        """
+        # 获取下载域名，并发的相同查询只请求一次
+        domains_list = single_flight.do_sync(
+            self._request_key("bucket_domains", bucket),
+            lambda: self._bucket_domains(bucket),
+            operation="bucket_domains",
+            tenant=self.tenant,
+        )
 
         http_schema = "https" if not disable_ssl else "http"
-        object_public_urls = []
+        domains = []
         for domain in domains_list:
             # 被冻结
             freeze_types = domain.get("freeze_types")
@@ -81,41 +260,41 @@ class StorageService:
             if domain_url is None:
                 continue
 
-            object_public_urls.append(
-                {
-                    "object_url": f"{http_schema}://{domain_url}/{key}",
-                    "domain_type": "cdn"
+            domains.append(
+                (
+                    domain_url,
+                    "cdn"
                     if domain.get("domaintype") is None or domain.get("domaintype") == 0
                     else "origin",
-                }
-            )
-
-        object_urls = []
-        bucket_info, bucket_info_response = self.bucket_manager.bucket_info(bucket)
-        if domain_response.status_code != 200:
-            raise Exception(
-                f"get bucket domain error：{bucket_info_response.exception} reqId:{bucket_info_response.req_id}"
-            )
-        if bucket_info["private"] != 0:
-            for url_info in object_public_urls:
-                public_url = url_info.get("object_url")
-                if public_url is None:
-                    continue
-                url_info["object_url"] = self.auth.private_download_url(
-                    public_url, expires=expires
                 )
-                object_urls.append(url_info)
-        else:
-            for url_info in object_public_urls:
-                object_urls.append(url_info)
-        return object_urls
+            )
 
-    async def list_buckets(self, prefix: Optional[str] = None) -> List[dict]:
-        if not self.config.buckets or len(self.config.buckets) == 0:
-            return []
+        # 按探测到的延迟与可用性排序，最快的可用域名在前
+        domains = domain_prober.rank(http_schema, domains)
 
-        max_buckets = 50
+        bucket_info = single_flight.do_sync(
+            self._request_key("bucket_info", bucket),
+            lambda: self._bucket_info(bucket),
+            operation="bucket_info",
+            tenant=self.tenant,
+        )
+        private = bucket_info["private"] != 0
+
+        object_urls = {}
+        for key in keys:
+            urls = []
+            for domain_url, domain_type in domains:
+                object_url = f"{http_schema}://{domain_url}/{key}"
+                if private:
+                    object_url = self.auth.private_download_url(
+                        object_url, expires=expires
+                    )
+                urls.append({"object_url": object_url, "domain_type": domain_type})
+            object_urls[key] = urls
+        return object_urls
 
+    @_instrumented("list_buckets")
+    async def _list_all_buckets(self) -> List[dict]:
         async with self.s3_session.client(
             "s3",
             aws_access_key_id=self.config.access_key,
@@ -124,22 +303,40 @@ class StorageService:
             region_name=self.config.region_name,
             config=self.s3_config,
         ) as s3:
-            # If buckets are configured, only return those
             response = await s3.list_buckets()
-            all_buckets = response.get("Buckets", [])
+            return response.get("Buckets", [])
+
+    async def list_buckets(self, prefix: Optional[str] = None) -> List[dict]:
+        if not self.config.buckets or len(self.config.buckets) == 0:
+            return []
+
+        max_buckets = 50
+
+        configured_bucket_list = bucket_cache.lookup(
+            self.credential_key, self.config.buckets
+        )
+        if configured_bucket_list is None:
+            # 同一账号并发的 ListBuckets 只请求一次，再按各自配置的 bucket 过滤
+            all_buckets = await single_flight.do(
+                self._request_key("list_buckets"),
+                self._list_all_buckets,
+                operation="list_buckets",
+                tenant=self.tenant,
+            )
+            bucket_cache.put(self.credential_key, all_buckets)
 
+            # If buckets are configured, only return those
+            configured = set(self.config.buckets)
             configured_bucket_list = [
-                bucket
-                for bucket in all_buckets
-                if bucket["Name"] in self.config.buckets
+                bucket for bucket in all_buckets if bucket["Name"] in configured
             ]
 
-            if prefix:
-                configured_bucket_list = [
-                    b for b in configured_bucket_list if b["Name"] > prefix
-                ]
+        if prefix:
+            configured_bucket_list = [
+                b for b in configured_bucket_list if b["Name"] > prefix
+            ]
 
-            return configured_bucket_list[:max_buckets]
+        return configured_bucket_list[:max_buckets]
 
     async def list_objects(
         self, bucket: str, prefix: str = "", max_keys: int = 100, start_after: str = ""
@@ -154,6 +351,28 @@ class StorageService:
         if max_keys > 500:
             max_keys = 500
 
+        try:
+            objects = await single_flight.do(
+                self._request_key(
+                    "list_objects", bucket, prefix, max_keys, start_after
+                ),
+                lambda: self._list_objects_v2(bucket, prefix, max_keys, start_after),
+                operation="list_objects",
+                tenant=self.tenant,
+            )
+        except Exception as e:
+            if client_error_code(e) in BUCKET_UNAVAILABLE_CODES:
+                bucket_cache.invalidate(self.credential_key, bucket)
+            raise
+
+        # 能够列举对象说明 bucket 存在且凭证可以访问
+        bucket_cache.verify(self.credential_key, bucket)
+        return objects
+
+    @_instrumented("list_objects")
+    async def _list_objects_v2(
+        self, bucket: str, prefix: str, max_keys: int, start_after: str
+    ) -> List[dict]:
         async with self.s3_session.client(
             "s3",
             aws_access_key_id=self.config.access_key,
@@ -170,6 +389,7 @@ class StorageService:
             )
             return response.get("Contents", [])
 
+    @_instrumented("get_object")
     async def get_object(self, bucket: str, key: str) -> Dict[str, Any]:
         if self.config.buckets and bucket not in self.config.buckets:
             logger.warning(f"Bucket {bucket} not in configured bucket list")
@@ -196,9 +416,7 @@ class StorageService:
             response["Body"] = b"".join(chunks)
             return response
 
-    def upload_text_data(
-        self, bucket: str, key: str, data: str, overwrite: bool = False
-    ) -> list[dict[str:Any]]:
+    def _put_data(self, bucket: str, key: str, data: str, overwrite: bool) -> None:
         policy = {
             "insertOnly": 1,
         }
@@ -207,15 +425,35 @@ class StorageService:
             policy["insertOnly"] = 0
             policy["scope"] = f"{bucket}:{key}"
 
+        import qiniu
+
+        # 上传前按 UC 服务地址查询上传域名
+        self._configure_uc_host()
         token = self.auth.upload_token(bucket=bucket, key=key, policy=policy)
         ret, info = qiniu.put_data(
             up_token=token, key=key, data=bytes(data, encoding="utf-8")
         )
         if info.status_code != 200:
-            raise Exception(f"Failed to upload object: {info}")
+            raise response_error("Failed to upload object", info)
 
+    @_instrumented("upload_text_data")
+    def upload_text_data(
+        self, bucket: str, key: str, data: str, overwrite: bool = False
+    ) -> list[dict[str:Any]]:
+        self._put_data(bucket, key, data, overwrite)
         return self.get_object_url(bucket, key)
 
+    @_instrumented("put_text_object")
+    def put_text_object(
+        self, bucket: str, key: str, data: str, overwrite: bool = False
+    ) -> None:
+        """写入文本对象，只发起上传请求，不查询访问域名、不生成访问链接
+
+        写入成功即返回，不会在对象写入之后再失败，不覆盖写入的调用方无需担心重试时对象已存在
+        """
+        self._put_data(bucket, key, data, overwrite)
+
+    @_instrumented("upload_local_file")
     def upload_local_file(
         self, bucket: str, key: str, file_path: str, overwrite: bool = False
     ) -> list[dict[str:Any]]:
@@ -227,19 +465,50 @@ class StorageService:
             policy["insertOnly"] = 0
             policy["scope"] = f"{bucket}:{key}"
 
+        import qiniu
+
+        # 上传前按 UC 服务地址查询上传域名
+        self._configure_uc_host()
         token = self.auth.upload_token(bucket=bucket, key=key, policy=policy)
         ret, info = qiniu.put_file(up_token=token, key=key, file_path=file_path)
         if info.status_code != 200:
-            raise Exception(f"Failed to upload object: {info}")
+            raise response_error("Failed to upload object", info)
 
         return self.get_object_url(bucket, key)
 
-    def fetch_object(self, bucket: str, key: str, url: str):
+    @_instrumented("fetch_object")
+    def fetch_object(self, bucket: str, key: str, url: str) -> Dict[str, Any]:
+        """由七牛云服务端抓取 url 指向的资源并保存到 bucket
+
+        Returns:
+            抓取到的文件信息，包含 fsize、hash、key 与 mimeType
+
+        Raises:
+            StorageResponseError: 抓取失败
+        """
         ret, info = self.bucket_manager.fetch(url, bucket, key=key)
         if info.status_code != 200:
-            raise Exception(f"Failed to fetch object: {info}")
+            raise response_error("Failed to fetch object", info)
 
-        return self.get_object_url(bucket, key)
+        return ret
+
+    @_instrumented("stat_object")
+    def stat_object(self, bucket: str, key: str) -> Optional[Dict[str, Any]]:
+        """查询文件信息，不下载文件内容
+
+        Returns:
+            文件信息，包含 fsize、hash 与 mimeType；文件不存在时返回 None
+
+        Raises:
+            StorageResponseError: 查询失败
+        """
+        ret, info = self.bucket_manager.stat(bucket, key)
+        if info.status_code == 612:
+            return None
+        if info.status_code != 200:
+            raise response_error("Failed to stat object", info)
+
+        return ret
 
     def is_text_file(self, key: str) -> bool:
         text_extensions = {
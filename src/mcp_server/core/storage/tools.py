@@ -1,11 +1,32 @@
+import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
 
 from mcp import types
 
+from .catalog import MusicCatalog
+from .domain_probe import domain_prober
+from .facets import FACETS
+from .hot_tracks import RECENT_PLAYS, hot_tracks
+from .playlist import MAX_PLAYLIST_TRACKS
+from .remote_fetch import (
+    DEFAULT_FETCH_CONCURRENCY,
+    DEFAULT_FETCH_RETRIES,
+    FILE_EXISTS_ERROR,
+    MAX_FETCH_CONCURRENCY,
+    MAX_FETCH_ITEMS,
+    MAX_FETCH_RETRIES,
+    fetch_all,
+    key_from_url,
+    to_catalog_object,
+)
 from .storage import StorageService
 from ...consts import consts
 from ...tools import tools
+from ...tools.progress import report_progress
+from ...tools.scheduler import scheduler
 from ...session import get_session_context
 
 logger = logging.getLogger(consts.LOGGER_NAME)
@@ -14,75 +35,72 @@ logger = logging.getLogger(consts.LOGGER_NAME)
 DEFAULT_MAX_KEYS = 100
 MAX_ALLOWED_KEYS = 500
 DEFAULT_URL_EXPIRES = 3600  # 1小时
+# 调用方可指定的URL有效期范围（秒）
+MIN_URL_EXPIRES = 60
+MAX_URL_EXPIRES = 7 * 24 * 3600
+DEFAULT_DUPLICATE_GROUPS = 20
 
 
 class SessionAwareToolImpl:
     """会话感知的音乐存储工具实现"""
 
-    # @tools.tool_meta(
-    #     types.Tool(
-    #         name="get_music_directories",
-    #         description="获取当前用户的所有音乐目录列表。",
-    #         inputSchema={
-    #             "type": "object",
-    #             "properties": {
-    #                 "prefix": {
-    #                     "type": "string",
-    #                     "description": "音乐目录前缀。列出的音乐目录将根据此前缀进行过滤，仅输出匹配前缀的音乐目录。",
-    #                 },
-    #             },
-    #             "required": [],
-    #         },
-    #     )
-    # )
-    # async def get_music_directories(
-    #     self, session_id: Optional[str] = None, **kwargs: Any
-    # ) -> List[types.TextContent]:
-    #     try:
-    #         async with get_session_context(session_id) as session_config:
-    #             storage = StorageService.from_session_config(session_config)
-    #             buckets = await storage.list_buckets(**kwargs)
-    #             return [types.TextContent(type="text", text=str(buckets))]
-    #     except Exception as e:
-    #         logger.error(f"获取音乐目录失败: {e}")
-    #         return [types.TextContent(type="text", text=f"获取音乐目录失败: {str(e)}")]
-
-    def _filter_music_files(
-        self,
-        music_files: List[Dict[str, Any]],
-        bucket: Optional[str] = None,
-        prefix: str = "",
-        start_after: str = "",
-    ) -> List[Dict[str, Any]]:
-        """过滤音乐文件列表
+    @tools.tool_meta(
+        types.Tool(
+            name="get_music_directories",
+            description="浏览音乐文件夹。列出指定文件夹路径下的子文件夹（含文件数量与总大小）以及直接位于该文件夹中的音乐文件key，不传`path`时列出根目录。",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "path": {
+                        "type": "string",
+                        "description": "文件夹路径，如`周杰伦/`或`周杰伦/七里香/`。为空时列出根目录。",
+                    },
+                    "max_keys": {
+                        "type": "integer",
+                        "description": "最多返回的文件数量，默认为100，最大为500。子文件夹总是全部返回。",
+                    },
+                },
+                "required": [],
+            },
+        )
+    )
+    async def get_music_directories(
+        self, session_id: Optional[str] = None, **kwargs: Any
+    ) -> List[types.TextContent]:
+        """浏览音乐文件夹
+
+        基于预加载时构建的目录树，只访问目标文件夹的直接子项。
 
         Args:
-            music_files: 原始音乐文件列表
-            bucket: 目录过滤条件
-            prefix: 文件名前缀过滤条件
-            start_after: 分页起始位置
+            session_id: 会话ID，用于多租户隔离
+            **kwargs: 包含path和max_keys参数
 
         Returns:
-            过滤后的音乐文件列表
+            包含文件夹信息的文本内容
         """
-        filtered_files = []
+        try:
+            from ...session import session_manager
 
-        for obj in music_files:
-            # bucket过滤
-            if bucket and obj.get("Bucket") != bucket:
-                continue
+            params = self._validate_and_normalize_params(kwargs)
+            path = kwargs.get("path", "")
 
-            # prefix过滤
-            if prefix and not obj.get("Key", "").startswith(prefix):
-                continue
+            music_cache = session_manager.get_music_cache()
+            catalog = await music_cache.ensure_catalog(session_id)
 
-            # start_after过滤（用于分页）
-            if start_after and obj.get("Key", "") <= start_after:
-                continue
+            if not catalog:
+                return [types.TextContent(type="text", text="暂无音乐文件")]
 
-            filtered_files.append(obj)
+            listing = catalog.directories.list_directory(
+                path, max_files=params["max_keys"]
+            )
+            if listing is None:
+                return [types.TextContent(type="text", text=f"未找到文件夹: {path}")]
+
+            return [types.TextContent(type="text", text=str(listing))]
 
-        return filtered_files
+        except Exception as e:
+            logger.error(f"获取音乐目录失败: {e}")
+            return [types.TextContent(type="text", text=f"获取音乐目录失败: {str(e)}")]
 
     def _validate_and_normalize_params(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
         """验证和标准化参数
@@ -106,12 +124,13 @@ class SessionAwareToolImpl:
             "max_keys": max_keys,
             "prefix": kwargs.get("prefix", ""),
             "start_after": kwargs.get("start_after", ""),
+            "cursor": kwargs.get("cursor"),
         }
 
     @tools.tool_meta(
         types.Tool(
             name="get_music_list",
-            description="获取音乐文件列表, 可以使用`prefix`根据路径过滤, 返回音乐文件的key（名称，路径，还可以用于获取下载url）列表。",
+            description="获取音乐文件列表, 可以使用`prefix`根据路径过滤, 返回音乐文件的key（名称，路径，还可以用于获取下载url）列表。若还有更多文件，会同时返回`next_cursor`用于获取下一页。",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -127,6 +146,10 @@ class SessionAwareToolImpl:
                         "type": "string",
                         "description": "分页起始位置。从指定的音乐文件名之后开始列出，用于实现分页浏览。",
                     },
+                    "cursor": {
+                        "type": "string",
+                        "description": "分页游标。传入上一次返回的`next_cursor`继续列出下一页，优先于`start_after`，目录刷新后依然有效。",
+                    },
                 },
                 "required": [],
             },
@@ -141,27 +164,41 @@ class SessionAwareToolImpl:
             # 验证和标准化参数
             params = self._validate_and_normalize_params(kwargs)
 
-            # 从音乐缓存中获取文件列表
+            # 从音乐缓存中获取目录快照
             music_cache = session_manager.get_music_cache()
-            music_files = music_cache._session_music_cache.get(session_id, [])
+            catalog = await music_cache.ensure_catalog(session_id)
 
-            if not music_files:
+            if not catalog:
                 return [types.TextContent(type="text", text="暂无音乐文件")]
 
-            # 过滤文件
-            filtered_files = self._filter_music_files(
-                music_files,
+            # 相同目录版本下的相同请求直接复用编码好的响应
+            cache_params = ("get_music_list", *params.items())
+            cached = music_cache.page_cache.get(catalog.version, cache_params)
+            if cached is not None:
+                return list(cached)
+
+            # 通过排序索引定位并截取一页
+            page, next_cursor = catalog.page(
+                params["max_keys"],
                 bucket=params["bucket"],
                 prefix=params["prefix"],
                 start_after=params["start_after"],
+                cursor=params["cursor"],
             )
 
-            # 限制返回数量
-            max_keys = params["max_keys"]
-            if len(filtered_files) > max_keys:
-                filtered_files = filtered_files[:max_keys]
+            result = [types.TextContent(type="text", text=str(page))]
+            if next_cursor:
+                result.append(
+                    types.TextContent(type="text", text=f"next_cursor: {next_cursor}")
+                )
 
-            return [types.TextContent(type="text", text=str(filtered_files))]
+            music_cache.page_cache.put(
+                catalog.version,
+                cache_params,
+                tuple(result),
+                sum(len(content.text.encode()) for content in result),
+            )
+            return result
 
         except Exception as e:
             logger.error(f"获取音乐文件列表失败: {e}")
@@ -169,6 +206,112 @@ class SessionAwareToolImpl:
                 types.TextContent(type="text", text=f"获取音乐文件列表失败: {str(e)}")
             ]
 
+    @tools.tool_meta(
+        types.Tool(
+            name="get_music_stats",
+            description="获取音乐库统计信息，包括音乐文件总数、总大小，以及按音乐目录(bucket)、格式(extension)、顶层文件夹(folder)、顶层文件夹与格式的组合(folder_extension，值为“文件夹|格式”)、大小区间(size_band)分组的文件数量和字节数。适合回答“每个文件夹有多少FLAC”之类的问题，无需逐页列出文件。",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "facets": {
+                        "type": "array",
+                        "items": {"type": "string", "enum": list(FACETS)},
+                        "description": "需要返回的分组维度，默认返回全部维度。",
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "每个分组维度最多返回的条目数量（按文件数量降序），默认返回全部。",
+                    },
+                },
+                "required": [],
+            },
+        )
+    )
+    async def get_music_stats(
+        self, session_id: Optional[str] = None, **kwargs: Any
+    ) -> List[types.TextContent]:
+        """获取音乐库分面统计
+
+        统计数据随目录加载增量维护，查询不需要遍历目录。
+
+        Args:
+            session_id: 会话ID，用于多租户隔离
+            **kwargs: 包含facets和limit参数
+
+        Returns:
+            包含统计信息的文本内容
+        """
+        try:
+            from ...session import session_manager
+
+            limit = kwargs.get("limit")
+            if limit is not None and limit < 1:
+                limit = None
+
+            music_cache = session_manager.get_music_cache()
+            catalog = await music_cache.ensure_catalog(session_id)
+
+            if not catalog:
+                return [types.TextContent(type="text", text="暂无音乐文件")]
+
+            stats = catalog.facets.summary(facets=kwargs.get("facets"), limit=limit)
+            return [types.TextContent(type="text", text=str(stats))]
+
+        except Exception as e:
+            logger.error(f"获取音乐统计信息失败: {e}")
+            return [
+                types.TextContent(type="text", text=f"获取音乐统计信息失败: {str(e)}")
+            ]
+
+    @tools.tool_meta(
+        types.Tool(
+            name="find_duplicate_music",
+            description="查找内容完全相同的重复音乐文件（按ETag与文件大小判断，不下载文件），包括跨音乐目录(bucket)的副本。返回重复分组及每组只保留一份时可节省的字节数，按可节省字节数降序排列。",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": f"最多返回的重复分组数量，默认为{DEFAULT_DUPLICATE_GROUPS}。",
+                    },
+                },
+                "required": [],
+            },
+        )
+    )
+    async def find_duplicate_music(
+        self, session_id: Optional[str] = None, **kwargs: Any
+    ) -> List[types.TextContent]:
+        """查找重复音乐文件
+
+        重复文件索引随目录加载增量维护，查询只遍历重复的分组。
+
+        Args:
+            session_id: 会话ID，用于多租户隔离
+            **kwargs: 包含limit参数
+
+        Returns:
+            包含重复分组与可回收字节数的文本内容
+        """
+        try:
+            from ...session import session_manager
+
+            limit = kwargs.get("limit", DEFAULT_DUPLICATE_GROUPS)
+
+            music_cache = session_manager.get_music_cache()
+            catalog = await music_cache.ensure_catalog(session_id)
+
+            if not catalog:
+                return [types.TextContent(type="text", text="暂无音乐文件")]
+
+            report = catalog.duplicates.summary(limit=limit)
+            return [types.TextContent(type="text", text=str(report))]
+
+        except Exception as e:
+            logger.error(f"查找重复音乐失败: {e}")
+            return [types.TextContent(type="text", text=f"查找重复音乐失败: {str(e)}")]
+
     def _create_music_url_info(
         self, obj: Dict[str, Any], key: str, url: str, mime_type: str
     ) -> Dict[str, Any]:
@@ -194,7 +337,7 @@ class SessionAwareToolImpl:
     @tools.tool_meta(
         types.Tool(
             name="get_music_url",
-            description="使用通过get_music_list获取到的音乐文件key，获取指定音乐文件的播放URL。可以使用此URL直接在音乐播放器中播放音乐，无需下载完整文件。",
+            description="使用通过get_music_list获取到的音乐文件key，获取指定音乐文件的播放URL。可以使用此URL直接在音乐播放器中播放音乐，无需下载完整文件。URL按实测的下载域名速度从快到慢排列，不可用的域名排在最后。",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -202,6 +345,10 @@ class SessionAwareToolImpl:
                         "type": "string",
                         "description": "音乐对应的key，通过get_music_list获得。",
                     },
+                    "best_only": {
+                        "type": "boolean",
+                        "description": "是否只返回当前最快且可用的一个URL，默认返回全部域名的URL。",
+                    },
                     # "disable_ssl": {
                     #     "type": "boolean",
                     #     "description": "Whether to disable HTTPS, default to use HTTPS",
@@ -225,7 +372,7 @@ class SessionAwareToolImpl:
 
         Args:
             session_id: 会话ID，用于多租户隔离
-            **kwargs: 包含key和expires参数
+            **kwargs: 包含key、best_only和expires参数
 
         Returns:
             包含URL信息的文本内容
@@ -239,12 +386,14 @@ class SessionAwareToolImpl:
                 return [types.TextContent(type="text", text="缺少必需参数: key")]
 
             expires = kwargs.get("expires", DEFAULT_URL_EXPIRES)
+            best_only = kwargs.get("best_only", False)
 
             async with get_session_context(session_id) as session_config:
                 storage = StorageService.from_session_config(session_config)
                 music_cache = session_manager.get_music_cache()
 
                 # 在缓存中查找所有匹配的音乐文件
+                await music_cache.ensure_catalog(session_id)
                 matching_files = music_cache.find_music_by_key(session_id, key)
 
                 if not matching_files:
@@ -252,14 +401,43 @@ class SessionAwareToolImpl:
                         types.TextContent(type="text", text=f"未找到音乐文件: {key}")
                     ]
 
+                # 只有默认有效期的URL会被缓存与预签名
+                cacheable = expires == hot_tracks.url_expires
+                credential = storage.credential_key
                 urls = []
                 for obj in matching_files:
                     bucket_name = obj["Bucket"]
                     try:
-                        # 生成播放URL
-                        url = storage.get_object_url(
-                            bucket=bucket_name, key=key, expires=expires
+                        url = (
+                            hot_tracks.get_urls(credential, bucket_name, key)
+                            if cacheable
+                            else None
                         )
+                        if url is not None:
+                            # 缓存的URL按最新的探测结果排序，域名不可用时自动切换
+                            url = domain_prober.order_urls(url)
+                        else:
+                            signed_at = time.time()
+                            # 生成播放URL，同步的 UC 请求与限流等待在线程池中执行，避免阻塞事件循环
+                            url = await scheduler.run_sync(
+                                storage.get_object_url,
+                                bucket=bucket_name,
+                                key=key,
+                                expires=expires,
+                            )
+                            if cacheable:
+                                hot_tracks.put_urls(
+                                    credential,
+                                    bucket_name,
+                                    key,
+                                    url,
+                                    signed_at + expires,
+                                )
+                        hot_tracks.record_play(
+                            storage, bucket_name, key, session_id=session_id
+                        )
+                        if best_only:
+                            url = url[:1]
 
                         # 获取MIME类型
                         mime_type = music_cache._get_music_mime_type(key)
@@ -285,6 +463,605 @@ class SessionAwareToolImpl:
             logger.error(f"获取音乐URL失败: {e}")
             return [types.TextContent(type="text", text=f"获取音乐URL失败: {str(e)}")]
 
+    @tools.tool_meta(
+        types.Tool(
+            name="get_recently_played",
+            description="获取最近通过get_music_url播放过的音乐，最新的在前。记录只保存在服务内存中，服务重启后清空。",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": RECENT_PLAYS,
+                        "description": f"返回的记录数量，默认为20，最多{RECENT_PLAYS}条。",
+                    },
+                },
+                "required": [],
+            },
+        )
+    )
+    async def get_recently_played(
+        self, limit: int = 20, session_id: Optional[str] = None, **kwargs: Any
+    ) -> List[types.TextContent]:
+        """获取最近播放的音乐
+
+        Args:
+            limit: 返回的记录数量
+            session_id: 会话ID，用于多租户隔离
+
+        Returns:
+            包含 bucket、key 与播放时间的记录列表
+        """
+        try:
+            async with get_session_context(session_id) as session_config:
+                storage = StorageService.from_session_config(session_config)
+                plays = hot_tracks.recently_played(storage.credential_key, limit)
+                if not plays:
+                    return [types.TextContent(type="text", text="暂无播放记录")]
+                return [
+                    types.TextContent(
+                        type="text",
+                        text=str(
+                            [
+                                {
+                                    "bucket": bucket,
+                                    "key": key,
+                                    "played_at": datetime.fromtimestamp(
+                                        played_at, timezone.utc
+                                    ).isoformat(),
+                                }
+                                for bucket, key, played_at in plays
+                            ]
+                        ),
+                    )
+                ]
+
+        except Exception as e:
+            logger.error(f"获取最近播放失败: {e}")
+            return [types.TextContent(type="text", text=f"获取最近播放失败: {str(e)}")]
+
+    def _tracks_for_keys(
+        self, catalog: Optional[MusicCatalog], keys: List[str]
+    ) -> List[Dict[str, str]]:
+        """将音乐文件key解析为播放列表曲目，多个bucket中存在同名文件时取第一个
+
+        Raises:
+            ValueError: 存在目录中找不到的key
+        """
+        tracks = []
+        missing = []
+        for key in keys:
+            matches = catalog.find_by_key(key) if catalog is not None else []
+            if not matches:
+                missing.append(key)
+                continue
+            tracks.append({"bucket": matches[0]["Bucket"], "key": key})
+        if missing:
+            raise ValueError(f"未找到音乐文件: {missing}")
+        return tracks
+
+    @tools.tool_meta(
+        types.Tool(
+            name="create_playlist",
+            description="创建播放列表并保存到音乐目录(bucket)中，可以同时传入初始曲目。创建后可以用get_playlist一次获取全部曲目的播放URL。",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "name": {
+                        "type": "string",
+                        "description": "播放列表名称，不能包含`/`。",
+                    },
+                    "keys": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "maxItems": MAX_PLAYLIST_TRACKS,
+                        "description": "初始曲目的音乐文件key，通过get_music_list获得。",
+                    },
+                    "bucket": {
+                        "type": "string",
+                        "description": "保存播放列表的音乐目录(bucket)，默认为第一个音乐目录。",
+                    },
+                },
+                "required": ["name"],
+            },
+        )
+    )
+    async def create_playlist(
+        self, session_id: Optional[str] = None, **kwargs: Any
+    ) -> List[types.TextContent]:
+        """创建播放列表
+
+        Args:
+            session_id: 会话ID，用于多租户隔离
+            **kwargs: 包含name、keys和bucket参数
+
+        Returns:
+            包含播放列表概要的文本内容
+        """
+        try:
+            from ...session import session_manager
+
+            async with get_session_context(session_id) as session_config:
+                storage = StorageService.from_session_config(session_config)
+                bucket = kwargs.get("bucket") or (session_config.buckets or [None])[0]
+                if bucket is None or bucket not in session_config.buckets:
+                    return [
+                        types.TextContent(type="text", text=f"无效的音乐目录: {bucket}")
+                    ]
+
+                music_cache = session_manager.get_music_cache()
+                catalog = await music_cache.ensure_catalog(session_id)
+                tracks = self._tracks_for_keys(catalog, kwargs.get("keys", []))
+                playlist = await music_cache.playlists.create(
+                    session_id, storage, kwargs["name"], bucket, tracks
+                )
+                return [types.TextContent(type="text", text=str(playlist.summary()))]
+
+        except Exception as e:
+            logger.error(f"创建播放列表失败: {e}")
+            return [types.TextContent(type="text", text=f"创建播放列表失败: {str(e)}")]
+
+    @tools.tool_meta(
+        types.Tool(
+            name="add_to_playlist",
+            description="向播放列表添加曲目，默认追加到末尾，也可以插入到指定位置。",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "name": {
+                        "type": "string",
+                        "description": "播放列表名称。",
+                    },
+                    "keys": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "minItems": 1,
+                        "maxItems": MAX_PLAYLIST_TRACKS,
+                        "description": "需要添加的音乐文件key，通过get_music_list获得。",
+                    },
+                    "position": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "description": "插入位置（从0开始），默认追加到末尾。",
+                    },
+                },
+                "required": ["name", "keys"],
+            },
+        )
+    )
+    async def add_to_playlist(
+        self, session_id: Optional[str] = None, **kwargs: Any
+    ) -> List[types.TextContent]:
+        """向播放列表添加曲目
+
+        Args:
+            session_id: 会话ID，用于多租户隔离
+            **kwargs: 包含name、keys和position参数
+
+        Returns:
+            包含播放列表概要的文本内容
+        """
+        try:
+            from ...session import session_manager
+
+            async with get_session_context(session_id) as session_config:
+                storage = StorageService.from_session_config(session_config)
+                music_cache = session_manager.get_music_cache()
+                catalog = await music_cache.ensure_catalog(session_id)
+                added = self._tracks_for_keys(catalog, kwargs["keys"])
+                position = kwargs.get("position")
+
+                def change(tracks: List[Dict[str, str]]) -> List[Dict[str, str]]:
+                    index = len(tracks) if position is None else position
+                    return tracks[:index] + added + tracks[index:]
+
+                playlist = await music_cache.playlists.update(
+                    session_id, storage, kwargs["name"], change
+                )
+                return [types.TextContent(type="text", text=str(playlist.summary()))]
+
+        except Exception as e:
+            logger.error(f"添加播放列表曲目失败: {e}")
+            return [
+                types.TextContent(type="text", text=f"添加播放列表曲目失败: {str(e)}")
+            ]
+
+    @tools.tool_meta(
+        types.Tool(
+            name="reorder_playlist",
+            description="调整播放列表中曲目的顺序，把从`from_index`开始的`count`首曲目移动到`to_index`位置。",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "name": {
+                        "type": "string",
+                        "description": "播放列表名称。",
+                    },
+                    "from_index": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "description": "需要移动的第一首曲目的位置（从0开始）。",
+                    },
+                    "to_index": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "description": "移动后第一首曲目所在的位置（从0开始）。",
+                    },
+                    "count": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "连续移动的曲目数量，默认为1。",
+                    },
+                },
+                "required": ["name", "from_index", "to_index"],
+            },
+        )
+    )
+    async def reorder_playlist(
+        self, session_id: Optional[str] = None, **kwargs: Any
+    ) -> List[types.TextContent]:
+        """移动播放列表中连续的若干首曲目
+
+        Args:
+            session_id: 会话ID，用于多租户隔离
+            **kwargs: 包含name、from_index、to_index和count参数
+
+        Returns:
+            包含播放列表概要的文本内容
+        """
+        try:
+            from ...session import session_manager
+
+            from_index = kwargs["from_index"]
+            to_index = kwargs["to_index"]
+            count = kwargs.get("count", 1)
+
+            def change(tracks: List[Dict[str, str]]) -> List[Dict[str, str]]:
+                if from_index + count > len(tracks):
+                    raise ValueError(
+                        f"移动范围超出播放列表长度 {len(tracks)}: "
+                        f"[{from_index}, {from_index + count})"
+                    )
+                moved = tracks[from_index : from_index + count]
+                rest = tracks[:from_index] + tracks[from_index + count :]
+                if to_index > len(rest):
+                    raise ValueError(f"目标位置超出播放列表长度: {to_index}")
+                return rest[:to_index] + moved + rest[to_index:]
+
+            async with get_session_context(session_id) as session_config:
+                storage = StorageService.from_session_config(session_config)
+                music_cache = session_manager.get_music_cache()
+                playlist = await music_cache.playlists.update(
+                    session_id, storage, kwargs["name"], change
+                )
+                return [types.TextContent(type="text", text=str(playlist.summary()))]
+
+        except Exception as e:
+            logger.error(f"调整播放列表顺序失败: {e}")
+            return [
+                types.TextContent(type="text", text=f"调整播放列表顺序失败: {str(e)}")
+            ]
+
+    @tools.tool_meta(
+        types.Tool(
+            name="list_playlists",
+            description="列出所有播放列表的名称、所在音乐目录与曲目数量。",
+            inputSchema={
+                "type": "object",
+                "properties": {},
+                "required": [],
+            },
+        )
+    )
+    async def list_playlists(
+        self, session_id: Optional[str] = None, **kwargs: Any
+    ) -> List[types.TextContent]:
+        try:
+            from ...session import session_manager
+
+            async with get_session_context(session_id) as session_config:
+                storage = StorageService.from_session_config(session_config)
+                music_cache = session_manager.get_music_cache()
+                playlists = await music_cache.playlists.list_playlists(
+                    session_id, storage
+                )
+                if not playlists:
+                    return [types.TextContent(type="text", text="暂无播放列表")]
+                return [
+                    types.TextContent(
+                        type="text",
+                        text=str([playlist.summary() for playlist in playlists]),
+                    )
+                ]
+
+        except Exception as e:
+            logger.error(f"获取播放列表失败: {e}")
+            return [types.TextContent(type="text", text=f"获取播放列表失败: {str(e)}")]
+
+    @tools.tool_meta(
+        types.Tool(
+            name="get_playlist",
+            description="获取播放列表的全部曲目以及每首曲目的播放URL，一次调用即可得到整个播放队列，无需逐首调用get_music_url。",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "name": {
+                        "type": "string",
+                        "description": "播放列表名称。",
+                    },
+                    "expires": {
+                        "type": "integer",
+                        "minimum": MIN_URL_EXPIRES,
+                        "maximum": MAX_URL_EXPIRES,
+                        "description": f"播放URL的有效期（秒），默认{DEFAULT_URL_EXPIRES}秒，"
+                        f"范围{MIN_URL_EXPIRES}到{MAX_URL_EXPIRES}秒。"
+                        "播放列表较长时可以适当延长，避免播放到后面的曲目时URL已过期。",
+                    },
+                },
+                "required": ["name"],
+            },
+        )
+    )
+    async def get_playlist(
+        self, session_id: Optional[str] = None, **kwargs: Any
+    ) -> List[types.TextContent]:
+        """获取播放列表与全部曲目的播放URL
+
+        同一 bucket 的曲目批量生成URL，下载域名与 bucket 信息只查询一次，
+        各 bucket 并发处理。
+
+        Args:
+            session_id: 会话ID，用于多租户隔离
+            **kwargs: 包含name和expires参数
+
+        Returns:
+            包含播放列表曲目与URL的文本内容
+        """
+        try:
+            from ...session import session_manager
+
+            name = kwargs["name"]
+            expires = kwargs.get("expires", DEFAULT_URL_EXPIRES)
+
+            async with get_session_context(session_id) as session_config:
+                storage = StorageService.from_session_config(session_config)
+                music_cache = session_manager.get_music_cache()
+                catalog = await music_cache.ensure_catalog(session_id)
+                playlist = await music_cache.playlists.get(session_id, storage, name)
+                if playlist is None:
+                    return [
+                        types.TextContent(type="text", text=f"未找到播放列表: {name}")
+                    ]
+
+                # 目录中已不存在的曲目不生成URL
+                objects: Dict[Tuple[str, str], Dict[str, Any]] = {}
+                keys_by_bucket: Dict[str, List[str]] = {}
+                for track in playlist.tracks:
+                    track_id = (track["bucket"], track["key"])
+                    if track_id in objects or catalog is None:
+                        continue
+                    for obj in catalog.find_by_key(track["key"]):
+                        if obj["Bucket"] == track["bucket"]:
+                            objects[track_id] = obj
+                            keys_by_bucket.setdefault(obj["Bucket"], []).append(
+                                track["key"]
+                            )
+                            break
+
+                # 同步的 UC 请求与签名在线程池中执行
+                buckets = list(keys_by_bucket)
+                results = await asyncio.gather(
+                    *(
+                        scheduler.run_sync(
+                            storage.get_object_urls,
+                            bucket=bucket,
+                            keys=keys_by_bucket[bucket],
+                            expires=expires,
+                        )
+                        for bucket in buckets
+                    ),
+                    return_exceptions=True,
+                )
+                urls: Dict[Tuple[str, str], Any] = {}
+                for bucket, result in zip(buckets, results):
+                    if isinstance(result, Exception):
+                        logger.warning(
+                            f"为bucket {bucket}生成播放列表URL失败: {result}"
+                        )
+                        continue
+                    for key, url_infos in result.items():
+                        urls[(bucket, key)] = url_infos
+
+                tracks = []
+                for index, track in enumerate(playlist.tracks):
+                    track_id = (track["bucket"], track["key"])
+                    item: Dict[str, Any] = {"index": index, **track}
+                    obj = objects.get(track_id)
+                    if obj is None:
+                        item["error"] = "音乐文件不存在"
+                    elif not urls.get(track_id):
+                        item["error"] = "无法生成播放URL"
+                    else:
+                        item["url"] = urls[track_id][0]["object_url"]
+                        item["size"] = obj.get("Size", 0)
+                        item["mime_type"] = music_cache._get_music_mime_type(
+                            track["key"]
+                        )
+                    tracks.append(item)
+
+                return [
+                    types.TextContent(
+                        type="text",
+                        text=str({**playlist.summary(), "tracks": tracks}),
+                    )
+                ]
+
+        except Exception as e:
+            logger.error(f"获取播放列表失败: {e}")
+            return [types.TextContent(type="text", text=f"获取播放列表失败: {str(e)}")]
+
+    @tools.tool_meta(
+        types.Tool(
+            name="import_music_from_urls",
+            description="从其他网站的地址批量导入音乐文件。由七牛云服务端并发抓取到音乐目录(bucket)中，失败时自动重试，导入成功的文件立即出现在音乐列表中。",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "items": {
+                        "type": "array",
+                        "minItems": 1,
+                        "maxItems": MAX_FETCH_ITEMS,
+                        "description": f"需要导入的文件，最多{MAX_FETCH_ITEMS}个。",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "url": {
+                                    "type": "string",
+                                    "description": "音乐文件的源地址（http或https）。",
+                                },
+                                "key": {
+                                    "type": "string",
+                                    "description": "保存的音乐文件key，默认为`prefix`加上源地址中的文件名。",
+                                },
+                            },
+                            "required": ["url"],
+                        },
+                    },
+                    "bucket": {
+                        "type": "string",
+                        "description": "保存到的音乐目录(bucket)，默认为第一个音乐目录。",
+                    },
+                    "prefix": {
+                        "type": "string",
+                        "description": "未指定key时使用的文件夹路径，如`周杰伦/七里香/`。",
+                    },
+                    "overwrite": {
+                        "type": "boolean",
+                        "description": "是否覆盖已存在的同名文件，默认为false。",
+                    },
+                    "concurrency": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": MAX_FETCH_CONCURRENCY,
+                        "description": f"同时抓取的文件数量，默认为{DEFAULT_FETCH_CONCURRENCY}。",
+                    },
+                    "retries": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "maximum": MAX_FETCH_RETRIES,
+                        "description": f"每个文件失败后的最大重试次数，默认为{DEFAULT_FETCH_RETRIES}。",
+                    },
+                },
+                "required": ["items"],
+            },
+        )
+    )
+    async def import_music_from_urls(
+        self, session_id: Optional[str] = None, **kwargs: Any
+    ) -> List[types.TextContent]:
+        """批量抓取远程音乐文件并加入目录
+
+        客户端携带 progressToken 时，每完成一个文件发送一次进度通知。
+
+        Args:
+            session_id: 会话ID，用于多租户隔离
+            **kwargs: 包含items、bucket、prefix、overwrite、concurrency和retries参数
+
+        Returns:
+            包含导入汇总与逐项结果的文本内容
+        """
+        try:
+            from ...session import session_manager
+
+            async with get_session_context(session_id) as session_config:
+                storage = StorageService.from_session_config(session_config)
+                bucket = kwargs.get("bucket") or (session_config.buckets or [None])[0]
+                if bucket is None or bucket not in session_config.buckets:
+                    return [
+                        types.TextContent(type="text", text=f"无效的音乐目录: {bucket}")
+                    ]
+
+                music_cache = session_manager.get_music_cache()
+                catalog = await music_cache.ensure_catalog(session_id)
+
+                prefix = kwargs.get("prefix", "")
+                overwrite = kwargs.get("overwrite", False)
+                results: List[Optional[Dict[str, Any]]] = []
+                items = []
+                # key -> 首个使用该 key 的项的序号，同一批次内的 key 不能重复
+                claimed: Dict[str, int] = {}
+                for index, item in enumerate(kwargs["items"]):
+                    url = item["url"]
+                    try:
+                        if not url.startswith(("http://", "https://")):
+                            raise ValueError(f"仅支持http或https地址: {url}")
+                        key = item.get("key") or key_from_url(url, prefix)
+                    except ValueError as e:
+                        results.append({"index": index, "url": url, "error": str(e)})
+                        continue
+                    if key in claimed:
+                        results.append(
+                            {
+                                "index": index,
+                                "url": url,
+                                "key": key,
+                                "error": f"与第{claimed[key]}项的key重复",
+                            }
+                        )
+                        continue
+                    claimed[key] = index
+                    exists = catalog is not None and any(
+                        obj["Bucket"] == bucket for obj in catalog.find_by_key(key)
+                    )
+                    if exists and not overwrite:
+                        results.append(
+                            {
+                                "index": index,
+                                "url": url,
+                                "key": key,
+                                "error": FILE_EXISTS_ERROR,
+                            }
+                        )
+                        continue
+                    results.append(None)
+                    items.append({"url": url, "key": key, "index": index})
+
+                fetched = await fetch_all(
+                    storage,
+                    bucket,
+                    items,
+                    concurrency=kwargs.get("concurrency", DEFAULT_FETCH_CONCURRENCY),
+                    retries=kwargs.get("retries", DEFAULT_FETCH_RETRIES),
+                    overwrite=overwrite,
+                    on_progress=report_progress,
+                )
+
+                imported = []
+                for item, result in zip(items, fetched):
+                    result["index"] = item["index"]
+                    fetched_object = result.pop("object", None)
+                    if fetched_object is not None:
+                        result["size"] = fetched_object.get("fsize", 0)
+                        imported.append(to_catalog_object(bucket, fetched_object))
+                    results[item["index"]] = result
+
+                # 成功导入的文件直接加入目录，不重新列举 bucket
+                added = await music_cache.add_music_files(session_id, imported)
+
+                summary = {
+                    "bucket": bucket,
+                    "imported": len(imported),
+                    "failed": len(results) - len(imported),
+                    "added_to_catalog": added,
+                    "results": results,
+                }
+                return [types.TextContent(type="text", text=str(summary))]
+
+        except Exception as e:
+            logger.error(f"导入音乐文件失败: {e}")
+            return [types.TextContent(type="text", text=f"导入音乐文件失败: {str(e)}")]
+
     # @tools.tool_meta(
     #     types.Tool(
     #         name="get_object",
@@ -371,8 +1148,18 @@ def register_session_aware_tools() -> None:
     # 注册对外提供的工具
     tools.auto_register_tools(
         [
+            impl.get_music_directories,  # 音乐文件夹浏览工具
             impl.get_music_list,  # 音乐文件列表工具
             impl.get_music_url,  # 音乐URL生成工具
+            impl.get_recently_played,  # 最近播放工具
+            impl.get_music_stats,  # 音乐库统计工具
+            impl.find_duplicate_music,  # 重复文件检测工具
+            impl.create_playlist,  # 播放列表工具
+            impl.add_to_playlist,
+            impl.reorder_playlist,
+            impl.list_playlists,
+            impl.get_playlist,
+            impl.import_music_from_urls,  # 远程抓取导入工具
         ]
     )
 
@@ -0,0 +1,686 @@
+"""指标模块
+
+提供 Prometheus 文本格式的计数器、仪表与直方图，以及带基数控制的租户标签。
+指标按进程统计，多 worker 部署时每个 worker 各自暴露。
+"""
+
+import asyncio
+import bisect
+import hashlib
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from ..consts import consts
+
+logger = logging.getLogger(consts.LOGGER_NAME)
+
+# 默认的耗时直方图分桶（秒）
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+# Prometheus 文本格式的 Content-Type
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 租户标签的最大取值数量，超出后统一归入 OVERFLOW_TENANT
+MAX_TENANT_LABELS = 100
+OVERFLOW_TENANT = "other"
+UNKNOWN_TENANT = "unknown"
+# 同时带有延迟指标的下载域名数量上限，超出后新域名不记录指标
+MAX_DOMAIN_LABELS = 100
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names: Tuple[str, ...] = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(
+                f"Metric {self.name} expects labels {self.label_names}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def samples(self) -> List[Tuple[str, Sequence[str], Sequence[str], float]]:
+        """返回 (指标名, 标签名, 标签值, 数值) 列表"""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for name, label_names, label_values, value in self.samples():
+            lines.append(
+                f"{name}{_format_labels(label_names, label_values)} {_format_value(value)}"
+            )
+        return lines
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._label_values(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [(self.name, self.label_names, key, value) for key, value in items]
+
+
+class Gauge(_Metric):
+    """可增可减的仪表"""
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+    ):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def remove(self, **labels: str) -> None:
+        """删除一组标签的取值，之后不再输出该序列"""
+        key = self._label_values(labels)
+        with self._lock:
+            self._values.pop(key, None)
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._label_values(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [(self.name, self.label_names, key, value) for key, value in items]
+
+
+class Histogram(_Metric):
+    """累积分桶直方图"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        # 标签值 -> (各分桶计数, 总和, 总数)
+        self._values: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total, count = self._values.get(
+                key, ([0] * (len(self.buckets) + 1), 0.0, 0)
+            )
+            counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """统计代码块的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def get_count(self, **labels: str) -> int:
+        entry = self._values.get(self._label_values(labels))
+        return entry[2] if entry else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted(
+                (key, (list(counts), total, count))
+                for key, (counts, total, count) in self._values.items()
+            )
+
+        bucket_labels = self.label_names + ("le",)
+        samples = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                samples.append(
+                    (
+                        f"{self.name}_bucket",
+                        bucket_labels,
+                        key + (_format_value(bound),),
+                        cumulative,
+                    )
+                )
+            samples.append((f"{self.name}_sum", self.label_names, key, total))
+            samples.append((f"{self.name}_count", self.label_names, key, count))
+        return samples
+
+
+class CallbackMetric(_Metric):
+    """采集时通过回调取值的无标签指标，用于导出已有的统计计数"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        type_name: str,
+        function: Callable[[], float],
+    ):
+        super().__init__(name, documentation)
+        self.type_name = type_name
+        self._function = function
+
+    def samples(self):
+        try:
+            value = float(self._function())
+        except Exception as e:
+            logger.warning(f"Failed to collect metric {self.name}: {e}")
+            return []
+        return [(self.name, (), (), value)]
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """注册指标，禁止重复名称"""
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """以 Prometheus 文本格式输出所有指标"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labels))
+
+
+def gauge(name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labels))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labels: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labels, buckets))
+
+
+_tenant_labels: Dict[str, str] = {}
+_tenant_lock = threading.Lock()
+
+
+def tenant_label(access_key: Optional[str]) -> str:
+    """将租户的 access key 转换为指标标签
+
+    标签为 access key 的哈希前缀，避免在指标中暴露凭证；
+    不同租户超过 MAX_TENANT_LABELS 个后，新租户统一归入 OVERFLOW_TENANT。
+    """
+    if not access_key:
+        return UNKNOWN_TENANT
+
+    label = _tenant_labels.get(access_key)
+    if label is not None:
+        return label
+
+    with _tenant_lock:
+        if access_key not in _tenant_labels:
+            if len(_tenant_labels) >= MAX_TENANT_LABELS:
+                return OVERFLOW_TENANT
+            digest = hashlib.sha256(access_key.encode("utf-8")).hexdigest()[:12]
+            _tenant_labels[access_key] = digest
+        return _tenant_labels[access_key]
+
+
+_domain_labels: Set[str] = set()
+_domain_lock = threading.Lock()
+
+
+def domain_label(origin: str) -> Optional[str]:
+    """将下载域名 "scheme://domain" 转换为指标标签
+
+    域名本身不是敏感信息，直接作为标签；同时带有标签的域名超过 MAX_DOMAIN_LABELS 个后，
+    新域名返回 None，不记录指标，域名不再使用时需调用 release_domain_label 释放。
+    """
+    with _domain_lock:
+        if origin not in _domain_labels:
+            if len(_domain_labels) >= MAX_DOMAIN_LABELS:
+                return None
+            _domain_labels.add(origin)
+        return origin
+
+
+def release_domain_label(origin: str) -> None:
+    """释放下载域名的指标标签，并删除其延迟指标"""
+    with _domain_lock:
+        if origin not in _domain_labels:
+            return
+        _domain_labels.discard(origin)
+    DOMAIN_LATENCY.remove(domain=origin)
+
+
+def tenant_label_for_session(session_id: Optional[str]) -> str:
+    """根据会话ID获取租户标签"""
+    if not session_id:
+        return UNKNOWN_TENANT
+
+    from ..session import session_manager
+
+    session_config = session_manager.get_cached_session(session_id)
+    if session_config is None:
+        return UNKNOWN_TENANT
+    return tenant_label(session_config.access_key)
+
+
+def callback(
+    name: str, documentation: str, type_name: str, function: Callable[[], float]
+) -> CallbackMetric:
+    return REGISTRY.register(CallbackMetric(name, documentation, type_name, function))
+
+
+@contextmanager
+def track_call(calls: Counter, duration: Histogram, **labels: str) -> Iterator[None]:
+    """统计代码块的调用次数、状态与耗时
+
+    Args:
+        calls: 带 status 标签的调用计数器
+        duration: 耗时直方图
+        **labels: 除 status 外的标签
+    """
+    start = time.perf_counter()
+    status = "error"
+    try:
+        yield
+        status = "ok"
+    finally:
+        duration.observe(time.perf_counter() - start, **labels)
+        calls.inc(status=status, **labels)
+
+
+def render() -> str:
+    """以 Prometheus 文本格式输出全局注册表中的指标"""
+    return REGISTRY.render()
+
+
+# 工具调用
+TOOL_CALLS = counter(
+    "music_mcp_tool_calls_total",
+    "Tool calls by tool, tenant and status.",
+    ("tool", "tenant", "status"),
+)
+TOOL_DURATION = histogram(
+    "music_mcp_tool_duration_seconds",
+    "Tool call latency including argument validation.",
+    ("tool", "tenant"),
+)
+
+# 工具调度
+TOOL_QUEUE_DEPTH = gauge(
+    "music_mcp_tool_queue_depth",
+    "Tool calls waiting for an execution slot.",
+    ("tenant",),
+)
+TOOL_QUEUE_WAIT = histogram(
+    "music_mcp_tool_queue_wait_seconds",
+    "Time tool calls spent waiting for an execution slot.",
+    ("tenant",),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+TOOL_CALLS_RUNNING = gauge(
+    "music_mcp_tool_calls_running",
+    "Tool calls holding an execution slot.",
+    ("tenant",),
+)
+
+# 存储后端调用
+STORAGE_REQUESTS = counter(
+    "music_mcp_storage_requests_total",
+    "Storage backend calls by operation, tenant and status.",
+    ("operation", "tenant", "status"),
+)
+STORAGE_DURATION = histogram(
+    "music_mcp_storage_request_duration_seconds",
+    "Storage backend call latency.",
+    ("operation", "tenant"),
+)
+
+STORAGE_COALESCED = counter(
+    "music_mcp_storage_coalesced_total",
+    "Storage calls served by an identical request already in flight.",
+    ("operation", "tenant"),
+)
+
+BUCKET_CACHE_LOOKUPS = counter(
+    "music_mcp_bucket_cache_lookups_total",
+    "Bucket metadata cache lookups by result: hit, verified or miss.",
+    ("result",),
+)
+URL_CACHE_LOOKUPS = counter(
+    "music_mcp_url_cache_lookups_total",
+    "Signed play URL cache lookups by result: hit or miss.",
+    ("result",),
+)
+URL_PREFETCHES = counter(
+    "music_mcp_url_prefetches_total",
+    "Play URLs pre-signed for hot tracks.",
+    ("tenant",),
+)
+DOMAIN_PROBES = counter(
+    "music_mcp_domain_probes_total",
+    "Download domain probes by result: success or failure.",
+    ("result",),
+)
+DOMAIN_LATENCY = gauge(
+    "music_mcp_domain_latency_seconds",
+    "Smoothed probe latency of each download domain.",
+    ("domain",),
+)
+HTTP_COMPRESSION_BYTES = counter(
+    "music_mcp_http_compression_bytes_total",
+    "HTTP response bytes before (stage=in) and after (stage=out) compression.",
+    ("encoding", "stage"),
+)
+OBJECT_EVENTS = counter(
+    "music_mcp_object_events_total",
+    "Object events received through the webhook by kind: put or delete.",
+    ("event",),
+)
+WEBHOOK_REJECTIONS = counter(
+    "music_mcp_webhook_rejections_total",
+    "Webhook requests rejected by reason.",
+    ("reason",),
+)
+
+# 存储后端限流
+STORAGE_RATE_LIMIT_WAIT = histogram(
+    "music_mcp_storage_rate_limit_wait_seconds",
+    "Time storage calls waited for a rate limit token.",
+    ("operation_class", "tenant"),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+STORAGE_RATE_LIMIT_REJECTIONS = counter(
+    "music_mcp_storage_rate_limit_rejections_total",
+    "Storage calls rejected because the expected wait exceeded the limit.",
+    ("operation_class", "tenant"),
+)
+STORAGE_THROTTLED = counter(
+    "music_mcp_storage_throttled_total",
+    "Throttling responses (429/503/573) from the storage backend.",
+    ("operation_class", "tenant"),
+)
+
+# 目录预加载
+PRELOAD_DURATION = histogram(
+    "music_mcp_preload_duration_seconds",
+    "Catalog preload duration.",
+    ("tenant",),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+)
+PRELOADS_IN_FLIGHT = gauge(
+    "music_mcp_preloads_in_flight", "Catalog preloads currently running."
+)
+
+
+def _music_cache_stat(name: str) -> Callable[[], float]:
+    def collect() -> float:
+        from ..session import session_manager
+
+        return session_manager.get_music_cache().get_memory_stats()[name]
+
+    return collect
+
+
+def _active_sessions() -> float:
+    from ..session import session_manager
+
+    return session_manager.active_sessions
+
+
+def _reaped_sessions() -> float:
+    from ..session import session_manager
+
+    return session_manager.reaped_sessions
+
+
+# 会话与目录缓存，采集时从现有统计中读取
+callback(
+    "music_mcp_active_sessions",
+    "Sessions with a live connection in this process.",
+    "gauge",
+    _active_sessions,
+)
+callback(
+    "music_mcp_reaped_sessions_total",
+    "Sessions closed by the idle reaper.",
+    "counter",
+    _reaped_sessions,
+)
+callback(
+    "music_mcp_catalog_sessions",
+    "Sessions with a catalog held in memory.",
+    "gauge",
+    _music_cache_stat("cached_sessions"),
+)
+callback(
+    "music_mcp_catalog_entries",
+    "Music files held in memory across all catalogs.",
+    "gauge",
+    _music_cache_stat("catalog_entries"),
+)
+callback(
+    "music_mcp_catalog_bytes",
+    "Estimated memory used by catalogs.",
+    "gauge",
+    _music_cache_stat("catalog_bytes"),
+)
+callback(
+    "music_mcp_catalog_budget_bytes",
+    "Catalog memory budget.",
+    "gauge",
+    _music_cache_stat("max_catalog_bytes"),
+)
+callback(
+    "music_mcp_catalog_evictions_total",
+    "Catalogs evicted to stay within the memory budget.",
+    "counter",
+    _music_cache_stat("evictions"),
+)
+callback(
+    "music_mcp_page_cache_bytes",
+    "Memory used by cached list pages.",
+    "gauge",
+    _music_cache_stat("page_cache_bytes"),
+)
+callback(
+    "music_mcp_page_cache_hits_total",
+    "List page cache hits.",
+    "counter",
+    _music_cache_stat("page_cache_hits"),
+)
+callback(
+    "music_mcp_page_cache_misses_total",
+    "List page cache misses.",
+    "counter",
+    _music_cache_stat("page_cache_misses"),
+)
+callback(
+    "music_mcp_page_cache_hit_ratio",
+    "List page cache hit ratio since start.",
+    "gauge",
+    _music_cache_stat("page_cache_hit_ratio"),
+)
+
+
+def _scheduler_stat(name: str) -> Callable[[], float]:
+    def collect() -> float:
+        from ..tools.scheduler import scheduler
+
+        return getattr(scheduler, name)
+
+    return collect
+
+
+callback(
+    "music_mcp_tool_executor_workers",
+    "Size of the dedicated thread pool, also the limit of sync tool calls.",
+    "gauge",
+    _scheduler_stat("max_workers"),
+)
+callback(
+    "music_mcp_tool_concurrency_limit",
+    "Tool calls allowed to execute at the same time.",
+    "gauge",
+    _scheduler_stat("max_concurrency"),
+)
+
+
+# 事件循环延迟
+EVENT_LOOP_LAG = histogram(
+    "music_mcp_event_loop_lag_seconds",
+    "Delay between scheduled and actual wakeups of the event loop monitor.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+# 事件循环延迟检测间隔与最大值统计窗口（秒）
+LOOP_LAG_INTERVAL = 0.1
+LOOP_LAG_WINDOW = 5.0
+
+_recent_lags: deque = deque(maxlen=int(LOOP_LAG_WINDOW / LOOP_LAG_INTERVAL))
+
+
+async def monitor_event_loop_lag(interval: float = LOOP_LAG_INTERVAL) -> None:
+    """定期休眠并记录实际唤醒时间的延迟，反映阻塞事件循环的同步调用"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - expected)
+        EVENT_LOOP_LAG.observe(lag)
+        _recent_lags.append(lag)
+
+
+def _recent_max_lag() -> float:
+    return max(_recent_lags, default=0.0)
+
+
+def _resident_memory() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        # resource 只在 Unix 上可用
+        import resource
+    except ImportError:
+        return 0.0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位，Linux 以 KiB 为单位
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+callback(
+    "music_mcp_event_loop_lag_max_seconds",
+    "Largest event loop lag over the last few seconds.",
+    "gauge",
+    _recent_max_lag,
+)
+callback(
+    "process_resident_memory_bytes",
+    "Resident memory size in bytes.",
+    "gauge",
+    _resident_memory,
+)
@@ -1,6 +1,6 @@
 import logging
 from abc import abstractmethod
-from typing import Dict, AsyncGenerator, Iterable
+from typing import Dict, AsyncGenerator, Iterable, Optional, Tuple
 
 from mcp import types
 from mcp.server.lowlevel.helper_types import ReadResourceContents
@@ -10,6 +10,10 @@ from ..consts import consts
 logger = logging.getLogger(consts.LOGGER_NAME)
 
 ResourceContents = str | bytes | Iterable[ReadResourceContents]
+ResourcePage = Tuple[list[types.Resource], Optional[str]]
+
+# 对外游标格式: "<scheme>:<provider cursor>"
+_CURSOR_SEPARATOR = ":"
 
 
 class ResourceProvider:
@@ -20,6 +24,12 @@ class ResourceProvider:
     async def list_resources(self, **kwargs) -> list[types.Resource]:
         pass
 
+    async def list_resources_page(
+        self, cursor: Optional[str] = None, **kwargs
+    ) -> ResourcePage:
+        """分页列出资源，默认一次性返回全部资源"""
+        return await self.list_resources(**kwargs), None
+
     @abstractmethod
     async def read_resource(self, uri: types.AnyUrl, **kwargs) -> ResourceContents:
         pass
@@ -39,6 +49,33 @@ async def list_resources(**kwargs) -> AsyncGenerator[types.Resource, None]:
     return
 
 
+async def list_resources_page(cursor: Optional[str] = None, **kwargs) -> ResourcePage:
+    """按游标分页列出资源，游标中记录当前所在的 provider"""
+    if len(_all_resource_providers) == 0:
+        return [], None
+
+    schemes = list(_all_resource_providers.keys())
+    scheme, provider_cursor = schemes[0], None
+    if cursor:
+        scheme, _, provider_cursor = cursor.partition(_CURSOR_SEPARATOR)
+        if scheme not in _all_resource_providers:
+            raise ValueError(f"Invalid cursor: {cursor}")
+
+    provider = _all_resource_providers[scheme]
+    resources, next_provider_cursor = await provider.list_resources_page(
+        cursor=provider_cursor or None, **kwargs
+    )
+
+    if next_provider_cursor:
+        return resources, f"{scheme}{_CURSOR_SEPARATOR}{next_provider_cursor}"
+
+    # 当前 provider 已列完，下一页从后续 provider 开始
+    index = schemes.index(scheme)
+    if index + 1 < len(schemes):
+        return resources, f"{schemes[index + 1]}{_CURSOR_SEPARATOR}"
+    return resources, None
+
+
 async def read_resource(uri: types.AnyUrl, **kwargs) -> ResourceContents:
     if len(_all_resource_providers) == 0:
         return ""
@@ -57,8 +94,10 @@ def register_resource_provider(provider: ResourceProvider):
 
 __all__ = [
     "ResourceContents",
+    "ResourcePage",
     "ResourceProvider",
     "list_resources",
+    "list_resources_page",
     "read_resource",
     "register_resource_provider",
 ]
@@ -1,14 +1,17 @@
 import asyncio
 import logging
+import os
 
 import anyio
 import click
 
-from . import application
 from .consts import consts
 from .session import session_manager
 from .context import current_session_id
-from .config.config import load_config_from_headers
+from .config.config import ALLOWED_ENDPOINTS_ENV, load_config_from_headers
+
+# mcp、Starlette 与存储 SDK 导入较慢，application 与传输相关模块在启动对应传输时才导入，
+# 使 --help 与命令行参数校验不需要加载它们
 
 # 配置日志
 logging.basicConfig(
@@ -24,84 +27,514 @@ SAMPLE_RESOURCES = {
 }
 
 
-@click.command()
-@click.option("--port", default=8000, help="Port to listen on for SSE")
-@click.option(
-    "--transport",
-    type=click.Choice(["stdio", "sse"]),
-    default="stdio",
-    help="Transport type",
-)
-def main(port: int, transport: str) -> int:
-    app = application.server
+# 多 worker 模式下通过环境变量把配置传递给各个 worker 进程
+TRANSPORT_ENV = "MUSIC_MCP_TRANSPORT"
+SESSION_STORE_ENV = "MUSIC_MCP_SESSION_STORE"
+IDLE_TIMEOUT_ENV = "MUSIC_MCP_IDLE_TIMEOUT"
+CATALOG_MEMORY_BUDGET_ENV = "MUSIC_MCP_CATALOG_MEMORY_BUDGET"
+SLOW_CALL_THRESHOLD_ENV = "MUSIC_MCP_SLOW_CALL_THRESHOLD"
+TOOL_WORKERS_ENV = "MUSIC_MCP_TOOL_WORKERS"
+TOOL_CONCURRENCY_ENV = "MUSIC_MCP_TOOL_CONCURRENCY"
+TENANT_CONCURRENCY_ENV = "MUSIC_MCP_TENANT_CONCURRENCY"
+# 逗号分隔的 access_key=weight 列表
+TENANT_WEIGHTS_ENV = "MUSIC_MCP_TENANT_WEIGHTS"
+# 逗号分隔的 operation_class=rate 列表
+STORAGE_RATE_LIMITS_ENV = "MUSIC_MCP_STORAGE_RATE_LIMITS"
+STORAGE_MAX_WAIT_ENV = "MUSIC_MCP_STORAGE_MAX_WAIT"
+BUCKET_CACHE_TTL_ENV = "MUSIC_MCP_BUCKET_CACHE_TTL"
+HOT_TRACKS_ENV = "MUSIC_MCP_HOT_TRACKS"
+DOMAIN_PROBE_INTERVAL_ENV = "MUSIC_MCP_DOMAIN_PROBE_INTERVAL"
+# 响应压缩阈值（字节），未设置时不压缩
+COMPRESSION_MIN_SIZE_ENV = "MUSIC_MCP_COMPRESSION_MIN_SIZE"
+# 与 OpenTelemetry SDK 使用相同的环境变量
+OTLP_ENDPOINT_ENV = "OTEL_EXPORTER_OTLP_ENDPOINT"
+
+
+def configure_tracing() -> None:
+    """根据环境变量配置慢调用阈值与 OTLP 导出"""
+    from .tracing import tracing
+
+    tracing.configure(
+        slow_call_threshold=float(os.environ[SLOW_CALL_THRESHOLD_ENV])
+        if SLOW_CALL_THRESHOLD_ENV in os.environ
+        else None,
+        otlp_endpoint=os.environ.get(OTLP_ENDPOINT_ENV),
+    )
+
+
+def configure_scheduler() -> None:
+    """根据环境变量配置工具线程池、并发上限与租户权重"""
+    from .tools.scheduler import scheduler
+
+    weights = {}
+    for item in os.environ.get(TENANT_WEIGHTS_ENV, "").split(","):
+        if item.strip():
+            access_key, _, weight = item.strip().rpartition("=")
+            weights[access_key] = float(weight)
 
-    if transport == "sse":
-        from mcp.server.sse import SseServerTransport
-        from starlette.applications import Starlette
-        from starlette.routing import Mount, Route
-        from starlette.requests import Request
-        from starlette.responses import JSONResponse
-
-        sse = SseServerTransport("/messages/")
-
-        async def handle_sse(request: Request):
-            # 从HTTP headers提取认证信息
-            headers = dict(request.headers)
-            config, error_msg = load_config_from_headers(headers)
-
-            if not config:
-                logger.error(f"Header validation failed: {error_msg}")
-                return JSONResponse(status_code=401, content={"error": error_msg})
-
-            # 创建会话并预加载音乐文件
-            session_id = await session_manager.create_session(
-                access_key=config.access_key,
-                secret_key=config.secret_key,
-                endpoint_url=config.endpoint_url,
-                region_name=config.region_name,
-                buckets=config.buckets,
+    def _int_env(name: str):
+        return int(os.environ[name]) if os.environ.get(name) else None
+
+    scheduler.configure(
+        max_workers=_int_env(TOOL_WORKERS_ENV),
+        max_concurrency=_int_env(TOOL_CONCURRENCY_ENV),
+        per_tenant_limit=_int_env(TENANT_CONCURRENCY_ENV),
+        weights=weights,
+    )
+
+
+def configure_storage() -> None:
+    """根据环境变量配置存储后端的限流速率、bucket 元数据缓存、热门曲目预签名与域名探测"""
+    from .core.storage.bucket_cache import bucket_cache
+    from .core.storage.domain_probe import domain_prober
+    from .core.storage.hot_tracks import hot_tracks
+    from .core.storage.rate_limit import rate_limiter
+
+    if os.environ.get(BUCKET_CACHE_TTL_ENV):
+        bucket_cache.ttl = float(os.environ[BUCKET_CACHE_TTL_ENV])
+    if os.environ.get(HOT_TRACKS_ENV):
+        hot_tracks.configure(hot_set_size=int(os.environ[HOT_TRACKS_ENV]))
+    if os.environ.get(DOMAIN_PROBE_INTERVAL_ENV):
+        domain_prober.interval = float(os.environ[DOMAIN_PROBE_INTERVAL_ENV])
+
+    rates = {}
+    for item in os.environ.get(STORAGE_RATE_LIMITS_ENV, "").split(","):
+        if item.strip():
+            operation_class, _, rate = item.strip().partition("=")
+            rates[operation_class] = float(rate)
+
+    rate_limiter.configure(
+        rates=rates,
+        max_wait=float(os.environ[STORAGE_MAX_WAIT_ENV])
+        if os.environ.get(STORAGE_MAX_WAIT_ENV)
+        else None,
+    )
+
+
+def _parse_storage_rate_limit(ctx, param, values):
+    """校验 --storage-rate-limit 取值为 CLASS=RATE"""
+    from .core.storage.rate_limit import DEFAULT_RATES
+
+    for value in values:
+        operation_class, _, rate = value.partition("=")
+        try:
+            valid = operation_class in DEFAULT_RATES and float(rate) > 0
+        except ValueError:
+            valid = False
+        if not valid:
+            raise click.BadParameter(
+                f"expected CLASS=RATE with CLASS in {sorted(DEFAULT_RATES)} "
+                f"and a positive rate, got {value!r}"
+            )
+    return values
+
+
+def _parse_tenant_weight(ctx, param, values):
+    """校验 --tenant-weight 取值为 ACCESS_KEY=WEIGHT"""
+    for value in values:
+        access_key, sep, weight = value.rpartition("=")
+        try:
+            valid = bool(sep and access_key) and float(weight) > 0
+        except ValueError:
+            valid = False
+        if not valid:
+            raise click.BadParameter(
+                f"expected ACCESS_KEY=WEIGHT with a positive weight, got {value!r}"
             )
+    return values
+
 
-            logger.info(f"Created session {session_id} for SSE connection")
+# SSE 连接心跳检查间隔（秒），检测到客户端断开后立即回收会话
+HEARTBEAT_INTERVAL = 15
 
+
+def create_starlette_app():
+    """创建 SSE 或 streamable HTTP 传输的 Starlette 应用，多 worker 模式下由每个 worker 进程调用"""
+    from contextlib import asynccontextmanager
+
+    from mcp.server.sse import SseServerTransport
+    from starlette.applications import Starlette
+    from starlette.middleware import Middleware
+    from starlette.routing import Mount, Route
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse, PlainTextResponse, Response
+
+    from . import application
+    from .core.storage import remote_fetch
+    from .core.storage.domain_probe import domain_prober
+    from .core.storage.hot_tracks import hot_tracks
+    from .metrics import metrics
+    from .tools.scheduler import scheduler
+    from .tracing import tracing
+    from .store.relay import SseMessageRelay
+    from .store.store import MEMORY_STORE_URL, create_store
+    from .transport.streamable_http import StreamableHttpTransport
+    from .transport.compression import CompressionMiddleware
+    from .transport.webhook import WEBHOOK_PATH, ObjectEventWebhook
+
+    app = application.server
+    store = create_store(os.environ.get(SESSION_STORE_ENV, MEMORY_STORE_URL))
+    session_manager.set_store(store)
+    session_manager.configure_limits(
+        idle_timeout=float(os.environ[IDLE_TIMEOUT_ENV])
+        if IDLE_TIMEOUT_ENV in os.environ
+        else None,
+        catalog_memory_budget=int(os.environ[CATALOG_MEMORY_BUDGET_ENV])
+        if CATALOG_MEMORY_BUDGET_ENV in os.environ
+        else None,
+    )
+
+    configure_tracing()
+    configure_scheduler()
+    configure_storage()
+
+    sse = SseServerTransport("/messages/")
+    relay = SseMessageRelay(sse, store)
+
+    class _SentResponse(Response):
+        """SSE 响应已经通过原始 send 发送完毕，结束时无需再发送"""
+
+        async def __call__(self, scope, receive, send) -> None:
+            return None
+
+    async def handle_sse(request: Request):
+        # 从HTTP headers提取认证信息
+        headers = dict(request.headers)
+        config, error_msg = load_config_from_headers(headers)
+
+        if not config:
+            logger.error(f"Header validation failed: {error_msg}")
+            return JSONResponse(status_code=401, content={"error": error_msg})
+
+        # 创建会话并预加载音乐文件
+        session_id = await session_manager.create_session(
+            access_key=config.access_key,
+            secret_key=config.secret_key,
+            endpoint_url=config.endpoint_url,
+            region_name=config.region_name,
+            buckets=config.buckets,
+        )
+
+        logger.info(f"Created session {session_id} for SSE connection")
+
+        async def heartbeat(cancel_scope: anyio.CancelScope):
+            # 客户端断开后 MCP 会话不会自行退出，需要主动检测并结束连接
+            while True:
+                await anyio.sleep(HEARTBEAT_INTERVAL)
+                if await request.is_disconnected():
+                    logger.info(f"SSE client of session {session_id} disconnected")
+                    cancel_scope.cancel()
+                    return
+
+        try:
+            # 先设置上下文变量，再建立和运行连接，确保后续回调都能读取到
+            token = current_session_id.set(session_id)
             try:
-                # 先设置上下文变量，再建立和运行连接，确保后续回调都能读取到
-                token = current_session_id.set(session_id)
-                try:
+                async with anyio.create_task_group() as tg:
+                    session_manager.register_closer(session_id, tg.cancel_scope.cancel)
+                    tg.start_soon(heartbeat, tg.cancel_scope)
                     async with sse.connect_sse(
                         request.scope, request.receive, request._send
                     ) as streams:
+                        # 立即登记连接，其他 worker 收到的消息才能转发过来
+                        await relay.sync_transports()
                         await app.run(
                             streams[0], streams[1], app.create_initialization_options()
                         )
-                finally:
-                    current_session_id.reset(token)
+                    tg.cancel_scope.cancel()
             finally:
-                # 清理会话
-                session_manager.remove_session(session_id)
-                logger.info(f"Cleaned up session {session_id}")
-
-        starlette_app = Starlette(
-            debug=True,
-            routes=[
-                Route("/sse", endpoint=handle_sse),
-                Mount("/messages/", app=sse.handle_post_message),
-            ],
+                current_session_id.reset(token)
+        finally:
+            # 清理会话
+            await session_manager.remove_session(session_id)
+            logger.info(f"Cleaned up session {session_id}")
+        return _SentResponse()
+
+    async def handle_metrics(_: Request):
+        return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+    streamable_http = os.environ.get(TRANSPORT_ENV) == "streamable-http"
+    if streamable_http:
+        routes = [
+            Route(
+                "/mcp",
+                endpoint=StreamableHttpTransport(app, session_manager),
+                methods=["GET", "POST", "DELETE"],
+            )
+        ]
+    else:
+        routes = [
+            Route("/sse", endpoint=handle_sse),
+            Mount("/messages/", app=relay.handle_post_message),
+        ]
+
+    @asynccontextmanager
+    async def lifespan(_: Starlette):
+        async with anyio.create_task_group() as tg:
+            if not streamable_http:
+                tg.start_soon(relay.run)
+            tg.start_soon(session_manager.run_reaper)
+            tg.start_soon(metrics.monitor_event_loop_lag)
+            tg.start_soon(hot_tracks.run_prefetcher)
+            tg.start_soon(domain_prober.run_prober)
+            # 在后台线程中预先注册业务工具，首个会话不必等待存储 SDK 导入
+            tg.start_soon(anyio.to_thread.run_sync, application.load_core)
+            try:
+                yield
+            finally:
+                tg.cancel_scope.cancel()
+                store.close()
+                scheduler.shutdown()
+                remote_fetch.shutdown()
+                tracing.shutdown()
+
+    middleware = []
+    if os.environ.get(COMPRESSION_MIN_SIZE_ENV):
+        middleware.append(
+            Middleware(
+                CompressionMiddleware,
+                minimum_size=int(os.environ[COMPRESSION_MIN_SIZE_ENV]),
+            )
         )
 
+    return Starlette(
+        debug=True,
+        middleware=middleware,
+        routes=routes
+        + [
+            Route("/metrics", endpoint=handle_metrics),
+            Route(
+                WEBHOOK_PATH,
+                endpoint=ObjectEventWebhook(session_manager),
+                methods=["POST"],
+            ),
+        ],
+        lifespan=lifespan,
+    )
+
+
+@click.command()
+@click.option(
+    "--port", default=8000, help="Port to listen on for SSE or streamable HTTP"
+)
+@click.option(
+    "--transport",
+    type=click.Choice(["stdio", "sse", "streamable-http"]),
+    default="stdio",
+    help="Transport type",
+)
+@click.option(
+    "--workers",
+    default=1,
+    type=click.IntRange(min=1),
+    help="Number of worker processes for SSE or streamable HTTP, "
+    "SSE requires a shared session store",
+)
+@click.option(
+    "--session-store",
+    default="memory",
+    help='Session store url: "memory" or "sqlite:///path/to/store.db"',
+)
+@click.option(
+    "--idle-timeout",
+    default=30 * 60,
+    type=click.FloatRange(min=1),
+    help="Seconds without client requests before a session is reaped",
+)
+@click.option(
+    "--catalog-memory-budget",
+    default=512,
+    type=click.IntRange(min=1),
+    help="Memory budget in MiB for cached music catalogs, LRU evicted beyond it",
+)
+@click.option(
+    "--slow-call-threshold",
+    default=1.0,
+    type=click.FloatRange(min=0),
+    help="Seconds after which a tool call is logged with a timing breakdown",
+)
+@click.option(
+    "--otlp-endpoint",
+    default=None,
+    help="OTLP/HTTP collector url for span export, e.g. http://localhost:4318",
+)
+@click.option(
+    "--tool-workers",
+    default=None,
+    type=click.IntRange(min=1),
+    help="Threads dedicated to sync tools, defaults to min(32, cpu_count + 4)",
+)
+@click.option(
+    "--tool-concurrency",
+    default=None,
+    type=click.IntRange(min=1),
+    help="Tool calls executing at the same time, defaults to 64; "
+    "sync tools are further capped by --tool-workers",
+)
+@click.option(
+    "--tenant-concurrency",
+    default=8,
+    type=click.IntRange(min=1),
+    help="Tool calls a single tenant may execute at the same time",
+)
+@click.option(
+    "--tenant-weight",
+    multiple=True,
+    callback=_parse_tenant_weight,
+    help="Fair queuing weight as ACCESS_KEY=WEIGHT, may be repeated, default 1",
+)
+@click.option(
+    "--storage-rate-limit",
+    multiple=True,
+    callback=_parse_storage_rate_limit,
+    help="Storage calls per second per tenant as CLASS=RATE for list, read or write, "
+    "may be repeated, defaults to list=20 read=50 write=10",
+)
+@click.option(
+    "--storage-max-wait",
+    default=30.0,
+    type=click.FloatRange(min=0),
+    help="Seconds a storage call may wait for the rate limiter before it is rejected",
+)
+@click.option(
+    "--allowed-endpoint",
+    multiple=True,
+    help="S3 endpoint clients may select with the X-ENDPOINT-URL header "
+    '(repeatable, "*" allows any); the header is ignored when none is given',
+)
+@click.option(
+    "--bucket-cache-ttl",
+    default=300.0,
+    type=click.FloatRange(min=0),
+    help="Seconds ListBuckets results and verified buckets are cached per credential, "
+    "0 disables the cache",
+)
+@click.option(
+    "--hot-tracks",
+    default=200,
+    type=click.IntRange(min=0),
+    help="Most played tracks per tenant whose play URLs are signed ahead of expiry, "
+    "0 disables pre-signing",
+)
+@click.option(
+    "--compression/--no-compression",
+    default=True,
+    help="Compress SSE streams and HTTP responses with gzip, or brotli/zstd "
+    "when installed, as negotiated by Accept-Encoding",
+)
+@click.option(
+    "--compression-min-size",
+    default=1024,
+    type=click.IntRange(min=0),
+    help="Smallest non-streaming response body in bytes that is compressed",
+)
+@click.option(
+    "--domain-probe-interval",
+    default=30.0,
+    type=click.FloatRange(min=0),
+    help="Seconds between latency probes of each download domain used to order "
+    "play URLs, 0 disables probing",
+)
+def main(
+    port: int,
+    transport: str,
+    workers: int,
+    session_store: str,
+    idle_timeout: float,
+    catalog_memory_budget: int,
+    slow_call_threshold: float,
+    otlp_endpoint: str | None,
+    tool_workers: int | None,
+    tool_concurrency: int | None,
+    tenant_concurrency: int,
+    tenant_weight: tuple[str, ...],
+    storage_rate_limit: tuple[str, ...],
+    storage_max_wait: float,
+    allowed_endpoint: tuple[str, ...],
+    bucket_cache_ttl: float,
+    hot_tracks: int,
+    compression: bool,
+    compression_min_size: int,
+    domain_probe_interval: float,
+) -> int:
+    if tool_workers:
+        os.environ[TOOL_WORKERS_ENV] = str(tool_workers)
+    if tool_concurrency:
+        os.environ[TOOL_CONCURRENCY_ENV] = str(tool_concurrency)
+    os.environ[TENANT_CONCURRENCY_ENV] = str(tenant_concurrency)
+    if tenant_weight:
+        os.environ[TENANT_WEIGHTS_ENV] = ",".join(tenant_weight)
+    if storage_rate_limit:
+        os.environ[STORAGE_RATE_LIMITS_ENV] = ",".join(storage_rate_limit)
+    os.environ[STORAGE_MAX_WAIT_ENV] = str(storage_max_wait)
+    os.environ[BUCKET_CACHE_TTL_ENV] = str(bucket_cache_ttl)
+    if allowed_endpoint:
+        os.environ[ALLOWED_ENDPOINTS_ENV] = ",".join(allowed_endpoint)
+    os.environ[HOT_TRACKS_ENV] = str(hot_tracks)
+    os.environ[DOMAIN_PROBE_INTERVAL_ENV] = str(domain_probe_interval)
+
+    os.environ[SLOW_CALL_THRESHOLD_ENV] = str(slow_call_threshold)
+    if otlp_endpoint:
+        os.environ[OTLP_ENDPOINT_ENV] = otlp_endpoint
+
+    if transport in ("sse", "streamable-http"):
         import uvicorn
 
-        uvicorn.run(starlette_app, host="0.0.0.0", port=port)
+        from .store.store import MEMORY_STORE_URL
+
+        # streamable HTTP 会话可以根据请求头在任意 worker 上重建，无需共享存储
+        if transport == "sse" and workers > 1 and session_store == MEMORY_STORE_URL:
+            raise click.BadParameter(
+                "multiple workers require a shared session store, e.g. sqlite:///tmp/music-mcp.db",
+                param_hint="--session-store",
+            )
+
+        os.environ[TRANSPORT_ENV] = transport
+        os.environ[SESSION_STORE_ENV] = session_store
+        os.environ[IDLE_TIMEOUT_ENV] = str(idle_timeout)
+        os.environ[CATALOG_MEMORY_BUDGET_ENV] = str(catalog_memory_budget * 1024 * 1024)
+        if compression:
+            os.environ[COMPRESSION_MIN_SIZE_ENV] = str(compression_min_size)
+        if workers > 1:
+            uvicorn.run(
+                "mcp_server.server:create_starlette_app",
+                factory=True,
+                host="0.0.0.0",
+                port=port,
+                workers=workers,
+            )
+        else:
+            uvicorn.run(create_starlette_app(), host="0.0.0.0", port=port)
     else:
         from mcp.server.stdio import stdio_server
 
+        from . import application
+        from .core.storage import remote_fetch
+        from .core.storage.domain_probe import domain_prober
+        from .core.storage.hot_tracks import hot_tracks as hot_track_stats
+        from .tools.scheduler import scheduler
+        from .tracing import tracing
+
+        configure_tracing()
+        configure_scheduler()
+        configure_storage()
+
+        app = application.server
+
         async def arun():
-            async with stdio_server() as streams:
-                await app.run(
-                    streams[0], streams[1], app.create_initialization_options()
-                )
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(hot_track_stats.run_prefetcher)
+                tg.start_soon(domain_prober.run_prober)
+                async with stdio_server() as streams:
+                    await app.run(
+                        streams[0], streams[1], app.create_initialization_options()
+                    )
+                tg.cancel_scope.cancel()
 
         anyio.run(arun)
+        scheduler.shutdown()
+        remote_fetch.shutdown()
+        tracing.shutdown()
 
     return 0
 
@@ -1,13 +1,26 @@
+import asyncio
+import hmac
 import logging
+import time
 import uuid
-from typing import Dict, Optional
-from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from dataclasses import asdict, dataclass
 from contextlib import asynccontextmanager
 
 from .consts import consts
+from .store.store import MemorySessionStore, SessionStore
 
 logger = logging.getLogger(consts.LOGGER_NAME)
 
+# 会话空闲超时时间（秒），超时未收到客户端请求的会话会被回收
+DEFAULT_IDLE_TIMEOUT = 30 * 60
+# 空闲会话回收检查间隔（秒）
+DEFAULT_REAP_INTERVAL = 60
+# 共享存储中会话活动时间的写入间隔为空闲超时的 1/STORE_TOUCH_FRACTION
+STORE_TOUCH_FRACTION = 4
+# 共享存储中的会话在所有进程空闲超过 STORE_PURGE_FACTOR 倍超时后删除
+STORE_PURGE_FACTOR = 2
+
 
 @dataclass
 class SessionConfig:
@@ -20,13 +33,48 @@ class SessionConfig:
     buckets: list[str]
     session_id: str
 
+    def matches_credentials(self, access_key: str, secret_key: str) -> bool:
+        """请求携带的凭证是否与会话一致"""
+        return self.access_key == access_key and hmac.compare_digest(
+            self.secret_key, secret_key
+        )
+
 
 class SessionManager:
     """会话管理器，管理所有活跃的SSE连接会话"""
 
-    def __init__(self):
+    def __init__(self, store: Optional[SessionStore] = None):
         self._sessions: Dict[str, SessionConfig] = {}
+        # access key -> 本进程中使用该凭证的会话ID
+        self._access_key_index: Dict[str, Set[str]] = {}
+        self._store: SessionStore = store or MemorySessionStore()
         self._music_cache = None  # 延迟初始化的音乐缓存实例
+        # 会话最近一次活动时间（time.monotonic）
+        self._last_seen: Dict[str, float] = {}
+        # 会话对应连接的关闭回调，由传输层注册
+        self._closers: Dict[str, Callable[[], None]] = {}
+        # 会话离开本进程时的回调，用于释放按会话或租户保存的状态
+        self._release_callbacks: List[Callable[[str], None]] = []
+        # 最近一次把活动时间写入共享存储的时间（time.monotonic）
+        self._store_touched: Dict[str, float] = {}
+        self.idle_timeout: float = DEFAULT_IDLE_TIMEOUT
+        self.reaped_sessions = 0
+
+    @property
+    def store(self) -> SessionStore:
+        """会话与目录存储后端"""
+        return self._store
+
+    @property
+    def active_sessions(self) -> int:
+        """本进程中持有连接的会话数量"""
+        return len(self._sessions)
+
+    def set_store(self, store: SessionStore) -> None:
+        """切换会话与目录存储后端，需在创建会话之前调用"""
+        self._store = store
+        if self._music_cache is not None:
+            self._music_cache.store = store
 
     async def create_session(
         self,
@@ -35,9 +83,14 @@ class SessionManager:
         endpoint_url: str,
         region_name: str,
         buckets: list[str],
+        session_id: Optional[str] = None,
     ) -> str:
-        """创建新的会话并预加载音乐文件"""
-        session_id = str(uuid.uuid4())
+        """创建新的会话并预加载音乐文件
+
+        Args:
+            session_id: 指定会话ID，用于在其他进程中恢复无连接的会话，默认生成新ID
+        """
+        session_id = session_id or str(uuid.uuid4())
         session_config = SessionConfig(
             access_key=access_key,
             secret_key=secret_key,
@@ -47,7 +100,12 @@ class SessionManager:
             session_id=session_id,
         )
 
-        self._sessions[session_id] = session_config
+        self._add_session(session_config)
+        self._last_seen[session_id] = time.monotonic()
+        # SQLite 等共享存储的读写会阻塞，放到线程中执行
+        await asyncio.to_thread(
+            self._store.put_session, session_id, asdict(session_config)
+        )
         logger.info(f"Created session {session_id} for access_key: {access_key}")
 
         # 预加载音乐文件
@@ -58,31 +116,269 @@ class SessionManager:
             logger.error(f"Failed to preload music files for session {session_id}: {e}")
         return session_id
 
-    def get_session(self, session_id: str) -> Optional[SessionConfig]:
-        """获取会话配置"""
+    def get_cached_session(self, session_id: str) -> Optional[SessionConfig]:
+        """获取本进程中的会话配置，不访问共享存储，可在同步代码中调用"""
         return self._sessions.get(session_id)
 
-    def remove_session(self, session_id: str) -> bool:
+    async def get_session(self, session_id: str) -> Optional[SessionConfig]:
+        """获取会话配置，本进程未缓存时从共享存储中加载"""
+        session_config = self._sessions.get(session_id)
+        if session_config is None and self._store.shared:
+            data = await asyncio.to_thread(self._store.get_session, session_id)
+            if data is not None:
+                # 读取期间其他协程可能已经加载了同一会话
+                session_config = self._sessions.get(session_id) or self._add_session(
+                    SessionConfig(**data)
+                )
+        return session_config
+
+    async def find_sessions(self, access_key: str) -> List[Tuple[str, SessionConfig]]:
+        """查找使用指定 access key 的会话
+
+        本进程中的会话从内存索引中查找；使用共享存储时，
+        再按 access key 索引查询其他进程创建的会话，耗时与匹配的会话数量有关。
+
+        Returns:
+            (会话ID, 会话配置) 列表
+        """
+        found = {
+            session_id: self._sessions[session_id]
+            for session_id in self._access_key_index.get(access_key, ())
+        }
+        if self._store.shared:
+            rows = await asyncio.to_thread(self._store.find_sessions, access_key)
+            for session_id, data in rows:
+                if session_id not in found:
+                    found[session_id] = self._sessions.get(
+                        session_id
+                    ) or self._add_session(SessionConfig(**data))
+        return list(found.items())
+
+    def _add_session(self, session_config: SessionConfig) -> SessionConfig:
+        """加入本进程的会话并建立 access key 索引，替换同一ID的已有会话"""
+        session_id = session_config.session_id
+        self._pop_session(session_id)
+        self._sessions[session_id] = session_config
+        self._access_key_index.setdefault(session_config.access_key, set()).add(
+            session_id
+        )
+        return session_config
+
+    def _pop_session(self, session_id: str) -> Optional[SessionConfig]:
+        session_config = self._sessions.pop(session_id, None)
+        if session_config is not None:
+            session_ids = self._access_key_index.get(session_config.access_key)
+            if session_ids is not None:
+                session_ids.discard(session_id)
+                if not session_ids:
+                    del self._access_key_index[session_config.access_key]
+        return session_config
+
+    async def ensure_session(
+        self,
+        session_id: str,
+        access_key: str,
+        secret_key: str,
+        endpoint_url: str,
+        region_name: str,
+        buckets: list[str],
+    ) -> SessionConfig:
+        """按请求携带的租户配置获取会话，本进程与共享存储中都不存在时以同一ID重建
+
+        无连接的传输（streamable HTTP）每个请求都可能落到不同的进程上，
+        会话只是目录快照的句柄，可以根据请求头随时恢复。
+
+        Raises:
+            PermissionError: 会话属于其他凭证
+        """
+        session_config = await self.get_session(session_id)
+        if session_config is None:
+            await self.create_session(
+                access_key,
+                secret_key,
+                endpoint_url,
+                region_name,
+                buckets,
+                session_id=session_id,
+            )
+            return self._sessions[session_id]
+
+        if not session_config.matches_credentials(access_key, secret_key):
+            raise PermissionError(f"Session {session_id} belongs to other credentials")
+
+        if (
+            session_config.endpoint_url != endpoint_url
+            or session_config.region_name != region_name
+            or session_config.buckets != buckets
+        ):
+            # 租户配置以请求头为准，变化后重新加载目录
+            logger.info(f"Configuration of session {session_id} changed, reloading")
+            await self.remove_session(session_id)
+            await self.create_session(
+                access_key,
+                secret_key,
+                endpoint_url,
+                region_name,
+                buckets,
+                session_id=session_id,
+            )
+            return self._sessions[session_id]
+
+        self._last_seen.setdefault(session_id, time.monotonic())
+        return session_config
+
+    def touch(self, session_id: Optional[str]) -> None:
+        """记录会话活动，推迟空闲回收"""
+        if session_id not in self._last_seen:
+            return
+        now = time.monotonic()
+        self._last_seen[session_id] = now
+        if self._store.shared:
+            # 其他进程据此判断会话是否仍然活跃，按空闲超时的一小部分节流写入
+            touched = self._store_touched.get(session_id, 0.0)
+            if now - touched > self.idle_timeout / STORE_TOUCH_FRACTION:
+                self._store_touched[session_id] = now
+                try:
+                    loop = asyncio.get_running_loop()
+                except RuntimeError:
+                    self._store.touch_session(session_id)
+                else:
+                    # 在线程中写入，不阻塞事件循环
+                    loop.run_in_executor(None, self._store.touch_session, session_id)
+
+    def register_closer(self, session_id: str, closer: Callable[[], None]) -> None:
+        """注册关闭会话连接的回调，空闲回收时调用"""
+        self._closers[session_id] = closer
+
+    def register_release_callback(self, callback: Callable[[str], None]) -> None:
+        """注册会话离开本进程（移除、回收或从共享存储中清除）时的回调
+
+        Args:
+            callback: 以会话ID调用的函数
+        """
+        self._release_callbacks.append(callback)
+
+    def _notify_released(self, session_id: str) -> None:
+        for callback in self._release_callbacks:
+            try:
+                callback(session_id)
+            except Exception as e:
+                logger.error(f"Release callback failed for session {session_id}: {e}")
+
+    def reap_idle_sessions(self, now: Optional[float] = None) -> list[str]:
+        """回收空闲超时的会话
+
+        有连接的会话通过关闭回调断开连接，由传输层负责移除；
+        没有连接的会话直接移除。使用共享存储时，没有连接的会话可能仍在其他进程中活跃，
+        只释放本进程的状态，存储中的记录在所有进程都空闲超时后才删除。
+
+        Args:
+            now: 当前时间（time.monotonic），默认取当前值
+
+        Returns:
+            被回收的会话ID列表
+        """
+        now = time.monotonic() if now is None else now
+        idle = [
+            session_id
+            for session_id, last_seen in self._last_seen.items()
+            if now - last_seen > self.idle_timeout
+        ]
+        for session_id in idle:
+            logger.warning(
+                f"Reaping session {session_id} idle for {now - self._last_seen[session_id]:.0f}s"
+            )
+            self._last_seen.pop(session_id, None)
+            closer = self._closers.pop(session_id, None)
+            if closer is not None:
+                closer()
+            elif self._store.shared:
+                self._release_session(session_id)
+            else:
+                # 进程内存储不涉及 I/O，可以直接删除
+                self._release_session(session_id)
+                self._store.delete_session(session_id)
+            self.reaped_sessions += 1
+        return idle
+
+    async def purge_store(self) -> list[str]:
+        """删除共享存储中在所有进程都空闲超时的会话，并释放其在本进程中的状态
+
+        Returns:
+            被删除的会话ID列表
+        """
+        if not self._store.shared:
+            return []
+        purged = await asyncio.to_thread(
+            self._store.purge_idle_sessions, self.idle_timeout * STORE_PURGE_FACTOR
+        )
+        for session_id in purged:
+            logger.info(f"Purged session {session_id} idle in all workers")
+            self._release_session(session_id)
+        return purged
+
+    def _release_session(self, session_id: str) -> None:
+        """只释放本进程中的会话状态，保留共享存储中的记录"""
+        self._last_seen.pop(session_id, None)
+        self._closers.pop(session_id, None)
+        self._store_touched.pop(session_id, None)
+        self._pop_session(session_id)
+        if self._music_cache is not None:
+            self._music_cache.clear_session_cache(session_id)
+        self._notify_released(session_id)
+
+    async def run_reaper(self, interval: float = DEFAULT_REAP_INTERVAL) -> None:
+        """定期回收空闲会话"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.reap_idle_sessions()
+                await self.purge_store()
+            except Exception as e:
+                logger.error(f"Failed to reap idle sessions: {e}")
+
+    async def remove_session(self, session_id: str) -> bool:
         """移除会话"""
-        if session_id in self._sessions:
-            del self._sessions[session_id]
+        self._last_seen.pop(session_id, None)
+        self._closers.pop(session_id, None)
+        self._store_touched.pop(session_id, None)
+        removed = self._pop_session(session_id) is not None
+        deleted = await asyncio.to_thread(self._store.delete_session, session_id)
+        removed = deleted or removed
+        if removed:
             # 清理对应的音乐缓存
             if self._music_cache is not None:
                 self._music_cache.clear_session_cache(session_id)
+            self._notify_released(session_id)
             logger.info(f"Removed session {session_id} and cleared its music cache")
-            return True
-        return False
+        return removed
 
     def list_sessions(self) -> list[str]:
         """列出所有活跃会话ID"""
-        return list(self._sessions.keys())
+        return self._store.list_sessions()
+
+    def configure_limits(
+        self,
+        idle_timeout: Optional[float] = None,
+        catalog_memory_budget: Optional[int] = None,
+    ) -> None:
+        """设置会话空闲超时与目录内存预算
+
+        Args:
+            idle_timeout: 会话空闲超时时间（秒）
+            catalog_memory_budget: 所有会话目录快照的内存预算（字节）
+        """
+        if idle_timeout is not None:
+            self.idle_timeout = idle_timeout
+        if catalog_memory_budget is not None:
+            self.get_music_cache().max_catalog_bytes = catalog_memory_budget
 
     def get_music_cache(self):
         """获取全局共享的音乐缓存实例"""
         if self._music_cache is None:
             from .core.storage.music_cache import MusicCache
 
-            self._music_cache = MusicCache()
+            self._music_cache = MusicCache(store=self._store)
         return self._music_cache
 
 
@@ -95,7 +391,7 @@ async def get_session_context(session_id: str | None):
     """获取会话上下文的异步上下文管理器。必须提供有效的 session_id。"""
     if not session_id:
         raise ValueError("Missing session_id in request context")
-    session_config = session_manager.get_session(session_id)
+    session_config = await session_manager.get_session(session_id)
     if not session_config:
         raise ValueError(f"Session {session_id} not found")
 
@@ -0,0 +1,159 @@
+"""SSE 消息转发模块
+
+多 worker 部署时，客户端的 /messages/ POST 可能落到没有持有该 SSE 连接的进程上。
+此时消息会写入共享存储，由持有连接的进程轮询取出后投递给本地的 MCP 会话。
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Set
+from uuid import UUID
+
+import anyio
+import mcp.types as types
+from mcp.server.sse import SseServerTransport
+from pydantic import ValidationError
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from .store import TRANSPORT_TTL, SessionStore
+from ..consts import consts
+
+logger = logging.getLogger(consts.LOGGER_NAME)
+
+# 轮询共享存储的间隔（秒）
+DEFAULT_POLL_INTERVAL = 0.02
+
+# 连接刚建立时可能尚未登记，等待登记的最长时间（秒）
+TRANSPORT_REGISTER_GRACE = 1.0
+
+# 重新登记本进程全部连接的间隔（秒），需明显小于登记有效期
+TRANSPORT_HEARTBEAT_INTERVAL = TRANSPORT_TTL / 4
+
+
+class SseMessageRelay:
+    """在多个 worker 进程之间转发 SSE 会话的客户端消息"""
+
+    def __init__(
+        self,
+        sse: SseServerTransport,
+        store: SessionStore,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+    ) -> None:
+        self.sse = sse
+        self.store = store
+        self.poll_interval = poll_interval
+        self._registered: Set[str] = set()
+        # 最近一次重新登记全部连接的时间（anyio.current_time）
+        self._heartbeat_at = 0.0
+
+    def _stream_writers(self) -> Dict[UUID, Any]:
+        """本进程 SSE 连接的消息写入流
+
+        MCP 没有公开按会话投递消息的接口，这里依赖 SseServerTransport 的私有属性，
+        tests/test_relay.py 覆盖了这一依赖，升级 mcp 时需要确认其仍然成立。
+        """
+        return self.sse._read_stream_writers
+
+    def _local_transports(self) -> Set[str]:
+        return {session_id.hex for session_id in self._stream_writers()}
+
+    async def sync_transports(self) -> None:
+        """将本进程持有的 SSE 连接同步到共享存储，并定期刷新登记时间"""
+        local = self._local_transports()
+        added = local - self._registered
+        removed = self._registered - local
+        now = anyio.current_time()
+        if local and now - self._heartbeat_at >= TRANSPORT_HEARTBEAT_INTERVAL:
+            added = local
+            self._heartbeat_at = now
+        if added:
+            await asyncio.to_thread(self.store.register_transports, added)
+        if removed:
+            await asyncio.to_thread(self.store.unregister_transports, removed)
+        self._registered = local
+
+    async def _wait_for_transport(self, transport_id: str) -> bool:
+        deadline = anyio.current_time() + TRANSPORT_REGISTER_GRACE
+        while True:
+            if await asyncio.to_thread(self.store.has_transport, transport_id):
+                return True
+            if anyio.current_time() >= deadline:
+                return False
+            await anyio.sleep(self.poll_interval)
+
+    async def handle_post_message(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        """处理客户端 POST 消息，连接不在本进程时写入共享存储"""
+        request = Request(scope, receive)
+        session_id_param = request.query_params.get("session_id")
+
+        is_local = False
+        if session_id_param:
+            try:
+                is_local = UUID(hex=session_id_param) in self._stream_writers()
+            except ValueError:
+                pass
+
+        # 本进程持有的连接、格式错误的请求以及非共享存储均交给 MCP 原生处理
+        if is_local or not session_id_param or not self.store.shared:
+            return await self.sse.handle_post_message(scope, receive, send)
+
+        if not await self._wait_for_transport(session_id_param):
+            return await self.sse.handle_post_message(scope, receive, send)
+
+        body = await request.body()
+        try:
+            types.JSONRPCMessage.model_validate_json(body)
+        except ValidationError as err:
+            logger.error(f"Failed to parse relayed message: {err}")
+            response = Response("Could not parse message", status_code=400)
+            return await response(scope, receive, send)
+
+        await asyncio.to_thread(
+            self.store.enqueue_message, session_id_param, body.decode("utf-8")
+        )
+        logger.debug(f"Relayed message for SSE session {session_id_param}")
+        response = Response("Accepted", status_code=202)
+        await response(scope, receive, send)
+
+    async def _deliver(self, transport_id: str, payload: str) -> None:
+        session_id = UUID(hex=transport_id)
+        writer = self._stream_writers().get(session_id)
+        if writer is None:
+            return
+
+        message = types.JSONRPCMessage.model_validate_json(payload)
+        try:
+            await writer.send(message)
+        except (anyio.ClosedResourceError, anyio.BrokenResourceError):
+            # 连接已关闭，不再登记
+            self._stream_writers().pop(session_id, None)
+
+    async def run(self) -> None:
+        """持续同步连接登记并投递其他进程转发的消息"""
+        if not self.store.shared:
+            return
+
+        logger.info("Starting SSE message relay")
+        try:
+            while True:
+                await self.sync_transports()
+                if self._registered:
+                    messages = await asyncio.to_thread(
+                        self.store.dequeue_messages, list(self._registered)
+                    )
+                    for transport_id, payload in messages:
+                        try:
+                            await self._deliver(transport_id, payload)
+                        except Exception as e:
+                            logger.error(
+                                f"Failed to deliver relayed message to {transport_id}: {e}"
+                            )
+                await anyio.sleep(self.poll_interval)
+        finally:
+            if self._registered:
+                self.store.unregister_transports(self._registered)
+                self._registered = set()
@@ -0,0 +1,596 @@
+"""会话与目录存储模块
+
+提供可插拔的会话/目录存储后端：
+- MemorySessionStore: 进程内存储，仅适用于单进程
+- SqliteSessionStore: 基于 SQLite WAL 模式的本机共享存储，多个 worker 进程可共享会话、
+  目录快照、SSE 消息转发队列以及对象事件请求的一次性随机数
+
+SQLite 存储中的会话配置包含明文 secret key（其他 worker 需要用它访问存储与签名），
+数据库及其 WAL 文件只允许运行服务的用户读写，新建的目录只允许该用户访问。
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..consts import consts
+
+logger = logging.getLogger(consts.LOGGER_NAME)
+
+# 存储地址格式: "memory" 或 "sqlite:///path/to/store.db"
+MEMORY_STORE_URL = "memory"
+SQLITE_STORE_SCHEME = "sqlite://"
+
+# SQLite 写锁等待时间（秒）
+SQLITE_BUSY_TIMEOUT = 5.0
+# 数据库文件与新建目录的权限
+SQLITE_FILE_MODE = 0o600
+SQLITE_DIRECTORY_MODE = 0o700
+# WAL 模式下与数据库一起创建的文件
+SQLITE_SIDE_FILES = ("-wal", "-shm")
+
+# 目录快照之后累积的增量修改超过该数量时，由调用方重新写入完整快照
+CATALOG_COMPACT_CHANGES = 10_000
+
+# SSE 连接登记的有效期（秒），持有连接的进程需在此之前重新登记，
+# 进程崩溃后其连接在有效期过后不再接收转发的消息
+TRANSPORT_TTL = 60.0
+
+
+class SessionStore(ABC):
+    """会话与目录存储后端"""
+
+    # 是否可在多个进程之间共享
+    shared: bool = False
+
+    @abstractmethod
+    def put_session(self, session_id: str, data: Dict[str, Any]) -> None:
+        """保存会话配置"""
+
+    @abstractmethod
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """获取会话配置，不存在时返回None"""
+
+    @abstractmethod
+    def delete_session(self, session_id: str) -> bool:
+        """删除会话配置及其目录快照"""
+
+    @abstractmethod
+    def list_sessions(self) -> List[str]:
+        """列出所有会话ID"""
+
+    @abstractmethod
+    def put_catalog(
+        self, session_id: str, version: int, music_files: List[Dict[str, Any]]
+    ) -> None:
+        """保存会话的目录快照"""
+
+    @abstractmethod
+    def put_catalog_changes(
+        self,
+        session_id: str,
+        version: int,
+        upserts: List[Dict[str, Any]],
+        removals: List[Tuple[str, str]],
+    ) -> Optional[int]:
+        """在目录快照上追加增量修改并更新快照版本，写入量只与修改数量有关
+
+        Args:
+            session_id: 会话ID
+            version: 修改之后的目录版本
+            upserts: 新增或替换的音乐文件，带有 Bucket 字段
+            removals: 移除的 (bucket, key)
+
+        Returns:
+            快照之后累积的修改数量，超过 CATALOG_COMPACT_CHANGES 时应重新写入完整快照；
+            目录快照不存在时不写入，返回None
+        """
+
+    @abstractmethod
+    def get_catalog(
+        self, session_id: str
+    ) -> Optional[Tuple[int, List[Dict[str, Any]]]]:
+        """获取会话的目录快照 (版本, 音乐文件列表)，已合并快照之后的增量修改，不存在时返回None"""
+
+    @abstractmethod
+    def get_catalog_version(self, session_id: str) -> Optional[int]:
+        """获取会话目录快照的版本，不存在时返回None"""
+
+    @abstractmethod
+    def register_transports(self, transport_ids: Iterable[str]) -> None:
+        """登记当前进程持有的 SSE 连接，已登记的连接刷新登记时间"""
+
+    @abstractmethod
+    def unregister_transports(self, transport_ids: Iterable[str]) -> None:
+        """注销 SSE 连接"""
+
+    @abstractmethod
+    def has_transport(self, transport_id: str) -> bool:
+        """SSE 连接是否由某个进程持有"""
+
+    @abstractmethod
+    def enqueue_message(self, transport_id: str, payload: str) -> None:
+        """为其他进程持有的 SSE 连接投递一条客户端消息"""
+
+    @abstractmethod
+    def dequeue_messages(self, transport_ids: Iterable[str]) -> List[Tuple[str, str]]:
+        """取出投递给指定 SSE 连接的消息 [(连接ID, 消息内容)]"""
+
+    def find_sessions(self, access_key: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """按 access key 查找共享存储中的会话 [(会话ID, 会话配置)]，
+        进程内存储由会话管理器的内存索引查找，返回空列表"""
+        return []
+
+    def touch_session(self, session_id: str) -> None:
+        """记录会话在任意进程中的最近活动时间"""
+
+    def add_nonce(self, access_key: str, nonce: str, expires_at: float) -> bool:
+        """在所有进程之间记住对象事件请求的随机数，进程内存储由 NonceCache 记住，返回 True
+
+        Args:
+            access_key: 签名请求的 access key
+            nonce: 请求携带的随机数
+            expires_at: 随机数的过期时间（Unix 时间戳，秒）
+
+        Returns:
+            随机数没有出现过或已经过期时返回 True，任意进程在有效期内见过时返回 False
+        """
+        return True
+
+    def purge_idle_sessions(self, max_idle: float) -> List[str]:
+        """删除所有进程中都已空闲超过 max_idle 秒的会话及其目录快照，
+        同时删除超过 TRANSPORT_TTL 未重新登记的 SSE 连接及其待投递的消息，以及过期的随机数"""
+        return []
+
+    def close(self) -> None:
+        """释放存储资源"""
+
+
+class MemorySessionStore(SessionStore):
+    """进程内会话存储"""
+
+    def __init__(self) -> None:
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._catalogs: Dict[str, Tuple[int, List[Dict[str, Any]]]] = {}
+        self._transports: Set[str] = set()
+        self._messages: Dict[str, List[str]] = {}
+
+    def put_session(self, session_id: str, data: Dict[str, Any]) -> None:
+        self._sessions[session_id] = dict(data)
+
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        data = self._sessions.get(session_id)
+        return dict(data) if data is not None else None
+
+    def delete_session(self, session_id: str) -> bool:
+        self._catalogs.pop(session_id, None)
+        return self._sessions.pop(session_id, None) is not None
+
+    def list_sessions(self) -> List[str]:
+        return list(self._sessions.keys())
+
+    def put_catalog(
+        self, session_id: str, version: int, music_files: List[Dict[str, Any]]
+    ) -> None:
+        self._catalogs[session_id] = (version, music_files)
+
+    def put_catalog_changes(
+        self,
+        session_id: str,
+        version: int,
+        upserts: List[Dict[str, Any]],
+        removals: List[Tuple[str, str]],
+    ) -> Optional[int]:
+        catalog = self._catalogs.get(session_id)
+        if catalog is None:
+            return None
+        music_files = _merge_catalog_changes(
+            catalog[1],
+            [(obj["Bucket"], obj["Key"], obj) for obj in upserts]
+            + [(bucket, key, None) for bucket, key in removals],
+        )
+        self._catalogs[session_id] = (version, music_files)
+        return 0
+
+    def get_catalog(
+        self, session_id: str
+    ) -> Optional[Tuple[int, List[Dict[str, Any]]]]:
+        return self._catalogs.get(session_id)
+
+    def get_catalog_version(self, session_id: str) -> Optional[int]:
+        catalog = self._catalogs.get(session_id)
+        return catalog[0] if catalog is not None else None
+
+    def register_transports(self, transport_ids: Iterable[str]) -> None:
+        self._transports.update(transport_ids)
+
+    def unregister_transports(self, transport_ids: Iterable[str]) -> None:
+        for transport_id in transport_ids:
+            self._transports.discard(transport_id)
+            self._messages.pop(transport_id, None)
+
+    def has_transport(self, transport_id: str) -> bool:
+        return transport_id in self._transports
+
+    def enqueue_message(self, transport_id: str, payload: str) -> None:
+        self._messages.setdefault(transport_id, []).append(payload)
+
+    def dequeue_messages(self, transport_ids: Iterable[str]) -> List[Tuple[str, str]]:
+        messages = []
+        for transport_id in transport_ids:
+            for payload in self._messages.pop(transport_id, []):
+                messages.append((transport_id, payload))
+        return messages
+
+
+class SqliteSessionStore(SessionStore):
+    """基于 SQLite WAL 模式的本机共享会话存储
+
+    会话配置（包括 secret key）以明文保存，数据库文件只允许当前用户读写，
+    应放在只有运行服务的用户可以访问的目录中。
+    """
+
+    shared = True
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS catalogs (
+            session_id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS catalog_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            key TEXT NOT NULL,
+            data TEXT
+        );
+        CREATE TABLE IF NOT EXISTS transports (
+            transport_id TEXT PRIMARY KEY,
+            owner_pid INTEGER NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            transport_id TEXT NOT NULL,
+            payload TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS nonces (
+            access_key TEXT NOT NULL,
+            nonce TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (access_key, nonce)
+        );
+        CREATE INDEX IF NOT EXISTS catalog_changes_session
+            ON catalog_changes (session_id, seq);
+        CREATE INDEX IF NOT EXISTS messages_transport ON messages (transport_id, id);
+        CREATE INDEX IF NOT EXISTS nonces_expires_at ON nonces (expires_at);
+        CREATE INDEX IF NOT EXISTS sessions_access_key
+            ON sessions (json_extract(data, '$.access_key'));
+    """
+
+    def __init__(self, path: str) -> None:
+        """打开（必要时创建）SQLite 存储
+
+        Args:
+            path: 数据库文件路径，多个进程需使用同一路径
+        """
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, mode=SQLITE_DIRECTORY_MODE, exist_ok=True)
+        # 会话配置包含密钥，在 SQLite 打开之前以受限权限创建文件，避免短暂地可被其他用户读取
+        os.close(os.open(path, os.O_RDWR | os.O_CREAT, SQLITE_FILE_MODE))
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path,
+            timeout=SQLITE_BUSY_TIMEOUT,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self._SCHEMA)
+        for suffix in ("", *SQLITE_SIDE_FILES):
+            if os.path.exists(path + suffix):
+                os.chmod(path + suffix, SQLITE_FILE_MODE)
+        logger.info(f"Opened SQLite session store at {path}")
+
+    def _execute(self, sql: str, params: Iterable[Any] = ()) -> List[Tuple[Any, ...]]:
+        with self._lock:
+            return self._conn.execute(sql, tuple(params)).fetchall()
+
+    def put_session(self, session_id: str, data: Dict[str, Any]) -> None:
+        self._execute(
+            "INSERT OR REPLACE INTO sessions (session_id, data, updated_at) VALUES (?, ?, ?)",
+            (session_id, json.dumps(data), time.time()),
+        )
+
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._execute(
+            "SELECT data FROM sessions WHERE session_id = ?", (session_id,)
+        )
+        return json.loads(rows[0][0]) if rows else None
+
+    def delete_session(self, session_id: str) -> bool:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "DELETE FROM catalogs WHERE session_id = ?", (session_id,)
+                )
+                self._conn.execute(
+                    "DELETE FROM catalog_changes WHERE session_id = ?", (session_id,)
+                )
+                deleted = self._conn.execute(
+                    "DELETE FROM sessions WHERE session_id = ?", (session_id,)
+                ).rowcount
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return deleted > 0
+
+    def list_sessions(self) -> List[str]:
+        return [row[0] for row in self._execute("SELECT session_id FROM sessions")]
+
+    def find_sessions(self, access_key: str) -> List[Tuple[str, Dict[str, Any]]]:
+        rows = self._execute(
+            "SELECT session_id, data FROM sessions "
+            "WHERE json_extract(data, '$.access_key') = ?",
+            (access_key,),
+        )
+        return [(session_id, json.loads(data)) for session_id, data in rows]
+
+    def touch_session(self, session_id: str) -> None:
+        self._execute(
+            "UPDATE sessions SET updated_at = ? WHERE session_id = ?",
+            (time.time(), session_id),
+        )
+
+    def add_nonce(self, access_key: str, nonce: str, expires_at: float) -> bool:
+        # 主键冲突且未过期时不写入，插入与判断在同一条语句中完成，多个进程并发时只有一个成功
+        with self._lock:
+            return (
+                self._conn.execute(
+                    "INSERT INTO nonces (access_key, nonce, expires_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT (access_key, nonce) DO UPDATE "
+                    "SET expires_at = excluded.expires_at WHERE nonces.expires_at < ?",
+                    (access_key, nonce, expires_at, time.time()),
+                ).rowcount
+                > 0
+            )
+
+    def purge_idle_sessions(self, max_idle: float) -> List[str]:
+        now = time.time()
+        cutoff = now - max_idle
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT session_id FROM sessions WHERE updated_at < ?", (cutoff,)
+                ).fetchall()
+                if rows:
+                    self._conn.executemany(
+                        "DELETE FROM catalogs WHERE session_id = ?", rows
+                    )
+                    self._conn.executemany(
+                        "DELETE FROM catalog_changes WHERE session_id = ?", rows
+                    )
+                    self._conn.executemany(
+                        "DELETE FROM sessions WHERE session_id = ?", rows
+                    )
+                # 崩溃的进程不会注销连接，按登记时间清理
+                self._conn.execute(
+                    "DELETE FROM transports WHERE updated_at < ?",
+                    (now - TRANSPORT_TTL,),
+                )
+                self._conn.execute(
+                    "DELETE FROM messages WHERE transport_id NOT IN "
+                    "(SELECT transport_id FROM transports)"
+                )
+                self._conn.execute("DELETE FROM nonces WHERE expires_at < ?", (now,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [row[0] for row in rows]
+
+    def put_catalog(
+        self, session_id: str, version: int, music_files: List[Dict[str, Any]]
+    ) -> None:
+        # LastModified 等非 JSON 类型以字符串形式保存
+        data = json.dumps(music_files, default=str, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # 完整快照已包含之前的增量修改
+                self._conn.execute(
+                    "DELETE FROM catalog_changes WHERE session_id = ?", (session_id,)
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO catalogs (session_id, version, data) VALUES (?, ?, ?)",
+                    (session_id, version, data),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def put_catalog_changes(
+        self,
+        session_id: str,
+        version: int,
+        upserts: List[Dict[str, Any]],
+        removals: List[Tuple[str, str]],
+    ) -> Optional[int]:
+        rows = [
+            (
+                session_id,
+                obj["Bucket"],
+                obj["Key"],
+                json.dumps(obj, default=str, ensure_ascii=False),
+            )
+            for obj in upserts
+        ] + [(session_id, bucket, key, None) for bucket, key in removals]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                updated = self._conn.execute(
+                    "UPDATE catalogs SET version = ? WHERE session_id = ?",
+                    (version, session_id),
+                ).rowcount
+                if not updated:
+                    self._conn.execute("ROLLBACK")
+                    return None
+                self._conn.executemany(
+                    "INSERT INTO catalog_changes (session_id, bucket, key, data) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                pending = self._conn.execute(
+                    "SELECT COUNT(*) FROM catalog_changes WHERE session_id = ?",
+                    (session_id,),
+                ).fetchone()[0]
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return pending
+
+    def get_catalog(
+        self, session_id: str
+    ) -> Optional[Tuple[int, List[Dict[str, Any]]]]:
+        with self._lock:
+            # 快照与增量修改需在同一个读事务中读取
+            self._conn.execute("BEGIN")
+            try:
+                catalog = self._conn.execute(
+                    "SELECT version, data FROM catalogs WHERE session_id = ?",
+                    (session_id,),
+                ).fetchone()
+                changes = self._conn.execute(
+                    "SELECT bucket, key, data FROM catalog_changes "
+                    "WHERE session_id = ? ORDER BY seq",
+                    (session_id,),
+                ).fetchall()
+            finally:
+                self._conn.execute("COMMIT")
+        if catalog is None:
+            return None
+        music_files = _merge_catalog_changes(
+            json.loads(catalog[1]),
+            [
+                (bucket, key, json.loads(data) if data is not None else None)
+                for bucket, key, data in changes
+            ],
+        )
+        return catalog[0], music_files
+
+    def get_catalog_version(self, session_id: str) -> Optional[int]:
+        rows = self._execute(
+            "SELECT version FROM catalogs WHERE session_id = ?", (session_id,)
+        )
+        return rows[0][0] if rows else None
+
+    def register_transports(self, transport_ids: Iterable[str]) -> None:
+        now, pid = time.time(), os.getpid()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO transports (transport_id, owner_pid, updated_at) VALUES (?, ?, ?)",
+                [(transport_id, pid, now) for transport_id in transport_ids],
+            )
+
+    def unregister_transports(self, transport_ids: Iterable[str]) -> None:
+        rows = [(transport_id,) for transport_id in transport_ids]
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM transports WHERE transport_id = ?", rows
+            )
+            self._conn.executemany("DELETE FROM messages WHERE transport_id = ?", rows)
+
+    def has_transport(self, transport_id: str) -> bool:
+        rows = self._execute(
+            "SELECT 1 FROM transports WHERE transport_id = ? AND updated_at >= ?",
+            (transport_id, time.time() - TRANSPORT_TTL),
+        )
+        return bool(rows)
+
+    def enqueue_message(self, transport_id: str, payload: str) -> None:
+        self._execute(
+            "INSERT INTO messages (transport_id, payload) VALUES (?, ?)",
+            (transport_id, payload),
+        )
+
+    def dequeue_messages(self, transport_ids: Iterable[str]) -> List[Tuple[str, str]]:
+        transport_ids = list(transport_ids)
+        if not transport_ids:
+            return []
+
+        placeholders = ",".join("?" * len(transport_ids))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    f"SELECT id, transport_id, payload FROM messages WHERE transport_id IN ({placeholders}) ORDER BY id",
+                    transport_ids,
+                ).fetchall()
+                if rows:
+                    self._conn.executemany(
+                        "DELETE FROM messages WHERE id = ?", [(row[0],) for row in rows]
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [(row[1], row[2]) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _merge_catalog_changes(
+    music_files: List[Dict[str, Any]],
+    changes: List[Tuple[str, str, Optional[Dict[str, Any]]]],
+) -> List[Dict[str, Any]]:
+    """按顺序把增量修改 (bucket, key, 对象信息或 None 表示删除) 合并到目录快照中"""
+    merged = {(obj["Bucket"], obj["Key"]): obj for obj in music_files}
+    for bucket, key, obj in changes:
+        if obj is None:
+            merged.pop((bucket, key), None)
+        else:
+            merged[(bucket, key)] = obj
+    return list(merged.values())
+
+
+def create_store(url: str) -> SessionStore:
+    """根据存储地址创建存储后端
+
+    Args:
+        url: "memory" 或 "sqlite:///path/to/store.db"
+
+    Returns:
+        存储后端实例
+
+    Raises:
+        ValueError: 存储地址无效
+    """
+    if not url or url == MEMORY_STORE_URL:
+        return MemorySessionStore()
+    if url.startswith(SQLITE_STORE_SCHEME):
+        path = url[len(SQLITE_STORE_SCHEME) :]
+        if not path or path == "/":
+            raise ValueError(f"Missing SQLite path in session store url: {url}")
+        # sqlite:///abs/path 为绝对路径，sqlite://relative/path 为相对路径
+        return SqliteSessionStore(path)
+    raise ValueError(f"Unsupported session store url: {url}")
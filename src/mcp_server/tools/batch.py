@@ -0,0 +1,137 @@
+"""批量调用工具
+
+客户端常常串行地发起 列表 -> 取链 -> 取链 的调用，每次都要完整往返一次。
+batch 工具在一次调用中并发执行多个子调用：
+- 子调用走与普通调用相同的路径，使用已编译的参数校验器校验，
+  并在调度器中按租户排队，单租户并发上限与公平排队同样生效
+- batch 本身不占用执行名额，避免子调用等待 batch 占用的名额而死锁
+- 结果按请求顺序返回，单个子调用失败只影响该条结果
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from mcp import types
+
+from ..consts import consts
+from . import tools
+
+logger = logging.getLogger(consts.LOGGER_NAME)
+
+BATCH_TOOL_NAME = "batch"
+
+# 单次批量调用的子调用数量上限
+MAX_BATCH_CALLS = 50
+# 单次批量调用同时执行的子调用数，实际并发还受调度器单租户并发数限制
+DEFAULT_BATCH_CONCURRENCY = 4
+MAX_BATCH_CONCURRENCY = 16
+
+
+def _content_text(content: Any) -> str:
+    text = getattr(content, "text", None)
+    if text is not None:
+        return text
+    return content.model_dump_json()
+
+
+class _BatchToolImpl:
+    @tools.tool_meta(
+        types.Tool(
+            name=BATCH_TOOL_NAME,
+            description=(
+                "批量并发执行多个工具调用，一次返回全部结果，用于替代多次串行调用"
+                "（如一次获取多首音乐的播放URL）。结果按请求顺序返回，"
+                "每条结果包含`index`、`name`以及`result`或`error`，单个调用失败不影响其他调用。"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "calls": {
+                        "type": "array",
+                        "minItems": 1,
+                        "maxItems": MAX_BATCH_CALLS,
+                        "description": f"需要执行的工具调用，最多{MAX_BATCH_CALLS}个。",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "name": {
+                                    "type": "string",
+                                    "description": "工具名称，不能为batch。",
+                                },
+                                "arguments": {
+                                    "type": "object",
+                                    "description": "工具参数，与单独调用该工具时相同。",
+                                },
+                            },
+                            "required": ["name"],
+                        },
+                    },
+                    "max_concurrency": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": MAX_BATCH_CONCURRENCY,
+                        "description": f"同时执行的调用数量，默认为{DEFAULT_BATCH_CONCURRENCY}。",
+                    },
+                },
+                "required": ["calls"],
+            },
+        ),
+        scheduled=False,
+    )
+    async def batch(
+        self,
+        calls: List[Dict[str, Any]],
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        session_id: Optional[str] = None,
+        **kwargs: Any,
+    ) -> List[types.TextContent]:
+        """并发执行子调用
+
+        Args:
+            calls: 子调用列表，每项包含name与可选的arguments
+            max_concurrency: 同时执行的子调用数
+            session_id: 会话ID，所有子调用都在该会话中执行
+
+        Returns:
+            按请求顺序排列的子调用结果
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(index: int, call: Dict[str, Any]) -> Dict[str, Any]:
+            name = call["name"]
+            item: Dict[str, Any] = {"index": index, "name": name}
+            if name == BATCH_TOOL_NAME:
+                item["error"] = "batch 调用不能嵌套"
+                return item
+
+            # 子调用只能访问当前会话，忽略客户端在子调用参数中传入的会话ID
+            arguments = dict(call.get("arguments") or {})
+            arguments.pop("session_id", None)
+            if session_id:
+                arguments["session_id"] = session_id
+
+            async with semaphore:
+                try:
+                    result = await tools.call_tool(name, arguments)
+                except Exception as e:
+                    logger.warning(f"批量调用第{index}项 {name} 失败: {e}")
+                    item["error"] = str(e)
+                    return item
+
+            item["result"] = "\n".join(_content_text(content) for content in result)
+            return item
+
+        results = await asyncio.gather(
+            *(run(index, call) for index, call in enumerate(calls))
+        )
+        return [types.TextContent(type="text", text=str(results))]
+
+
+def register_tools():
+    tool_impl = _BatchToolImpl()
+    tools.auto_register_tools(
+        [
+            tool_impl.batch,
+        ]
+    )
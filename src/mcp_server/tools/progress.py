@@ -0,0 +1,41 @@
+"""工具进度通知
+
+客户端在请求的 _meta 中携带 progressToken 时，长时间运行的工具可以通过
+MCP 进度通知报告完成情况。没有进度令牌或没有可推送通知的连接（如 streamable HTTP）
+时不发送通知。
+"""
+
+import logging
+from typing import Optional
+
+from mcp.server.lowlevel.server import request_ctx
+
+from ..consts import consts
+
+logger = logging.getLogger(consts.LOGGER_NAME)
+
+
+async def report_progress(progress: float, total: Optional[float] = None) -> None:
+    """向当前请求的客户端发送进度通知
+
+    Args:
+        progress: 已完成的数量
+        total: 总数量，未知时为None
+    """
+    try:
+        request_context = request_ctx.get()
+    except LookupError:
+        return
+
+    meta = request_context.meta
+    progress_token = meta.progressToken if meta is not None else None
+    if progress_token is None:
+        return
+
+    try:
+        await request_context.session.send_progress_notification(
+            progress_token, progress, total
+        )
+    except Exception as e:
+        # 通知发送失败不影响工具执行
+        logger.debug(f"Failed to send progress notification: {e}")
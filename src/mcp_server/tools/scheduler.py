@@ -0,0 +1,259 @@
+"""工具调度模块
+
+为工具执行提供专用的有界线程池与按租户的公平排队：
+- 同步工具在专用线程池中执行，不再与其他代码共享默认线程池
+- 全局并发数与单租户并发数均有上限，超出的调用排队等待；
+  同步工具另外受线程池大小限制，异步工具不占用线程，不受其限制
+- 排队的调用按加权的开始时间公平排队（SFQ）出队，
+  持续大量调用的租户不会饿死其他租户
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Deque, Dict, Optional, TypeVar
+
+from ..consts import consts
+from ..metrics import metrics
+
+logger = logging.getLogger(consts.LOGGER_NAME)
+
+T = TypeVar("T")
+
+# 专用线程池的默认大小，与标准库默认线程池一致
+DEFAULT_MAX_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+# 全局同时执行的工具调用数上限，与线程池大小无关
+DEFAULT_MAX_CONCURRENCY = 64
+# 单个租户同时执行的工具调用数上限
+DEFAULT_PER_TENANT_LIMIT = 8
+DEFAULT_WEIGHT = 1.0
+
+# 没有会话的调用统一归入该租户
+ANONYMOUS_TENANT = ""
+
+
+@dataclass(eq=False)
+class _Waiter:
+    tag: float
+    future: asyncio.Future
+    sync: bool = False
+    enqueued: float = field(default_factory=time.perf_counter)
+
+
+class ToolScheduler:
+    """工具调用调度器"""
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        per_tenant_limit: int = DEFAULT_PER_TENANT_LIMIT,
+    ):
+        """初始化调度器
+
+        Args:
+            max_workers: 同步工具专用线程池大小，同时也是同时执行的同步工具调用数上限，
+                避免同步调用在线程池内部按先来先服务排队
+            max_concurrency: 全局同时执行的工具调用数（同步与异步合计）
+            per_tenant_limit: 单个租户同时执行的工具调用数
+        """
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        self.per_tenant_limit = per_tenant_limit
+        self._weights: Dict[str, float] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # 虚拟时间为最近一次出队调用的开始标签
+        self._virtual_time = 0.0
+        # 租户最近一次入队调用的结束标签，租户空闲后删除，不累积额度
+        self._finish_tags: Dict[str, float] = {}
+        self._waiting: Dict[str, Deque[_Waiter]] = {}
+        self._running: Dict[str, int] = {}
+        self._in_flight = 0
+        self._sync_in_flight = 0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """同步工具专用线程池，首次使用时创建"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="music-mcp-tool"
+            )
+        return self._executor
+
+    @property
+    def in_flight(self) -> int:
+        """正在执行的工具调用数"""
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        """排队等待的工具调用数"""
+        return sum(len(waiters) for waiters in self._waiting.values())
+
+    def configure(
+        self,
+        max_workers: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        per_tenant_limit: Optional[int] = None,
+        weights: Optional[Dict[str, float]] = None,
+    ) -> None:
+        """调整调度参数，线程池大小需在首次执行同步工具之前设置
+
+        Args:
+            max_workers: 同步工具专用线程池大小
+            max_concurrency: 全局同时执行的工具调用数
+            per_tenant_limit: 单个租户同时执行的工具调用数
+            weights: access key 到权重的映射，权重越大分到的执行机会越多
+        """
+        if max_workers is not None:
+            if self._executor is not None:
+                raise RuntimeError("Tool executor already started")
+            self.max_workers = max_workers
+        if max_concurrency is not None:
+            self.max_concurrency = max_concurrency
+        if per_tenant_limit is not None:
+            self.per_tenant_limit = per_tenant_limit
+        for tenant, weight in (weights or {}).items():
+            self.set_weight(tenant, weight)
+
+    def set_weight(self, tenant: str, weight: float) -> None:
+        """设置租户权重"""
+        if weight <= 0:
+            raise ValueError(f"Weight of tenant must be positive, got {weight}")
+        self._weights[tenant] = weight
+
+    @asynccontextmanager
+    async def slot(self, tenant: str, sync: bool = False) -> AsyncIterator[None]:
+        """获取一个执行名额，名额不足时排队等待
+
+        Args:
+            tenant: 租户标识（access key）
+            sync: 是否为在线程池中执行的同步调用
+        """
+        await self.acquire(tenant, sync)
+        try:
+            yield
+        finally:
+            self.release(tenant, sync)
+
+    async def run_sync(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """在专用线程池中执行同步函数，并在线程中延续当前上下文"""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self.executor, lambda: context.run(func, *args, **kwargs)
+        )
+
+    def shutdown(self) -> None:
+        """关闭专用线程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def acquire(self, tenant: str, sync: bool = False) -> None:
+        """获取一个执行名额，名额不足时排队等待，需与 release 成对调用
+
+        Args:
+            tenant: 租户标识（access key）
+            sync: 是否为在线程池中执行的同步调用，同步调用额外受线程池大小限制
+        """
+        label = metrics.tenant_label(tenant)
+        start = max(self._virtual_time, self._finish_tags.get(tenant, 0.0))
+        self._finish_tags[tenant] = start + 1 / self._weights.get(
+            tenant, DEFAULT_WEIGHT
+        )
+        waiter = _Waiter(start, asyncio.get_running_loop().create_future(), sync)
+        self._waiting.setdefault(tenant, deque()).append(waiter)
+        metrics.TOOL_QUEUE_DEPTH.inc(tenant=label)
+        self._dispatch()
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # 已经分到名额但调用方被取消，归还名额
+                self.release(tenant, sync)
+            else:
+                waiters = self._waiting.get(tenant)
+                if waiters and waiter in waiters:
+                    waiters.remove(waiter)
+                    metrics.TOOL_QUEUE_DEPTH.dec(tenant=label)
+                self._forget_idle(tenant)
+            raise
+
+        metrics.TOOL_QUEUE_WAIT.observe(
+            time.perf_counter() - waiter.enqueued, tenant=label
+        )
+
+    def release(self, tenant: str, sync: bool = False) -> None:
+        """归还执行名额并放行排队的调用，sync 需与 acquire 时一致"""
+        self._in_flight -= 1
+        if sync:
+            self._sync_in_flight -= 1
+        self._running[tenant] -= 1
+        metrics.TOOL_CALLS_RUNNING.dec(tenant=metrics.tenant_label(tenant))
+        self._forget_idle(tenant)
+        self._dispatch()
+
+    def _forget_idle(self, tenant: str) -> None:
+        if not self._running.get(tenant) and not self._waiting.get(tenant):
+            self._running.pop(tenant, None)
+            self._waiting.pop(tenant, None)
+            self._finish_tags.pop(tenant, None)
+
+    def _dispatch(self) -> None:
+        """按开始标签从小到大放行排队的调用，直到没有空闲名额
+
+        线程池占满时，排在租户队首的同步调用暂不放行，其他租户的异步调用照常放行
+        """
+        while self._in_flight < self.max_concurrency:
+            sync_available = self._sync_in_flight < self.max_workers
+            candidates = [
+                (waiters[0].tag, tenant)
+                for tenant, waiters in self._waiting.items()
+                if waiters
+                and self._running.get(tenant, 0) < self.per_tenant_limit
+                and (sync_available or not waiters[0].sync)
+            ]
+            if not candidates:
+                return
+
+            tag, tenant = min(candidates)
+            waiter = self._waiting[tenant].popleft()
+            label = metrics.tenant_label(tenant)
+            metrics.TOOL_QUEUE_DEPTH.dec(tenant=label)
+            if waiter.future.cancelled():
+                self._forget_idle(tenant)
+                continue
+
+            self._virtual_time = max(self._virtual_time, tag)
+            self._in_flight += 1
+            if waiter.sync:
+                self._sync_in_flight += 1
+            self._running[tenant] = self._running.get(tenant, 0) + 1
+            metrics.TOOL_CALLS_RUNNING.inc(tenant=label)
+            waiter.future.set_result(None)
+
+
+def tenant_for_session(session_id: Optional[str]) -> str:
+    """根据会话ID获取调度使用的租户标识"""
+    if not session_id:
+        return ANONYMOUS_TENANT
+
+    from ..session import session_manager
+
+    session_config = session_manager.get_cached_session(session_id)
+    if session_config is None:
+        return ANONYMOUS_TENANT
+    return session_config.access_key
+
+
+# 全局工具调度器实例
+scheduler = ToolScheduler()
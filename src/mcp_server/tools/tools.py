@@ -1,6 +1,5 @@
 import functools
 import inspect
-import asyncio
 import logging
 import fastjsonschema
 
@@ -9,6 +8,9 @@ from dataclasses import dataclass
 from mcp import types
 
 from .. import consts
+from ..metrics import metrics
+from ..tracing import tracing
+from .scheduler import scheduler, tenant_for_session
 
 logger = logging.getLogger(consts.LOGGER_NAME)
 
@@ -23,6 +25,8 @@ class _ToolEntry:
     func: Optional[ToolFunc]
     async_func: Optional[AsyncToolFunc]
     input_validator: Optional[Callable[..., None]]
+    # 是否在调度器中占用执行名额，自身只负责分发子调用的工具不占用
+    scheduled: bool = True
 
 
 # 初始化全局工具字典
@@ -39,6 +43,7 @@ def all_tools() -> List[types.Tool]:
 def register_tool(
     meta: types.Tool,
     func: Union[ToolFunc, AsyncToolFunc],
+    scheduled: bool = True,
 ) -> None:
     """注册工具，禁止重复名称"""
     name = meta.name
@@ -56,11 +61,12 @@ def register_tool(
         func=func,
         async_func=async_func,
         input_validator=fastjsonschema.compile(meta.inputSchema),
+        scheduled=scheduled,
     )
     _all_tools[name] = entry
 
 
-def tool_meta(meta: types.Tool):
+def tool_meta(meta: types.Tool, scheduled: bool = True):
     def _add_metadata(**kwargs):
         def decorator(func):
             if inspect.iscoroutinefunction(func):
@@ -83,7 +89,7 @@ def tool_meta(meta: types.Tool):
 
         return decorator
 
-    return _add_metadata(tool_meta=meta)
+    return _add_metadata(tool_meta=meta, scheduled=scheduled)
 
 
 def auto_register_tools(func_list: list[Union[ToolFunc, AsyncToolFunc]]):
@@ -91,7 +97,9 @@ def auto_register_tools(func_list: list[Union[ToolFunc, AsyncToolFunc]]):
     for func in func_list:
         if hasattr(func, "tool_meta"):
             meta = getattr(func, "tool_meta")
-            register_tool(meta=meta, func=func)
+            register_tool(
+                meta=meta, func=func, scheduled=getattr(func, "scheduled", True)
+            )
         else:
             raise ValueError("func must have tool_meta attribute")
 
@@ -103,29 +111,53 @@ async def call_tool(name: str, arguments: dict) -> ToolResult:
     if (tool_entry := _all_tools.get(name)) is None:
         raise ValueError(f"Tool {name} not found")
 
+    access_key = tenant_for_session(arguments.get("session_id"))
+    tenant = metrics.tenant_label(access_key)
+    with (
+        metrics.track_call(
+            metrics.TOOL_CALLS, metrics.TOOL_DURATION, tool=name, tenant=tenant
+        ),
+        tracing.span(f"tool.{name}", tool=name),
+    ):
+        if not tool_entry.scheduled:
+            return await _execute_tool(name, tool_entry, arguments)
+
+        # 排队时间计入工具耗时，拥塞时尾延迟可以在指标中直接体现
+        # 同步工具占用专用线程池，另外受线程池大小限制
+        sync = tool_entry.async_func is None
+        with tracing.span("tool.queue"):
+            await scheduler.acquire(access_key, sync)
+        try:
+            return await _execute_tool(name, tool_entry, arguments)
+        finally:
+            scheduler.release(access_key, sync)
+
+
+async def _execute_tool(
+    name: str, tool_entry: _ToolEntry, arguments: dict
+) -> ToolResult:
     # 工具输入参数校验
     # 把 None 移除否则校验不过
     arguments = {k: v for k, v in arguments.items() if v is not None}
-    try:
-        tool_entry.input_validator(arguments)
-    except fastjsonschema.JsonSchemaException as e:
-        raise ValueError(f"Invalid arguments for tool {name}: {e}")
+    with tracing.span("tool.validate"):
+        try:
+            tool_entry.input_validator(arguments)
+        except fastjsonschema.JsonSchemaException as e:
+            raise ValueError(f"Invalid arguments for tool {name}: {e}")
 
     try:
-        if tool_entry.async_func is not None:
-            # 异步函数直接执行
-            result = await tool_entry.async_func(**arguments)
-            return result
-        elif tool_entry.func is not None:
-            # 同步函数需要到线程池中转化为异步函数执行
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                executor=None,  # 使用全局线程池
-                func=lambda: tool_entry.func(**arguments),
-            )
-            return result
-        else:
-            raise ValueError(f"Unexpected tool entry: {tool_entry}")
+        with tracing.span("tool.execute"):
+            if tool_entry.async_func is not None:
+                # 异步函数直接执行
+                result = await tool_entry.async_func(**arguments)
+                return result
+            elif tool_entry.func is not None:
+                # 同步函数到工具专用线程池中执行，
+                # 调度器会复制上下文以便在线程中延续会话与追踪信息
+                result = await scheduler.run_sync(tool_entry.func, **arguments)
+                return result
+            else:
+                raise ValueError(f"Unexpected tool entry: {tool_entry}")
     except Exception as e:
         raise RuntimeError(f"Tool {name} execution error: {str(e)}") from e
 
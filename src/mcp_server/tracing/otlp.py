@@ -0,0 +1,175 @@
+"""OTLP/HTTP JSON 导出器
+
+将结束的 span 按批次以 OTLP/HTTP JSON 格式发送到 OpenTelemetry 收集器，
+无需安装 OpenTelemetry SDK。发送在后台线程中进行，队列满时丢弃新的 span。
+"""
+
+import logging
+import queue
+import threading
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .tracing import STATUS_ERROR, Span, SpanHook
+from ..consts import consts
+
+logger = logging.getLogger(consts.LOGGER_NAME)
+
+TRACES_PATH = "/v1/traces"
+SERVICE_NAME = "music-mcp-server"
+SCOPE_NAME = "mcp_server"
+
+DEFAULT_MAX_QUEUE_SIZE = 2048
+DEFAULT_MAX_BATCH_SIZE = 256
+DEFAULT_FLUSH_INTERVAL = 2.0
+DEFAULT_EXPORT_TIMEOUT = 5.0
+
+# OTLP 枚举值
+SPAN_KIND_INTERNAL = 1
+STATUS_CODE_OK = 1
+STATUS_CODE_ERROR = 2
+
+
+def _attribute_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {"key": key, "value": _attribute_value(value)}
+        for key, value in attributes.items()
+        if value is not None
+    ]
+
+
+def span_to_otlp(span: Span) -> Dict[str, Any]:
+    """将 span 转换为 OTLP JSON 格式"""
+    attributes = dict(span.attributes)
+    if span.session_id:
+        attributes["mcp.session_id"] = span.session_id
+
+    status: Dict[str, Any] = {"code": STATUS_CODE_OK}
+    if span.status == STATUS_ERROR:
+        status = {"code": STATUS_CODE_ERROR, "message": span.error or ""}
+
+    data = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": SPAN_KIND_INTERNAL,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns or span.start_ns),
+        "attributes": _attributes(attributes),
+        "status": status,
+    }
+    if span.parent is not None:
+        data["parentSpanId"] = span.parent.span_id
+    return data
+
+
+def build_payload(spans: List[Span], service_name: str = SERVICE_NAME) -> dict:
+    """构建 ExportTraceServiceRequest 的 JSON 请求体"""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": _attributes({"service.name": service_name})},
+                "scopeSpans": [
+                    {
+                        "scope": {"name": SCOPE_NAME},
+                        "spans": [span_to_otlp(span) for span in spans],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class OtlpHttpExporter(SpanHook):
+    """在后台线程中批量发送 span 的 OTLP/HTTP JSON 导出器"""
+
+    def __init__(
+        self,
+        endpoint: str,
+        service_name: str = SERVICE_NAME,
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        timeout: float = DEFAULT_EXPORT_TIMEOUT,
+    ) -> None:
+        """初始化导出器并启动发送线程
+
+        Args:
+            endpoint: 收集器地址，如 http://localhost:4318，
+                未包含 /v1/traces 时自动补全
+            service_name: 上报的 service.name
+            max_queue_size: 待发送 span 的队列上限
+            max_batch_size: 单次请求最多包含的 span 数
+            flush_interval: 两次发送之间的最长间隔（秒）
+            timeout: 单次请求超时时间（秒）
+        """
+        endpoint = endpoint.rstrip("/")
+        if not endpoint.endswith(TRACES_PATH):
+            endpoint += TRACES_PATH
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(max_queue_size)
+        self._client = httpx.Client(timeout=timeout)
+        self._thread = threading.Thread(
+            target=self._run, name="otlp-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def on_end(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _export(self, batch: List[Span]) -> None:
+        try:
+            response = self._client.post(
+                self.endpoint, json=build_payload(batch, self.service_name)
+            )
+            response.raise_for_status()
+            self.exported += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.warning(f"Failed to export {len(batch)} spans: {e}")
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[Span] = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+                while True:
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.max_batch_size:
+                        break
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            if batch:
+                self._export(batch)
+
+    def shutdown(self) -> None:
+        """发送剩余的 span 并停止发送线程"""
+        self._queue.put(None)
+        self._thread.join(timeout=self.flush_interval + 5)
+        self._client.close()
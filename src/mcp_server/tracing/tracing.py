@@ -0,0 +1,226 @@
+"""调用链追踪模块
+
+提供轻量的 span 与可插拔的开始/结束钩子：
+- 通过 contextvars 在协程与线程池之间传递当前 span，并关联 current_session_id
+- SlowCallLogger 在一次调用超过阈值时输出耗时分解
+- 其他钩子（如 OTLP 导出器）通过 add_hook 注册
+"""
+
+import logging
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ..consts import consts
+from ..context import current_session_id
+
+logger = logging.getLogger(consts.LOGGER_NAME)
+
+# 默认慢调用阈值（秒）
+DEFAULT_SLOW_CALL_THRESHOLD = 1.0
+
+# 耗时分解中最多列出的条目数
+MAX_BREAKDOWN_ITEMS = 10
+
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+
+
+class Span:
+    """一次被追踪的操作"""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent",
+        "session_id",
+        "attributes",
+        "start_ns",
+        "end_ns",
+        "status",
+        "error",
+        "breakdown",
+        "_lock",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        parent: Optional["Span"] = None,
+        session_id: Optional[str] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.session_id = session_id or (parent.session_id if parent else None)
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = STATUS_OK
+        self.error: Optional[str] = None
+        # 子孙 span 名称 -> [次数, 总耗时秒]，只在根 span 上汇总
+        self.breakdown: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def root(self) -> "Span":
+        span = self
+        while span.parent is not None:
+            span = span.parent
+        return span
+
+    @property
+    def duration(self) -> float:
+        """耗时（秒），未结束时为已经过的时间"""
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e9
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        self.status = STATUS_ERROR
+        self.error = f"{type(error).__name__}: {error}"
+
+    def _record_descendant(self, span: "Span") -> None:
+        with self._lock:
+            entry = self.breakdown.setdefault(span.name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += span.duration
+
+
+class SpanHook:
+    """span 生命周期钩子，子类按需覆盖"""
+
+    def on_start(self, span: Span) -> None:
+        pass
+
+    def on_end(self, span: Span) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        pass
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+_hooks: List[SpanHook] = []
+
+
+def add_hook(hook: SpanHook) -> SpanHook:
+    """注册 span 钩子"""
+    _hooks.append(hook)
+    return hook
+
+
+def remove_hook(hook: SpanHook) -> None:
+    """移除 span 钩子并释放其资源"""
+    if hook in _hooks:
+        _hooks.remove(hook)
+        hook.shutdown()
+
+
+def shutdown() -> None:
+    """释放所有钩子的资源，发送尚未导出的 span"""
+    for hook in list(_hooks):
+        try:
+            hook.shutdown()
+        except Exception as e:
+            logger.warning(f"Failed to shut down span hook {type(hook).__name__}: {e}")
+
+
+def get_current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def _run_hooks(method: str, span: Span) -> None:
+    for hook in list(_hooks):
+        try:
+            getattr(hook, method)(span)
+        except Exception as e:
+            logger.warning(f"Span hook {type(hook).__name__}.{method} failed: {e}")
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """追踪代码块，嵌套调用会成为当前 span 的子 span
+
+    Args:
+        name: span 名称
+        **attributes: span 属性
+    """
+    parent = _current_span.get()
+    current = Span(
+        name,
+        parent=parent,
+        session_id=current_session_id.get(),
+        attributes=attributes,
+    )
+    token = _current_span.set(current)
+    _run_hooks("on_start", current)
+    try:
+        yield current
+    except BaseException as e:
+        current.record_error(e)
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        if parent is not None:
+            current.root._record_descendant(current)
+        _run_hooks("on_end", current)
+
+
+def format_breakdown(span: Span) -> str:
+    """按耗时降序格式化根 span 的耗时分解"""
+    items: List[Tuple[str, List[float]]] = sorted(
+        span.breakdown.items(), key=lambda item: item[1][1], reverse=True
+    )
+    parts = [
+        f"{name} x{int(count)} {total * 1000:.1f}ms"
+        for name, (count, total) in items[:MAX_BREAKDOWN_ITEMS]
+    ]
+    if len(items) > MAX_BREAKDOWN_ITEMS:
+        parts.append(f"... {len(items) - MAX_BREAKDOWN_ITEMS} more")
+    return ", ".join(parts) if parts else "no child spans"
+
+
+class SlowCallLogger(SpanHook):
+    """根 span 超过阈值时记录耗时分解"""
+
+    def __init__(self, threshold: float = DEFAULT_SLOW_CALL_THRESHOLD) -> None:
+        self.threshold = threshold
+
+    def on_end(self, span: Span) -> None:
+        if span.parent is not None or span.duration < self.threshold:
+            return
+        logger.warning(
+            f"Slow call {span.name} took {span.duration * 1000:.1f}ms "
+            f"(session {span.session_id}, status {span.status}): {format_breakdown(span)}"
+        )
+
+
+slow_call_logger = add_hook(SlowCallLogger())
+
+
+def configure(
+    slow_call_threshold: Optional[float] = None, otlp_endpoint: Optional[str] = None
+) -> None:
+    """配置慢调用阈值与 OTLP 导出
+
+    Args:
+        slow_call_threshold: 慢调用阈值（秒）
+        otlp_endpoint: OTLP/HTTP 收集器地址，如 http://localhost:4318
+    """
+    if slow_call_threshold is not None:
+        slow_call_logger.threshold = slow_call_threshold
+    if otlp_endpoint:
+        from .otlp import OtlpHttpExporter
+
+        add_hook(OtlpHttpExporter(otlp_endpoint))
+        logger.info(f"Exporting spans to {otlp_endpoint}")
@@ -0,0 +1,267 @@
+"""HTTP 响应压缩模块
+
+以 ASGI 中间件的形式按 Accept-Encoding 协商压缩响应，覆盖 SSE 流、消息端点与 streamable HTTP：
+- 支持 gzip（标准库 zlib）；安装了 brotli 或 zstandard 时同时支持 br 与 zstd，
+  客户端声明支持多种编码时按 q 值、同等 q 值时按 zstd、br、gzip 的顺序选择
+- 一次性返回的响应小于阈值时不压缩，压缩后设置新的 Content-Length
+- 流式响应（包括 SSE）使用同一个流式编码器，每个分块压缩后立即同步刷新，
+  客户端收到的每个事件都可以立刻解码，且后续事件可以复用之前事件的压缩上下文
+- 已经编码过的响应以及音频、图片等已压缩的内容类型原样返回
+"""
+
+import zlib
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..metrics import metrics
+
+# 一次性返回的响应小于该字节数时不压缩
+DEFAULT_MINIMUM_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+
+# 内容已经压缩过、再次压缩没有收益的内容类型前缀
+INCOMPRESSIBLE_CONTENT_TYPES = (
+    "audio/",
+    "video/",
+    "image/",
+    "application/zip",
+    "application/gzip",
+    "application/octet-stream",
+)
+STREAMING_CONTENT_TYPES = ("text/event-stream",)
+
+
+class Encoder(ABC):
+    """流式编码器"""
+
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        """压缩一段数据，返回目前可以输出的部分"""
+
+    @abstractmethod
+    def flush(self) -> bytes:
+        """输出目前为止的全部数据，客户端可以立即解码"""
+
+    @abstractmethod
+    def finish(self) -> bytes:
+        """结束编码流"""
+
+
+class GzipEncoder(Encoder):
+    def __init__(self, level: int = GZIP_LEVEL) -> None:
+        # wbits=31 输出带 gzip 头部与校验的格式
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder(Encoder):
+    def __init__(self, quality: int = BROTLI_QUALITY) -> None:
+        import brotli
+
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdEncoder(Encoder):
+    def __init__(self, level: int = ZSTD_LEVEL) -> None:
+        import zstandard
+
+        self._flush_mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(self._flush_mode)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def _module_available(name: str) -> bool:
+    try:
+        __import__(name)
+    except ImportError:
+        return False
+    return True
+
+
+def available_encoders() -> Dict[str, Callable[[], Encoder]]:
+    """当前环境支持的编码，按优先级从高到低排列"""
+    encoders: Dict[str, Callable[[], Encoder]] = {}
+    if _module_available("zstandard"):
+        encoders["zstd"] = ZstdEncoder
+    if _module_available("brotli"):
+        encoders["br"] = BrotliEncoder
+    encoders["gzip"] = GzipEncoder
+    return encoders
+
+
+def negotiate(accept_encoding: str, supported: List[str]) -> Optional[str]:
+    """根据 Accept-Encoding 选择编码
+
+    Args:
+        accept_encoding: 请求的 Accept-Encoding 头
+        supported: 服务端支持的编码，按优先级从高到低排列
+
+    Returns:
+        选择的编码，客户端不接受任何支持的编码时返回 None
+    """
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name] = weight
+
+    best, best_weight = None, 0.0
+    for name in supported:
+        weight = weights.get(name, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = name, weight
+    return best
+
+
+class CompressionMiddleware:
+    """按 Accept-Encoding 压缩 HTTP 响应的 ASGI 中间件"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = DEFAULT_MINIMUM_SIZE,
+        encoders: Optional[Dict[str, Callable[[], Encoder]]] = None,
+    ) -> None:
+        """
+        Args:
+            app: 被包装的 ASGI 应用
+            minimum_size: 一次性返回的响应小于该字节数时不压缩
+            encoders: 编码名称到编码器工厂的映射，按优先级排列，默认为当前环境支持的全部编码
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoders = encoders if encoders is not None else available_encoders()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(
+            Headers(scope=scope).get("accept-encoding", ""), list(self.encoders)
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    """处理单个响应：收到第一个响应体分块后决定是否压缩"""
+
+    def __init__(
+        self, middleware: CompressionMiddleware, encoding: str, send: Send
+    ) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self._start: Optional[Message] = None
+        self._encoder: Optional[Encoder] = None
+        # 已确定不压缩，之后的消息原样转发
+        self._passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if self._passthrough:
+            await self._send(message)
+        elif message["type"] == "http.response.start":
+            self._start = message
+        elif message["type"] != "http.response.body":
+            await self._send(message)
+        elif self._encoder is None:
+            await self._first_body(message)
+        else:
+            await self._compressed_body(message)
+
+    def _compressible(self, headers: MutableHeaders) -> bool:
+        status = self._start["status"]
+        if status < 200 or status in (204, 304) or "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").lower()
+        return not content_type.startswith(INCOMPRESSIBLE_CONTENT_TYPES)
+
+    async def _first_body(self, message: Message) -> None:
+        headers = MutableHeaders(raw=list(self._start["headers"]))
+        self._start["headers"] = headers.raw
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        streaming = more_body or headers.get("content-type", "").startswith(
+            STREAMING_CONTENT_TYPES
+        )
+        if not self._compressible(headers) or (
+            not streaming and len(body) < self.middleware.minimum_size
+        ):
+            self._passthrough = True
+            await self._send(self._start)
+            await self._send(message)
+            return
+
+        self._encoder = self.middleware.encoders[self.encoding]()
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if streaming:
+            del headers["Content-Length"]
+            await self._send(self._start)
+            await self._compressed_body(message)
+            return
+
+        data = self._encoder.compress(body) + self._encoder.finish()
+        headers["Content-Length"] = str(len(data))
+        self._record(len(body), len(data))
+        await self._send(self._start)
+        await self._send({"type": "http.response.body", "body": data})
+
+    async def _compressed_body(self, message: Message) -> None:
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        data = self._encoder.compress(body)
+        data += self._encoder.flush() if more_body else self._encoder.finish()
+        self._record(len(body), len(data))
+        await self._send(
+            {"type": "http.response.body", "body": data, "more_body": more_body}
+        )
+
+    def _record(self, raw: int, compressed: int) -> None:
+        metrics.HTTP_COMPRESSION_BYTES.inc(raw, encoding=self.encoding, stage="in")
+        metrics.HTTP_COMPRESSION_BYTES.inc(
+            compressed, encoding=self.encoding, stage="out"
+        )
@@ -0,0 +1,230 @@
+"""Streamable HTTP 传输模块
+
+实现 MCP streamable HTTP 传输的无状态子集：
+- 客户端把 JSON-RPC 消息 POST 到同一个端点，服务端直接以 JSON 返回响应
+- initialize 时分配会话ID并通过 Mcp-Session-Id 响应头返回，后续请求携带该头部
+- 每个请求都携带租户认证头，会话按需从共享存储加载或根据请求头重建，
+  因此请求可以被负载均衡到任意 worker，空闲时不占用任何连接
+- 不提供服务端推送的 GET 流，DELETE 用于结束会话
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional, Union
+
+import mcp.types as types
+from mcp.server.lowlevel import Server
+from mcp.shared.exceptions import McpError
+from pydantic import ValidationError
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.types import Receive, Scope, Send
+
+from ..config.config import load_config_from_headers
+from ..consts import consts
+from ..context import current_session_id
+from ..session import SessionManager
+
+logger = logging.getLogger(consts.LOGGER_NAME)
+
+MCP_SESSION_ID_HEADER = "Mcp-Session-Id"
+
+# streamable HTTP 在该协议版本中引入，同时兼容旧版本客户端
+STREAMABLE_HTTP_PROTOCOL_VERSION = "2025-03-26"
+SUPPORTED_PROTOCOL_VERSIONS = (
+    types.LATEST_PROTOCOL_VERSION,
+    STREAMABLE_HTTP_PROTOCOL_VERSION,
+)
+
+JsonObject = Dict[str, Any]
+
+
+def _error(request_id: Union[str, int, None], code: int, message: str) -> JsonObject:
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "error": {"code": code, "message": message},
+    }
+
+
+def _dump(model) -> JsonObject:
+    return model.model_dump(by_alias=True, mode="json", exclude_none=True)
+
+
+class StreamableHttpTransport:
+    """以 ASGI 应用形式挂载的 streamable HTTP 端点"""
+
+    def __init__(self, server: Server, session_manager: SessionManager) -> None:
+        self.server = server
+        self.session_manager = session_manager
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request = Request(scope, receive)
+        if request.method == "POST":
+            response = await self.handle_post(request)
+        elif request.method == "DELETE":
+            response = await self.handle_delete(request)
+        else:
+            # 不提供服务端推送流，空闲客户端无需保持连接
+            response = Response(status_code=405, headers={"Allow": "POST, DELETE"})
+        await response(scope, receive, send)
+
+    def _initialize_result(self, params: Optional[JsonObject]) -> JsonObject:
+        requested = (params or {}).get("protocolVersion")
+        version = (
+            requested
+            if requested in SUPPORTED_PROTOCOL_VERSIONS
+            else STREAMABLE_HTTP_PROTOCOL_VERSION
+        )
+        options = self.server.create_initialization_options()
+        result = types.InitializeResult(
+            protocolVersion=version,
+            capabilities=options.capabilities,
+            serverInfo=types.Implementation(
+                name=options.server_name, version=options.server_version
+            ),
+        )
+        return _dump(result)
+
+    async def _dispatch(
+        self, message: types.JSONRPCRequest, session_id: str
+    ) -> JsonObject:
+        """调用低层服务注册的请求处理器"""
+        if message.method == "initialize":
+            return {
+                "jsonrpc": "2.0",
+                "id": message.id,
+                "result": self._initialize_result(message.params),
+            }
+
+        try:
+            request = types.ClientRequest.model_validate(_dump(message))
+        except ValidationError as e:
+            return _error(message.id, types.INVALID_PARAMS, str(e))
+
+        handler = self.server.request_handlers.get(type(request.root))
+        if handler is None:
+            return _error(message.id, types.METHOD_NOT_FOUND, "Method not found")
+
+        token = current_session_id.set(session_id)
+        try:
+            result = await handler(request.root)
+        except McpError as e:
+            return {"jsonrpc": "2.0", "id": message.id, "error": _dump(e.error)}
+        except Exception as e:
+            logger.error(f"Failed to handle {message.method}: {e}")
+            return _error(message.id, types.INTERNAL_ERROR, str(e))
+        finally:
+            current_session_id.reset(token)
+
+        return {"jsonrpc": "2.0", "id": message.id, "result": _dump(result)}
+
+    async def handle_post(self, request: Request) -> Response:
+        config, error_msg = load_config_from_headers(dict(request.headers))
+        if not config:
+            return JSONResponse(status_code=401, content={"error": error_msg})
+
+        try:
+            body = json.loads(await request.body())
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            return JSONResponse(
+                status_code=400, content=_error(None, types.PARSE_ERROR, str(e))
+            )
+
+        batch = isinstance(body, list)
+        try:
+            messages = [
+                types.JSONRPCMessage.model_validate(item).root
+                for item in (body if batch else [body])
+            ]
+        except ValidationError as e:
+            return JSONResponse(
+                status_code=400, content=_error(None, types.INVALID_REQUEST, str(e))
+            )
+        if not messages:
+            return JSONResponse(
+                status_code=400,
+                content=_error(None, types.INVALID_REQUEST, "Empty batch"),
+            )
+
+        requests: List[types.JSONRPCRequest] = [
+            m for m in messages if isinstance(m, types.JSONRPCRequest)
+        ]
+        initializing = any(m.method == "initialize" for m in requests)
+        if initializing and len(messages) > 1:
+            return JSONResponse(
+                status_code=400,
+                content=_error(
+                    None, types.INVALID_REQUEST, "initialize must not be batched"
+                ),
+            )
+
+        if initializing:
+            session_id = await self.session_manager.create_session(
+                access_key=config.access_key,
+                secret_key=config.secret_key,
+                endpoint_url=config.endpoint_url,
+                region_name=config.region_name,
+                buckets=config.buckets,
+            )
+            logger.info(f"Created session {session_id} for streamable HTTP client")
+        else:
+            session_id = request.headers.get(MCP_SESSION_ID_HEADER)
+            if not session_id:
+                return JSONResponse(
+                    status_code=400,
+                    content=_error(
+                        None,
+                        types.INVALID_REQUEST,
+                        f"Missing {MCP_SESSION_ID_HEADER} header",
+                    ),
+                )
+            try:
+                await self.session_manager.ensure_session(
+                    session_id,
+                    access_key=config.access_key,
+                    secret_key=config.secret_key,
+                    endpoint_url=config.endpoint_url,
+                    region_name=config.region_name,
+                    buckets=config.buckets,
+                )
+            except PermissionError as e:
+                logger.warning(str(e))
+                return JSONResponse(status_code=403, content={"error": str(e)})
+            self.session_manager.touch(session_id)
+
+        headers = {MCP_SESSION_ID_HEADER: session_id}
+        if not requests:
+            # 只有通知或响应时不需要返回内容
+            return Response(status_code=202, headers=headers)
+
+        responses = await asyncio.gather(
+            *[self._dispatch(message, session_id) for message in requests]
+        )
+        return JSONResponse(responses if batch else responses[0], headers=headers)
+
+    async def handle_delete(self, request: Request) -> Response:
+        session_id = request.headers.get(MCP_SESSION_ID_HEADER)
+        if not session_id:
+            return JSONResponse(
+                status_code=400,
+                content={"error": f"Missing {MCP_SESSION_ID_HEADER} header"},
+            )
+
+        config, error_msg = load_config_from_headers(dict(request.headers))
+        if not config:
+            return JSONResponse(status_code=401, content={"error": error_msg})
+
+        session_config = await self.session_manager.get_session(session_id)
+        if session_config is None:
+            return Response(status_code=404)
+        if not session_config.matches_credentials(config.access_key, config.secret_key):
+            return JSONResponse(
+                status_code=403,
+                content={"error": "Session belongs to other credentials"},
+            )
+
+        await self.session_manager.remove_session(session_id)
+        logger.info(f"Client ended streamable HTTP session {session_id}")
+        return Response(status_code=204)
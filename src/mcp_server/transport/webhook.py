@@ -0,0 +1,163 @@
+"""对象事件 Webhook 端点
+
+接收转发服务推送的对象事件，验证签名后增量修改受影响会话的目录，
+请求格式与签名方式见 core.storage.object_events。
+
+验证失败的请求按客户端地址限流，超出后直接拒绝，不再查找会话与计算签名。
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.types import Receive, Scope, Send
+
+from ..consts import consts
+from ..metrics import metrics
+from ..session import SessionManager
+
+logger = logging.getLogger(consts.LOGGER_NAME)
+
+WEBHOOK_PATH = "/webhooks/qiniu"
+# 请求体大小上限
+MAX_WEBHOOK_BODY_BYTES = 1024 * 1024
+# 每个客户端地址被拒绝的请求的速率（次/秒）与突发上限
+REJECTION_RATE = 1.0
+REJECTION_BURST = 10.0
+# 记录被拒绝请求的客户端地址数量上限
+MAX_TRACKED_CLIENTS = 10000
+
+
+class RejectionLimiter:
+    """按客户端地址统计被拒绝的请求，超出速率的地址暂时被直接拒绝"""
+
+    def __init__(
+        self,
+        rate: float = REJECTION_RATE,
+        burst: float = REJECTION_BURST,
+        max_clients: int = MAX_TRACKED_CLIENTS,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        # 客户端地址 -> (剩余额度, 更新时间)，按最近被拒绝的时间排序
+        self._clients: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def _allowance(self, client: str, now: float) -> float:
+        allowance, updated = self._clients.get(client, (self.burst, now))
+        return min(self.burst, allowance + (now - updated) * self.rate)
+
+    def blocked(self, client: str, now: Optional[float] = None) -> bool:
+        """客户端被拒绝的次数是否已经超出额度"""
+        now = time.monotonic() if now is None else now
+        return client in self._clients and self._allowance(client, now) < 1
+
+    def record(self, client: str, now: Optional[float] = None) -> None:
+        """记录一次被拒绝的请求"""
+        now = time.monotonic() if now is None else now
+        self._clients[client] = (self._allowance(client, now) - 1, now)
+        self._clients.move_to_end(client)
+        while len(self._clients) > self.max_clients:
+            self._clients.popitem(last=False)
+
+
+class ObjectEventWebhook:
+    """以 ASGI 应用形式挂载的对象事件端点"""
+
+    def __init__(self, session_manager: SessionManager) -> None:
+        from ..core.storage.object_events import NonceCache
+
+        self.session_manager = session_manager
+        self.nonces = NonceCache()
+        self.rejections = RejectionLimiter()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request = Request(scope, receive)
+        if request.method == "POST":
+            response = await self.handle_post(request)
+        else:
+            response = Response(status_code=405, headers={"Allow": "POST"})
+        await response(scope, receive, send)
+
+    def _reject(
+        self, client: str, status_code: int, reason: str, message: str
+    ) -> Response:
+        metrics.WEBHOOK_REJECTIONS.inc(reason=reason)
+        self.rejections.record(client)
+        return JSONResponse(status_code=status_code, content={"error": message})
+
+    async def _remember_nonce(self, access_key: str, nonce: str) -> bool:
+        """记住随机数，任意 worker 在有效期内见过时返回 False"""
+        if not self.nonces.add(access_key, nonce):
+            return False
+        store = self.session_manager.store
+        if not store.shared:
+            return True
+        return await asyncio.to_thread(
+            store.add_nonce, access_key, nonce, time.time() + self.nonces.ttl
+        )
+
+    async def handle_post(self, request: Request) -> Response:
+        # 对象事件处理依赖存储模块，首次请求时才加载
+        from ..core.storage import object_events
+
+        client = request.client.host if request.client else ""
+        if self.rejections.blocked(client):
+            metrics.WEBHOOK_REJECTIONS.inc(reason="rate_limited")
+            return JSONResponse(
+                status_code=429, content={"error": "Too many rejected requests"}
+            )
+
+        body = bytearray()
+        async for chunk in request.stream():
+            body.extend(chunk)
+            if len(body) > MAX_WEBHOOK_BODY_BYTES:
+                return self._reject(client, 413, "too_large", "Request body too large")
+        body = bytes(body)
+
+        parsed = object_events.parse_authorization(request.headers.get("authorization"))
+        timestamp = request.headers.get(object_events.TIMESTAMP_HEADER)
+        nonce = request.headers.get(object_events.NONCE_HEADER, "")
+        if not 0 < len(nonce) <= object_events.MAX_NONCE_LENGTH:
+            return self._reject(client, 401, "unauthorized", "Missing or invalid nonce")
+        # 时间戳过期的请求不必验证签名
+        if not object_events.is_fresh(timestamp):
+            return self._reject(client, 401, "stale", "Timestamp out of range")
+
+        path = request.url.path
+        if request.url.query:
+            path = f"{path}?{request.url.query}"
+        sessions = (
+            await object_events.authenticated_sessions(
+                self.session_manager, parsed[0], parsed[1], path, timestamp, nonce, body
+            )
+            if parsed is not None
+            else []
+        )
+        # 凭证没有活跃会话时同样无法验证签名，与签名错误一样拒绝
+        if not sessions:
+            return self._reject(
+                client, 401, "unauthorized", "Invalid or unknown signature"
+            )
+        # 只记住签名正确的请求的随机数，伪造的请求无法占满缓存
+        if not await self._remember_nonce(parsed[0], nonce):
+            return self._reject(client, 401, "replayed", "Nonce already used")
+
+        try:
+            events, ignored = object_events.parse_events(json.loads(body))
+        except (ValueError, KeyError, TypeError) as e:
+            return self._reject(client, 400, "invalid", f"Invalid event payload: {e}")
+
+        summary = await object_events.apply_events(
+            self.session_manager, sessions, events
+        )
+        logger.info(
+            f"Applied {len(events)} object events ({ignored} ignored) to "
+            f"{summary['sessions']} sessions"
+        )
+        return JSONResponse({"events": len(events), "ignored": ignored, **summary})
@@ -0,0 +1,70 @@
+"""
+测试共用的七牛云替身与工具调用辅助
+"""
+
+from typing import List, Optional
+
+import pytest
+
+from benchmarks.fake_qiniu import FakeQiniuBackend, FakeQiniuServer
+from mcp_server import core
+from mcp_server.core.storage.storage import UC_HOST_ENV
+from mcp_server.session import session_manager
+from mcp_server.tools import tools
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "qiniu_buckets(**buckets): bucket 名称到 FakeQiniuBackend.add_bucket "
+        "关键字参数的映射，由 fake_qiniu 创建",
+    )
+
+
+@pytest.fixture
+def fake_qiniu(request, monkeypatch):
+    """启动七牛云替身并让存储服务指向它，返回 (backend, server)
+
+    bucket 由测试的 qiniu_buckets 标记指定，例如:
+        @pytest.mark.qiniu_buckets(music={"count": 20, "private": True})
+    """
+    backend = FakeQiniuBackend()
+    marker = request.node.get_closest_marker("qiniu_buckets")
+    for name, options in (marker.kwargs if marker else {}).items():
+        backend.add_bucket(name, **options)
+    with FakeQiniuServer(backend) as server:
+        monkeypatch.setenv(UC_HOST_ENV, server.url)
+        core.load()
+        yield backend, server
+
+
+@pytest.fixture
+def open_session(fake_qiniu):
+    """在七牛云替身上创建会话的协程函数，默认使用替身中的全部 bucket"""
+    backend, server = fake_qiniu
+
+    async def open_session(
+        access_key: str,
+        secret_key: str = "test-sk",
+        buckets: Optional[List[str]] = None,
+    ) -> str:
+        return await session_manager.create_session(
+            access_key=access_key,
+            secret_key=secret_key,
+            endpoint_url=server.url,
+            region_name="test",
+            buckets=list(backend.buckets) if buckets is None else buckets,
+        )
+
+    return open_session
+
+
+@pytest.fixture
+def call_tool():
+    """在会话中调用工具并返回第一条文本结果的协程函数"""
+
+    async def call_tool(tool: str, session_id: str, **arguments) -> str:
+        result = await tools.call_tool(tool, {"session_id": session_id, **arguments})
+        return result[0].text
+
+    return call_tool
@@ -0,0 +1,87 @@
+"""
+批量调用工具测试
+"""
+
+import ast
+import asyncio
+
+import pytest
+
+from benchmarks.fake_qiniu import FakeQiniuBackend, FakeQiniuServer
+from mcp_server import core
+from mcp_server.core.storage.storage import UC_HOST_ENV
+from mcp_server.session import session_manager
+from mcp_server.tools import tools
+from mcp_server.tools.scheduler import scheduler
+
+
+@pytest.fixture(scope="module")
+def fake_qiniu():
+    backend = FakeQiniuBackend()
+    bucket = backend.add_bucket("batch-music", 10)
+    with FakeQiniuServer(backend) as server:
+        yield server, sorted(bucket.objects)
+
+
+def _batch(fake_qiniu, monkeypatch, calls, **arguments):
+    server, _ = fake_qiniu
+    monkeypatch.setenv(UC_HOST_ENV, server.url)
+    core.load()
+
+    async def main():
+        session_id = await session_manager.create_session(
+            access_key="batch-ak",
+            secret_key="batch-sk",
+            endpoint_url=server.url,
+            region_name="test",
+            buckets=["batch-music"],
+        )
+        result = await tools.call_tool(
+            "batch", {"calls": calls, "session_id": session_id, **arguments}
+        )
+        return ast.literal_eval(result[0].text)
+
+    return asyncio.run(main())
+
+
+def test_batch_returns_ordered_results_with_item_errors(fake_qiniu, monkeypatch):
+    keys = fake_qiniu[1]
+    results = _batch(
+        fake_qiniu,
+        monkeypatch,
+        [
+            {"name": "get_music_url", "arguments": {"key": keys[0]}},
+            {"name": "get_music_url", "arguments": {}},
+            {"name": "no_such_tool"},
+            {"name": "batch", "arguments": {"calls": []}},
+            {"name": "get_music_url", "arguments": {"key": keys[1]}},
+            {"name": "version"},
+        ],
+    )
+
+    assert [item["index"] for item in results] == list(range(6))
+    assert keys[0] in results[0]["result"] and "error" not in results[0]
+    # 参数由子工具已编译的校验器校验
+    assert "Invalid arguments for tool get_music_url" in results[1]["error"]
+    assert "not found" in results[2]["error"]
+    assert "嵌套" in results[3]["error"]
+    assert keys[1] in results[4]["result"]
+    assert results[5]["result"]
+
+
+def test_batch_does_not_deadlock_on_tenant_limit(fake_qiniu, monkeypatch):
+    keys = fake_qiniu[1]
+    previous = scheduler.per_tenant_limit
+    scheduler.configure(per_tenant_limit=1)
+    try:
+        results = _batch(
+            fake_qiniu,
+            monkeypatch,
+            [{"name": "get_music_url", "arguments": {"key": key}} for key in keys],
+            max_concurrency=4,
+        )
+    finally:
+        scheduler.configure(per_tenant_limit=previous)
+
+    assert all(keys[i] in item["result"] for i, item in enumerate(results))
+    assert scheduler.in_flight == 0
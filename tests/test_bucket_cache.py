@@ -0,0 +1,46 @@
+"""
+bucket 元数据缓存测试
+"""
+
+import time
+
+from mcp_server.core.storage.bucket_cache import BucketCache
+
+CREDENTIAL = ("ak", "sk-digest", "http://s3", "region")
+
+
+def test_cached_buckets_are_filtered_per_session():
+    cache = BucketCache(ttl=60)
+    assert cache.lookup(CREDENTIAL, ["a"]) is None
+
+    cache.put(CREDENTIAL, [{"Name": "a"}, {"Name": "b"}, {"Name": "c"}])
+    assert cache.lookup(CREDENTIAL, ["c", "a", "missing"]) == [
+        {"Name": "a"},
+        {"Name": "c"},
+    ]
+    # 其他凭证（如错误的 secret key）不共享缓存
+    assert cache.lookup(("ak", "other", "http://s3", "region"), ["a"]) is None
+
+
+def test_verified_buckets_skip_list_buckets_after_expiry():
+    cache = BucketCache(ttl=0.05)
+    cache.put(CREDENTIAL, [{"Name": "a"}, {"Name": "b"}])
+    time.sleep(0.06)
+    assert cache.lookup(CREDENTIAL, ["a"]) is None
+
+    cache.verify(CREDENTIAL, "a")
+    cache.verify(CREDENTIAL, "b")
+    assert cache.lookup(CREDENTIAL, ["b", "a"]) == [{"Name": "a"}, {"Name": "b"}]
+    # 只要有一个配置的 bucket 未验证就需要重新列举
+    assert cache.lookup(CREDENTIAL, ["a", "c"]) is None
+
+    cache.invalidate(CREDENTIAL, "a")
+    assert cache.lookup(CREDENTIAL, ["a", "b"]) is None
+    assert cache.lookup(CREDENTIAL, ["b"]) == [{"Name": "b"}]
+
+
+def test_zero_ttl_disables_cache():
+    cache = BucketCache(ttl=0)
+    cache.put(CREDENTIAL, [{"Name": "a"}])
+    cache.verify(CREDENTIAL, "a")
+    assert cache.lookup(CREDENTIAL, ["a"]) is None
@@ -0,0 +1,144 @@
+"""
+音乐目录快照测试
+"""
+
+import pytest
+
+from mcp_server.core.storage.catalog import (
+    CatalogCursor,
+    MusicCatalog,
+    decode_cursor,
+    encode_cursor,
+)
+
+
+def _obj(bucket: str, key: str, size: int = 1024) -> dict:
+    return {"Bucket": bucket, "Key": key, "Size": size}
+
+
+def _catalog() -> MusicCatalog:
+    return MusicCatalog(
+        [
+            _obj("b2", "rock/b.mp3"),
+            _obj("b1", "jazz/a.flac"),
+            _obj("b1", "rock/a.mp3"),
+            _obj("b2", "jazz/a.flac"),
+            _obj("b1", "rock/c.mp3"),
+        ]
+    )
+
+
+def _walk(catalog: MusicCatalog, limit: int, **kwargs) -> list:
+    keys, cursor = [], None
+    while True:
+        page, cursor = catalog.page(limit, cursor=cursor, **kwargs)
+        keys.extend((obj["Bucket"], obj["Key"]) for obj in page)
+        if cursor is None:
+            return keys
+
+
+def test_cursor_round_trip():
+    cursor = CatalogCursor(version=3, bucket="b1", key="歌手/a.mp3", position=7)
+    assert decode_cursor(encode_cursor(cursor)) == cursor
+
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_page_walks_sorted_catalog():
+    catalog = _catalog()
+    assert _walk(catalog, 2) == [
+        ("b1", "jazz/a.flac"),
+        ("b2", "jazz/a.flac"),
+        ("b1", "rock/a.mp3"),
+        ("b2", "rock/b.mp3"),
+        ("b1", "rock/c.mp3"),
+    ]
+    assert _walk(catalog, 1, bucket="b1", prefix="rock/") == [
+        ("b1", "rock/a.mp3"),
+        ("b1", "rock/c.mp3"),
+    ]
+
+
+def test_cursor_survives_refresh():
+    catalog = _catalog()
+    page, cursor = catalog.page(2)
+    assert [obj["Key"] for obj in page] == ["jazz/a.flac", "jazz/a.flac"]
+
+    refreshed = MusicCatalog(catalog.entries + [_obj("b1", "blues/x.mp3")])
+    assert refreshed.version != catalog.version
+
+    page, _ = refreshed.page(2, cursor=cursor)
+    assert [(obj["Bucket"], obj["Key"]) for obj in page] == [
+        ("b1", "rock/a.mp3"),
+        ("b2", "rock/b.mp3"),
+    ]
+
+
+def test_find_by_key_and_start_after():
+    catalog = _catalog()
+    assert [obj["Bucket"] for obj in catalog.find_by_key("jazz/a.flac")] == [
+        "b1",
+        "b2",
+    ]
+    assert catalog.find_by_key("rock/c.mp3")[0]["Key"] == "rock/c.mp3"
+    assert catalog.find_by_key("zzz.mp3") == []
+    page, _ = catalog.page(10, start_after="rock/a.mp3")
+    assert [obj["Key"] for obj in page] == ["rock/b.mp3", "rock/c.mp3"]
+
+
+def test_facets_follow_insert_and_remove():
+    catalog = _catalog()
+    catalog.insert(_obj("b1", "rock/big.flac", size=200 * 1024 * 1024))
+
+    stats = catalog.facets.summary()
+    assert stats["total_count"] == 6
+    assert {item["value"]: item["count"] for item in stats["facets"]["folder"]} == {
+        "rock": 4,
+        "jazz": 2,
+    }
+    assert {item["value"]: item["count"] for item in stats["facets"]["extension"]} == {
+        "mp3": 3,
+        "flac": 3,
+    }
+    assert stats["facets"]["size_band"][-1]["value"] == ">=100MB"
+    assert {
+        item["value"]: item["count"] for item in stats["facets"]["folder_extension"]
+    } == {"rock|mp3": 3, "rock|flac": 1, "jazz|flac": 2}
+
+    version = catalog.version
+    assert catalog.remove("b1", "rock/big.flac") is not None
+    assert catalog.version != version
+    assert catalog.remove("b1", "rock/big.flac") is None
+    assert catalog.facets.facet("size_band") == [
+        {"value": "<1MB", "count": 5, "bytes": 5 * 1024}
+    ]
+    assert _walk(catalog, 10, bucket="b1") == [
+        ("b1", "jazz/a.flac"),
+        ("b1", "rock/a.mp3"),
+        ("b1", "rock/c.mp3"),
+    ]
+
+
+def test_directory_trie_lists_children():
+    catalog = _catalog()
+    catalog.insert(_obj("b2", "rock/live/x.mp3", size=10))
+
+    root = catalog.directories.list_directory("")
+    assert [(d["name"], d["count"]) for d in root["directories"]] == [
+        ("jazz", 2),
+        ("rock", 4),
+    ]
+
+    rock = catalog.directories.list_directory("/rock/", max_files=2)
+    assert rock["path"] == "rock/"
+    assert rock["directories"] == [
+        {"name": "live", "path": "rock/live/", "count": 1, "bytes": 10}
+    ]
+    assert [f["key"] for f in rock["files"]] == ["rock/a.mp3", "rock/b.mp3"]
+    assert rock["truncated"]
+
+    catalog.remove("b2", "rock/live/x.mp3")
+    assert catalog.directories.find("rock/live") is None
+    assert catalog.directories.root.count == 5
+    assert catalog.directories.list_directory("missing") is None
@@ -0,0 +1,90 @@
+"""
+HTTP 响应压缩测试
+"""
+
+import gzip
+import json
+import zlib
+
+import pytest
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from mcp_server.transport.compression import CompressionMiddleware, Encoder, negotiate
+
+CATALOG_PAGE = [
+    {"Bucket": "music", "Key": f"artist-{i % 7}/track-{i:04d}.mp3", "Size": 1 << 20}
+    for i in range(100)
+]
+
+
+def test_negotiate():
+    supported = ["br", "gzip"]
+    assert negotiate("gzip, deflate, br", supported) == "br"
+    assert negotiate("gzip;q=1.0, br;q=0.5", supported) == "gzip"
+    assert negotiate("br;q=0, *", supported) == "gzip"
+    assert negotiate("identity", supported) is None
+    assert negotiate("", supported) is None
+
+
+def test_encoder_requires_all_methods():
+    class Partial(Encoder):
+        def compress(self, data: bytes) -> bytes:
+            return data
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+async def page(request):
+    return JSONResponse(CATALOG_PAGE)
+
+
+async def small(request):
+    return JSONResponse({"ok": True})
+
+
+async def events(request):
+    async def stream():
+        for i in range(3):
+            yield f"event: message\r\ndata: {json.dumps(CATALOG_PAGE[i])}\r\n\r\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+def _client():
+    app = Starlette(
+        routes=[Route("/page", page), Route("/small", small), Route("/sse", events)],
+        middleware=[Middleware(CompressionMiddleware)],
+    )
+    return TestClient(app)
+
+
+def test_compress_large_responses_only():
+    client = _client()
+
+    response = client.get("/page", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.json() == CATALOG_PAGE
+
+    for path, accept in (("/small", "gzip"), ("/page", "identity")):
+        response = client.get(path, headers={"Accept-Encoding": accept})
+        assert "content-encoding" not in response.headers
+
+
+def test_sse_events_decode_as_they_arrive():
+    client = _client()
+    with client.stream("GET", "/sse", headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        chunks = list(response.iter_raw())
+
+    # 每个事件单独刷新，收到第一个分块即可解码出完整事件
+    decoder = zlib.decompressobj(31)
+    first = decoder.decompress(chunks[0]).decode()
+    assert first.startswith("event: message") and first.endswith("\r\n\r\n")
+    assert gzip.decompress(b"".join(chunks)).decode().count("event: message") == 3
@@ -0,0 +1,32 @@
+"""
+请求头配置测试
+"""
+
+from mcp_server.config.config import ALLOWED_ENDPOINTS_ENV, load_config_from_headers
+
+HEADERS = {
+    "X-AK": "ak",
+    "X-SK": "sk",
+    "X-REGION-NAME": "cn-east-1",
+    "X-BUCKETS": "music",
+    "X-ENDPOINT-URL": "http://169.254.169.254",
+}
+DEFAULT_ENDPOINT = "https://s3.cn-east-1.qiniucs.com"
+
+
+def test_endpoint_header_requires_server_opt_in(monkeypatch):
+    monkeypatch.delenv(ALLOWED_ENDPOINTS_ENV, raising=False)
+    config, _ = load_config_from_headers(HEADERS)
+    assert config.endpoint_url == DEFAULT_ENDPOINT
+
+    monkeypatch.setenv(ALLOWED_ENDPOINTS_ENV, "http://127.0.0.1:9000/")
+    config, error = load_config_from_headers(HEADERS)
+    assert config is None and "not allowed" in error
+    config, _ = load_config_from_headers(
+        {**HEADERS, "X-ENDPOINT-URL": "http://127.0.0.1:9000"}
+    )
+    assert config.endpoint_url == "http://127.0.0.1:9000"
+
+    monkeypatch.setenv(ALLOWED_ENDPOINTS_ENV, "*")
+    config, _ = load_config_from_headers(HEADERS)
+    assert config.endpoint_url == "http://169.254.169.254"
@@ -0,0 +1,93 @@
+"""
+下载域名探测与排序测试
+"""
+
+import ast
+import asyncio
+import time
+
+import pytest
+
+from mcp_server.core.storage.domain_probe import (
+    DOMAIN_TTL,
+    DomainProber,
+    domain_prober,
+)
+from mcp_server.metrics import metrics
+from mcp_server.tools import tools
+
+
+def test_rank_by_latency_and_health():
+    prober = DomainProber()
+    domains = [("origin.test", "origin"), ("cdn.test", "cdn")]
+
+    # 未测量时 CDN 优先
+    assert prober.rank("http", domains)[0] == ("cdn.test", "cdn")
+
+    prober.record("http://origin.test", 0.01)
+    prober.record("http://cdn.test", 0.2)
+    assert prober.rank("http", domains)[0] == ("origin.test", "origin")
+
+    # 连续失败的域名排到最后，恢复后回到原位
+    prober.record("http://origin.test", None)
+    prober.record("http://origin.test", None)
+    assert prober.rank("http", domains)[0] == ("cdn.test", "cdn")
+    urls = [
+        {"object_url": "http://origin.test/a.mp3", "domain_type": "origin"},
+        {"object_url": "http://cdn.test/a.mp3", "domain_type": "cdn"},
+    ]
+    assert prober.order_urls(urls)[0]["domain_type"] == "cdn"
+
+    prober.record("http://origin.test", 0.01)
+    assert prober.order_urls(urls)[0]["domain_type"] == "origin"
+
+
+def test_latency_series_are_capped_and_expire(monkeypatch):
+    monkeypatch.setattr(metrics, "MAX_DOMAIN_LABELS", len(metrics._domain_labels) + 1)
+    prober = DomainProber()
+    prober.rank("http", [("kept.test", "cdn"), ("overflow.test", "cdn")])
+    prober.record("http://kept.test", 0.5)
+    prober.record("http://overflow.test", 0.5)
+
+    series = {labels[0] for _, _, labels, _ in metrics.DOMAIN_LATENCY.samples()}
+    assert "http://kept.test" in series and "http://overflow.test" not in series
+
+    # 长期未使用的域名不再探测，其延迟指标随之删除，名额可供新域名使用
+    prober._due(time.monotonic() + DOMAIN_TTL + 1)
+    series = {labels[0] for _, _, labels, _ in metrics.DOMAIN_LATENCY.samples()}
+    assert "http://kept.test" not in series
+    assert metrics.domain_label("http://overflow.test") == "http://overflow.test"
+    metrics.release_domain_label("http://overflow.test")
+
+
+@pytest.mark.qiniu_buckets(**{"probe-music": {"count": 10}})
+def test_failover_to_healthy_domain(fake_qiniu, open_session):
+    backend, server = fake_qiniu
+    # UC 先返回一个无法连接的域名
+    backend.buckets["probe-music"].domains = [
+        {"domain": "127.0.0.1:1", "domaintype": 1},
+        {"domain": server.url.removeprefix("http://"), "domaintype": 1},
+    ]
+    key = sorted(
+        k for k in backend.buckets["probe-music"].objects if not k.endswith(".jpg")
+    )[0]
+
+    async def get_urls(session_id, **arguments):
+        result = await tools.call_tool(
+            "get_music_url", {"session_id": session_id, "key": key, **arguments}
+        )
+        return ast.literal_eval(result[0].text)[0]["url"]
+
+    async def main():
+        session_id = await open_session("probe-ak")
+        before = await get_urls(session_id)
+        await domain_prober.probe_due()
+        await domain_prober.probe_due(now=time.monotonic() + domain_prober.interval)
+        # 第二次取链命中缓存，按最新的探测结果切换域名
+        after = await get_urls(session_id, best_only=True)
+        return before, after
+
+    before, after = asyncio.run(main())
+    assert [u["object_url"].split("/")[2] for u in before][0] == "127.0.0.1:1"
+    assert len(after) == 1
+    assert after[0]["object_url"].startswith(server.url)
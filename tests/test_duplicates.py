@@ -0,0 +1,76 @@
+"""
+重复文件检测测试
+"""
+
+import ast
+import asyncio
+
+import pytest
+
+from mcp_server.core.storage.catalog import MusicCatalog
+from mcp_server.tools import tools
+
+
+def _obj(bucket, key, etag, size):
+    return {"Bucket": bucket, "Key": key, "ETag": f'"{etag}"', "Size": size}
+
+
+def test_index_follows_catalog_changes():
+    catalog = MusicCatalog(
+        [
+            _obj("a", "song.mp3", "h1", 100),
+            _obj("b", "copy/song.mp3", "h1", 100),
+            _obj("b", "other.mp3", "h2", 100),
+            _obj("a", "empty.mp3", "", 100),
+        ]
+    )
+    duplicates = catalog.duplicates
+    assert duplicates.summary()["reclaimable_bytes"] == 100
+    assert duplicates.groups()[0]["files"] == [
+        {"bucket": "a", "key": "song.mp3"},
+        {"bucket": "b", "key": "copy/song.mp3"},
+    ]
+
+    # 第三份副本，以及被替换成其他内容的文件
+    catalog.insert(_obj("c", "song.mp3", "h1", 100))
+    catalog.insert(_obj("b", "copy/song.mp3", "h3", 100))
+    assert duplicates.groups()[0]["copies"] == 2
+    assert duplicates.reclaimable_bytes == 100
+
+    catalog.remove("c", "song.mp3")
+    assert duplicates.summary() == {
+        "duplicate_groups": 0,
+        "redundant_files": 0,
+        "reclaimable_bytes": 0,
+        "groups": [],
+    }
+
+
+# 相同种子生成内容相同的对象
+@pytest.mark.qiniu_buckets(
+    **{"dup-primary": {"count": 30, "seed": 7}, "dup-backup": {"count": 10, "seed": 7}}
+)
+def test_report_cross_bucket_copies(fake_qiniu, open_session):
+    backend, _ = fake_qiniu
+
+    async def main():
+        session_id = await open_session("dup-ak")
+        result = await tools.call_tool(
+            "find_duplicate_music", {"session_id": session_id, "limit": 3}
+        )
+        return ast.literal_eval(result[0].text)
+
+    report = asyncio.run(main())
+    backup = [
+        obj
+        for obj in backend.buckets["dup-backup"].objects.values()
+        if not obj.key.endswith(".jpg")
+    ]
+    assert report["duplicate_groups"] == len(backup)
+    assert report["reclaimable_bytes"] == sum(obj.size for obj in backup)
+    assert len(report["groups"]) == 3
+    assert report["groups"][0]["size"] == max(obj.size for obj in backup)
+    assert {f["bucket"] for f in report["groups"][0]["files"]} == {
+        "dup-primary",
+        "dup-backup",
+    }
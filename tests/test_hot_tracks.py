@@ -0,0 +1,98 @@
+"""
+热门曲目统计与播放URL预签名测试
+"""
+
+import ast
+import asyncio
+import time
+
+import pytest
+
+from mcp_server.config import config
+from mcp_server.core.storage.hot_tracks import (
+    DEFAULT_URL_EXPIRES,
+    URL_MIN_VALIDITY,
+    HotTracks,
+    hot_tracks,
+)
+from mcp_server.core.storage.storage import StorageService
+from mcp_server.metrics import metrics
+from mcp_server.session import session_manager
+
+
+def _storage(access_key, endpoint_url="http://localhost"):
+    return StorageService(
+        config.Config(
+            access_key=access_key,
+            secret_key="hot-sk",
+            endpoint_url=endpoint_url,
+            region_name="test",
+            buckets=["hot-music"],
+        )
+    )
+
+
+def test_decayed_popularity_and_recent_plays():
+    stats = HotTracks(half_life=10, hot_set_size=2)
+    storage = _storage("hot-ak-1")
+    credential = storage.credential_key
+
+    # 很久以前播放很多次的曲目热度衰减后低于最近播放的曲目
+    for _ in range(8):
+        stats.record_play(storage, "hot-music", "old.mp3", now=0)
+    for _ in range(3):
+        stats.record_play(storage, "hot-music", "new.mp3", now=30)
+    stats.record_play(storage, "hot-music", "once.mp3", now=30)
+
+    hot = stats.hot_set(credential, now=30)
+    assert [key for _, key, _ in hot] == ["new.mp3"]
+    assert hot[0][2] == pytest.approx(3)
+
+    recent = stats.recently_played(credential, limit=2)
+    assert [key for _, key, _ in recent] == ["once.mp3", "new.mp3"]
+    assert stats.recently_played(_storage("hot-ak-2").credential_key) == []
+
+
+@pytest.mark.qiniu_buckets(**{"hot-music": {"count": 20, "private": True}})
+def test_hot_track_urls_served_from_cache_and_presigned(
+    fake_qiniu, open_session, call_tool
+):
+    backend, server = fake_qiniu
+    key = sorted(
+        k for k in backend.buckets["hot-music"].objects if not k.endswith(".jpg")
+    )[0]
+
+    async def main():
+        session_id = await open_session("hot-ak-3", secret_key="hot-sk")
+        first = await call_tool("get_music_url", session_id, key=key)
+        hits = metrics.URL_CACHE_LOOKUPS.get(result="hit")
+        for _ in range(2):
+            assert await call_tool("get_music_url", session_id, key=key) == first
+        assert metrics.URL_CACHE_LOOKUPS.get(result="hit") == hits + 2
+
+        # 缓存的URL剩余有效期不足前由后台任务重新签名
+        credential = _storage("hot-ak-3", server.url).credential_key
+        urls = hot_tracks.get_urls(credential, "hot-music", key)
+        hot_tracks.put_urls(
+            credential, "hot-music", key, urls, time.time() + URL_MIN_VALIDITY
+        )
+        assert hot_tracks.get_urls(credential, "hot-music", key) is None
+        assert await hot_tracks.prefetch() == 1
+        later = time.time() + DEFAULT_URL_EXPIRES - URL_MIN_VALIDITY - 60
+        assert hot_tracks.get_urls(credential, "hot-music", key, now=later)
+
+        recent = await call_tool("get_recently_played", session_id, limit=5)
+
+        # 租户的最后一个会话移除后不再保留其统计、存储服务与缓存的URL
+        other = await open_session("hot-ak-3", secret_key="hot-sk")
+        await call_tool("get_music_url", other, key=key)
+        await session_manager.remove_session(session_id)
+        assert hot_tracks.recently_played(credential)
+        await session_manager.remove_session(other)
+        assert hot_tracks.recently_played(credential) == []
+        assert hot_tracks.get_urls(credential, "hot-music", key) is None
+        return first, ast.literal_eval(recent)
+
+    first, recent = asyncio.run(main())
+    assert "token=" in first
+    assert [play["key"] for play in recent] == [key] * 3
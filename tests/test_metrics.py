@@ -0,0 +1,72 @@
+"""
+指标导出测试
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+from mcp_server.metrics import metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = metrics.Registry()
+    hist = registry.register(
+        metrics.Histogram("demo_seconds", "Demo.", ("op",), buckets=(0.1, 1.0))
+    )
+    hist.observe(0.05, op="a")
+    hist.observe(0.5, op="a")
+    hist.observe(5, op="a")
+
+    text = registry.render()
+    assert "# TYPE demo_seconds histogram" in text
+    assert 'demo_seconds_bucket{op="a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{op="a",le="1"} 2' in text
+    assert 'demo_seconds_bucket{op="a",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{op="a"} 3' in text
+
+
+def test_track_call_records_status():
+    registry = metrics.Registry()
+    calls = registry.register(metrics.Counter("demo_total", "Demo.", ("op", "status")))
+    duration = registry.register(metrics.Histogram("demo_duration", "Demo.", ("op",)))
+
+    with metrics.track_call(calls, duration, op="x"):
+        pass
+    with pytest.raises(RuntimeError):
+        with metrics.track_call(calls, duration, op="x"):
+            raise RuntimeError("boom")
+
+    assert calls.get(op="x", status="ok") == 1
+    assert calls.get(op="x", status="error") == 1
+    assert duration.get_count(op="x") == 2
+
+
+def test_tenant_label_hides_key_and_caps_cardinality(monkeypatch):
+    monkeypatch.setattr(metrics, "_tenant_labels", {})
+    monkeypatch.setattr(metrics, "MAX_TENANT_LABELS", 2)
+
+    first = metrics.tenant_label("ak-one")
+    assert first != "ak-one"
+    assert metrics.tenant_label("ak-one") == first
+    metrics.tenant_label("ak-two")
+    assert metrics.tenant_label("ak-three") == metrics.OVERFLOW_TENANT
+    assert metrics.tenant_label(None) == metrics.UNKNOWN_TENANT
+
+
+def test_global_registry_renders_cache_stats():
+    text = metrics.render()
+    assert "music_mcp_page_cache_hit_ratio" in text
+    assert "music_mcp_active_sessions" in text
+
+
+def test_metrics_import_without_resource_module():
+    # Windows 没有 resource 模块，导入 metrics 与读取内存都不能失败
+    code = (
+        "import sys\n"
+        "sys.modules['resource'] = None\n"
+        "from mcp_server.metrics import metrics\n"
+        "assert metrics._resident_memory() >= 0\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
@@ -0,0 +1,89 @@
+"""
+音乐缓存资源分页测试
+"""
+
+import asyncio
+
+from mcp_server.core.storage.catalog import MusicCatalog
+from mcp_server.core.storage.music_cache import MusicCache
+
+
+def _obj(bucket: str, key: str, size: int = 1024) -> dict:
+    return {"Bucket": bucket, "Key": key, "Size": size}
+
+
+def _cache() -> MusicCache:
+    cache = MusicCache()
+    cache._set_catalog(
+        "s1",
+        MusicCatalog(
+            [_obj("b1", f"jazz/{i}.mp3") for i in range(3)]
+            + [_obj("b1", f"rock/{i}.mp3") for i in range(5)]
+            + [_obj("b2", f"rock/{i}.mp3") for i in range(2)]
+            + [_obj("b1", f"soul/{i}.mp3") for i in range(3)]
+        ),
+    )
+    return cache
+
+
+def test_prefix_filter_applies_before_pagination():
+    cache = _cache()
+
+    # 偏移量在过滤后的结果中计算，每页都是完整的
+    pages = [
+        [
+            r.name
+            for r in cache.get_music_files("s1", offset=offset, limit=3, prefix="rock/")
+        ]
+        for offset in (0, 3, 6)
+    ]
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert all(name.startswith("rock/") for page in pages for name in page)
+
+    uris, cursor = [], None
+    while True:
+        page, cursor = cache.get_music_files_page(
+            "s1", cursor=cursor, limit=2, prefix="rock/"
+        )
+        assert len(page) == 2 or cursor is None
+        uris.extend(str(r.uri) for r in page)
+        if cursor is None:
+            break
+    assert len(uris) == len(set(uris)) == 7
+    assert all("/rock/" in uri for uri in uris)
+
+
+def test_resource_memo_follows_catalog_version():
+    cache = _cache()
+    first = cache.get_music_files("s1", limit=2, prefix="jazz/")
+    # 同一目录版本复用已构建的 Resource
+    assert cache.get_music_files("s1", limit=2, prefix="jazz/")[0] is first[0]
+
+    # 直接修改目录同样会改变版本，旧的 Resource 不再复用
+    cache.get_catalog("s1").insert(_obj("b1", "jazz/0.mp3", size=2048))
+    refreshed = cache.get_music_files("s1", limit=2, prefix="jazz/")
+    assert refreshed[0] is not first[0]
+    assert "2048" in refreshed[0].description
+
+    asyncio.run(cache.apply_changes("s1", [], [("b1", "jazz/0.mp3")]))
+    assert [r.name for r in cache.get_music_files("s1", limit=2, prefix="jazz/")] == [
+        "jazz/1.mp3",
+        "jazz/2.mp3",
+    ]
+
+
+def test_catalog_mutation_invalidates_cached_pages():
+    cache = _cache()
+    catalog = cache.get_catalog("s1")
+    catalog.insert(_obj("b1", "华语/周杰伦/七里香.flac"))
+
+    page, _ = cache.get_music_files_page("s1", limit=20, prefix="华语/")
+    # 预算按编码后的 UTF-8 字节数计算，中文键名不会被低估
+    encoded = page[0].model_dump_json(by_alias=True, exclude_none=True).encode()
+    assert cache.page_cache.current_bytes == len(encoded)
+    version = catalog.version
+
+    catalog.remove("b1", "华语/周杰伦/七里香.flac")
+    assert cache.page_cache.get(version, ("list_resources", None, 20, "华语/")) is None
+    assert cache.page_cache.current_bytes == 0
+    assert cache.get_music_files_page("s1", limit=20, prefix="华语/") == ([], None)
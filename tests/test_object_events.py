@@ -0,0 +1,220 @@
+"""
+对象事件 Webhook 测试
+"""
+
+import asyncio
+import json
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from benchmarks.fake_qiniu import (
+    FakeEventNotifier,
+    FakeObject,
+    FakeQiniuBackend,
+    FakeQiniuServer,
+)
+from mcp_server.core.storage.object_events import (
+    MAX_CLOCK_SKEW,
+    NonceCache,
+    is_fresh,
+    parse_events,
+)
+from mcp_server.core.storage.storage import UC_HOST_ENV
+from mcp_server.session import SessionManager, session_manager
+from mcp_server.store.store import SqliteSessionStore
+from mcp_server.transport.webhook import (
+    REJECTION_BURST,
+    WEBHOOK_PATH,
+    ObjectEventWebhook,
+    RejectionLimiter,
+)
+
+
+def test_parse_generic_and_qiniu_events():
+    events, ignored = parse_events(
+        {
+            "events": [
+                {"event": "put", "bucket": "b", "key": "a.mp3", "size": 10},
+                {"event": "delete", "bucket": "b", "key": "c.mp3"},
+                {"event": "disable", "bucket": "b", "key": "d.mp3"},
+            ]
+        }
+    )
+    assert [(e.kind, e.key, e.size) for e in events] == [
+        ("put", "a.mp3", 10),
+        ("delete", "c.mp3", 0),
+    ]
+    assert ignored == 1
+
+    events, _ = parse_events(
+        {"eventName": "mkfile", "bucket": "b", "key": "x.flac", "hash": "abc"}
+    )
+    assert events[0].to_catalog_object()["ETag"] == '"abc"'
+    with pytest.raises(ValueError):
+        parse_events([{"eventName": "put", "bucket": "b"}])
+
+
+@pytest.fixture
+def webhook(monkeypatch):
+    backend = FakeQiniuBackend()
+    backend.add_bucket("event-music", 20)
+    backend.add_bucket("other-music", 5)
+    app = Starlette(
+        routes=[
+            Route(
+                WEBHOOK_PATH,
+                endpoint=ObjectEventWebhook(session_manager),
+                methods=["POST"],
+            )
+        ]
+    )
+    with FakeQiniuServer(backend) as server, TestClient(app) as client:
+        monkeypatch.setenv(UC_HOST_ENV, server.url)
+        yield backend, server, client
+
+
+def test_events_update_catalog_incrementally(webhook):
+    backend, server, client = webhook
+    session_id = asyncio.run(
+        session_manager.create_session(
+            access_key="event-ak",
+            secret_key="event-sk",
+            endpoint_url=server.url,
+            region_name="test",
+            buckets=["event-music"],
+        )
+    )
+    music_cache = session_manager.get_music_cache()
+    total = music_cache.get_total_count(session_id)
+    existing = music_cache.get_catalog(session_id).entries[0]["Key"]
+    notifier = FakeEventNotifier(
+        f"http://testserver{WEBHOOK_PATH}", "event-ak", "event-sk", client=client
+    )
+
+    # 伪造的签名与未知凭证都被拒绝
+    forged = notifier.send(
+        [notifier.delete_event("event-music", existing)], secret_key="wrong"
+    )
+    assert forged.status_code == 401
+    unknown = FakeEventNotifier(
+        notifier.url, "unknown-ak", "event-sk", client=client
+    ).send([notifier.delete_event("event-music", existing)])
+    assert unknown.status_code == 401
+    assert music_cache.get_total_count(session_id) == total
+
+    response = notifier.notify_put(
+        backend, "event-music", FakeObject("new/song.mp3", 4096, "e1")
+    )
+    assert response.json()["added"] == 1
+    assert music_cache.find_music_by_key(session_id, "new/song.mp3")[0]["Size"] == 4096
+
+    response = notifier.notify_delete(backend, "event-music", existing)
+    assert response.json()["removed"] == 1
+    assert music_cache.find_music_by_key(session_id, existing) == []
+
+    # 同一对象先写入后删除只有删除生效，未配置的 bucket 不影响目录
+    response = notifier.send(
+        [
+            notifier.put_event("event-music", FakeObject("tmp.mp3", 10, "e2")),
+            notifier.delete_event("event-music", "tmp.mp3"),
+            notifier.put_event("other-music", FakeObject("x.mp3", 10, "e3")),
+        ]
+    )
+    assert response.status_code == 200
+    assert response.json()["added"] == 0
+    assert music_cache.get_total_count(session_id) == total
+    asyncio.run(session_manager.remove_session(session_id))
+
+
+def test_replay_guards():
+    assert is_fresh("1000", now=1000 + MAX_CLOCK_SKEW)
+    assert not is_fresh("1000", now=1001 + MAX_CLOCK_SKEW)
+    assert not is_fresh("-1", now=0) and not is_fresh(None)
+
+    nonces = NonceCache(ttl=10, max_size=2)
+    assert nonces.add("ak", "n1", now=0)
+    assert not nonces.add("ak", "n1", now=5)
+    assert nonces.add("other-ak", "n1", now=5)
+    # 过期以及超出容量的随机数被丢弃
+    assert nonces.add("ak", "n2", now=11) and len(nonces) == 2
+
+    limiter = RejectionLimiter(rate=1, burst=2)
+    limiter.record("1.2.3.4", now=0)
+    assert not limiter.blocked("1.2.3.4", now=0)
+    limiter.record("1.2.3.4", now=0)
+    assert limiter.blocked("1.2.3.4", now=0)
+    assert not limiter.blocked("5.6.7.8", now=0)
+    assert not limiter.blocked("1.2.3.4", now=1)
+
+
+def test_stale_replayed_and_repeated_rejections(webhook):
+    backend, server, client = webhook
+    session_id = asyncio.run(
+        session_manager.create_session(
+            access_key="replay-ak",
+            secret_key="replay-sk",
+            endpoint_url=server.url,
+            region_name="test",
+            buckets=["event-music"],
+        )
+    )
+    notifier = FakeEventNotifier(
+        f"http://testserver{WEBHOOK_PATH}", "replay-ak", "replay-sk", client=client
+    )
+    event = notifier.put_event("event-music", FakeObject("replay.mp3", 10, "r1"))
+
+    stale = notifier.send([event], timestamp=1)
+    assert stale.status_code == 401 and "Timestamp" in stale.json()["error"]
+
+    body = json.dumps([event]).encode()
+    headers = notifier.signed_headers(body)
+    assert notifier.post(body, headers).status_code == 200
+    replayed = notifier.post(body, headers)
+    assert replayed.status_code == 401 and "Nonce" in replayed.json()["error"]
+
+    # 连续被拒绝的客户端之后的请求直接被拒绝，签名正确也不例外
+    for _ in range(int(REJECTION_BURST)):
+        notifier.send([event], secret_key="wrong")
+    assert notifier.send([event]).status_code == 429
+    asyncio.run(session_manager.remove_session(session_id))
+
+
+def test_replay_to_other_worker_is_rejected(tmp_path, monkeypatch):
+    path = str(tmp_path / "store.db")
+    backend = FakeQiniuBackend()
+    backend.add_bucket("event-music", 5)
+    # 两个 worker 各自持有会话管理器与存储连接
+    managers = [SessionManager(SqliteSessionStore(path)) for _ in range(2)]
+    apps = [
+        Starlette(routes=[Route(WEBHOOK_PATH, endpoint=ObjectEventWebhook(manager))])
+        for manager in managers
+    ]
+    with (
+        FakeQiniuServer(backend) as server,
+        TestClient(apps[0]) as first,
+        TestClient(apps[1]) as second,
+    ):
+        monkeypatch.setenv(UC_HOST_ENV, server.url)
+        session_id = asyncio.run(
+            managers[0].create_session(
+                access_key="worker-ak",
+                secret_key="worker-sk",
+                endpoint_url=server.url,
+                region_name="test",
+                buckets=["event-music"],
+            )
+        )
+        notifier = FakeEventNotifier(
+            f"http://testserver{WEBHOOK_PATH}", "worker-ak", "worker-sk", client=first
+        )
+        event = notifier.put_event("event-music", FakeObject("worker.mp3", 10, "w1"))
+        body = json.dumps([event]).encode()
+        headers = notifier.signed_headers(body)
+
+        assert notifier.post(body, headers).status_code == 200
+        replayed = second.post(WEBHOOK_PATH, content=body, headers=headers)
+        assert replayed.status_code == 401 and "Nonce" in replayed.json()["error"]
+        asyncio.run(managers[0].remove_session(session_id))
@@ -0,0 +1,33 @@
+"""
+分页响应缓存测试
+"""
+
+from mcp_server.core.storage.page_cache import PageCache
+
+
+def test_lru_eviction_respects_byte_budget():
+    cache = PageCache(max_bytes=10)
+    cache.put(1, "a", "aaaa", 4)
+    cache.put(1, "b", "bbbb", 4)
+    assert cache.get(1, "a") == "aaaa"
+
+    cache.put(1, "c", "cccc", 4)
+    assert cache.get(1, "b") is None
+    assert cache.get(1, "a") == "aaaa"
+    assert cache.current_bytes == 8
+    assert cache.evictions == 1
+
+    cache.put(1, "huge", "x" * 11, 11)
+    assert cache.get(1, "huge") is None
+
+
+def test_invalidate_drops_only_that_version():
+    cache = PageCache()
+    cache.put(1, "a", "v1", 2)
+    cache.put(2, "a", "v2", 2)
+
+    assert cache.invalidate(1) == 1
+    assert cache.get(1, "a") is None
+    assert cache.get(2, "a") == "v2"
+    assert cache.current_bytes == 2
+    assert (cache.hits, cache.misses) == (1, 1)
@@ -0,0 +1,105 @@
+"""
+播放列表测试
+"""
+
+import ast
+import asyncio
+import json
+
+import pytest
+
+from mcp_server.core.storage.playlist import playlist_key
+
+pytestmark = pytest.mark.qiniu_buckets(
+    **{"playlist-music": {"count": 300, "private": True}}
+)
+
+
+def _music_keys(backend):
+    objects = backend.buckets["playlist-music"].objects
+    return sorted(key for key in objects if not key.endswith(".jpg"))
+
+
+def test_create_append_reorder_persist(fake_qiniu, open_session, call_tool):
+    backend, _ = fake_qiniu
+    keys = _music_keys(backend)
+
+    async def main():
+        session_id = await open_session("playlist-ak-1")
+        created = await call_tool(
+            "create_playlist", session_id, name="晨跑", keys=keys[:2]
+        )
+        assert ast.literal_eval(created)["track_count"] == 2
+        assert "已存在" in await call_tool("create_playlist", session_id, name="晨跑")
+        assert "未找到音乐文件" in await call_tool(
+            "add_to_playlist", session_id, name="晨跑", keys=["missing.mp3"]
+        )
+
+        await call_tool("add_to_playlist", session_id, name="晨跑", keys=[keys[2]])
+        await call_tool(
+            "add_to_playlist", session_id, name="晨跑", keys=[keys[3]], position=0
+        )
+        await call_tool(
+            "reorder_playlist", session_id, name="晨跑", from_index=0, to_index=3
+        )
+
+        # 新会话（如其他进程）从 bucket 加载播放列表
+        other = await open_session("playlist-ak-2")
+        listed = ast.literal_eval(await call_tool("list_playlists", other))
+        assert [p["name"] for p in listed] == ["晨跑"]
+        return ast.literal_eval(await call_tool("get_playlist", other, name="晨跑"))
+
+    playlist = asyncio.run(main())
+    assert [t["key"] for t in playlist["tracks"]] == [
+        keys[0],
+        keys[1],
+        keys[2],
+        keys[3],
+    ]
+
+    stored = backend.buckets["playlist-music"].objects[playlist_key("晨跑")]
+    assert [t["key"] for t in json.loads(stored.body)["tracks"]] == keys[:4]
+
+
+def test_playlists_created_elsewhere_are_visible(fake_qiniu, open_session, call_tool):
+    backend, _ = fake_qiniu
+    keys = _music_keys(backend)
+
+    async def main():
+        # 两个会话都已加载过播放列表，如同各自位于不同进程
+        first = await open_session("playlist-ak-4")
+        second = await open_session("playlist-ak-5")
+        assert await call_tool("list_playlists", first) == "暂无播放列表"
+        assert await call_tool("list_playlists", second) == "暂无播放列表"
+
+        await call_tool("create_playlist", second, name="夜跑", keys=keys[:1])
+        got = ast.literal_eval(await call_tool("get_playlist", first, name="夜跑"))
+        await call_tool("create_playlist", second, name="午休", keys=keys[:2])
+        listed = ast.literal_eval(await call_tool("list_playlists", first))
+        return got, listed
+
+    got, listed = asyncio.run(main())
+    assert [t["key"] for t in got["tracks"]] == keys[:1]
+    assert [p["name"] for p in listed] == ["午休", "夜跑"]
+
+
+def test_resolve_large_playlist_in_one_call(fake_qiniu, open_session, call_tool):
+    backend, _ = fake_qiniu
+    # 同一首曲目可以在播放列表中出现多次
+    keys = (_music_keys(backend) * 2)[:500]
+
+    async def main():
+        session_id = await open_session("playlist-ak-3")
+        await call_tool("create_playlist", session_id, name="all", keys=keys)
+        backend.requests.clear()
+        playlist = await call_tool("get_playlist", session_id, name="all", expires=7200)
+        with pytest.raises(ValueError, match="Invalid arguments"):
+            await call_tool("get_playlist", session_id, name="all", expires=10**9)
+        return ast.literal_eval(playlist)
+
+    playlist = asyncio.run(main())
+    assert len(playlist["tracks"]) == 500
+    assert all("token=" in track["url"] for track in playlist["tracks"])
+    # 下载域名与 bucket 信息只查询一次，签名在本地完成
+    assert backend.requests["UcDomains"] == 1
+    assert backend.requests["UcBucketInfo"] == 1
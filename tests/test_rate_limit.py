@@ -0,0 +1,82 @@
+"""
+存储后端限流测试
+"""
+
+import asyncio
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+
+from mcp_server.core.storage.rate_limit import (
+    RateLimitExceeded,
+    StorageRateLimiter,
+    StorageThrottledError,
+    TokenBucket,
+    is_throttled,
+)
+from mcp_server.metrics import metrics
+
+
+def test_token_bucket_waits_instead_of_failing():
+    bucket = TokenBucket(rate=10, burst=2)
+    now = bucket.updated
+    assert bucket.reserve(max_wait=1, now=now) == 0
+    assert bucket.reserve(max_wait=1, now=now) == 0
+    assert bucket.reserve(max_wait=1, now=now) == pytest.approx(0.1)
+    assert bucket.reserve(max_wait=1, now=now) == pytest.approx(0.2)
+    # 半秒后补充 5 个令牌，透支的 2 个令牌已经还清
+    assert bucket.reserve(max_wait=1, now=now + 0.5) == 0
+
+
+def test_throttling_slows_down_and_recovers():
+    bucket = TokenBucket(rate=10, burst=10)
+    bucket.throttled()
+    bucket.throttled()
+    assert bucket.rate == pytest.approx(2.5)
+    assert bucket.tokens <= 0
+    for _ in range(20):
+        bucket.succeeded()
+    assert bucket.rate == 10
+
+    throttled = ClientError(
+        {"Error": {"Code": "SlowDown"}, "ResponseMetadata": {"HTTPStatusCode": 503}},
+        "ListObjectsV2",
+    )
+    missing = ClientError(
+        {"Error": {"Code": "NoSuchKey"}, "ResponseMetadata": {"HTTPStatusCode": 404}},
+        "GetObject",
+    )
+    assert is_throttled(throttled)
+    assert is_throttled(StorageThrottledError("rate limited", 573))
+    assert not is_throttled(missing)
+
+
+def test_limiter_rejects_beyond_max_wait():
+    limiter = StorageRateLimiter(rates={"list": 20}, max_wait=0.1)
+    tenant = metrics.tenant_label("rate-limit-ak")
+
+    async def main():
+        start = time.monotonic()
+        for _ in range(42):
+            await limiter.acquire_async("rate-limit-ak", "list_objects")
+        return time.monotonic() - start
+
+    # 桶容量 40，之后按 20 次/秒补充，超出容量的调用等待而不是失败
+    assert asyncio.run(main()) >= 0.09
+    # 连续透支到预计等待超过 0.1 秒时拒绝
+    wait = 0.0
+    with pytest.raises(RateLimitExceeded):
+        while True:
+            wait = limiter._reserve("rate-limit-ak", "list_buckets")
+    assert wait <= 0.1
+    assert (
+        metrics.STORAGE_RATE_LIMIT_REJECTIONS.get(operation_class="list", tenant=tenant)
+        == 1
+    )
+    # 不同操作类别与不同租户互不影响
+    assert limiter._reserve("rate-limit-ak", "get_object") == 0
+    assert limiter._reserve("other-ak", "list_objects") == 0
+
+    limiter.record("rate-limit-ak", "get_object", StorageThrottledError("slow", 429))
+    assert limiter.current_rate("rate-limit-ak", "read") == 25
@@ -0,0 +1,86 @@
+"""
+SSE 消息跨进程转发测试
+"""
+
+import asyncio
+import json
+
+import anyio
+from mcp.server.sse import SseServerTransport
+
+from mcp_server.store.relay import SseMessageRelay
+from mcp_server.store.store import SqliteSessionStore
+
+
+def _post_scope(query: str) -> dict:
+    return {
+        "type": "http",
+        "method": "POST",
+        "path": "/messages/",
+        "query_string": query.encode(),
+        "headers": [(b"content-type", b"application/json")],
+    }
+
+
+async def _post(relay: SseMessageRelay, query: str, body: bytes) -> int:
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await relay.handle_post_message(_post_scope(query), receive, send)
+    return sent[0]["status"]
+
+
+def test_message_posted_to_other_worker_is_relayed(tmp_path):
+    path = str(tmp_path / "store.db")
+    # 两个 worker 各自持有一个 SSE 传输与存储连接
+    owner = SseMessageRelay(
+        SseServerTransport("/messages/"), SqliteSessionStore(path), poll_interval=0.01
+    )
+    other = SseMessageRelay(
+        SseServerTransport("/messages/"), SqliteSessionStore(path), poll_interval=0.01
+    )
+    request = {"jsonrpc": "2.0", "id": 1, "method": "ping"}
+
+    async def main():
+        disconnected = anyio.Event()
+        endpoint = asyncio.get_running_loop().create_future()
+
+        async def receive():
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            body = message.get("body", b"").decode()
+            if "event: endpoint" in body and not endpoint.done():
+                endpoint.set_result(body.split("data: ", 1)[1].strip())
+
+        scope = {"type": "http", "method": "GET", "path": "/sse", "headers": []}
+        async with anyio.create_task_group() as tg:
+            async with owner.sse.connect_sse(scope, receive, send) as streams:
+                query = (await endpoint).split("?", 1)[1]
+                await owner.sync_transports()
+                tg.start_soon(owner.run)
+
+                # 发到没有该连接的 worker，写入共享存储后由持有连接的 worker 投递
+                body = json.dumps(request).encode()
+                assert await _post(other, query, body) == 202
+                with anyio.fail_after(5):
+                    message = await streams[0].receive()
+                assert message.model_dump(exclude_none=True) == request
+
+                assert await _post(other, query, b"not json") == 400
+                assert await _post(other, "session_id=" + "0" * 32, body) == 404
+
+                await streams[1].aclose()
+                disconnected.set()
+            tg.cancel_scope.cancel()
+        return query.removeprefix("session_id=")
+
+    transport_id = asyncio.run(main())
+    # 转发任务退出时注销本进程的连接
+    assert not other.store.has_transport(transport_id)
@@ -0,0 +1,124 @@
+"""
+远程抓取导入测试
+"""
+
+import ast
+import asyncio
+
+import pytest
+
+from benchmarks.fake_qiniu import FakeObject
+from mcp_server.core.storage import remote_fetch
+from mcp_server.tools import tools
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(remote_fetch, "RETRY_BASE_DELAY", 0.01)
+
+
+@pytest.mark.qiniu_buckets(**{"import-music": {"count": 20}})
+def test_import_retries_and_updates_catalog(fake_qiniu, open_session):
+    backend, _ = fake_qiniu
+    flaky = "https://old-host.example/library/flaky%20song.flac"
+    backend.fetch_failures[flaky] = 1
+    lost = "https://old-host.example/lost.mp3"
+    backend.fetch_lost_responses[lost] = 1
+
+    async def main():
+        session_id = await open_session("import-ak")
+        listed = backend.requests["ListObjectsV2"]
+        result = await tools.call_tool(
+            "import_music_from_urls",
+            {
+                "session_id": session_id,
+                "prefix": "imported/",
+                "items": [
+                    {"url": "https://old-host.example/library/a.mp3"},
+                    {"url": flaky},
+                    {"url": "https://old-host.example/missing.mp3"},
+                    {"url": "ftp://old-host.example/b.mp3"},
+                    {"url": "https://old-host.example/c.mp3", "key": "other/c.mp3"},
+                    {"url": lost},
+                ],
+            },
+        )
+        summary = ast.literal_eval(result[0].text)
+
+        music_list = await tools.call_tool(
+            "get_music_list", {"session_id": session_id, "prefix": "imported/"}
+        )
+        assert backend.requests["ListObjectsV2"] == listed
+
+        again = await tools.call_tool(
+            "import_music_from_urls",
+            {
+                "session_id": session_id,
+                "items": [{"url": "https://x.example/a.mp3", "key": "imported/a.mp3"}],
+            },
+        )
+        return summary, music_list[0].text, ast.literal_eval(again[0].text)
+
+    summary, music_list, again = asyncio.run(main())
+
+    results = summary["results"]
+    assert summary["imported"] == 4 and summary["added_to_catalog"] == 4
+    assert results[0]["key"] == "imported/a.mp3" and results[0]["attempts"] == 1
+    # 临时故障重试后成功
+    assert results[1]["key"] == "imported/flaky song.flac"
+    assert results[1]["attempts"] == 2 and "error" not in results[1]
+    # 源站不存在不重试
+    assert results[2]["attempts"] == 1 and "404" in results[2]["error"]
+    assert "http" in results[3]["error"]
+    assert results[4]["key"] == "other/c.mp3"
+    # 抓取已写入但响应丢失，重试时不把自己写入的文件当作已存在
+    assert results[5]["attempts"] == 2 and "error" not in results[5]
+
+    # 导入的文件无需重新列举即可查询
+    assert "imported/a.mp3" in music_list and "imported/flaky song.flac" in music_list
+    assert again["results"][0]["error"] == "文件已存在"
+    assert backend.buckets["import-music"].objects["imported/a.mp3"].size > 0
+
+
+@pytest.mark.qiniu_buckets(**{"import-music": {"count": 5}})
+def test_import_never_overwrites_unless_asked(fake_qiniu, open_session):
+    backend, _ = fake_qiniu
+
+    async def main():
+        session_id = await open_session("import-ak-2")
+        # 目录加载之后由其他途径写入 bucket 的文件
+        await tools.call_tool(
+            "import_music_from_urls",
+            {"session_id": session_id, "items": [{"url": "https://x.example/x.mp3"}]},
+        )
+        backend.buckets["import-music"].put(
+            FakeObject("late.mp3", 10, "late-etag", b"late")
+        )
+
+        async def import_items(**arguments):
+            result = await tools.call_tool(
+                "import_music_from_urls", {"session_id": session_id, **arguments}
+            )
+            return ast.literal_eval(result[0].text)["results"]
+
+        batch = await import_items(
+            items=[
+                {"url": "https://a.example/dup.mp3"},
+                {"url": "https://b.example/dup.mp3"},
+                {"url": "https://c.example/late.mp3"},
+            ]
+        )
+        fetches = backend.requests["Fetch"]
+        replaced = await import_items(
+            items=[{"url": "https://c.example/late.mp3"}], overwrite=True
+        )
+        return batch, fetches, replaced
+
+    batch, fetches, replaced = asyncio.run(main())
+    assert "error" not in batch[0]
+    assert batch[1]["error"] == "与第0项的key重复"
+    # 不在目录中但已存在于 bucket 的文件也不会被覆盖
+    assert batch[2]["error"] == "文件已存在"
+    assert fetches == 2
+    assert "error" not in replaced[0]
+    assert backend.buckets["import-music"].objects["late.mp3"].etag != "late-etag"
@@ -0,0 +1,104 @@
+"""
+工具调度器测试
+"""
+
+import asyncio
+
+from mcp_server.metrics import metrics
+from mcp_server.tools.scheduler import ToolScheduler
+
+
+async def _run_calls(scheduler, calls, order, hold=0.01):
+    async def call(tenant, index):
+        async with scheduler.slot(tenant):
+            order.append((tenant, index))
+            await asyncio.sleep(hold)
+
+    tasks = []
+    for tenant, count in calls:
+        for index in range(count):
+            tasks.append(asyncio.create_task(call(tenant, index)))
+            await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+
+
+def test_noisy_tenant_does_not_starve_others():
+    scheduler = ToolScheduler(max_concurrency=1)
+    order = []
+    # noisy 先提交大量调用，quiet 随后提交的调用不应排在所有 noisy 调用之后
+    asyncio.run(_run_calls(scheduler, [("noisy", 8), ("quiet", 2)], order))
+
+    positions = [i for i, (tenant, _) in enumerate(order) if tenant == "quiet"]
+    assert positions == [1, 3]
+    assert scheduler.in_flight == 0 and scheduler.queue_depth == 0
+    assert metrics.TOOL_QUEUE_DEPTH.get(tenant=metrics.tenant_label("noisy")) == 0
+
+
+def test_weights_and_per_tenant_limit():
+    scheduler = ToolScheduler(max_concurrency=1)
+    scheduler.set_weight("gold", 3)
+    order = []
+    asyncio.run(_run_calls(scheduler, [("bronze", 8), ("gold", 6)], order))
+    # 权重为 3 的租户在竞争期间获得约 3 倍的执行机会
+    tenants = [tenant for tenant, _ in order]
+    assert tenants[:8] == ["bronze"] + ["gold"] * 3 + ["bronze"] + ["gold"] * 3
+
+    limited = ToolScheduler(max_concurrency=4, per_tenant_limit=1)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with limited.slot("t"):
+            peak = max(peak, limited.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*[call() for _ in range(4)])
+
+    asyncio.run(main())
+    assert peak == 1
+
+
+def test_cancelled_waiters_release_their_place():
+    scheduler = ToolScheduler(max_concurrency=1)
+
+    async def main():
+        await scheduler.acquire("a")
+        waiter = asyncio.create_task(scheduler.acquire("b"))
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth == 1
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert scheduler.queue_depth == 0
+
+        scheduler.release("a")
+        await asyncio.wait_for(scheduler.acquire("c"), timeout=1)
+        scheduler.release("c")
+
+    asyncio.run(main())
+    assert scheduler.in_flight == 0
+
+
+def test_pool_size_only_limits_sync_calls():
+    scheduler = ToolScheduler(max_workers=1, max_concurrency=8)
+    peaks = {"sync": 0, "async": 0}
+    running = {"sync": 0, "async": 0}
+
+    async def call(tenant, sync):
+        kind = "sync" if sync else "async"
+        async with scheduler.slot(tenant, sync):
+            running[kind] += 1
+            peaks[kind] = max(peaks[kind], running[kind])
+            await asyncio.sleep(0.01)
+            running[kind] -= 1
+
+    async def main():
+        # 线程池占满时，异步调用不被阻塞
+        await asyncio.gather(
+            *[call("s", True) for _ in range(3)],
+            *[call(f"a{i}", False) for i in range(6)],
+        )
+
+    asyncio.run(main())
+    assert peaks == {"sync": 1, "async": 6}
+    assert scheduler.in_flight == 0 and scheduler._sync_in_flight == 0
@@ -0,0 +1,47 @@
+"""
+会话空闲回收与目录内存预算测试
+"""
+
+import time
+
+from mcp_server.core.storage.catalog import MusicCatalog, estimate_entry_bytes
+from mcp_server.core.storage.music_cache import MusicCache
+from mcp_server.session import SessionManager
+
+
+def _catalog(count: int) -> MusicCatalog:
+    return MusicCatalog(
+        [{"Bucket": "b", "Key": f"{i:04}.mp3", "Size": 1} for i in range(count)]
+    )
+
+
+def test_catalogs_are_lru_evicted_beyond_budget():
+    entry_bytes = estimate_entry_bytes({"Key": "0000.mp3"})
+    cache = MusicCache(max_catalog_bytes=25 * entry_bytes)
+
+    cache._set_catalog("s1", _catalog(10))
+    cache._set_catalog("s2", _catalog(10))
+    assert cache.get_catalog("s1") is not None  # s1 变为最近使用
+    cache._set_catalog("s3", _catalog(10))
+
+    assert cache.get_catalog("s2") is None
+    assert set(cache.get_cached_sessions()) == {"s1", "s3"}
+    stats = cache.get_memory_stats()
+    assert stats["evictions"] == 1
+    assert stats["evicted_sessions"] == 1
+    assert stats["catalog_bytes"] == 20 * entry_bytes
+
+
+def test_idle_sessions_are_reaped():
+    manager = SessionManager()
+    closed = []
+    now = time.monotonic()
+    manager._sessions = {"active": None, "idle": None, "detached": None}
+    manager._last_seen = {"active": now, "idle": now - 120, "detached": now - 120}
+    manager.register_closer("idle", lambda: closed.append("idle"))
+    manager.idle_timeout = 60
+
+    assert sorted(manager.reap_idle_sessions(now)) == ["detached", "idle"]
+    assert closed == ["idle"]
+    assert "detached" not in manager._sessions
+    assert manager.reaped_sessions == 2
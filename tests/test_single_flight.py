@@ -0,0 +1,121 @@
+"""
+存储请求合并测试
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from mcp_server.config import config
+from mcp_server.core.storage.single_flight import SingleFlight
+from mcp_server.core.storage.storage import StorageService
+from mcp_server.metrics import metrics
+
+
+def test_identical_requests_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def list_objects():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return ["a.mp3"]
+
+    async def main():
+        results = await asyncio.gather(
+            *[flight.do("key", list_objects, "list_objects", "sf") for _ in range(5)],
+            flight.do("other", list_objects, "list_objects", "sf"),
+        )
+        return results
+
+    results = asyncio.run(main())
+    assert results == [["a.mp3"]] * 6
+    assert len(calls) == 2
+    assert metrics.STORAGE_COALESCED.get(operation="list_objects", tenant="sf") == 4
+    assert flight.in_flight == 0
+
+
+def test_cancellation_only_affects_the_cancelled_waiter():
+    flight = SingleFlight()
+    started = []
+    cancelled = []
+
+    async def slow():
+        started.append(1)
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+        return "done"
+
+    async def main():
+        first = asyncio.create_task(flight.do("k", slow, "op", "sf-cancel"))
+        second = asyncio.create_task(flight.do("k", slow, "op", "sf-cancel"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == "done"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert cancelled == []
+
+        # 所有等待者都取消后后端请求也被取消，之后的请求重新发起
+        only = asyncio.create_task(flight.do("k", slow, "op", "sf-cancel"))
+        await asyncio.sleep(0.01)
+        only.cancel()
+        await asyncio.gather(only, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert cancelled == [1]
+        assert await flight.do("k", slow, "op", "sf-cancel") == "done"
+
+    asyncio.run(main())
+    assert len(started) == 3
+
+
+def test_sync_requests_are_shared_across_threads():
+    flight = SingleFlight()
+    calls = []
+    barrier = threading.Barrier(4)
+
+    def bucket_info():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"private": 0}
+
+    def worker():
+        barrier.wait()
+        return flight.do_sync("info", bucket_info, "bucket_info", "sf-sync")
+
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda _: worker(), range(4)))
+    assert results == [{"private": 0}] * 4
+    assert len(calls) == 1
+
+    def failing():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flight.do_sync("info", failing, "bucket_info", "sf-sync")
+    assert flight.in_flight == 0
+
+
+def test_request_key_includes_secret_key():
+    def storage(secret_key):
+        return StorageService(
+            config.Config(
+                access_key="ak",
+                secret_key=secret_key,
+                endpoint_url="http://s3.test",
+                region_name="test",
+                buckets=[],
+            )
+        )
+
+    # 只有 access key 正确的请求不能复用其他租户进行中的请求结果
+    key = storage("right")._request_key("list_buckets")
+    assert storage("wrong")._request_key("list_buckets") != key
+    assert storage("right")._request_key("list_buckets") == key
+    assert "right" not in key
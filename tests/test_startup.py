@@ -0,0 +1,20 @@
+"""
+冷启动导入预算测试
+"""
+
+import pytest
+
+from benchmarks.startup import DEFAULT_BUDGETS, run_scenario
+
+
+@pytest.mark.parametrize("name", ["import", "help", "application"])
+def test_startup_does_not_import_storage_sdks(name):
+    elapsed, heavy_modules = run_scenario(name)
+    assert heavy_modules == []
+    assert elapsed < DEFAULT_BUDGETS[name]
+
+
+def test_tools_are_registered_on_demand():
+    _, heavy_modules = run_scenario("tools")
+    # 注册工具不需要创建存储客户端
+    assert "aioboto3" not in heavy_modules and "qiniu" not in heavy_modules
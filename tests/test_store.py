@@ -0,0 +1,151 @@
+"""
+会话与目录存储测试
+"""
+
+import sys
+import time
+
+import pytest
+
+from mcp_server.store import store as store_module
+from mcp_server.store.store import (
+    MemorySessionStore,
+    SqliteSessionStore,
+    create_store,
+)
+
+
+def test_sqlite_store_is_shared_between_connections(tmp_path):
+    path = str(tmp_path / "store.db")
+    worker_a, worker_b = SqliteSessionStore(path), SqliteSessionStore(path)
+
+    worker_a.put_session("s1", {"access_key": "ak", "buckets": ["b1"]})
+    worker_a.put_catalog("s1", 7, [{"Bucket": "b1", "Key": "a.mp3", "Size": 1}])
+    assert worker_b.get_session("s1") == {"access_key": "ak", "buckets": ["b1"]}
+    worker_b.put_session("s2", {"access_key": "other", "buckets": []})
+    assert worker_a.find_sessions("ak") == [
+        ("s1", {"access_key": "ak", "buckets": ["b1"]})
+    ]
+    # 按 access key 查找使用索引，不扫描全部会话
+    plan = worker_a._execute(
+        "EXPLAIN QUERY PLAN SELECT session_id FROM sessions "
+        "WHERE json_extract(data, '$.access_key') = ?",
+        ("ak",),
+    )
+    assert "sessions_access_key" in str(plan)
+    assert worker_b.get_catalog_version("s1") == 7
+    assert worker_b.get_catalog("s1") == (
+        7,
+        [{"Bucket": "b1", "Key": "a.mp3", "Size": 1}],
+    )
+
+    worker_a.register_transports(["t1"])
+    assert worker_b.has_transport("t1")
+    worker_b.enqueue_message("t1", "first")
+    worker_b.enqueue_message("t1", "second")
+    assert worker_a.dequeue_messages(["t1", "t2"]) == [
+        ("t1", "first"),
+        ("t1", "second"),
+    ]
+    assert worker_a.dequeue_messages(["t1"]) == []
+
+    assert worker_b.delete_session("s1")
+    assert worker_a.get_session("s1") is None
+    assert worker_a.get_catalog("s1") is None
+
+
+def test_catalog_changes_are_merged_into_snapshot(tmp_path):
+    path = str(tmp_path / "store.db")
+    worker_a, worker_b = SqliteSessionStore(path), SqliteSessionStore(path)
+    assert worker_a.put_catalog_changes("s1", 8, [], [("b1", "a.mp3")]) is None
+
+    worker_a.put_catalog(
+        "s1",
+        7,
+        [
+            {"Bucket": "b1", "Key": "a.mp3", "Size": 1},
+            {"Bucket": "b1", "Key": "b.mp3", "Size": 2},
+        ],
+    )
+    # 修改只写入变化的行，完整快照保持不变
+    assert (
+        worker_a.put_catalog_changes(
+            "s1", 8, [{"Bucket": "b1", "Key": "c.mp3", "Size": 3}], [("b1", "a.mp3")]
+        )
+        == 2
+    )
+    assert (
+        worker_a.put_catalog_changes(
+            "s1", 9, [{"Bucket": "b1", "Key": "b.mp3", "Size": 4}], []
+        )
+        == 3
+    )
+    assert worker_b.get_catalog_version("s1") == 9
+    assert worker_b.get_catalog("s1") == (
+        9,
+        [
+            {"Bucket": "b1", "Key": "b.mp3", "Size": 4},
+            {"Bucket": "b1", "Key": "c.mp3", "Size": 3},
+        ],
+    )
+
+    worker_b.put_catalog("s1", 10, [{"Bucket": "b1", "Key": "d.mp3", "Size": 5}])
+    assert worker_a.get_catalog("s1") == (
+        10,
+        [{"Bucket": "b1", "Key": "d.mp3", "Size": 5}],
+    )
+    assert worker_a.delete_session("s1") is False
+    assert worker_a._execute("SELECT COUNT(*) FROM catalog_changes") == [(0,)]
+
+
+def test_stale_transports_are_purged(tmp_path, monkeypatch):
+    path = str(tmp_path / "store.db")
+    crashed, alive = SqliteSessionStore(path), SqliteSessionStore(path)
+    crashed.register_transports(["dead"])
+    alive.register_transports(["live"])
+    alive.enqueue_message("dead", "lost")
+    alive.enqueue_message("live", "kept")
+
+    # 崩溃的进程不再重新登记，存活的进程按心跳重新登记
+    later = time.time() + store_module.TRANSPORT_TTL + 1
+    monkeypatch.setattr(store_module.time, "time", lambda: later)
+    alive.register_transports(["live"])
+    assert not alive.has_transport("dead")
+    assert alive.has_transport("live")
+
+    assert alive.purge_idle_sessions(3600) == []
+    assert alive.dequeue_messages(["dead", "live"]) == [("live", "kept")]
+
+
+def test_nonces_are_shared_until_expired(tmp_path, monkeypatch):
+    path = str(tmp_path / "store.db")
+    worker_a, worker_b = SqliteSessionStore(path), SqliteSessionStore(path)
+    now = time.time()
+    assert worker_a.add_nonce("ak", "n1", now + 10)
+    assert not worker_b.add_nonce("ak", "n1", now + 10)
+    assert worker_b.add_nonce("other-ak", "n1", now + 10)
+
+    later = now + 11
+    monkeypatch.setattr(store_module.time, "time", lambda: later)
+    assert worker_b.add_nonce("ak", "n1", later + 10)
+    worker_a.purge_idle_sessions(3600)
+    assert worker_a._execute("SELECT nonce, access_key FROM nonces") == [("n1", "ak")]
+
+
+def test_create_store():
+    assert isinstance(create_store("memory"), MemorySessionStore)
+    with pytest.raises(ValueError):
+        create_store("redis://localhost")
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX file permissions")
+def test_sqlite_files_are_private(tmp_path):
+    path = tmp_path / "private" / "store.db"
+    store = SqliteSessionStore(str(path))
+    store.put_session("s1", {"secret_key": "sk"})
+    assert path.stat().st_mode & 0o777 == 0o600
+    assert path.parent.stat().st_mode & 0o777 == 0o700
+    for suffix in ("-wal", "-shm"):
+        side = path.with_name(path.name + suffix)
+        if side.exists():
+            assert side.stat().st_mode & 0o777 == 0o600
@@ -0,0 +1,153 @@
+"""
+streamable HTTP 传输测试
+"""
+
+import asyncio
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from benchmarks.fake_qiniu import FakeQiniuBackend, FakeQiniuServer
+from mcp_server import application
+from mcp_server.config.config import ALLOWED_ENDPOINTS_ENV
+from mcp_server.core.storage.storage import UC_HOST_ENV
+from mcp_server.session import session_manager
+from mcp_server.transport.streamable_http import (
+    MCP_SESSION_ID_HEADER,
+    StreamableHttpTransport,
+)
+
+
+@pytest.fixture(scope="module")
+def fake_qiniu():
+    backend = FakeQiniuBackend()
+    backend.add_bucket("music", 450)
+    with FakeQiniuServer(backend) as server:
+        yield server
+
+
+@pytest.fixture
+def client(fake_qiniu, monkeypatch):
+    monkeypatch.setenv(UC_HOST_ENV, fake_qiniu.url)
+    monkeypatch.setenv(ALLOWED_ENDPOINTS_ENV, fake_qiniu.url)
+    transport = StreamableHttpTransport(application.server, session_manager)
+    app = Starlette(routes=[Route("/mcp", endpoint=transport)])
+    with TestClient(app) as test_client:
+        test_client.headers.update(
+            {
+                "X-AK": "ak",
+                "X-SK": "sk",
+                "X-REGION-NAME": "test",
+                "X-BUCKETS": "music",
+                "X-ENDPOINT-URL": fake_qiniu.url,
+            }
+        )
+        yield test_client
+
+
+def _rpc(method, params=None, request_id=1):
+    message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+    if params is not None:
+        message["params"] = params
+    return message
+
+
+def _initialize(client) -> str:
+    response = client.post(
+        "/mcp",
+        json=_rpc(
+            "initialize",
+            {
+                "protocolVersion": "2025-03-26",
+                "capabilities": {},
+                "clientInfo": {"name": "test", "version": "0"},
+            },
+        ),
+    )
+    assert response.status_code == 200
+    assert response.json()["result"]["protocolVersion"] == "2025-03-26"
+    return response.headers[MCP_SESSION_ID_HEADER]
+
+
+def test_initialize_and_call_tools(client):
+    session_id = _initialize(client)
+    headers = {MCP_SESSION_ID_HEADER: session_id}
+
+    notified = client.post(
+        "/mcp",
+        json={"jsonrpc": "2.0", "method": "notifications/initialized"},
+        headers=headers,
+    )
+    assert notified.status_code == 202
+
+    responses = client.post(
+        "/mcp",
+        json=[
+            _rpc("tools/list", request_id=1),
+            _rpc(
+                "tools/call",
+                {"name": "get_music_list", "arguments": {"max_keys": 5}},
+                request_id=2,
+            ),
+        ],
+        headers=headers,
+    ).json()
+    assert [r["id"] for r in responses] == [1, 2]
+    assert any(t["name"] == "get_music_list" for t in responses[0]["result"]["tools"])
+    assert "track-" in responses[1]["result"]["content"][0]["text"]
+
+    assert client.delete("/mcp", headers=headers).status_code == 204
+    assert asyncio.run(session_manager.get_session(session_id)) is None
+
+
+def test_session_is_rebuilt_from_headers(client):
+    # 模拟请求被负载均衡到没有该会话的 worker
+    session_id = _initialize(client)
+    asyncio.run(session_manager.remove_session(session_id))
+
+    response = client.post(
+        "/mcp",
+        json=_rpc("tools/call", {"name": "get_music_list", "arguments": {}}),
+        headers={MCP_SESSION_ID_HEADER: session_id},
+    )
+    assert response.status_code == 200
+    assert "track-" in response.json()["result"]["content"][0]["text"]
+    assert asyncio.run(session_manager.get_session(session_id)) is not None
+    asyncio.run(session_manager.remove_session(session_id))
+
+
+def test_requests_are_rejected(client):
+    session_id = _initialize(client)
+
+    missing = client.post("/mcp", json=_rpc("tools/list"))
+    assert missing.status_code == 400
+
+    other_tenant = client.post(
+        "/mcp",
+        json=_rpc("tools/list"),
+        headers={MCP_SESSION_ID_HEADER: session_id, "X-SK": "x"},
+    )
+    assert other_tenant.status_code == 403
+
+    assert client.get("/mcp").status_code == 405
+    asyncio.run(session_manager.remove_session(session_id))
+
+
+def test_list_resources_follows_params_cursor(client):
+    session_id = _initialize(client)
+    headers = {MCP_SESSION_ID_HEADER: session_id}
+
+    first = client.post("/mcp", json=_rpc("resources/list"), headers=headers).json()
+    cursor = first["result"]["nextCursor"]
+    assert cursor
+
+    second = client.post(
+        "/mcp", json=_rpc("resources/list", {"cursor": cursor}), headers=headers
+    ).json()
+    first_uris = {r["uri"] for r in first["result"]["resources"]}
+    second_uris = {r["uri"] for r in second["result"]["resources"]}
+    assert second_uris and not first_uris & second_uris
+    assert second["result"].get("nextCursor") is None
+    asyncio.run(session_manager.remove_session(session_id))
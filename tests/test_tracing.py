@@ -0,0 +1,105 @@
+"""
+调用链追踪测试
+"""
+
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from mcp_server.context import current_session_id
+from mcp_server.tracing import tracing
+from mcp_server.tracing.otlp import OtlpHttpExporter
+
+
+class _RecordingHook(tracing.SpanHook):
+    def __init__(self):
+        self.started = []
+        self.ended = []
+
+    def on_start(self, span):
+        self.started.append(span.name)
+
+    def on_end(self, span):
+        self.ended.append(span)
+
+
+def test_spans_nest_and_carry_session_id():
+    hook = tracing.add_hook(_RecordingHook())
+    token = current_session_id.set("session-1")
+    try:
+        with tracing.span("tool.demo") as root:
+            with tracing.span("storage.list_objects"):
+                pass
+            with pytest.raises(ValueError):
+                with tracing.span("storage.get_object"):
+                    raise ValueError("missing")
+    finally:
+        current_session_id.reset(token)
+        tracing.remove_hook(hook)
+
+    assert hook.started == ["tool.demo", "storage.list_objects", "storage.get_object"]
+    child, failed, ended_root = hook.ended
+    assert ended_root is root
+    assert child.parent is root and child.trace_id == root.trace_id
+    assert child.session_id == "session-1"
+    assert failed.status == tracing.STATUS_ERROR
+    assert set(root.breakdown) == {"storage.list_objects", "storage.get_object"}
+    assert tracing.get_current_span() is None
+
+
+def test_slow_call_logger_reports_breakdown(caplog):
+    logger = tracing.SlowCallLogger(threshold=0)
+    hook = tracing.add_hook(logger)
+    try:
+        with caplog.at_level(logging.WARNING):
+            with tracing.span("tool.slow"):
+                with tracing.span("tool.execute"):
+                    pass
+    finally:
+        tracing.remove_hook(hook)
+
+    assert any(
+        "Slow call tool.slow" in r.message and "tool.execute x1" in r.message
+        for r in caplog.records
+    )
+
+
+class _CollectorHandler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        _CollectorHandler.requests.append((self.path, json.loads(body)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+def test_otlp_exporter_posts_to_local_collector():
+    collector = ThreadingHTTPServer(("127.0.0.1", 0), _CollectorHandler)
+    threading.Thread(target=collector.serve_forever, daemon=True).start()
+    exporter = tracing.add_hook(
+        OtlpHttpExporter(f"http://127.0.0.1:{collector.server_port}")
+    )
+    try:
+        with tracing.span("tool.demo", tool="demo"):
+            with tracing.span("tool.execute"):
+                pass
+    finally:
+        tracing.remove_hook(exporter)
+        collector.shutdown()
+
+    assert exporter.exported == 2
+    path, payload = _CollectorHandler.requests[-1]
+    assert path == "/v1/traces"
+    spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert [s["name"] for s in spans] == ["tool.execute", "tool.demo"]
+    assert spans[0]["parentSpanId"] == spans[1]["spanId"]
+    assert len(spans[1]["traceId"]) == 32